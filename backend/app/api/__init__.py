@@ -8,9 +8,15 @@ Contains all REST API endpoints for the HeatGuard system.
 from .prediction import prediction_bp
 from .health import health_bp
 from .data_generation import data_generation_bp
+from .compliance import compliance_bp
+from .metrics import metrics_bp
+from .admin import admin_bp
 
 __all__ = [
     "prediction_bp",
     "health_bp",
     "data_generation_bp",
+    "compliance_bp",
+    "metrics_bp",
+    "admin_bp",
 ]
\ No newline at end of file
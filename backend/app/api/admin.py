@@ -0,0 +1,53 @@
+"""
+Admin API Endpoints
+===================
+
+Diagnostics endpoints for operators, restricted to admin API keys.
+
+``/api/v1/admin/traces`` serves the request traces kept in memory: sampled
+requests (TRACE_SAMPLE_RATE) with every span, and requests slower than
+TRACE_SLOW_REQUEST_MS with their stage totals.
+"""
+
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from ..middleware.auth import require_admin_permission
+from ..utils.logger import get_logger
+from ..utils.tracing import trace_buffer
+
+logger = get_logger(__name__)
+
+# Create router
+admin_bp = APIRouter(prefix="/api/v1/admin", tags=["admin"])
+
+
+@admin_bp.get("/traces", summary="Recent request traces")
+async def get_traces(
+    limit: int = Query(50, ge=1, le=1000, description="Maximum traces returned"),
+    path: Optional[str] = Query(None, description="Only traces of this request path"),
+    min_duration_ms: float = Query(0.0, ge=0, description="Only traces at least this slow"),
+    _: bool = Depends(require_admin_permission)
+) -> Dict[str, Any]:
+    """
+    Recently kept request traces, most recent first.
+
+    - **stages**: summed duration and call count of each pipeline stage
+    - **spans**: each stage and preprocessing step with its offset from the
+      request start and the thread it ran on (sampled requests only)
+    - Look a response up by its `X-Trace-ID` header, or send `X-Request-ID`
+      to choose the trace ID
+    """
+    return {
+        'tracing': trace_buffer.get_stats(),
+        'traces': trace_buffer.get_traces(limit=limit, path=path, min_duration_ms=min_duration_ms)
+    }
+
+
+@admin_bp.delete("/traces", summary="Clear request traces")
+async def clear_traces(_: bool = Depends(require_admin_permission)) -> Dict[str, Any]:
+    """Drop all kept request traces."""
+    cleared = trace_buffer.clear()
+    logger.info("Request traces cleared", cleared=cleared)
+    return {'cleared': cleared}
@@ -0,0 +1,102 @@
+"""
+Compliance API Endpoints
+========================
+
+OSHA compliance data export endpoints.
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from datetime import datetime
+
+from ..services.compliance_service import ComplianceService
+from ..utils.logger import get_logger
+from ..utils.serialization import FastJSONResponse
+from ..middleware.auth import APIKeyHeader
+
+logger = get_logger(__name__)
+
+# Create router
+compliance_bp = APIRouter(prefix="/api/v1", tags=["compliance"])
+
+# Service instances
+compliance_service = ComplianceService()
+
+EXPORT_MEDIA_TYPES = {
+    'ndjson': "application/x-ndjson",
+    'csv': "text/csv",
+}
+
+
+@compliance_bp.get("/compliance/export",
+                   summary="Stream raw compliance entries as NDJSON or CSV")
+async def export_compliance_entries(
+    start_date: datetime = Query(..., description="Export start (ISO 8601)"),
+    end_date: datetime = Query(..., description="Export end (ISO 8601)"),
+    worker_id: Optional[List[str]] = Query(None, description="Only export these workers (repeatable)"),
+    export_format: str = Query("ndjson", alias="format", regex="^(ndjson|csv)$"),
+    fields: Optional[str] = Query(None, description="Comma-separated dotted entry fields to export"),
+    compress: bool = Query(False, alias="gzip", description="Gzip the response body"),
+    api_key: str = Depends(APIKeyHeader)
+) -> StreamingResponse:
+    """
+    Export the raw compliance entries of a period for audits.
+
+    Entries are read segment by segment and written to the response as they are
+    encoded, so a full year can be exported without loading it into memory.
+
+    - **Formats**: one JSON entry per line, or CSV with one column per field
+    - **Filters**: date range and worker IDs are applied while reading
+    - **Compression**: `gzip=true` sends the body with `Content-Encoding: gzip`
+    - **Progress**: poll `/compliance/export/{export_id}` with the `X-Export-Id` response header
+    """
+    selected = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+
+    try:
+        export_id, chunks = compliance_service.export_compliance_entries(
+            start_date, end_date,
+            worker_ids=worker_id,
+            export_format=export_format,
+            fields=selected,
+            compress=compress
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    filename = f"compliance_{start_date:%Y%m%d%H%M}_{end_date:%Y%m%d%H%M}.{export_format}"
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "X-Export-Id": export_id
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(chunks, media_type=EXPORT_MEDIA_TYPES[export_format], headers=headers)
+
+
+@compliance_bp.get("/compliance/export/{export_id}",
+                   summary="Get the progress of a compliance export")
+async def get_compliance_export_progress(
+    export_id: str,
+    api_key: str = Depends(APIKeyHeader)
+):
+    """
+    Get the progress of a running or recent compliance export.
+
+    Reports segments read out of the segments in the period, entries and bytes
+    written so far, and whether the export completed, failed or was cancelled
+    by the client disconnecting.
+    """
+    progress = compliance_service.get_export_progress(export_id)
+
+    if progress is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Export not found"
+        )
+
+    return FastJSONResponse(content=progress)
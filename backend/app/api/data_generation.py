@@ -5,7 +5,7 @@ Data Generation API Endpoints
 API endpoints for generating test data and simulation scenarios.
 """
 
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, status
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field, validator
 from typing import List, Dict, Any, Optional
@@ -83,8 +83,8 @@ class DataGeneratorInfo(BaseModel):
 @data_generation_bp.get("/generate_random", response_model=GeneratedDataResponse,
                        summary="Generate random test data")
 async def generate_random_data(
-    count: int = Field(default=10, ge=1, le=1000),
-    risk_distribution: Optional[str] = Field(default=None, description="JSON string of risk distribution"),
+    count: int = Query(default=10, ge=1, le=1000),
+    risk_distribution: Optional[str] = Query(default=None, description="JSON string of risk distribution"),
     seed: Optional[int] = None,
     api_key: str = Depends(APIKeyHeader)
 ) -> GeneratedDataResponse:
@@ -166,10 +166,10 @@ async def generate_random_data(
 @data_generation_bp.get("/generate_ramp_up", response_model=GeneratedDataResponse,
                        summary="Generate escalating risk scenario")
 async def generate_ramp_up_scenario(
-    duration_minutes: int = Field(default=60, ge=5, le=480),
-    interval_minutes: int = Field(default=5, ge=1, le=30),
-    worker_age: Optional[int] = Field(default=None, ge=18, le=65),
-    worker_gender: Optional[int] = Field(default=None, ge=0, le=1),
+    duration_minutes: int = Query(default=60, ge=5, le=480),
+    interval_minutes: int = Query(default=5, ge=1, le=30),
+    worker_age: Optional[int] = Query(default=None, ge=18, le=65),
+    worker_gender: Optional[int] = Query(default=None, ge=0, le=1),
     seed: Optional[int] = None,
     api_key: str = Depends(APIKeyHeader)
 ) -> GeneratedDataResponse:
@@ -258,10 +258,10 @@ async def generate_ramp_up_scenario(
 @data_generation_bp.get("/generate_ramp_down", response_model=GeneratedDataResponse,
                        summary="Generate de-escalating risk scenario")
 async def generate_ramp_down_scenario(
-    duration_minutes: int = Field(default=60, ge=5, le=480),
-    interval_minutes: int = Field(default=5, ge=1, le=30),
-    worker_age: Optional[int] = Field(default=None, ge=18, le=65),
-    worker_gender: Optional[int] = Field(default=None, ge=0, le=1),
+    duration_minutes: int = Query(default=60, ge=5, le=480),
+    interval_minutes: int = Query(default=5, ge=1, le=30),
+    worker_age: Optional[int] = Query(default=None, ge=18, le=65),
+    worker_gender: Optional[int] = Query(default=None, ge=0, le=1),
     seed: Optional[int] = None,
     api_key: str = Depends(APIKeyHeader)
 ) -> GeneratedDataResponse:
@@ -17,9 +17,10 @@ import time
 from ..services.prediction_service import PredictionService
 from ..services.batch_service import BatchService
 from ..services.compliance_service import ComplianceService
-from ..models.model_loader import model_loader
+from ..models.model_loader import model_loader, model_refresher
+from ..services.warmup_service import warmup_service
 from ..config.settings import settings
-from ..utils.logger import get_logger
+from ..utils.logger import get_logger, get_logging_metrics
 
 logger = get_logger(__name__)
 
@@ -209,6 +210,7 @@ async def model_health_check() -> JSONResponse:
     - Model performance metrics
     - Feature availability
     - Prediction capabilities
+    - Background refresh status and the last model swap
     """
     try:
         # Get model health from loader
@@ -225,6 +227,9 @@ async def model_health_check() -> JSONResponse:
             content={
                 "model_loader_status": model_health,
                 "model_info": model_info,
+                "model_cache": model_loader.get_all_models_info(),
+                "model_refresh": model_refresher.get_status(),
+                "warmup": warmup_service.get_status(),
                 "timestamp": datetime.now().isoformat()
             }
         )
@@ -251,6 +256,7 @@ async def services_health_check() -> JSONResponse:
     - Prediction Service
     - Batch Processing Service
     - Compliance Service
+    - Logging pipeline
     """
     try:
         services_status = []
@@ -306,6 +312,15 @@ async def services_health_check() -> JSONResponse:
                 "timestamp": datetime.now().isoformat()
             })
 
+        # Check the logging pipeline
+        logging_metrics = get_logging_metrics()
+        services_status.append({
+            "service_name": "LoggingPipeline",
+            "status": "degraded" if logging_metrics['async'] and not logging_metrics['running'] else "healthy",
+            "details": logging_metrics,
+            "timestamp": datetime.now().isoformat()
+        })
+
         return JSONResponse(
             content={
                 "services": services_status,
@@ -382,13 +397,22 @@ async def readiness_check() -> JSONResponse:
 
     Returns:
     - 200: Service is ready to accept requests
-    - 503: Service is not ready (still initializing)
+    - 503: Service is not ready (still initializing or warming up the model)
     """
     try:
         # Check if critical components are ready
         model_ready = model_loader.is_model_loaded("default")
 
-        if model_ready:
+        if model_ready and warmup_service.is_running:
+            return JSONResponse(
+                content={
+                    "ready": False,
+                    "reason": "Model warm-up in progress",
+                    "timestamp": datetime.now().isoformat()
+                },
+                status_code=503
+            )
+        elif model_ready:
             return JSONResponse(
                 content={
                     "ready": True,
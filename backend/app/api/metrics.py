@@ -0,0 +1,134 @@
+"""
+Metrics API Endpoints
+=====================
+
+Prometheus scrape endpoints for the HeatGuard system.
+
+``/api/v1/metrics`` serves request, pipeline stage, model, cache, queue and
+executor metrics; ``/api/v1/business-metrics`` serves prediction outcome
+counters. Both are scraped by deployment/monitoring/prometheus.yml.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List
+
+from fastapi import APIRouter, HTTPException, Response, status
+
+from ..config.settings import settings
+from ..middleware.auth import auth_middleware
+from ..models.model_loader import model_loader
+from ..utils.compliance_writer import compliance_writer
+from ..utils.logger import get_logger
+from ..utils.metrics import (
+    PROMETHEUS_CONTENT_TYPE, MetricFamily, MetricsRegistry, business_registry, registry
+)
+from .prediction import batch_service, prediction_service
+
+logger = get_logger(__name__)
+
+# Create router
+metrics_bp = APIRouter(prefix="/api/v1", tags=["metrics"])
+
+UNFINISHED_JOB_STATUSES = ('pending', 'running')
+
+
+def collect_model_cache() -> Iterable[MetricFamily]:
+    """Per-model footprint and cache counters of the model loader."""
+    models = model_loader.get_all_models_info()
+    hits = misses = evictions = 0
+    memory: List = []
+    for model_name, info in models.items():
+        hits += info['cache_hits']
+        misses += info['cache_misses']
+        evictions += info['cache_evictions']
+        memory.append(({'model': model_name}, info['memory_bytes']))
+
+    yield ("heatguard_model_memory_bytes", "gauge", "Estimated memory held by each cached model", memory)
+    yield ("heatguard_model_cache_memory_limit_bytes", "gauge", "Model cache memory budget (0 = none)",
+           [({}, settings.MODEL_CACHE_MAX_BYTES)])
+    yield ("heatguard_models_cached", "gauge", "Models in the model cache", [({}, len(models))])
+
+    # Cache counters of the model cache and the API key caches, one family each
+    api_keys = auth_middleware.get_cache_stats()
+    caches = {
+        'model': {'hits': hits, 'misses': misses, 'evictions': evictions},
+        'api_key': api_keys['valid_keys'],
+        'invalid_api_key': api_keys['invalid_keys'],
+    }
+    for counter in ('hits', 'misses', 'evictions'):
+        yield (f"heatguard_cache_{counter}_total", "counter", f"Cache {counter} by cache",
+               [({'cache': cache}, stats[counter]) for cache, stats in caches.items()])
+
+
+def collect_queues() -> Iterable[MetricFamily]:
+    """Batch job backlog, executor saturation and the compliance writer queue."""
+    jobs = list(batch_service.active_jobs.values())
+    by_status = {job_status: 0 for job_status in UNFINISHED_JOB_STATUSES}
+    rows_pending = 0
+    for job in jobs:
+        by_status[job.status] = by_status.get(job.status, 0) + 1
+        if job.status in UNFINISHED_JOB_STATUSES:
+            rows_pending += max(0, job.total_items - job.processed_items)
+
+    yield ("heatguard_batch_jobs", "gauge", "Batch jobs held by the batch service, by status",
+           [({'status': job_status}, count) for job_status, count in by_status.items()])
+    yield ("heatguard_batch_job_queue_depth", "gauge", "Batch jobs pending or running",
+           [({}, sum(by_status[job_status] for job_status in UNFINISHED_JOB_STATUSES))])
+    yield ("heatguard_batch_rows_pending", "gauge", "Rows of unfinished batch jobs not yet scored",
+           [({}, rows_pending)])
+
+    executors = {
+        'prediction_service': prediction_service.executor,
+        'batch_service': batch_service.executor,
+    }
+    yield ("heatguard_executor_queued_tasks", "gauge", "Tasks waiting for an executor thread",
+           [({'executor': name}, executor._work_queue.qsize()) for name, executor in executors.items()])
+    yield ("heatguard_executor_threads", "gauge", "Threads started by an executor",
+           [({'executor': name}, len(executor._threads)) for name, executor in executors.items()])
+    yield ("heatguard_executor_max_workers", "gauge", "Thread limit of an executor",
+           [({'executor': name}, executor._max_workers) for name, executor in executors.items()])
+
+    writer = compliance_writer.get_metrics()
+    yield ("heatguard_compliance_queue_depth", "gauge", "Entries waiting for the compliance writer",
+           [({}, writer['queue_depth'])])
+    yield ("heatguard_compliance_entries_dropped_total", "counter", "Compliance entries dropped by a full queue",
+           [({}, writer['entries_dropped'])])
+    yield ("heatguard_compliance_entries_overflowed_total", "counter",
+           "Compliance entries buffered outside the full queue",
+           [({}, writer['entries_overflowed'])])
+
+
+registry.add_collector(collect_model_cache)
+registry.add_collector(collect_queues)
+
+
+def _scrape(metrics_registry: MetricsRegistry) -> Response:
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Metrics are disabled")
+    return Response(content=metrics_registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@metrics_bp.get("/metrics", summary="Prometheus metrics")
+async def get_metrics() -> Response:
+    """
+    Operational metrics in the Prometheus text exposition format.
+
+    - **Requests**: `http_requests_total`, `http_request_duration_seconds`
+    - **Pipeline**: `heatguard_pipeline_stage_duration_seconds` by stage,
+      `heatguard_prediction_duration_seconds`
+    - **Models**: load time, per-model memory, cache hits, misses and evictions
+    - **Queues**: batch job backlog, executor saturation, compliance writer queue
+    """
+    return _scrape(registry)
+
+
+@metrics_bp.get("/business-metrics", summary="Prometheus business metrics")
+async def get_business_metrics() -> Response:
+    """
+    Prediction outcome metrics in the Prometheus text exposition format.
+
+    - `heatguard_predictions_total` by risk level
+    - `heatguard_critical_risk_alerts_total`
+    - `heatguard_osha_compliance_logs_total`
+    """
+    return _scrape(business_registry)
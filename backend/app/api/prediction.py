@@ -5,20 +5,28 @@ Prediction API Endpoints
 REST API endpoints for heat exposure predictions.
 """
 
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Query, Request, Response, status
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from pydantic import BaseModel, Field, validator
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import os
 import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
+from pathlib import Path
 
-from ..services.prediction_service import PredictionService
+from ..services.prediction_service import PredictionService, SERVICE_FIELDS
 from ..services.batch_service import BatchService
+from ..services.warmup_service import warmup_service
+from ..models.heat_predictor import PREDICTION_FIELDS, COMPACT_PREDICTION_FIELDS, recommendation_text
+from ..config.model_config import OSHA_RECOMMENDATIONS
 from ..utils.validators import ValidationError
 from ..utils.logger import get_logger, log_api_request
+from ..utils.serialization import FastJSONResponse, dumps_lines, project, project_many
 from ..config.settings import settings
 from ..middleware.auth import get_current_user, APIKeyHeader
+from ..middleware.quota import quota_manager, quota_headers
 
 logger = get_logger(__name__)
 
@@ -29,6 +37,11 @@ prediction_bp = APIRouter(prefix="/api/v1", tags=["predictions"])
 prediction_service = PredictionService()
 batch_service = BatchService()
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Received upload bytes are written to disk in batches of about this size
+UPLOAD_WRITE_BYTES = 1024 * 1024
+
 
 # Pydantic models for request/response
 class WorkerData(BaseModel):
@@ -112,6 +125,7 @@ class PredictionResponse(BaseModel):
 
     # Safety information
     osha_recommendations: List[str]
+    osha_recommendation_codes: Optional[List[str]]
     requires_immediate_attention: bool
 
     # Processing metadata
@@ -132,6 +146,90 @@ class BatchPredictionResponse(BaseModel):
     validation_warnings: Optional[List[str]]
 
 
+# Field lists used to shape service results without a validation pass
+PREDICTION_RESPONSE_FIELDS = tuple(PredictionResponse.__fields__)
+BATCH_RESPONSE_FIELDS = tuple(BatchPredictionResponse.__fields__)
+STREAM_PREDICTION_FIELDS = ('record_type', 'batch_index') + PREDICTION_RESPONSE_FIELDS
+
+# Field selection through the fields= and profile= query parameters
+RESPONSE_PROFILES = {'full': None, 'compact': COMPACT_PREDICTION_FIELDS}
+SELECTABLE_FIELDS = frozenset(PREDICTION_FIELDS) | frozenset(SERVICE_FIELDS) | {'osha_recommendations'}
+
+
+def _selected_fields(fields: Optional[str], profile: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Resolve the fields/profile query parameters.
+
+    Args:
+        fields: Comma-separated field names (takes precedence over profile)
+        profile: Named field profile
+
+    Returns:
+        Tuple of prediction fields to return, or None for the full response
+
+    Raises:
+        HTTPException: If unknown fields are requested
+    """
+    if fields:
+        selected = [name.strip() for name in fields.split(',') if name.strip()]
+        unknown = [name for name in selected if name not in SELECTABLE_FIELDS]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Unknown fields requested: {unknown}"
+            )
+    else:
+        selected = RESPONSE_PROFILES.get(profile or 'full')
+        if selected is None:
+            return None
+
+    # Predictions are always identified by worker
+    return tuple(dict.fromkeys(['worker_id', *selected]))
+
+
+def _attach_recommendation_text(results: List[Dict[str, Any]],
+                                selected: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
+    """
+    Resolve recommendation keys to text for human-facing responses.
+
+    The text tuples are shared, so this only adds a reference per result.
+    Nothing is done when a field selection leaves the text out.
+    """
+    if selected is not None and 'osha_recommendations' not in selected:
+        return results
+    for result in results:
+        if 'osha_recommendation_key' in result:
+            result['osha_recommendations'] = recommendation_text(result['osha_recommendation_key'])
+    return results
+
+
+def _single_prediction_response(result: Dict[str, Any], selected: Optional[Tuple[str, ...]] = None):
+    """Build the /predict response, validating only when VALIDATE_RESPONSES is set."""
+    _attach_recommendation_text([result], selected)
+    if selected is not None:
+        return FastJSONResponse(project(result, tuple(dict.fromkeys(['request_id', *selected]))))
+    if settings.VALIDATE_RESPONSES:
+        return PredictionResponse(**result)
+    return FastJSONResponse(project(result, PREDICTION_RESPONSE_FIELDS))
+
+
+def _batch_prediction_response(result: Dict[str, Any], selected: Optional[Tuple[str, ...]] = None):
+    """Build the /predict_batch response, validating only when VALIDATE_RESPONSES is set."""
+    _attach_recommendation_text(result.get('predictions', []), selected)
+    if selected is None and settings.VALIDATE_RESPONSES:
+        return BatchPredictionResponse(**result)
+    content = project(result, BATCH_RESPONSE_FIELDS)
+    content['predictions'] = project_many(result.get('predictions', []), selected or PREDICTION_RESPONSE_FIELDS)
+    return FastJSONResponse(content)
+
+
+def _with_quota_headers(result: Any, response: Response, quota_status: Optional[Dict[str, Any]]) -> Any:
+    """Attach quota headers to a returned Response, or to the injected one for models."""
+    target = result if isinstance(result, Response) else response
+    target.headers.update(quota_headers(quota_status))
+    return result
+
+
 # API Endpoints
 
 @prediction_bp.post("/predict", response_model=PredictionResponse,
@@ -139,6 +237,9 @@ class BatchPredictionResponse(BaseModel):
 async def predict_single_worker(
     request: SinglePredictionRequest,
     background_tasks: BackgroundTasks,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated result fields to return"),
+    profile: Optional[str] = Query(None, regex="^(full|compact)$", description="Named result field profile"),
     api_key: str = Depends(APIKeyHeader)
 ) -> PredictionResponse:
     """
@@ -151,8 +252,13 @@ async def predict_single_worker(
     - **Risk Assessment**: Returns risk score (0-1) and categorical risk level
     - **Safety Recommendations**: OSHA-compliant recommendations based on risk level
     - **OSHA Compliance**: Automatically logs predictions for compliance reporting
+    - **Field Selection**: `fields=a,b,c` or `profile=compact` computes and returns only those
+      fields; compact results carry recommendation codes from `/osha_recommendations`
+    - **Compute Quota**: Charged one row against the API key's quota (see `X-Quota-*` headers)
     """
     start_time = time.time()
+    selected = _selected_fields(fields, profile)
+    quota_status = quota_manager.charge(api_key, "predict", rows=1)
 
     try:
         # Convert Pydantic model to dict
@@ -163,7 +269,8 @@ async def predict_single_worker(
         result = await prediction_service.predict_single_worker(
             worker_data,
             use_conservative=options.get('use_conservative', True),
-            log_compliance=options.get('log_compliance', True)
+            log_compliance=options.get('log_compliance', True),
+            fields=selected
         )
 
         # Log API request
@@ -178,7 +285,7 @@ async def predict_single_worker(
             request_id=result.get('request_id')
         )
 
-        return PredictionResponse(**result)
+        return _with_quota_headers(_single_prediction_response(result, selected), response, quota_status)
 
     except ValidationError as e:
         logger.error(f"Validation error in single prediction: {e}")
@@ -199,6 +306,10 @@ async def predict_single_worker(
 async def predict_batch_workers(
     request: BatchPredictionRequest,
     background_tasks: BackgroundTasks,
+    http_request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated prediction fields to return"),
+    profile: Optional[str] = Query(None, regex="^(full|compact)$", description="Named prediction field profile"),
     api_key: str = Depends(APIKeyHeader)
 ) -> BatchPredictionResponse:
     """
@@ -211,20 +322,53 @@ async def predict_batch_workers(
     - **Parallel Processing**: Optional parallel processing for faster results
     - **Batch Statistics**: Aggregated risk analysis across all workers
     - **OSHA Compliance**: Batch compliance logging for all predictions
+    - **Streaming**: Send `Accept: application/x-ndjson` to receive one prediction per line
+      as each chunk finishes, followed by a trailing `batch_statistics` record
+    - **Field Selection**: `fields=a,b,c` or `profile=compact` computes and returns only those
+      fields for each prediction
+    - **Compute Quota**: Charged one row per worker against the API key's quota
     """
     start_time = time.time()
+    selected = _selected_fields(fields, profile)
+    quota_status = quota_manager.charge(api_key, "predict_batch", rows=len(request.data))
 
     try:
         # Convert Pydantic models to dicts
         worker_data_list = [worker.dict() for worker in request.data]
         options = request.options.dict() if request.options else {}
 
+        if NDJSON_MEDIA_TYPE in http_request.headers.get("accept", ""):
+            record_chunks = await prediction_service.stream_multiple_workers(
+                worker_data_list,
+                use_conservative=options.get('use_conservative', True),
+                log_compliance=options.get('log_compliance', True),
+                parallel=request.parallel_processing,
+                fields=selected
+            )
+
+            background_tasks.add_task(
+                log_api_request,
+                endpoint="/api/v1/predict_batch",
+                method="POST",
+                status_code=200,
+                response_time=time.time() - start_time,
+                user_id=None,
+                request_id=None
+            )
+
+            return StreamingResponse(
+                _encode_ndjson(record_chunks, selected),
+                media_type=NDJSON_MEDIA_TYPE,
+                headers=quota_headers(quota_status)
+            )
+
         # Make batch prediction
         result = await prediction_service.predict_multiple_workers(
             worker_data_list,
             use_conservative=options.get('use_conservative', True),
             log_compliance=options.get('log_compliance', True),
-            parallel=request.parallel_processing
+            parallel=request.parallel_processing,
+            fields=selected
         )
 
         # Log API request
@@ -239,7 +383,7 @@ async def predict_batch_workers(
             request_id=result.get('request_id')
         )
 
-        return BatchPredictionResponse(**result)
+        return _with_quota_headers(_batch_prediction_response(result, selected), response, quota_status)
 
     except ValidationError as e:
         logger.error(f"Validation error in batch prediction: {e}")
@@ -255,6 +399,32 @@ async def predict_batch_workers(
         )
 
 
+async def _encode_ndjson(record_chunks, selected: Optional[Tuple[str, ...]] = None):
+    """Encode each chunk of records as newline-delimited JSON."""
+    record_fields = ('record_type', 'batch_index') + selected if selected else STREAM_PREDICTION_FIELDS
+    async for records in record_chunks:
+        _attach_recommendation_text(records, selected)
+        # Failed rows keep their error details; statistics records pass through
+        records = [
+            project(record, record_fields)
+            if record.get('record_type') == 'prediction' and 'error' not in record else record
+            for record in records
+        ]
+        yield dumps_lines(records)
+
+
+@prediction_bp.get("/osha_recommendations",
+                  summary="Get the OSHA recommendation code table")
+async def get_osha_recommendations(api_key: str = Depends(APIKeyHeader)):
+    """
+    Get the text for each recommendation code returned in `osha_recommendation_codes`.
+
+    The table is static for a given service version, so clients can fetch it once and
+    resolve codes from compact prediction results locally.
+    """
+    return FastJSONResponse({'recommendations': OSHA_RECOMMENDATIONS})
+
+
 # Async Batch Processing Endpoints
 
 class AsyncBatchRequest(BaseModel):
@@ -279,6 +449,7 @@ class AsyncBatchResponse(BaseModel):
 async def submit_async_batch_prediction(
     request: AsyncBatchRequest,
     background_tasks: BackgroundTasks,
+    response: Response,
     api_key: str = Depends(APIKeyHeader)
 ) -> AsyncBatchResponse:
     """
@@ -291,8 +462,11 @@ async def submit_async_batch_prediction(
     - **Job Tracking**: Returns job ID for monitoring progress
     - **Chunk Processing**: Configurable chunk size for optimal performance
     - **Priority Queuing**: Set job priority for processing order
+    - **Compute Quota**: Charged QUOTA_ASYNC_ROW_WEIGHT of a row per worker against the API key's quota
     """
     start_time = time.time()
+    quota_status = quota_manager.charge(api_key, "predict_batch_async", rows=len(request.data))
+    response.headers.update(quota_headers(quota_status))
 
     try:
         # Convert Pydantic models to dicts
@@ -307,10 +481,12 @@ async def submit_async_batch_prediction(
             priority=request.priority
         )
 
-        # Estimate completion time (rough calculation)
+        # Estimate completion time from the row cost measured at warm-up
         batch_size = len(worker_data_list)
-        estimated_seconds = (batch_size / 100) * 30  # Rough estimate
-        estimated_completion = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        estimated_seconds = warmup_service.estimate_seconds(batch_size)
+        if estimated_seconds is None:
+            estimated_seconds = (batch_size / 100) * 30  # Rough estimate before calibration
+        estimated_completion = (datetime.now() + timedelta(seconds=estimated_seconds)).strftime('%Y-%m-%d %H:%M:%S')
 
         # Log API request
         response_time = time.time() - start_time
@@ -340,6 +516,170 @@ async def submit_async_batch_prediction(
         )
 
 
+@prediction_bp.post("/predict_batch_upload", response_model=AsyncBatchResponse,
+                   summary="Submit a CSV or Parquet file for asynchronous processing")
+async def submit_file_batch_prediction(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    file_format: str = Query("csv", alias="format", regex="^(csv|parquet)$"),
+    chunk_size: int = Query(1000, ge=10, le=1000, description="Rows scored per chunk"),
+    use_conservative: bool = Query(True, description="Apply conservative bias for safety"),
+    log_compliance: bool = Query(True, description="Log predictions for OSHA compliance"),
+    priority: str = Query("normal", regex="^(low|normal|high)$"),
+    api_key: str = Depends(APIKeyHeader)
+) -> AsyncBatchResponse:
+    """
+    Submit a large CSV or Parquet export for asynchronous processing.
+
+    The raw file is sent as the request body and streamed to disk, then read back
+    in bounded chunks so that memory use stays flat regardless of file size.
+
+    - **No Row Limit**: Score full-day exports with millions of rows
+    - **Chunked Reading**: CSV parsed in chunks, Parquet read by row group
+    - **Incremental Results**: Results are written as NDJSON as each chunk completes
+    - **Job Tracking**: Monitor with `/batch_status/{job_id}`, download with `/batch_results/{job_id}/download`
+    - **Compute Quota**: Charged by file size (QUOTA_UPLOAD_BYTES_PER_ROW bytes per row), before
+      the body is read when Content-Length is sent
+    """
+    start_time = time.time()
+
+    # Reject over-quota uploads before reading the body when the size is known
+    quota_status = None
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit():
+        quota_status = quota_manager.charge(api_key, "predict_batch_upload", bytes_received=int(content_length))
+
+    upload_dir = Path(settings.BATCH_RESULTS_DIR) / "uploads"
+    upload_path = upload_dir / f"upload_{uuid.uuid4().hex}.{file_format}"
+
+    try:
+        bytes_received = await _receive_upload(request, upload_path)
+
+        if bytes_received == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Uploaded file is empty"
+            )
+
+        if quota_status is None:
+            quota_status = quota_manager.charge(api_key, "predict_batch_upload", bytes_received=bytes_received)
+        response.headers.update(quota_headers(quota_status))
+
+        job_id = await batch_service.submit_file_job(
+            file_path=str(upload_path),
+            file_format=file_format,
+            use_conservative=use_conservative,
+            log_compliance=log_compliance,
+            chunk_size=chunk_size,
+            priority=priority
+        )
+
+        job_status = await batch_service.get_job_status(job_id)
+
+        response_time = time.time() - start_time
+        background_tasks.add_task(
+            log_api_request,
+            endpoint="/api/v1/predict_batch_upload",
+            method="POST",
+            status_code=202,
+            response_time=response_time,
+            user_id=None,
+            request_id=job_id
+        )
+
+        return AsyncBatchResponse(
+            job_id=job_id,
+            status="submitted",
+            message="File batch job submitted successfully",
+            batch_size=job_status['total_items'] if job_status else 0,
+            estimated_completion_time=None
+        )
+
+    except HTTPException:
+        await _discard_upload(upload_path)
+        raise
+    except ValidationError as e:
+        await _discard_upload(upload_path)
+        logger.error(f"Validation error in file batch upload: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"File validation failed: {e}"
+        )
+    except Exception as e:
+        await _discard_upload(upload_path)
+        logger.error(f"Error submitting file batch: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to submit file batch job"
+        )
+
+
+async def _receive_upload(request: Request, upload_path: Path) -> int:
+    """
+    Stream a request body to disk without buffering it in memory.
+
+    Blocks are collected up to UPLOAD_WRITE_BYTES and written on the batch
+    executor, so disk I/O never runs on the event loop.
+
+    Args:
+        request: Request whose body is the uploaded file
+        upload_path: File the body is written to
+
+    Returns:
+        Number of bytes received
+
+    Raises:
+        HTTPException: 413 if the body exceeds UPLOAD_MAX_BYTES
+    """
+    loop = asyncio.get_event_loop()
+    executor = batch_service.executor
+    await loop.run_in_executor(executor, _make_upload_dir, upload_path)
+    upload_file = await loop.run_in_executor(executor, open, upload_path, 'wb')
+
+    try:
+        bytes_received = 0
+        pending: List[bytes] = []
+        pending_bytes = 0
+        async for block in request.stream():
+            bytes_received += len(block)
+            if bytes_received > settings.UPLOAD_MAX_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Upload exceeds limit of {settings.UPLOAD_MAX_BYTES} bytes"
+                )
+            pending.append(block)
+            pending_bytes += len(block)
+            if pending_bytes >= UPLOAD_WRITE_BYTES:
+                await loop.run_in_executor(executor, upload_file.writelines, pending)
+                pending = []
+                pending_bytes = 0
+
+        if pending:
+            await loop.run_in_executor(executor, upload_file.writelines, pending)
+    finally:
+        await loop.run_in_executor(executor, upload_file.close)
+
+    return bytes_received
+
+
+def _make_upload_dir(upload_path: Path) -> None:
+    """Create the upload directory."""
+    upload_path.parent.mkdir(parents=True, exist_ok=True)
+
+
+def _remove_upload(upload_path: Path) -> None:
+    try:
+        os.remove(upload_path)
+    except OSError:
+        pass
+
+
+async def _discard_upload(upload_path: Path) -> None:
+    """Remove a partially received or rejected upload on the batch executor."""
+    await asyncio.get_event_loop().run_in_executor(batch_service.executor, _remove_upload, upload_path)
+
+
 @prediction_bp.get("/batch_status/{job_id}",
                   summary="Get status of asynchronous batch job")
 async def get_batch_job_status(
@@ -361,7 +701,7 @@ async def get_batch_job_status(
                 detail="Job not found"
             )
 
-        return JSONResponse(content=status_info)
+        return FastJSONResponse(content=status_info)
 
     except HTTPException:
         raise
@@ -393,7 +733,10 @@ async def get_batch_job_results(
                 detail="Job not found"
             )
 
-        return JSONResponse(content=results)
+        if results.get('results'):
+            _attach_recommendation_text(results['results'])
+
+        return FastJSONResponse(content=results)
 
     except HTTPException:
         raise
@@ -405,6 +748,42 @@ async def get_batch_job_results(
         )
 
 
+@prediction_bp.get("/batch_results/{job_id}/download",
+                  summary="Download results of a completed file batch job")
+async def download_batch_job_results(
+    job_id: str,
+    api_key: str = Depends(APIKeyHeader)
+) -> FileResponse:
+    """
+    Download the NDJSON results of a completed file batch job.
+
+    The result file is streamed from disk, one prediction per line.
+    """
+    try:
+        result_file = await batch_service.get_job_result_file(job_id)
+
+        if result_file is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Job not found or results not available"
+            )
+
+        return FileResponse(
+            result_file,
+            media_type="application/x-ndjson",
+            filename=f"{job_id}.ndjson"
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error downloading job results: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error retrieving job results"
+        )
+
+
 @prediction_bp.delete("/batch_job/{job_id}",
                      summary="Cancel asynchronous batch job")
 async def cancel_batch_job(
@@ -425,7 +804,7 @@ async def cancel_batch_job(
                 detail="Job not found or cannot be cancelled"
             )
 
-        return JSONResponse(
+        return FastJSONResponse(
             content={
                 "job_id": job_id,
                 "status": "cancelled",
@@ -447,7 +826,7 @@ async def cancel_batch_job(
                   summary="List batch jobs")
 async def list_batch_jobs(
     status_filter: Optional[str] = None,
-    limit: int = Field(50, ge=1, le=200),
+    limit: int = Query(50, ge=1, le=200),
     api_key: str = Depends(APIKeyHeader)
 ) -> JSONResponse:
     """
@@ -458,7 +837,7 @@ async def list_batch_jobs(
     try:
         jobs = await batch_service.list_jobs(status_filter, limit)
 
-        return JSONResponse(
+        return FastJSONResponse(
             content={
                 "jobs": jobs,
                 "total_count": len(jobs),
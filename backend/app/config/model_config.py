@@ -126,6 +126,58 @@ OSHA_STANDARDS = {
     }
 }
 
+# OSHA Safety Recommendations
+# Recommendation text keyed by short code. Prediction results carry the codes
+# in 'osha_recommendation_codes' and clients resolve them against this table.
+OSHA_RECOMMENDATIONS = {
+    # Safe
+    'SAFE_CONTINUE': "Continue current activity with normal precautions",
+    'SAFE_HYDRATE': "Maintain regular hydration schedule",
+    'SAFE_MONITOR': "Monitor for any changes in conditions",
+
+    # Caution
+    'CAUTION_HYDRATE': "Increase water intake to 8 oz every 15-20 minutes",
+    'CAUTION_REST': "Take rest breaks in shade/cool area every hour",
+    'CAUTION_MONITOR': "Monitor workers for early heat stress symptoms",
+    'CAUTION_CLOTHING': "Consider lighter colored, loose-fitting clothing",
+
+    # Warning
+    'WARNING_WORK_REST': "Implement work/rest cycles: 15 minutes work, 15 minutes rest",
+    'WARNING_HYDRATE': "Mandatory water intake: 8 oz every 15 minutes",
+    'WARNING_COOL_AREA': "Move to air-conditioned area if possible",
+    'WARNING_CLOTHING': "Remove unnecessary clothing layers",
+    'WARNING_BUDDY': "Assign heat stress buddy system",
+
+    # Danger
+    'DANGER_STOP_WORK': "STOP strenuous outdoor work immediately",
+    'DANGER_COOL_AREA': "Move to air-conditioned environment",
+    'DANGER_MEDICAL_MONITOR': "Continuous medical monitoring required",
+    'DANGER_COOLING': "Implement emergency cooling procedures",
+    'DANGER_CONTACT_MEDICAL': "Contact medical personnel if heat illness symptoms present",
+
+    # Heat index advisories
+    'HI_EXTREME_DANGER': "EXTREME DANGER: Cease all outdoor work activities",
+    'HI_DANGER': "Postpone non-essential outdoor work",
+    'HI_EXTREME_CAUTION': "Extreme caution required for outdoor work"
+}
+
+# Recommendation codes issued for each risk level
+RISK_LEVEL_RECOMMENDATIONS = {
+    'Safe': ('SAFE_CONTINUE', 'SAFE_HYDRATE', 'SAFE_MONITOR'),
+    'Caution': ('CAUTION_HYDRATE', 'CAUTION_REST', 'CAUTION_MONITOR', 'CAUTION_CLOTHING'),
+    'Warning': ('WARNING_WORK_REST', 'WARNING_HYDRATE', 'WARNING_COOL_AREA',
+                'WARNING_CLOTHING', 'WARNING_BUDDY'),
+    'Danger': ('DANGER_STOP_WORK', 'DANGER_COOL_AREA', 'DANGER_MEDICAL_MONITOR',
+               'DANGER_COOLING', 'DANGER_CONTACT_MEDICAL')
+}
+
+# Additional advisory by heat index (°F), lowest threshold first
+HEAT_INDEX_RECOMMENDATIONS = [
+    (90, 'HI_EXTREME_CAUTION'),
+    (105, 'HI_DANGER'),
+    (130, 'HI_EXTREME_DANGER')
+]
+
 # Risk Assessment Mapping
 RISK_ASSESSMENT_MAPPING = {
     'thermal_comfort_to_heat_exposure': {
@@ -24,12 +24,17 @@ class Settings(BaseSettings):
     PORT: int = 8000
     DEBUG: bool = False
     RELOAD: bool = False
+    VALIDATE_RESPONSES: bool = False  # Re-validate prediction responses against their models
 
     # Security Configuration
     SECRET_KEY: str = "heatguard-secret-key-change-in-production"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     ALGORITHM: str = "HS256"
     API_KEY_HEADER: str = "X-API-Key"
+    API_KEY_CACHE_SIZE: int = 10000  # Validated keys kept in the LRU cache
+    API_KEY_CACHE_TTL: int = 300  # seconds before a validated key is looked up again
+    API_KEY_NEGATIVE_CACHE_SIZE: int = 10000  # Rejected keys kept in the LRU cache
+    API_KEY_NEGATIVE_CACHE_TTL: int = 60  # seconds a rejected key is remembered
 
     # CORS Configuration
     BACKEND_CORS_ORIGINS: List[str] = [
@@ -52,32 +57,89 @@ class Settings(BaseSettings):
 
     # Redis Configuration
     REDIS_URL: str = "redis://localhost:6379"
+    REDIS_MAX_CONNECTIONS: int = 50  # Per process, shared by all Redis users
+    REDIS_SOCKET_TIMEOUT: float = 0.1  # seconds per command before falling back
+    REDIS_CONNECT_TIMEOUT: float = 0.5  # seconds
+    REDIS_HEALTH_CHECK_INTERVAL: int = 30  # seconds idle before a pooled connection is pinged
     CACHE_TTL: int = 300  # 5 minutes
 
     # Model Configuration
     MODEL_DIR: str = "thermal_comfort_model"
     MODEL_CACHE_SIZE: int = 10
+    MODEL_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024  # Estimated footprint budget of cached models (0 = count limit only)
+    MODEL_REFRESH_ENABLED: bool = True  # Reload models in the background when their files change
+    MODEL_REFRESH_INTERVAL: float = 60.0  # seconds between model file checks
+    WARMUP_ENABLED: bool = True  # Score synthetic batches at startup before reporting ready
+    WARMUP_BATCH_SIZES: List[int] = [1, 32, 1024]  # Warm-up batch sizes, also the latency profile
     PREDICTION_TIMEOUT: int = 30  # seconds
 
     # Logging Configuration
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     LOG_FILE: Optional[str] = None
+    LOG_ASYNC: bool = True  # Format and write records on a background listener thread
+    LOG_QUEUE_SIZE: int = 10000  # Records waiting for the listener
+    LOG_QUEUE_POLICY: str = "drop"  # Queue full: "drop" DEBUG/INFO at once, or "block" every level up to the timeout
+    LOG_ENQUEUE_TIMEOUT: float = 0.1  # seconds a blocked caller waits before its record is dropped
+    LOG_BATCH_SIZE: int = 500  # Records written per listener batch
+    LOG_HOT_PATH_MAX_PER_SECOND: float = 10.0  # Per-call-site limit for per-row logs (suppressed counts are logged)
 
     # OSHA Compliance Configuration
     ENABLE_OSHA_LOGGING: bool = True
-    OSHA_LOG_FILE: str = "logs/osha_compliance.log"
+    OSHA_LOG_FILE: str = "logs/osha_compliance.log"  # Pre-segment log, still read by reports
+    COMPLIANCE_SEGMENT_DIR: str = "logs/osha_compliance"
+    COMPLIANCE_SEGMENT_PARTITION: str = "hour"  # "hour" or "day"
+    COMPLIANCE_INDEX_INTERVAL: int = 1000  # Entries per sparse index block
+    COMPLIANCE_ROLLUP_PERSIST_INTERVAL: float = 5.0  # seconds between rollup saves
+    COMPLIANCE_ROLLUP_CACHE_SIZE: int = 17520  # Segments whose rollup summaries stay in memory (2 years hourly)
+    COMPLIANCE_MERGE_ENABLED: bool = True  # Merge per-process segments into consolidated ones
+    COMPLIANCE_MERGE_INTERVAL: int = 60  # seconds between merge passes
+    COMPLIANCE_MERGE_GRACE: int = 300  # seconds after a segment's period ends before it is merged
+    COMPLIANCE_COMPACTION_ENABLED: bool = True  # Convert closed segments to Parquet (requires pyarrow)
+    COMPLIANCE_COMPACTION_INTERVAL: int = 300  # seconds between compaction passes
+    COMPLIANCE_COMPACTION_GRACE: int = 3600  # seconds after a segment's period ends before it is compacted
+    COMPLIANCE_PARQUET_COMPRESSION: str = "zstd"
+    COMPLIANCE_PARQUET_ROW_GROUP_SIZE: int = 65536
+    COMPLIANCE_EXPORT_CHUNK_ROWS: int = 1000  # Entries encoded per streamed export chunk
+    COMPLIANCE_EXPORT_PROGRESS_INTERVAL: int = 100000  # Entries between export progress log lines
+    COMPLIANCE_EXPORT_HISTORY: int = 100  # Recent exports whose progress can be queried
     HEAT_INDEX_THRESHOLD_WARNING: float = 80.0  # °F
     HEAT_INDEX_THRESHOLD_DANGER: float = 90.0   # °F
+    COMPLIANCE_DURABILITY: str = "flush"  # "flush" or "fsync" after each group commit
+    COMPLIANCE_FLUSH_INTERVAL_MS: int = 50  # Group-commit interval
+    COMPLIANCE_MAX_BATCH: int = 5000  # Entries per group commit
+    COMPLIANCE_QUEUE_SIZE: int = 100000
+    COMPLIANCE_PRIORITY_QUEUE_SIZE: int = 10000  # Immediate-action alerts waiting for dispatch
+    COMPLIANCE_OVERFLOW_POLICY: str = "buffer"  # Queue full: "buffer" in memory until the writer catches up, or "drop"
 
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 100
+    RATE_LIMIT_REDIS_RETRY_INTERVAL: float = 30.0  # seconds on the local limiter after a Redis failure
+    QUOTA_ENABLED: bool = True  # Charge inference endpoints by rows scored
+    QUOTA_ROWS_PER_SECOND: float = 100.0  # Default per-key budget refill (keys may set rows_per_second)
+    QUOTA_BURST_ROWS: float = 2000.0  # Default per-key burst allowance (keys may set burst_rows)
+    QUOTA_MODEL_ROW_COST: float = 1.0  # Budget units per row scored by the current model
+    QUOTA_ASYNC_ROW_WEIGHT: float = 0.5  # Fraction of the row cost charged for background batch jobs
+    QUOTA_UPLOAD_BYTES_PER_ROW: int = 400  # Bytes of an uploaded file estimated as one row
     BATCH_SIZE_LIMIT: int = 1000
+    BATCH_STREAM_CHUNK_SIZE: int = 100
+    BATCH_STREAM_CHUNK_TARGET_MS: float = 250.0  # Stream chunk size calibrated to this duration at warm-up (0 keeps BATCH_STREAM_CHUNK_SIZE)
+
+    # File Upload Batch Jobs
+    BATCH_RESULTS_DIR: str = "batch_results"
+    UPLOAD_MAX_BYTES: int = 10 * 1024 * 1024 * 1024  # 10GB
 
     # Monitoring and Health Checks
     HEALTH_CHECK_TIMEOUT: int = 5
     METRICS_ENABLED: bool = True
 
+    # Request Tracing
+    TRACING_ENABLED: bool = True  # Per-stage timings in the Server-Timing response header
+    TRACE_SAMPLE_RATE: float = 0.0  # Fraction of requests keeping every span for /api/v1/admin/traces (0 = none)
+    TRACE_SLOW_REQUEST_MS: float = 1000.0  # Slower requests keep their stage totals even unsampled (0 = off)
+    TRACE_BUFFER_SIZE: int = 200  # Traces kept in memory, oldest dropped first
+    TRACE_MAX_SPANS: int = 1000  # Spans kept per sampled trace
+
     # Feature Engineering
     CONSERVATIVE_BIAS: float = 0.15
     ENABLE_FEATURE_SCALING: bool = True
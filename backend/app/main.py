@@ -22,11 +22,17 @@ import logging
 # Import application components
 from .config.settings import settings
 from .utils.logger import setup_logging, get_logger, log_api_request
-from .models.model_loader import model_loader
-from .middleware.auth import SecurityHeaders
-from .api.prediction import prediction_bp
+from .models.model_loader import model_loader, model_refresher
+from .utils.compliance_writer import compliance_compactor, compliance_merger, compliance_writer
+from .utils.redis_client import close_redis_clients
+from .middleware.request_middleware import LoggingAndSecurityMiddleware
+from .api.prediction import prediction_bp, prediction_service
+from .services.warmup_service import warmup_service
 from .api.health import health_bp
 from .api.data_generation import data_generation_bp
+from .api.compliance import compliance_bp
+from .api.metrics import metrics_bp
+from .api.admin import admin_bp
 
 # Setup logging first
 setup_logging(
@@ -55,11 +61,22 @@ async def lifespan(app: FastAPI):
         model_loader.load_model("default")
         logger.info("Model pre-loading completed successfully")
 
+        # Score synthetic batches before reporting ready, and calibrate from them
+        if warmup_service.start(prediction_service):
+            logger.info("Model warm-up started")
+
     except Exception as e:
         logger.error(f"Failed to pre-load model: {e}")
         # Continue startup even if model loading fails
         # The health check will indicate the issue
 
+    if model_refresher.start():
+        logger.info("Background model refresh started")
+    if compliance_merger.start():
+        logger.info("Compliance segment merging started")
+    if compliance_compactor.start():
+        logger.info("Compliance segment compaction started")
+
     logger.info("HeatGuard system startup completed")
 
     yield
@@ -68,7 +85,12 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down HeatGuard Predictive Safety System")
     try:
         # Clean up resources
+        model_refresher.stop(timeout=10.0)
+        compliance_merger.stop(timeout=10.0)
+        compliance_compactor.stop(timeout=10.0)
+        compliance_writer.close(timeout=10.0)
         model_loader.clear_cache()
+        close_redis_clients()
         logger.info("System shutdown completed")
     except Exception as e:
         logger.error(f"Error during shutdown: {e}")
@@ -103,69 +125,8 @@ app.add_middleware(
 )
 
 
-# Custom middleware for request logging and security headers
-@app.middleware("http")
-async def logging_and_security_middleware(request: Request, call_next):
-    """Custom middleware for request logging and security headers."""
-    start_time = time.time()
-
-    # Log incoming request
-    logger.debug(
-        f"Incoming request: {request.method} {request.url.path}",
-        method=request.method,
-        path=request.url.path,
-        client_ip=request.client.host if request.client else "unknown",
-        user_agent=request.headers.get("user-agent", "unknown")
-    )
-
-    try:
-        # Process request
-        response = await call_next(request)
-
-        # Calculate response time
-        process_time = time.time() - start_time
-
-        # Add security headers
-        security_headers = SecurityHeaders.get_security_headers()
-        for header_name, header_value in security_headers.items():
-            response.headers[header_name] = header_value
-
-        # Add custom headers
-        response.headers["X-Process-Time"] = str(round(process_time * 1000, 2))
-        response.headers["X-API-Version"] = settings.VERSION
-
-        # Log request completion
-        logger.info(
-            f"Request completed: {request.method} {request.url.path}",
-            method=request.method,
-            path=request.url.path,
-            status_code=response.status_code,
-            response_time_ms=round(process_time * 1000, 2)
-        )
-
-        return response
-
-    except Exception as e:
-        process_time = time.time() - start_time
-
-        logger.error(
-            f"Request failed: {request.method} {request.url.path}",
-            method=request.method,
-            path=request.url.path,
-            error=str(e),
-            response_time_ms=round(process_time * 1000, 2)
-        )
-
-        # Return error response
-        return JSONResponse(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            content={
-                "error": "Internal server error",
-                "message": "An unexpected error occurred",
-                "timestamp": time.time(),
-                "request_id": f"req_{int(time.time() * 1000)}"
-            }
-        )
+# Request logging, timing and security headers (outermost of our middleware)
+app.add_middleware(LoggingAndSecurityMiddleware)
 
 
 # Exception handlers
@@ -215,6 +176,9 @@ async def general_exception_handler(request: Request, exc: Exception):
 app.include_router(prediction_bp)
 app.include_router(health_bp)
 app.include_router(data_generation_bp)
+app.include_router(compliance_bp)
+app.include_router(metrics_bp)
+app.include_router(admin_bp)
 
 
 # Root endpoint
@@ -234,7 +198,9 @@ async def root() -> Dict[str, Any]:
             "single_prediction": "/api/v1/predict",
             "batch_prediction": "/api/v1/predict_batch",
             "async_batch": "/api/v1/predict_batch_async",
+            "file_batch_upload": "/api/v1/predict_batch_upload",
             "health_check": "/api/v1/health",
+            "metrics": "/api/v1/metrics",
             "test_data": "/api/v1/generate_random"
         },
         "company_info": {
@@ -6,7 +6,11 @@ Contains middleware components for authentication, security, and request process
 """
 
 from .auth import AuthMiddleware
+from .quota import QuotaManager
+from .request_middleware import LoggingAndSecurityMiddleware
 
 __all__ = [
     "AuthMiddleware",
+    "LoggingAndSecurityMiddleware",
+    "QuotaManager",
 ]
\ No newline at end of file
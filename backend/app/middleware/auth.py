@@ -5,21 +5,23 @@ Authentication and Security Middleware
 Handles API key authentication, rate limiting, and security for the HeatGuard system.
 """
 
+import math
 import time
 import hashlib
 import hmac
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Any, Tuple
 from datetime import datetime, timedelta
 import jwt
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.security.api_key import APIKeyHeader
 import redis
-from collections import defaultdict
 import threading
+from collections import OrderedDict
 
 from ..config.settings import settings
 from ..utils.logger import get_logger
+from ..utils.redis_client import get_redis_client
 
 logger = get_logger(__name__)
 
@@ -31,7 +33,13 @@ class APIKeyError(Exception):
 
 class RateLimitError(Exception):
     """Custom exception for rate limiting errors."""
-    pass
+
+    def __init__(self, message: str, limit: Optional[int] = None,
+                 reset_time: Optional[int] = None, retry_after: Optional[int] = None):
+        super().__init__(message)
+        self.limit = limit
+        self.reset_time = reset_time
+        self.retry_after = retry_after
 
 
 # API Key security scheme
@@ -41,14 +49,110 @@ APIKeyHeader = APIKeyHeader(name=settings.API_KEY_HEADER, auto_error=False)
 security = HTTPBearer(auto_error=False)
 
 
+class _APIKeyRecord:
+    """A loaded API key with its derived fields computed once."""
+
+    __slots__ = ("info", "identifier", "active", "expires_at")
+
+    def __init__(self, api_key: str, info: Dict[str, Any]):
+        self.info = info
+        self.identifier = hashlib.sha256(api_key.encode()).hexdigest()  # Rate limit and quota identifier
+        self.active = bool(info.get("active", False))
+        expires_at = info.get("expires_at")
+        self.expires_at = (
+            datetime.fromisoformat(expires_at.replace('Z', '+00:00')).timestamp() if expires_at else None
+        )
+
+
+class _LRUTTLCache:
+    """
+    Size-bounded cache with a time to live, evicting least recently used entries.
+
+    Entries are looked up by the raw key string; a hit moves the entry to the
+    end of the order, and inserting into a full cache evicts from the front.
+    There is no lock: each step is a single OrderedDict operation, atomic
+    under the GIL, and a step that loses a race with another thread's
+    eviction is skipped. Counters may undercount under contention.
+    """
+
+    __slots__ = ("max_size", "ttl", "_entries", "hits", "misses", "evictions", "expirations")
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str, now: float) -> Any:
+        """Return the cached value, or None if absent or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[1] <= now:
+            self._entries.pop(key, None)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        try:
+            self._entries.move_to_end(key)
+        except KeyError:
+            pass
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: str, value: Any, now: float) -> None:
+        """Cache a value until ``now + ttl``, evicting the least recently used entry when full."""
+        entries = self._entries
+        entries[key] = (value, now + self.ttl)
+        try:
+            entries.move_to_end(key)
+            while len(entries) > self.max_size:
+                entries.popitem(last=False)
+                self.evictions += 1
+        except KeyError:
+            pass
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
+
+
 class AuthMiddleware:
-    """Authentication and authorization middleware."""
+    """
+    Authentication and authorization middleware.
+
+    API keys are indexed when loaded, with their rate limit identifier and
+    expiry epoch computed once, so validating a key takes dictionary lookups
+    and a float comparison. A bounded LRU/TTL cache of validated keys fronts
+    the key store, and a separate one remembers rejected keys so that
+    streams of random keys cannot grow memory without limit.
+    """
 
     def __init__(self):
-        self.valid_api_keys = self._load_api_keys()
+        self.api_key_cache = _LRUTTLCache(settings.API_KEY_CACHE_SIZE, settings.API_KEY_CACHE_TTL)
+        self.negative_key_cache = _LRUTTLCache(settings.API_KEY_NEGATIVE_CACHE_SIZE,
+                                               settings.API_KEY_NEGATIVE_CACHE_TTL)
+        self.set_api_keys(self._load_api_keys())
         self.rate_limiter = RateLimiter()
-        self.api_key_cache = {}
-        self.cache_ttl = 300  # 5 minutes
 
     def _load_api_keys(self) -> Dict[str, Dict[str, Any]]:
         """
@@ -61,6 +165,8 @@ class AuthMiddleware:
                 "name": "Demo API Key",
                 "permissions": ["read", "write", "admin"],
                 "rate_limit": 1000,  # requests per minute
+                "rows_per_second": 500,  # compute quota, rows scored
+                "burst_rows": 5000,
                 "created_at": "2024-01-01T00:00:00Z",
                 "expires_at": None,  # Never expires
                 "active": True
@@ -69,6 +175,8 @@ class AuthMiddleware:
                 "name": "Read-Only API Key",
                 "permissions": ["read"],
                 "rate_limit": 500,
+                "rows_per_second": 50,
+                "burst_rows": 1000,
                 "created_at": "2024-01-01T00:00:00Z",
                 "expires_at": None,
                 "active": True
@@ -78,6 +186,29 @@ class AuthMiddleware:
         logger.info(f"Loaded {len(api_keys)} API keys")
         return api_keys
 
+    def set_api_keys(self, api_keys: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Replace the valid API keys, rebuilding the index and clearing the caches.
+
+        Args:
+            api_keys: Key metadata by API key
+        """
+        self.valid_api_keys = api_keys
+        self._key_index = {api_key: _APIKeyRecord(api_key, info) for api_key, info in api_keys.items()}
+        self.api_key_cache.clear()
+        self.negative_key_cache.clear()
+
+    def _lookup_api_key(self, api_key: str) -> Optional[_APIKeyRecord]:
+        """
+        Find a key in the key store (the in-memory index; a database in production).
+
+        The index is a dict: Python's per-process randomized SipHash picks the
+        slot, so the stored key is only compared against a presented key whose
+        full hash matches, and response time does not reveal how many leading
+        characters of a guess are right.
+        """
+        return self._key_index.get(api_key)
+
     def validate_api_key(self, api_key: Optional[str]) -> Dict[str, Any]:
         """
         Validate API key and return key metadata.
@@ -94,38 +225,45 @@ class AuthMiddleware:
         if not api_key:
             raise APIKeyError("API key is required")
 
-        # Check cache first
-        cache_key = hashlib.sha256(api_key.encode()).hexdigest()
-        if cache_key in self.api_key_cache:
-            cached_result, cached_time = self.api_key_cache[cache_key]
-            if time.time() - cached_time < self.cache_ttl:
-                if cached_result is None:
-                    raise APIKeyError("Invalid API key")
-                return cached_result
-
-        # Validate API key
-        key_info = self.valid_api_keys.get(api_key)
+        now = time.time()
+        record = self.api_key_cache.get(api_key, now)
+        if record is None:
+            if self.negative_key_cache.get(api_key, now) is not None:
+                raise APIKeyError("Invalid API key")
+
+            record = self._lookup_api_key(api_key)
+            if record is None:
+                self.negative_key_cache.put(api_key, True, now)
+                raise APIKeyError("Invalid API key")
+            self.api_key_cache.put(api_key, record, now)
+
+        # Status and expiry are checked on every request, cached or not
+        if not record.active:
+            raise APIKeyError("API key is deactivated")
+        if record.expires_at is not None and now >= record.expires_at:
+            raise APIKeyError("API key has expired")
 
-        if not key_info:
-            # Cache negative result
-            self.api_key_cache[cache_key] = (None, time.time())
-            raise APIKeyError("Invalid API key")
+        return record.info
 
-        if not key_info.get("active", False):
-            raise APIKeyError("API key is deactivated")
+    def get_key_identifier(self, api_key: str) -> str:
+        """
+        Get the identifier a key's rate limits and quotas are tracked under.
 
-        # Check expiration
-        expires_at = key_info.get("expires_at")
-        if expires_at:
-            expire_time = datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
-            if datetime.now().replace(tzinfo=expire_time.tzinfo) > expire_time:
-                raise APIKeyError("API key has expired")
+        Args:
+            api_key: API key
 
-        # Cache positive result
-        self.api_key_cache[cache_key] = (key_info, time.time())
+        Returns:
+            SHA-256 hex digest of the key, precomputed for loaded keys
+        """
+        record = self._key_index.get(api_key)
+        return record.identifier if record is not None else hash_api_key(api_key)
 
-        logger.debug(f"API key validated: {key_info.get('name', 'Unknown')}")
-        return key_info
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Size, hit and eviction counters of the positive and negative key caches."""
+        return {
+            "valid_keys": self.api_key_cache.get_stats(),
+            "invalid_keys": self.negative_key_cache.get_stats()
+        }
 
     def check_permissions(self, key_info: Dict[str, Any], required_permission: str) -> bool:
         """
@@ -146,19 +284,85 @@ class AuthMiddleware:
         return key_info.get("rate_limit", settings.RATE_LIMIT_PER_MINUTE)
 
 
+RATE_LIMIT_KEY_PREFIX = "rate_limit:tb:"
+
+# Token bucket in a two-field hash: KEYS[1], ARGV = capacity, ms to refill
+# it, cost. Admits when the bucket holds the cost (or is full, for costs over
+# capacity) and charges the full cost. Returns {allowed (0/1), tokens left x
+# 1000, server time in ms}. Rejections write nothing; the key expires once
+# the bucket would be full again.
+RATE_LIMIT_SCRIPT = """
+if redis.replicate_commands then
+    redis.replicate_commands()
+end
+local limit = tonumber(ARGV[1])
+local rate = limit / tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = limit
+else
+    tokens = math.min(limit, tokens + math.max(0, now - ts) * rate)
+end
+if tokens < math.min(cost, limit) then
+    return {0, math.floor(tokens * 1000), now}
+end
+tokens = tokens - cost
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((limit - tokens) / rate) + 1000)
+return {1, math.floor(tokens * 1000), now}
+"""
+
+
+class _TokenBucket:
+    """Token bucket state for one identifier in the in-memory rate limiter."""
+
+    __slots__ = ("tokens", "updated_at", "full_at")
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated_at = now
+        self.full_at = now
+
+
 class RateLimiter:
-    """Rate limiting implementation."""
+    """
+    Rate limiting implementation.
+
+    Uses Redis when available. The in-memory fallback keeps a token bucket per
+    identifier: ``limit`` tokens refilled evenly over the window, so a client
+    can burst up to its limit and then sustains ``limit`` requests per window.
+    Each identifier costs one small fixed-size object however high its limit,
+    and the buckets are split over lock stripes by identifier hash so
+    concurrent requests for different keys do not contend. Buckets that have
+    refilled completely are indistinguishable from new ones and are evicted
+    by a periodic sweep of each stripe.
+    """
 
-    def __init__(self):
-        self.redis_client = self._get_redis_client()
-        self.in_memory_store = defaultdict(list)
-        self.lock = threading.Lock()
+    LOCK_STRIPES = 64
+    SWEEP_INTERVAL = 60.0  # seconds between idle-bucket sweeps of a stripe
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None):
+        self.redis_client = redis_client if redis_client is not None else self._get_redis_client()
+        self._rate_limit_script = (
+            self.redis_client.register_script(RATE_LIMIT_SCRIPT) if self.redis_client is not None else None
+        )
+        self._redis_retry_at = 0.0
+        self.redis_fallbacks = 0
+        self._stripe_mask = self.LOCK_STRIPES - 1
+        self._locks = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        self._buckets: List[Dict[str, _TokenBucket]] = [{} for _ in range(self.LOCK_STRIPES)]
+        self._next_sweep = [0.0] * self.LOCK_STRIPES
 
     def _get_redis_client(self) -> Optional[redis.Redis]:
-        """Get Redis client if available."""
+        """Get the shared Redis client if Redis is reachable."""
         try:
             if settings.REDIS_URL:
-                client = redis.from_url(settings.REDIS_URL)
+                client = get_redis_client(settings.REDIS_URL)
                 client.ping()  # Test connection
                 return client
         except Exception as e:
@@ -180,90 +384,163 @@ class RateLimiter:
         Raises:
             RateLimitError: If rate limit is exceeded
         """
-        now = time.time()
-        window_start = now - (window_minutes * 60)
+        window_seconds = window_minutes * 60
+        allowed, tokens, now = self._take(identifier, limit, window_seconds, 1.0)
+        refill_rate = limit / window_seconds  # tokens per second
+
+        if not allowed:
+            retry_after = (1.0 - tokens) / refill_rate
+            reset_time = math.ceil(now + retry_after)
+            raise RateLimitError(
+                f"Rate limit exceeded. Limit: {limit} requests per minute. "
+                f"Current: {limit}. Reset at: {reset_time}",
+                limit=limit,
+                reset_time=reset_time,
+                retry_after=max(1, math.ceil(retry_after))
+            )
 
-        if self.redis_client:
-            return self._check_rate_limit_redis(identifier, limit, window_start, now)
-        else:
-            return self._check_rate_limit_memory(identifier, limit, window_start, now)
+        remaining = int(tokens)
+        return {
+            "allowed": True,
+            "limit": limit,
+            "remaining": remaining,
+            "reset_time": math.ceil(now + (limit - tokens) / refill_rate),
+            "current_count": limit - remaining
+        }
 
-    def _check_rate_limit_redis(self, identifier: str, limit: int, window_start: float, now: float) -> Dict[str, Any]:
-        """Redis-based rate limiting."""
-        try:
-            pipe = self.redis_client.pipeline()
+    def consume(self, identifier: str, cost: float, rate: float, burst: float) -> Dict[str, Any]:
+        """
+        Charge a weighted cost against a budget refilled at a steady rate.
 
-            # Remove old entries
-            pipe.zremrangebyscore(f"rate_limit:{identifier}", 0, window_start)
+        A request is admitted when the budget holds its cost, or a full burst
+        for costs larger than the burst, and is then charged in full. Large
+        requests can therefore drive the budget negative, and the client waits
+        for the debt to refill before its next request.
 
-            # Count current requests
-            pipe.zcard(f"rate_limit:{identifier}")
+        Args:
+            identifier: Unique identifier (API key hash, IP, etc.)
+            cost: Units this request consumes
+            rate: Units refilled per second
+            burst: Budget capacity
 
-            # Add current request
-            pipe.zadd(f"rate_limit:{identifier}", {str(now): now})
+        Returns:
+            Dictionary with the cost charged and the budget left
 
-            # Set expiration
-            pipe.expire(f"rate_limit:{identifier}", 3600)  # 1 hour
+        Raises:
+            RateLimitError: If the budget cannot cover the request yet
+        """
+        allowed, tokens, now = self._take(identifier, burst, burst / rate, cost)
+
+        if not allowed:
+            retry_after = (min(cost, burst) - tokens) / rate
+            raise RateLimitError(
+                f"Quota exceeded. Budget: {rate:g} units per second, burst {burst:g}. "
+                f"Request cost: {cost:g}. Retry in {retry_after:.1f}s",
+                limit=int(burst),
+                reset_time=math.ceil(now + retry_after),
+                retry_after=max(1, math.ceil(retry_after))
+            )
 
-            results = pipe.execute()
-            current_count = results[1]
+        return {
+            "allowed": True,
+            "cost": cost,
+            "rate": rate,
+            "burst": burst,
+            "remaining": tokens,
+            "reset_time": math.ceil(now + (burst - tokens) / rate)
+        }
 
-            if current_count >= limit:
-                # Get time until reset
-                oldest_request = self.redis_client.zrange(f"rate_limit:{identifier}", 0, 0, withscores=True)
-                if oldest_request:
-                    reset_time = int(oldest_request[0][1] + 60)  # 1 minute window
-                else:
-                    reset_time = int(now + 60)
+    def _take(self, identifier: str, capacity: float, refill_seconds: float, cost: float) -> Tuple[bool, float, float]:
+        """
+        Take ``cost`` tokens from an identifier's bucket in Redis or in memory.
 
-                raise RateLimitError(
-                    f"Rate limit exceeded. Limit: {limit} requests per minute. "
-                    f"Current: {current_count}. Reset at: {reset_time}"
+        Returns:
+            (allowed, tokens left, bucket clock time in seconds)
+        """
+        now = time.time()
+        if self.redis_client is not None and now >= self._redis_retry_at:
+            try:
+                return self._take_redis(identifier, capacity, refill_seconds, cost)
+            except redis.RedisError as e:
+                self._redis_retry_at = now + settings.RATE_LIMIT_REDIS_RETRY_INTERVAL
+                self.redis_fallbacks += 1
+                logger.error(
+                    "Redis rate limiting error, using the in-memory limiter for %ss: %s",
+                    settings.RATE_LIMIT_REDIS_RETRY_INTERVAL, e
                 )
+        return self._take_memory(identifier, capacity, refill_seconds, cost, now)
 
-            return {
-                "allowed": True,
-                "limit": limit,
-                "remaining": limit - current_count - 1,
-                "reset_time": int(now + 60),
-                "current_count": current_count + 1
-            }
+    def _take_redis(self, identifier: str, capacity: float, refill_seconds: float,
+                    cost: float) -> Tuple[bool, float, float]:
+        """
+        Redis-based token bucket.
 
-        except redis.RedisError as e:
-            logger.error(f"Redis rate limiting error: {e}")
-            # Fallback to memory-based rate limiting
-            return self._check_rate_limit_memory(identifier, limit, window_start, now)
-
-    def _check_rate_limit_memory(self, identifier: str, limit: int, window_start: float, now: float) -> Dict[str, Any]:
-        """In-memory rate limiting."""
-        with self.lock:
-            # Clean old entries
-            self.in_memory_store[identifier] = [
-                timestamp for timestamp in self.in_memory_store[identifier]
-                if timestamp > window_start
-            ]
-
-            current_count = len(self.in_memory_store[identifier])
-
-            if current_count >= limit:
-                oldest_timestamp = min(self.in_memory_store[identifier]) if self.in_memory_store[identifier] else now
-                reset_time = int(oldest_timestamp + 60)
-
-                raise RateLimitError(
-                    f"Rate limit exceeded. Limit: {limit} requests per minute. "
-                    f"Current: {current_count}. Reset at: {reset_time}"
-                )
+        One EVALSHA round trip checks and takes tokens atomically on the
+        server, using the server clock so every app instance agrees. On any
+        Redis error the caller uses the local limiter, which stays in use for
+        RATE_LIMIT_REDIS_RETRY_INTERVAL seconds instead of paying the timeout
+        on every request.
+        """
+        allowed, milli_tokens, server_ms = self._rate_limit_script(
+            keys=[f"{RATE_LIMIT_KEY_PREFIX}{identifier}"],
+            args=[repr(float(capacity)), int(refill_seconds * 1000), repr(float(cost))]
+        )
+        return bool(allowed), milli_tokens / 1000, server_ms / 1000
+
+    def _take_memory(self, identifier: str, capacity: float, refill_seconds: float,
+                     cost: float, now: float) -> Tuple[bool, float, float]:
+        """In-memory token bucket."""
+        refill_rate = capacity / refill_seconds  # tokens per second
+        stripe = hash(identifier) & self._stripe_mask
+
+        with self._locks[stripe]:
+            buckets = self._buckets[stripe]
+            if now >= self._next_sweep[stripe]:
+                self._sweep(buckets, now)
+                self._next_sweep[stripe] = now + self.SWEEP_INTERVAL
+
+            bucket = buckets.get(identifier)
+            if bucket is None:
+                bucket = buckets[identifier] = _TokenBucket(float(capacity), now)
+            else:
+                # Clock steps backwards add nothing; a lowered limit caps the bucket
+                elapsed = max(0.0, now - bucket.updated_at)
+                bucket.tokens = min(float(capacity), bucket.tokens + elapsed * refill_rate)
+                bucket.updated_at = now
+
+            if bucket.tokens < min(cost, capacity):
+                return False, bucket.tokens, now
+
+            bucket.tokens -= cost
+            bucket.full_at = now + (capacity - bucket.tokens) / refill_rate
+            return True, bucket.tokens, now
 
-            # Add current request
-            self.in_memory_store[identifier].append(now)
+    @staticmethod
+    def _sweep(buckets: Dict[str, _TokenBucket], now: float) -> int:
+        """Drop buckets that have refilled completely (caller holds the stripe lock)."""
+        idle = [identifier for identifier, bucket in buckets.items() if bucket.full_at <= now]
+        for identifier in idle:
+            del buckets[identifier]
+        return len(idle)
+
+    def evict_idle(self) -> int:
+        """
+        Sweep every stripe now instead of waiting for its next request.
 
-            return {
-                "allowed": True,
-                "limit": limit,
-                "remaining": limit - current_count - 1,
-                "reset_time": int(now + 60),
-                "current_count": current_count + 1
-            }
+        Returns:
+            Number of idle buckets evicted
+        """
+        now = time.time()
+        evicted = 0
+        for stripe, lock in enumerate(self._locks):
+            with lock:
+                evicted += self._sweep(self._buckets[stripe], now)
+                self._next_sweep[stripe] = now + self.SWEEP_INTERVAL
+        return evicted
+
+    def get_tracked_identifiers(self) -> int:
+        """Number of identifiers with in-memory bucket state."""
+        return sum(len(buckets) for buckets in self._buckets)
 
 
 # Global instances
@@ -288,7 +565,7 @@ async def get_api_key(api_key: Optional[str] = Depends(APIKeyHeader)) -> str:
         key_info = auth_middleware.validate_api_key(api_key)
 
         # Check rate limit
-        key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+        key_hash = auth_middleware.get_key_identifier(api_key)
         rate_limit = auth_middleware.get_rate_limit(key_info)
 
         try:
@@ -300,13 +577,16 @@ async def get_api_key(api_key: Optional[str] = Depends(APIKeyHeader)) -> str:
 
         except RateLimitError as e:
             logger.warning(f"Rate limit exceeded for API key", api_key_name=key_info.get('name'))
+            reset_time = e.reset_time if e.reset_time is not None else int(time.time() + 60)
+            retry_after = e.retry_after if e.retry_after is not None else max(1, reset_time - int(time.time()))
             raise HTTPException(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 detail=str(e),
                 headers={
                     "X-RateLimit-Limit": str(rate_limit),
                     "X-RateLimit-Remaining": "0",
-                    "X-RateLimit-Reset": str(int(time.time() + 60))
+                    "X-RateLimit-Reset": str(reset_time),
+                    "Retry-After": str(retry_after)
                 }
             )
 
@@ -353,7 +633,7 @@ async def get_current_user(api_key: str = Depends(get_api_key)) -> Dict[str, Any
         )
 
 
-async def require_permission(permission: str):
+def require_permission(permission: str):
     """
     Dependency factory for requiring specific permissions.
 
@@ -466,18 +746,20 @@ def verify_signature(payload: str, signature: str, secret: str) -> bool:
 class SecurityHeaders:
     """Security headers for API responses."""
 
+    HEADERS: Dict[str, str] = {
+        "X-Content-Type-Options": "nosniff",
+        "X-Frame-Options": "DENY",
+        "X-XSS-Protection": "1; mode=block",
+        "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
+        "Cache-Control": "no-cache, no-store, must-revalidate",
+        "Pragma": "no-cache",
+        "Expires": "0"
+    }
+
     @staticmethod
     def get_security_headers() -> Dict[str, str]:
         """Get standard security headers."""
-        return {
-            "X-Content-Type-Options": "nosniff",
-            "X-Frame-Options": "DENY",
-            "X-XSS-Protection": "1; mode=block",
-            "Strict-Transport-Security": "max-age=31536000; includeSubDomains",
-            "Cache-Control": "no-cache, no-store, must-revalidate",
-            "Pragma": "no-cache",
-            "Expires": "0"
-        }
+        return dict(SecurityHeaders.HEADERS)
 
 
 def get_client_ip(request) -> str:
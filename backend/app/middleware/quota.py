@@ -0,0 +1,161 @@
+"""
+Compute Quotas
+==============
+
+Cost-weighted per-key budgets for the inference endpoints.
+
+Request rate limits treat a 1,000-worker batch like a single prediction.
+Quotas instead charge each request for the inference it causes, in rows
+scored, against a per-key budget refilled at a steady rows-per-second rate
+with a burst allowance, so one client's batches cannot starve the real-time
+clients of the inference tier.
+"""
+
+import math
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from ..config.settings import settings
+from ..utils.logger import get_logger
+from .auth import AuthMiddleware, RateLimiter, RateLimitError, auth_middleware
+
+logger = get_logger(__name__)
+
+
+def _scored_rows_cost(rows: int) -> float:
+    """Rows scored synchronously on the request path."""
+    return rows * settings.QUOTA_MODEL_ROW_COST
+
+
+def _async_rows_cost(rows: int) -> float:
+    """Rows scored by a background batch job."""
+    return rows * settings.QUOTA_MODEL_ROW_COST * settings.QUOTA_ASYNC_ROW_WEIGHT
+
+
+def _upload_cost(bytes_received: int) -> float:
+    """Rows estimated from the size of an uploaded file, scored in the background."""
+    return _async_rows_cost(math.ceil(bytes_received / settings.QUOTA_UPLOAD_BYTES_PER_ROW))
+
+
+# Cost function per endpoint, called with that endpoint's request size
+ENDPOINT_COSTS: Dict[str, Callable[..., float]] = {
+    "predict": _scored_rows_cost,
+    "predict_batch": _scored_rows_cost,
+    "predict_batch_async": _async_rows_cost,
+    "predict_batch_upload": _upload_cost,
+}
+
+
+def quota_headers(quota_status: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Response headers describing a charged request and the budget left.
+
+    Args:
+        quota_status: Result of QuotaManager.charge (None when quotas are disabled)
+
+    Returns:
+        Header dict, empty when there is nothing to report
+    """
+    if not quota_status:
+        return {}
+    return {
+        "X-Quota-Cost": f"{quota_status['cost']:g}",
+        "X-Quota-Remaining": str(max(0, math.floor(quota_status['remaining']))),
+        "X-Quota-Limit": f"{quota_status['rate']:g}",
+        "X-Quota-Burst": f"{quota_status['burst']:g}",
+        "X-Quota-Reset": str(quota_status['reset_time']),
+    }
+
+
+class QuotaManager:
+    """Charge endpoint costs against per-API-key row budgets."""
+
+    def __init__(self, auth: Optional[AuthMiddleware] = None, rate_limiter: Optional[RateLimiter] = None):
+        self.auth = auth or auth_middleware
+        self.rate_limiter = rate_limiter or self.auth.rate_limiter
+        self._metrics_lock = threading.Lock()
+        self._charged: Dict[str, float] = {}
+        self._rejected: Dict[str, int] = {}
+
+    def get_budget(self, api_key: Optional[str]) -> Tuple[str, float, float]:
+        """
+        Get the budget a request is charged against.
+
+        Keys carry ``rows_per_second`` and ``burst_rows`` in their metadata;
+        keys without them get the configured defaults. Requests without a
+        key, or with a key that is unknown or inactive, share one anonymous
+        budget, so sending a fresh made-up key per request does not get a
+        fresh budget.
+
+        Returns:
+            (budget identifier, rows refilled per second, burst rows)
+        """
+        key_info = self.auth.valid_api_keys.get(api_key) if api_key else None
+        if not key_info or not key_info.get("active", True):
+            return "quota:anonymous", settings.QUOTA_ROWS_PER_SECOND, settings.QUOTA_BURST_ROWS
+
+        return (
+            f"quota:{self.auth.get_key_identifier(api_key)}",
+            float(key_info.get("rows_per_second", settings.QUOTA_ROWS_PER_SECOND)),
+            float(key_info.get("burst_rows", settings.QUOTA_BURST_ROWS))
+        )
+
+    def charge(self, api_key: Optional[str], endpoint: str, **size: int) -> Optional[Dict[str, Any]]:
+        """
+        Charge a request's cost to its key's budget.
+
+        Args:
+            api_key: API key from the request header
+            endpoint: Key of ENDPOINT_COSTS
+            **size: Arguments of the endpoint's cost function (rows, bytes_received)
+
+        Returns:
+            Budget status for quota_headers, or None when quotas are disabled
+
+        Raises:
+            HTTPException: 429 with Retry-After when the budget cannot cover the request
+        """
+        if not settings.QUOTA_ENABLED:
+            return None
+
+        cost = ENDPOINT_COSTS[endpoint](**size)
+        identifier, rate, burst = self.get_budget(api_key)
+
+        try:
+            quota_status = self.rate_limiter.consume(identifier, cost, rate, burst)
+        except RateLimitError as e:
+            with self._metrics_lock:
+                self._rejected[endpoint] = self._rejected.get(endpoint, 0) + 1
+            logger.warning("Quota exceeded: %s", endpoint, endpoint=endpoint, cost=cost,
+                           max_per_second=settings.LOG_HOT_PATH_MAX_PER_SECOND)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=str(e),
+                headers={
+                    "X-Quota-Cost": f"{cost:g}",
+                    "X-Quota-Remaining": "0",
+                    "X-Quota-Limit": f"{rate:g}",
+                    "X-Quota-Burst": f"{burst:g}",
+                    "X-Quota-Reset": str(e.reset_time),
+                    "Retry-After": str(e.retry_after)
+                }
+            )
+
+        with self._metrics_lock:
+            self._charged[endpoint] = self._charged.get(endpoint, 0.0) + cost
+        return quota_status
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Units charged and requests rejected per endpoint."""
+        with self._metrics_lock:
+            return {
+                "enabled": settings.QUOTA_ENABLED,
+                "charged_units": dict(self._charged),
+                "rejected_requests": dict(self._rejected)
+            }
+
+
+# Global quota manager, sharing the API key rate limiter's buckets and Redis
+quota_manager = QuotaManager()
@@ -0,0 +1,164 @@
+"""
+Request Middleware
+==================
+
+Pure ASGI middleware for request timing, logging and security headers.
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..config.settings import settings
+from ..utils.logger import get_logger
+from ..utils.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS
+from ..utils.serialization import dumps
+from ..utils.tracing import finish_trace, reset_trace, start_trace
+from .auth import SecurityHeaders
+
+logger = get_logger(__name__)
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+def encode_headers(headers: Dict[str, str]) -> Headers:
+    """Encode a header dict as ASGI raw headers (lowercase names)."""
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+
+
+class LoggingAndSecurityMiddleware:
+    """
+    Time and log each HTTP request and add the security headers to its response.
+
+    The middleware wraps ``send`` instead of the response object, so response
+    bodies (including streamed ones) pass through untouched and unbuffered.
+    The header block is encoded once; ``X-Process-Time`` is the time until the
+    response headers were sent, while the completion log measures until the
+    last body chunk.
+
+    Completion logs are rate-limited per call site like other per-row logs;
+    failed requests are always logged. Each request is also counted in the
+    HTTP request metrics, labelled by the endpoint function that handled it
+    (path templates, not raw paths, so job IDs do not become label values).
+
+    With TRACING_ENABLED the request runs under a RequestTrace: the stages
+    recorded before the response headers are sent are reported in the
+    ``Server-Timing`` header, and sampled requests also get ``X-Trace-ID``
+    for looking the trace up at ``/api/v1/admin/traces``.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+        headers = SecurityHeaders.get_security_headers()
+        headers["X-API-Version"] = settings.VERSION
+        self.headers = encode_headers(headers)
+        self.header_names = frozenset(name for name, _ in self.headers)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+        status_code = None
+        trace = token = None
+        if settings.TRACING_ENABLED:
+            trace, token = start_trace(scope["method"], scope["path"], self._request_id(scope))
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal status_code
+            message_type = message["type"]
+            if message_type == "http.response.start":
+                status_code = message["status"]
+                process_ms = (time.perf_counter() - start_time) * 1000
+                # Our values replace any the endpoint set, as Response.headers[...] = did
+                headers = [header for header in message.get("headers", ()) if header[0] not in self.header_names]
+                headers.extend(self.headers)
+                headers.append((b"x-process-time", b"%.2f" % process_ms))
+                if trace is not None:
+                    headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                    if trace.sampled:
+                        headers.append((b"x-trace-id", trace.trace_id.encode("latin-1")))
+                message["headers"] = headers
+            elif message_type == "http.response.body" and not message.get("more_body", False):
+                await send(message)
+                self._log_completed(scope, status_code, start_time)
+                if trace is not None:
+                    finish_trace(trace, status_code)
+                return
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            elapsed = time.perf_counter() - start_time
+            response_time_ms = round(elapsed * 1000, 2)
+            logger.error(
+                "Request failed: %s %s", scope["method"], scope["path"],
+                method=scope["method"],
+                path=scope["path"],
+                error=str(e),
+                response_time_ms=response_time_ms
+            )
+            self._record_metrics(scope, status_code or 500, elapsed)
+            if trace is not None:
+                finish_trace(trace, status_code or 500)
+            if status_code is not None:
+                # Headers already sent; nothing left to replace
+                raise
+            await self._send_error(send)
+        finally:
+            if token is not None:
+                reset_trace(token)
+
+    @staticmethod
+    def _request_id(scope: Dict[str, Any]) -> Optional[str]:
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                # Trace IDs are echoed in X-Trace-ID; keep them short
+                return value.decode("latin-1")[:64] or None
+        return None
+
+    @staticmethod
+    def _record_metrics(scope: Dict[str, Any], status_code: int, seconds: float) -> None:
+        endpoint = scope.get("endpoint")
+        handler = getattr(endpoint, "__name__", "unmatched")
+        HTTP_REQUESTS.labels(scope["method"], handler, status_code).inc()
+        HTTP_REQUEST_DURATION.labels(scope["method"], handler).observe(seconds)
+
+    def _log_completed(self, scope: Dict[str, Any], status_code: int, start_time: float) -> None:
+        elapsed = time.perf_counter() - start_time
+        response_time_ms = round(elapsed * 1000, 2)
+        self._record_metrics(scope, status_code, elapsed)
+        if status_code is not None and status_code >= 500:
+            logger.warning(
+                "Request completed: %s %s", scope["method"], scope["path"],
+                method=scope["method"],
+                path=scope["path"],
+                status_code=status_code,
+                response_time_ms=response_time_ms
+            )
+        else:
+            logger.info(
+                "Request completed: %s %s", scope["method"], scope["path"],
+                max_per_second=settings.LOG_HOT_PATH_MAX_PER_SECOND,
+                method=scope["method"],
+                path=scope["path"],
+                status_code=status_code,
+                response_time_ms=response_time_ms
+            )
+
+    async def _send_error(self, send: Any) -> None:
+        now = time.time()
+        body = dumps({
+            "error": "Internal server error",
+            "message": "An unexpected error occurred",
+            "timestamp": now,
+            "request_id": f"req_{int(now * 1000)}"
+        })
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ]
+        headers.extend(self.headers)
+        await send({"type": "http.response.start", "status": 500, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -11,16 +11,78 @@ import numpy as np
 import joblib
 import os
 import json
+import sys
+import time
+from bisect import bisect_right
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple, Union
+from typing import Dict, List, Any, Optional, Tuple, Union, Collection
 import logging
 
-from ..config.model_config import MODEL_CONFIG, RISK_ASSESSMENT_MAPPING, HEAT_INDEX_CONFIG, OSHA_STANDARDS
+from ..config.model_config import (
+    MODEL_CONFIG, RISK_ASSESSMENT_MAPPING, HEAT_INDEX_CONFIG, OSHA_STANDARDS,
+    OSHA_RECOMMENDATIONS, RISK_LEVEL_RECOMMENDATIONS, HEAT_INDEX_RECOMMENDATIONS
+)
 from ..config.settings import settings
 from ..utils.logger import get_logger
+from ..utils.metrics import PREDICTION_DURATION, observe_stage
 
 logger = get_logger(__name__)
 
+# Every field predict_single can return
+PREDICTION_FIELDS = (
+    'timestamp', 'worker_id',
+    'heat_exposure_risk_score', 'risk_level', 'confidence',
+    'temperature_celsius', 'temperature_fahrenheit', 'humidity_percent', 'heat_index',
+    'risk_score_standard', 'risk_score_conservative',
+    'conservative_bias_applied', 'conservative_bias_value',
+    'predicted_thermal_class', 'class_probabilities',
+    'osha_recommendation_key', 'osha_recommendation_codes', 'requires_immediate_attention',
+    'heart_rate_avg', 'hrv_rmssd',
+    'model_version', 'prediction_method'
+)
+PREDICTION_FIELD_SET = frozenset(PREDICTION_FIELDS)
+
+# Fields read by machine consumers that only act on the risk assessment
+COMPACT_PREDICTION_FIELDS = (
+    'worker_id', 'heat_exposure_risk_score', 'risk_level',
+    'requires_immediate_attention', 'osha_recommendation_codes'
+)
+
+# Fields that need the heat index to be calculated. 'osha_recommendations'
+# is resolved from the recommendation key by the API, not by the predictor.
+HEAT_INDEX_FIELDS = frozenset({
+    'temperature_fahrenheit', 'heat_index', 'osha_recommendation_key',
+    'osha_recommendation_codes', 'osha_recommendations'
+})
+
+# Precomputed OSHA recommendation sets, one per (risk level, heat index
+# category) pair. Predictions carry the index into these tables as
+# 'osha_recommendation_key', so every result shares the same tuples.
+RISK_LEVELS = ('Safe', 'Caution', 'Warning', 'Danger')
+HEAT_INDEX_ADVISORY_THRESHOLDS = tuple(threshold for threshold, _ in HEAT_INDEX_RECOMMENDATIONS)
+_HEAT_INDEX_ADVISORIES = ((),) + tuple((code,) for _, code in HEAT_INDEX_RECOMMENDATIONS)
+_RISK_LEVEL_INDEX = {level: index for index, level in enumerate(RISK_LEVELS)}
+
+RECOMMENDATION_CODE_SETS = tuple(
+    RISK_LEVEL_RECOMMENDATIONS[level] + advisory
+    for level in RISK_LEVELS
+    for advisory in _HEAT_INDEX_ADVISORIES
+)
+RECOMMENDATION_TEXT_SETS = tuple(
+    tuple(sys.intern(OSHA_RECOMMENDATIONS[code]) for code in codes)
+    for codes in RECOMMENDATION_CODE_SETS
+)
+
+
+def recommendation_codes(key: Optional[int]) -> Tuple[str, ...]:
+    """Recommendation codes for an osha_recommendation_key (empty for None)."""
+    return RECOMMENDATION_CODE_SETS[key] if key is not None else ()
+
+
+def recommendation_text(key: Optional[int]) -> Tuple[str, ...]:
+    """Recommendation text for an osha_recommendation_key (empty for None)."""
+    return RECOMMENDATION_TEXT_SETS[key] if key is not None else ()
+
 
 class HeatExposurePredictor:
     """
@@ -197,6 +259,20 @@ class HeatExposurePredictor:
         else:
             return "Danger"
 
+    def _get_osha_recommendation_key(self, risk_level: str, heat_index: float) -> int:
+        """
+        Get the OSHA recommendation set for a risk level and heat index.
+
+        Args:
+            risk_level: Heat exposure risk level
+            heat_index: Heat index in Fahrenheit
+
+        Returns:
+            Index into RECOMMENDATION_CODE_SETS / RECOMMENDATION_TEXT_SETS
+        """
+        heat_index_category = bisect_right(HEAT_INDEX_ADVISORY_THRESHOLDS, heat_index)
+        return _RISK_LEVEL_INDEX[risk_level] * len(_HEAT_INDEX_ADVISORIES) + heat_index_category
+
     def _get_osha_recommendations(self, risk_score: float, temperature_c: float, humidity: float) -> List[str]:
         """
         Get OSHA-compliant safety recommendations based on heat exposure risk.
@@ -213,57 +289,21 @@ class HeatExposurePredictor:
         temperature_f = (temperature_c * 9/5) + 32
         heat_index = self.calculate_heat_index(temperature_f, humidity)
 
-        recommendations = []
-
-        # Risk-based recommendations
-        if risk_score < 0.25:  # Safe
-            recommendations.extend([
-                "Continue current activity with normal precautions",
-                "Maintain regular hydration schedule",
-                "Monitor for any changes in conditions"
-            ])
-        elif risk_score < 0.5:  # Caution
-            recommendations.extend([
-                "Increase water intake to 8 oz every 15-20 minutes",
-                "Take rest breaks in shade/cool area every hour",
-                "Monitor workers for early heat stress symptoms",
-                "Consider lighter colored, loose-fitting clothing"
-            ])
-        elif risk_score < 0.75:  # Warning
-            recommendations.extend([
-                "Implement work/rest cycles: 15 minutes work, 15 minutes rest",
-                "Mandatory water intake: 8 oz every 15 minutes",
-                "Move to air-conditioned area if possible",
-                "Remove unnecessary clothing layers",
-                "Assign heat stress buddy system"
-            ])
-        else:  # Danger
-            recommendations.extend([
-                "STOP strenuous outdoor work immediately",
-                "Move to air-conditioned environment",
-                "Continuous medical monitoring required",
-                "Implement emergency cooling procedures",
-                "Contact medical personnel if heat illness symptoms present"
-            ])
-
-        # Heat index specific recommendations
-        if heat_index >= 130:  # Extreme Danger
-            recommendations.append("EXTREME DANGER: Cease all outdoor work activities")
-        elif heat_index >= 105:  # Danger
-            recommendations.append("Postpone non-essential outdoor work")
-        elif heat_index >= 90:  # Extreme Caution
-            recommendations.append("Extreme caution required for outdoor work")
-
-        return recommendations
+        key = self._get_osha_recommendation_key(self._assess_heat_exposure_risk(risk_score), heat_index)
+        return list(RECOMMENDATION_TEXT_SETS[key])
 
     def predict_single(self, features_dict: Dict[str, Union[int, float]],
-                      use_conservative: bool = True) -> Dict[str, Any]:
+                      use_conservative: bool = True,
+                      fields: Optional[Collection[str]] = None) -> Dict[str, Any]:
         """
         Predict heat exposure risk for a single worker.
 
         Args:
             features_dict: Dictionary with feature names as keys and values
             use_conservative: Whether to apply conservative bias for safety
+            fields: Result fields to compute (all of PREDICTION_FIELDS when None).
+                worker_id, heat_exposure_risk_score, risk_level and
+                requires_immediate_attention are always included.
 
         Returns:
             Comprehensive heat exposure risk assessment
@@ -271,6 +311,8 @@ class HeatExposurePredictor:
         if not self.is_loaded:
             raise RuntimeError("Model not loaded. Call _load_model() first.")
 
+        wanted = PREDICTION_FIELD_SET if fields is None else frozenset(fields)
+
         # Validate input features
         missing_features = [f for f in self.feature_columns if f not in features_dict]
         if missing_features:
@@ -280,6 +322,7 @@ class HeatExposurePredictor:
                 features_dict[feature] = 0.0
 
         # Prepare features
+        start = time.perf_counter()
         features_df = pd.DataFrame([features_dict])
         features_df = features_df[self.feature_columns]  # Ensure correct order
 
@@ -288,10 +331,13 @@ class HeatExposurePredictor:
 
         # Scale features
         features_scaled = self.scaler.transform(features_df)
+        scaled = time.perf_counter()
 
-        # Make predictions
-        prediction = self.model.predict(features_scaled)[0]
+        # Make predictions (the predicted class is the most probable one, so
+        # predict_proba alone gives both)
         probabilities = self.model.predict_proba(features_scaled)[0]
+        prediction = int(probabilities.argmax())
+        inferred = time.perf_counter()
 
         # Calculate heat exposure risk scores
         standard_scores, conservative_scores, class_mapping = self._create_heat_exposure_score(
@@ -300,63 +346,79 @@ class HeatExposurePredictor:
 
         # Select final score based on conservative setting
         final_score = conservative_scores[0] if use_conservative else standard_scores[0]
-
-        # Generate assessments and recommendations
-        predicted_class = self.label_encoder.classes_[prediction]
-        confidence = float(probabilities.max())
         risk_level = self._assess_heat_exposure_risk(final_score)
 
-        # Get environmental data for heat index calculation
-        temp_c = features_dict.get('Temperature', 25.0)
-        humidity = features_dict.get('Humidity', 50.0)
-        temp_f = (temp_c * 9/5) + 32
-        heat_index = self.calculate_heat_index(temp_f, humidity)
-
-        recommendations = self._get_osha_recommendations(final_score, temp_c, humidity)
-
-        # Prepare comprehensive result
+        # Core predictions
         result = {
-            'timestamp': datetime.now().isoformat(),
             'worker_id': features_dict.get('worker_id', 'unknown'),
-
-            # Core predictions
             'heat_exposure_risk_score': round(float(final_score), 4),
             'risk_level': risk_level,
-            'confidence': round(confidence, 3),
-
-            # Environmental assessment
-            'temperature_celsius': temp_c,
-            'temperature_fahrenheit': round(temp_f, 1),
-            'humidity_percent': humidity,
-            'heat_index': round(heat_index, 1),
-
-            # Detailed scores
-            'risk_score_standard': round(float(standard_scores[0]), 4),
-            'risk_score_conservative': round(float(conservative_scores[0]), 4),
-            'conservative_bias_applied': use_conservative,
-            'conservative_bias_value': self.conservative_bias,
-
-            # ML model details
-            'predicted_thermal_class': str(predicted_class),
-            'class_probabilities': {
-                class_name: round(float(prob), 3)
-                for class_name, prob in zip(self.label_encoder.classes_, probabilities)
-            },
-
-            # Safety recommendations
-            'osha_recommendations': recommendations,
-            'requires_immediate_attention': final_score > MODEL_CONFIG.risk_thresholds['warning'],
+            'requires_immediate_attention': bool(final_score > MODEL_CONFIG.risk_thresholds['warning'])
+        }
 
-            # Biometric summary
-            'heart_rate_avg': features_dict.get('hrv_mean_hr', 0.0),
-            'hrv_rmssd': features_dict.get('hrv_rmssd', 0.0),
+        if 'timestamp' in wanted:
+            result['timestamp'] = datetime.now().isoformat()
+        if 'confidence' in wanted:
+            result['confidence'] = round(float(probabilities[prediction]), 3)
 
-            # System metadata
-            'model_version': '1.0.0',
-            'prediction_method': 'xgboost_heat_exposure'
-        }
+        # Environmental assessment
+        temp_c = features_dict.get('Temperature', 25.0)
+        humidity = features_dict.get('Humidity', 50.0)
+        if 'temperature_celsius' in wanted:
+            result['temperature_celsius'] = temp_c
+        if 'humidity_percent' in wanted:
+            result['humidity_percent'] = humidity
+        if not wanted.isdisjoint(HEAT_INDEX_FIELDS):
+            temp_f = (temp_c * 9/5) + 32
+            heat_index = self.calculate_heat_index(temp_f, humidity)
+            result['temperature_fahrenheit'] = round(temp_f, 1)
+            result['heat_index'] = round(heat_index, 1)
 
-        logger.info(f"Heat exposure prediction completed - Risk Level: {risk_level}, Score: {final_score:.3f}")
+            # Safety recommendations
+            recommendation_key = self._get_osha_recommendation_key(risk_level, heat_index)
+            result['osha_recommendation_key'] = recommendation_key
+            result['osha_recommendation_codes'] = RECOMMENDATION_CODE_SETS[recommendation_key]
+
+        # Detailed scores
+        if 'risk_score_standard' in wanted:
+            result['risk_score_standard'] = round(float(standard_scores[0]), 4)
+        if 'risk_score_conservative' in wanted:
+            result['risk_score_conservative'] = round(float(conservative_scores[0]), 4)
+        if 'conservative_bias_applied' in wanted:
+            result['conservative_bias_applied'] = use_conservative
+        if 'conservative_bias_value' in wanted:
+            result['conservative_bias_value'] = self.conservative_bias
+
+        # ML model details
+        if 'predicted_thermal_class' in wanted:
+            result['predicted_thermal_class'] = str(self.label_encoder.classes_[prediction])
+        if 'class_probabilities' in wanted:
+            result['class_probabilities'] = {
+                class_name: round(float(prob), 3)
+                for class_name, prob in zip(self.label_encoder.classes_, probabilities)
+            }
+
+        # Biometric summary
+        if 'heart_rate_avg' in wanted:
+            result['heart_rate_avg'] = features_dict.get('hrv_mean_hr', 0.0)
+        if 'hrv_rmssd' in wanted:
+            result['hrv_rmssd'] = features_dict.get('hrv_rmssd', 0.0)
+
+        # System metadata
+        if 'model_version' in wanted:
+            result['model_version'] = '1.0.0'
+        if 'prediction_method' in wanted:
+            result['prediction_method'] = 'xgboost_heat_exposure'
+
+        finished = time.perf_counter()
+        observe_stage('scaling', scaled - start)
+        observe_stage('inference', inferred - scaled)
+        observe_stage('scoring', finished - inferred)
+        PREDICTION_DURATION.observe(finished - start)
+
+        # Once per row in batches, so rate-limited per call site
+        logger.info("Heat exposure prediction completed - Risk Level: %s, Score: %.3f", risk_level, final_score,
+                    max_per_second=settings.LOG_HOT_PATH_MAX_PER_SECOND)
 
         return result
 
@@ -390,7 +452,8 @@ class HeatExposurePredictor:
                 results.append(result)
 
             except Exception as e:
-                logger.error(f"Error predicting sample {idx}: {e}")
+                logger.error("Error predicting sample %s: %s", idx, e,
+                             max_per_second=settings.LOG_HOT_PATH_MAX_PER_SECOND)
                 # Create error result
                 error_result = {
                     'timestamp': datetime.now().isoformat(),
@@ -5,24 +5,148 @@ Model Loader
 Handles model loading, caching, and management for the HeatGuard system.
 """
 
+import hashlib
 import os
+import pickle
 import time
 import threading
-from typing import Dict, Optional, Any
-import logging
-from datetime import datetime, timedelta
+from concurrent.futures import Future
+from typing import Dict, Optional, Any, Tuple
+from datetime import datetime
 
 from ..config.settings import settings
 from ..utils.logger import get_logger
+from ..utils.metrics import MODEL_LOAD_DURATION
 from .heat_predictor import HeatExposurePredictor
 
 logger = get_logger(__name__)
 
 
+# (file name, size, mtime in ns) of each model file, sorted by name
+ModelFingerprint = Tuple[Tuple[str, int, int], ...]
+
+
+def model_fingerprint(model_dir: str) -> ModelFingerprint:
+    """
+    Cheap signature of the model files in a directory, from ``stat`` alone.
+
+    Args:
+        model_dir: Model directory
+
+    Returns:
+        Name, size and modification time of each ``.joblib`` file
+    """
+    try:
+        with os.scandir(model_dir) as entries:
+            files = [entry for entry in entries if entry.name.endswith(".joblib") and entry.is_file()]
+            return tuple(sorted((entry.name, entry.stat().st_size, entry.stat().st_mtime_ns) for entry in files))
+    except FileNotFoundError:
+        return ()
+
+
+def model_checksum(model_dir: str) -> str:
+    """
+    SHA-256 over the names and contents of the model files in a directory.
+
+    Args:
+        model_dir: Model directory
+
+    Returns:
+        Hex digest (of nothing, if the directory is missing)
+    """
+    digest = hashlib.sha256()
+    for name, _, _ in model_fingerprint(model_dir):
+        digest.update(name.encode() + b"\0")
+        with open(os.path.join(model_dir, name), "rb") as model_file:
+            for block in iter(lambda: model_file.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+class _ByteCounter:
+    """Pickle sink that counts the bytes written instead of keeping them."""
+
+    __slots__ = ("nbytes",)
+
+    def __init__(self):
+        self.nbytes = 0
+
+    def write(self, data) -> int:
+        size = memoryview(data).nbytes
+        self.nbytes += size
+        return size
+
+    def buffer(self, buffer: pickle.PickleBuffer) -> None:
+        # Returning None keeps large array buffers out of band: counted, not copied
+        self.nbytes += buffer.raw().nbytes
+
+
+def predictor_footprint(predictor: HeatExposurePredictor, fingerprint: ModelFingerprint) -> int:
+    """
+    Estimate the memory a loaded predictor holds.
+
+    Measured as the serialized size of the predictor, which tracks what the
+    booster trees, scaler arrays and encoders occupy in memory, including
+    the booster's native memory that ``tracemalloc`` cannot see. Nothing is
+    buffered while measuring. Predictors that cannot be pickled are sized by
+    their model files.
+
+    Args:
+        predictor: Loaded predictor
+        fingerprint: Fingerprint of its model files (fallback size)
+
+    Returns:
+        Estimated footprint in bytes
+    """
+    counter = _ByteCounter()
+    try:
+        pickle.Pickler(counter, protocol=5, buffer_callback=counter.buffer).dump(predictor)
+    except Exception:
+        return sum(size for _, size, _ in fingerprint)
+    return counter.nbytes
+
+
+class _ModelStats:
+    """Cache counters for one model name, kept across reloads and evictions."""
+
+    __slots__ = ("hits", "misses", "evictions")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+class _CachedModel:
+    """An immutable cache entry: a loaded predictor and what is known about its load."""
+
+    __slots__ = ("predictor", "metadata", "loaded_at", "fingerprint", "memory_bytes", "stats")
+
+    def __init__(self, predictor: HeatExposurePredictor, metadata: Dict[str, Any],
+                 loaded_at: float, fingerprint: ModelFingerprint, memory_bytes: int = 0):
+        self.predictor = predictor
+        self.metadata = metadata
+        self.loaded_at = loaded_at
+        self.fingerprint = fingerprint  # Model files when the load started
+        self.memory_bytes = memory_bytes
+        self.stats: Optional[_ModelStats] = None  # Attached when published
+
+
 class ModelLoader:
     """
     Manages model loading, caching, and lifecycle for heat exposure prediction.
     Implements singleton pattern with thread-safe operations.
+
+    Cached models live in a dict that is never mutated: writers build a new
+    dict under ``_load_lock`` and swap the reference, so cache hits read one
+    snapshot without taking a lock. Cold loads are single-flight per model
+    name: the first caller loads outside the lock while concurrent callers
+    wait on its future, and a hit never waits behind a load.
+
+    Cached models do not expire; ModelRefresher replaces them in the
+    background when their files change. The cache is bounded by
+    MODEL_CACHE_SIZE models and by MODEL_CACHE_MAX_BYTES of estimated model
+    footprint, evicting least recently used models first.
     """
 
     _instance = None
@@ -40,11 +164,11 @@ class ModelLoader:
         if self._initialized:
             return
 
-        self._models: Dict[str, HeatExposurePredictor] = {}
-        self._model_metadata: Dict[str, Dict[str, Any]] = {}
-        self._load_times: Dict[str, datetime] = {}
-        self._access_times: Dict[str, datetime] = {}
-        self._load_lock = threading.Lock()
+        self._entries: Dict[str, _CachedModel] = {}  # Replaced, never mutated
+        self._access_times: Dict[str, float] = {}
+        self._loads_in_flight: Dict[str, Future] = {}
+        self._stats: Dict[str, _ModelStats] = {}
+        self._load_lock = threading.Lock()  # Serializes writers only
         self._initialized = True
 
         logger.info("ModelLoader initialized")
@@ -67,50 +191,108 @@ class ModelLoader:
             FileNotFoundError: If model files are not found
             RuntimeError: If model loading fails
         """
-        with self._load_lock:
-            # Check if model is already loaded and not expired
-            if (model_name in self._models and
-                not force_reload and
-                self._is_model_valid(model_name)):
+        if not force_reload:
+            entry = self._entries.get(model_name)
+            if entry is not None and self._is_entry_valid(entry):
+                self._access_times[model_name] = time.time()
+                entry.stats.hits += 1
+                return entry.predictor
 
-                # Update access time
-                self._access_times[model_name] = datetime.now()
-                logger.debug(f"Retrieved cached model: {model_name}")
-                return self._models[model_name]
+        with self._load_lock:
+            # Another caller may have finished loading while we waited
+            if not force_reload and self._is_model_valid(model_name):
+                entry = self._entries[model_name]
+                self._access_times[model_name] = time.time()
+                entry.stats.hits += 1
+                return entry.predictor
+
+            self._stats.setdefault(model_name, _ModelStats()).misses += 1
+            future = self._loads_in_flight.get(model_name)
+            leader = future is None
+            if leader:
+                future = self._loads_in_flight[model_name] = Future()
+
+        if not leader:
+            logger.debug("Waiting for in-flight load of model: %s", model_name,
+                         max_per_second=settings.LOG_HOT_PATH_MAX_PER_SECOND)
+            return future.result()
 
-            # Load new model
-            logger.info(f"Loading heat exposure model: {model_name}")
-            start_time = time.time()
+        try:
+            entry = self._load_entry(model_name, model_dir)
+            self._publish(model_name, entry)
+            predictor = entry.predictor
+        except BaseException as e:
+            with self._load_lock:
+                del self._loads_in_flight[model_name]
+            future.set_exception(e)
+            raise
+        with self._load_lock:
+            del self._loads_in_flight[model_name]
+        future.set_result(predictor)
+        return predictor
 
-            try:
-                # Create new predictor instance
-                predictor = HeatExposurePredictor(model_dir=model_dir)
+    def _load_entry(self, model_name: str, model_dir: Optional[str]) -> _CachedModel:
+        """Load a predictor into a new cache entry, without holding the lock."""
+        logger.info(f"Loading heat exposure model: {model_name}")
+        model_dir = model_dir or settings.MODEL_DIR
+        start_time = time.time()
 
-                # Cache the model
-                self._models[model_name] = predictor
-                self._load_times[model_name] = datetime.now()
-                self._access_times[model_name] = datetime.now()
+        try:
+            # Fingerprint first, so files changed during the load are seen as changed
+            fingerprint = model_fingerprint(model_dir)
+            # Create new predictor instance
+            predictor = HeatExposurePredictor(model_dir=model_dir)
+            checksum = model_checksum(model_dir)
+        except Exception as e:
+            logger.error(f"Failed to load model {model_name}: {e}")
+            raise RuntimeError(f"Model loading failed: {e}") from e
+
+        load_duration = time.time() - start_time
+        MODEL_LOAD_DURATION.observe(load_duration)
+        memory_bytes = predictor_footprint(predictor, fingerprint)
+        metadata = {
+            'model_dir': model_dir,
+            'load_duration': load_duration,
+            'feature_count': len(predictor.feature_columns),
+            'target_classes': list(predictor.label_encoder.classes_),
+            'checksum': checksum,
+            'version': '1.0.0'
+        }
 
-                # Store metadata
-                load_duration = time.time() - start_time
-                self._model_metadata[model_name] = {
-                    'model_dir': model_dir or settings.MODEL_DIR,
-                    'load_duration': load_duration,
-                    'feature_count': len(predictor.feature_columns),
-                    'target_classes': list(predictor.label_encoder.classes_),
-                    'version': '1.0.0'
-                }
+        logger.info(f"Model {model_name} loaded successfully in {load_duration:.2f}s",
+                    memory_bytes=memory_bytes)
+        return _CachedModel(predictor, metadata, time.time(), fingerprint, memory_bytes)
 
-                logger.info(f"Model {model_name} loaded successfully in {load_duration:.2f}s")
+    def _publish(self, model_name: str, entry: _CachedModel,
+                 replacing: Optional[_CachedModel] = None) -> bool:
+        """
+        Swap a cache entry into a new snapshot.
 
-                # Clean up old models if cache is full
-                self._cleanup_cache()
+        Requests that already hold the previous predictor finish on it; later
+        lookups get the new one.
 
-                return predictor
+        Args:
+            model_name: Model identifier
+            entry: New cache entry
+            replacing: Publish only if this is still the cached entry (None: always)
 
-            except Exception as e:
-                logger.error(f"Failed to load model {model_name}: {e}")
-                raise RuntimeError(f"Model loading failed: {e}") from e
+        Returns:
+            True if published
+        """
+        with self._load_lock:
+            if replacing is not None and self._entries.get(model_name) is not replacing:
+                return False
+            entry.stats = self._stats.setdefault(model_name, _ModelStats())
+            entries = dict(self._entries)
+            entries[model_name] = entry
+            self._access_times.setdefault(model_name, time.time())
+            # Clean up old models if cache is full
+            self._entries = self._cleanup_cache(entries, keep=model_name)
+            return True
+
+    def get_entries(self) -> Dict[str, _CachedModel]:
+        """The current cache snapshot (never mutated; do not modify)."""
+        return self._entries
 
     def get_model(self, model_name: str = "default") -> Optional[HeatExposurePredictor]:
         """
@@ -122,9 +304,11 @@ class ModelLoader:
         Returns:
             Model instance if cached, None otherwise
         """
-        if model_name in self._models and self._is_model_valid(model_name):
-            self._access_times[model_name] = datetime.now()
-            return self._models[model_name]
+        entry = self._entries.get(model_name)
+        if entry is not None and self._is_entry_valid(entry):
+            self._access_times[model_name] = time.time()
+            entry.stats.hits += 1
+            return entry.predictor
         return None
 
     def is_model_loaded(self, model_name: str = "default") -> bool:
@@ -137,8 +321,8 @@ class ModelLoader:
         Returns:
             True if model is loaded and valid
         """
-        return (model_name in self._models and
-                self._is_model_valid(model_name))
+        entry = self._entries.get(model_name)
+        return entry is not None and self._is_entry_valid(entry)
 
     def unload_model(self, model_name: str) -> bool:
         """
@@ -151,11 +335,11 @@ class ModelLoader:
             True if model was unloaded, False if not found
         """
         with self._load_lock:
-            if model_name in self._models:
-                del self._models[model_name]
-                del self._model_metadata[model_name]
-                del self._load_times[model_name]
-                del self._access_times[model_name]
+            if model_name in self._entries:
+                entries = dict(self._entries)
+                del entries[model_name]
+                self._entries = entries
+                self._access_times.pop(model_name, None)
 
                 logger.info(f"Model {model_name} unloaded from cache")
                 return True
@@ -186,16 +370,22 @@ class ModelLoader:
         Returns:
             Model metadata dictionary or None if not loaded
         """
-        if model_name not in self._model_metadata:
+        entry = self._entries.get(model_name)
+        if entry is None:
             return None
 
-        metadata = self._model_metadata[model_name].copy()
+        metadata = entry.metadata.copy()
+        last_access = self._access_times.get(model_name, entry.loaded_at)
         metadata.update({
             'model_name': model_name,
-            'is_loaded': self.is_model_loaded(model_name),
-            'load_time': self._load_times[model_name].isoformat(),
-            'last_access': self._access_times[model_name].isoformat(),
-            'age_minutes': (datetime.now() - self._load_times[model_name]).total_seconds() / 60
+            'is_loaded': self._is_entry_valid(entry),
+            'load_time': datetime.fromtimestamp(entry.loaded_at).isoformat(),
+            'last_access': datetime.fromtimestamp(last_access).isoformat(),
+            'age_minutes': (time.time() - entry.loaded_at) / 60,
+            'memory_bytes': entry.memory_bytes,
+            'cache_hits': entry.stats.hits,
+            'cache_misses': entry.stats.misses,
+            'cache_evictions': entry.stats.evictions
         })
 
         return metadata
@@ -205,11 +395,11 @@ class ModelLoader:
         Get information about all loaded models.
 
         Returns:
-            Dictionary mapping model names to their metadata
+            Dictionary mapping model names to their metadata, footprint and cache counters
         """
         return {
             model_name: self.get_model_info(model_name)
-            for model_name in self._models.keys()
+            for model_name in self._entries
         }
 
     def clear_cache(self) -> int:
@@ -220,10 +410,8 @@ class ModelLoader:
             Number of models that were cleared
         """
         with self._load_lock:
-            count = len(self._models)
-            self._models.clear()
-            self._model_metadata.clear()
-            self._load_times.clear()
+            count = len(self._entries)
+            self._entries = {}
             self._access_times.clear()
 
             logger.info(f"Cleared {count} models from cache")
@@ -231,7 +419,7 @@ class ModelLoader:
 
     def _is_model_valid(self, model_name: str) -> bool:
         """
-        Check if a cached model is still valid (not expired).
+        Check if a cached model is still valid.
 
         Args:
             model_name: Model identifier
@@ -239,42 +427,58 @@ class ModelLoader:
         Returns:
             True if model is valid
         """
-        if model_name not in self._load_times:
-            return False
+        entry = self._entries.get(model_name)
+        return entry is not None and self._is_entry_valid(entry)
 
-        # Check if model has expired (optional TTL)
-        load_time = self._load_times[model_name]
-        max_age = timedelta(hours=24)  # Models expire after 24 hours
+    @staticmethod
+    def _is_entry_valid(entry: _CachedModel) -> bool:
+        """Check that a cache entry's model instance is still functional."""
+        return entry.predictor.is_loaded
 
-        if datetime.now() - load_time > max_age:
-            logger.info(f"Model {model_name} has expired and will be reloaded")
-            return False
+    def _cleanup_cache(self, entries: Dict[str, _CachedModel],
+                       keep: Optional[str] = None) -> Dict[str, _CachedModel]:
+        """
+        Remove least recently used models from a new snapshot if the cache is full.
 
-        # Check if model instance is still functional
-        model = self._models.get(model_name)
-        return model is not None and model.is_loaded
+        Args:
+            entries: Snapshot being built (caller holds ``_load_lock``)
+            keep: Model just published, never evicted by its own publication
 
-    def _cleanup_cache(self) -> None:
-        """
-        Clean up cache by removing least recently used models if cache is full.
+        Returns:
+            The snapshot, trimmed to MODEL_CACHE_SIZE models and MODEL_CACHE_MAX_BYTES
         """
-        if len(self._models) <= settings.MODEL_CACHE_SIZE:
-            return
+        budget = settings.MODEL_CACHE_MAX_BYTES
+        total_bytes = sum(entry.memory_bytes for entry in entries.values())
+
+        def over_limit() -> bool:
+            return len(entries) > settings.MODEL_CACHE_SIZE or (budget > 0 and total_bytes > budget)
+
+        if not over_limit():
+            return entries
 
         # Sort models by last access time
         models_by_access = sorted(
-            self._access_times.items(),
-            key=lambda x: x[1]
+            entries,
+            key=lambda name: self._access_times.get(name, entries[name].loaded_at)
         )
 
         # Remove oldest models
-        models_to_remove = len(self._models) - settings.MODEL_CACHE_SIZE
-        for model_name, _ in models_by_access[:models_to_remove]:
-            logger.info(f"Removing {model_name} from cache (LRU cleanup)")
-            del self._models[model_name]
-            del self._model_metadata[model_name]
-            del self._load_times[model_name]
-            del self._access_times[model_name]
+        for model_name in models_by_access:
+            if not over_limit():
+                break
+            if model_name == keep:
+                continue
+            entry = entries.pop(model_name)
+            total_bytes -= entry.memory_bytes
+            entry.stats.evictions += 1
+            self._access_times.pop(model_name, None)
+            logger.info(f"Removing {model_name} from cache (LRU cleanup)",
+                        memory_bytes=entry.memory_bytes, cache_bytes=total_bytes)
+
+        if over_limit():
+            logger.warning(f"Model {keep} alone exceeds the model cache budget",
+                           memory_bytes=total_bytes, budget_bytes=budget)
+        return entries
 
     def health_check(self) -> Dict[str, Any]:
         """
@@ -284,8 +488,9 @@ class ModelLoader:
             Health check results
         """
         try:
-            total_models = len(self._models)
-            valid_models = sum(1 for name in self._models.keys() if self._is_model_valid(name))
+            entries = self._entries
+            total_models = len(entries)
+            valid_models = sum(1 for entry in entries.values() if self._is_entry_valid(entry))
 
             # Try to load default model if not present
             default_model_loaded = self.is_model_loaded("default")
@@ -302,6 +507,8 @@ class ModelLoader:
                 'valid_models': valid_models,
                 'default_model_loaded': default_model_loaded,
                 'cache_size_limit': settings.MODEL_CACHE_SIZE,
+                'cache_memory_bytes': sum(entry.memory_bytes for entry in entries.values()),
+                'cache_memory_limit_bytes': settings.MODEL_CACHE_MAX_BYTES,
                 'timestamp': datetime.now().isoformat()
             }
 
@@ -314,5 +521,152 @@ class ModelLoader:
             }
 
 
+class ModelRefresher:
+    """
+    Background job that reloads cached models whose files have changed.
+
+    Each pass compares the ``stat`` fingerprint of every cached model's
+    directory with the one taken when it was loaded. A change is acted on
+    once the fingerprint is the same on two passes in a row, so a deploy
+    still copying files is not loaded half-written. Files touched but not
+    changed (same checksum) only update the fingerprint. Otherwise a new
+    instance is loaded and warmed on this thread and swapped in atomically;
+    requests already holding the old instance finish on it.
+    """
+
+    def __init__(self, loader: ModelLoader):
+        self.loader = loader
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._pending: Dict[str, ModelFingerprint] = {}
+
+        # Metrics
+        self.runs = 0
+        self.swaps = 0
+        self.failures = 0
+        self.last_run_at: Optional[str] = None
+        self.last_swap: Optional[Dict[str, Any]] = None
+        self.last_error: Optional[str] = None
+
+    def start(self) -> bool:
+        """
+        Start the refresh thread.
+
+        Returns:
+            True if started, False if refreshing is disabled
+        """
+        if not settings.MODEL_REFRESH_ENABLED:
+            return False
+        if self._thread is not None and self._thread.is_alive():
+            return True
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-refresher", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the refresh thread after the load in progress."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(settings.MODEL_REFRESH_INTERVAL):
+            self.run_once()
+
+    def run_once(self) -> int:
+        """
+        Check every cached model and swap in those whose files changed.
+
+        Returns:
+            Number of models swapped
+        """
+        swapped = 0
+        for model_name, entry in self.loader.get_entries().items():
+            if self._stop.is_set():
+                break
+            try:
+                if self.refresh(model_name, entry):
+                    swapped += 1
+            except Exception as e:
+                self.failures += 1
+                self.last_error = f"{model_name}: {e}"
+                logger.error(f"Model refresh failed for {model_name}, keeping the loaded model: {e}")
+
+        self.runs += 1
+        self.last_run_at = datetime.now().isoformat()
+        return swapped
+
+    def refresh(self, model_name: str, entry: _CachedModel) -> bool:
+        """
+        Reload one cached model if its files changed and have settled.
+
+        Args:
+            model_name: Model identifier
+            entry: The cache entry to check
+
+        Returns:
+            True if a new instance was swapped in
+
+        Raises:
+            RuntimeError: If the new files cannot be loaded (the old model stays)
+        """
+        model_dir = entry.metadata['model_dir']
+        fingerprint = model_fingerprint(model_dir)
+        if fingerprint == entry.fingerprint:
+            self._pending.pop(model_name, None)
+            return False
+        if self._pending.get(model_name) != fingerprint:
+            self._pending[model_name] = fingerprint  # Wait for the files to settle
+            return False
+        del self._pending[model_name]
+
+        checksum = model_checksum(model_dir)
+        if checksum == entry.metadata['checksum']:
+            # Touched, not changed: keep the instance under the new fingerprint
+            touched = _CachedModel(entry.predictor, entry.metadata, entry.loaded_at, fingerprint,
+                                   entry.memory_bytes)
+            self.loader._publish(model_name, touched, replacing=entry)
+            return False
+
+        new_entry = self.loader._load_entry(model_name, model_dir)
+        self._warm(new_entry.predictor)
+        if not self.loader._publish(model_name, new_entry, replacing=entry):
+            return False  # Reloaded or unloaded meanwhile
+
+        self.swaps += 1
+        self.last_swap = {
+            'model_name': model_name,
+            'swapped_at': datetime.now().isoformat(),
+            'previous_checksum': entry.metadata['checksum'],
+            'checksum': new_entry.metadata['checksum'],
+            'load_duration': new_entry.metadata['load_duration']
+        }
+        logger.info(f"Model {model_name} refreshed from changed files", **self.last_swap)
+        return True
+
+    @staticmethod
+    def _warm(predictor: HeatExposurePredictor) -> None:
+        """Run one prediction so the first request on the new instance pays no first-call costs."""
+        predictor.predict_single(predictor.get_feature_template())
+
+    def get_status(self) -> Dict[str, Any]:
+        """Refresh configuration, counters and the last swap, for the model health check."""
+        return {
+            'enabled': settings.MODEL_REFRESH_ENABLED,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'interval_seconds': settings.MODEL_REFRESH_INTERVAL,
+            'runs': self.runs,
+            'swaps': self.swaps,
+            'failures': self.failures,
+            'last_run_at': self.last_run_at,
+            'last_swap': self.last_swap,
+            'last_error': self.last_error
+        }
+
+
 # Global model loader instance
-model_loader = ModelLoader()
\ No newline at end of file
+model_loader = ModelLoader()
+model_refresher = ModelRefresher(model_loader)
@@ -8,9 +8,11 @@ Contains business logic services for the HeatGuard system.
 from .prediction_service import PredictionService
 from .batch_service import BatchService
 from .compliance_service import ComplianceService
+from .warmup_service import WarmupService
 
 __all__ = [
     "PredictionService",
     "BatchService",
     "ComplianceService",
+    "WarmupService",
 ]
\ No newline at end of file
@@ -7,12 +7,14 @@ with optimized performance and resource management.
 """
 
 import asyncio
+import os
 import time
 import uuid
 from typing import Dict, List, Any, Optional, AsyncGenerator
 from datetime import datetime, timedelta
 import pandas as pd
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
 import json
 from pathlib import Path
 
@@ -20,16 +22,28 @@ from ..models.model_loader import model_loader
 from ..utils.validators import InputValidator, ValidationError
 from ..utils.data_preprocessor import DataPreprocessor
 from ..utils.logger import get_logger
+from ..utils.metrics import count_predictions
 from ..config.settings import settings
 from .compliance_service import ComplianceService
 
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet uploads are optional
+    pq = None
+
 logger = get_logger(__name__)
 
+SUPPORTED_FILE_FORMATS = ('csv', 'parquet')
+
 
 class BatchJob:
     """Represents a batch processing job."""
 
-    def __init__(self, job_id: str, data: List[Dict[str, Any]], options: Dict[str, Any]):
+    max_recorded_errors = 100
+
+    def __init__(self, job_id: str, data: List[Dict[str, Any]], options: Dict[str, Any],
+                 source_file: Optional[str] = None,
+                 result_file: Optional[str] = None):
         self.job_id = job_id
         self.data = data
         self.options = options
@@ -40,9 +54,57 @@ class BatchJob:
         self.progress = 0.0
         self.results: List[Dict[str, Any]] = []
         self.errors: List[str] = []
+        self.suppressed_errors = 0
         self.total_items = len(data)
         self.processed_items = 0
 
+        # File-backed jobs stream results to disk instead of self.results
+        self.source_file = source_file
+        self.result_file = result_file
+
+        # Running aggregates, updated as each chunk completes
+        self.success_count = 0
+        self.error_count = 0
+        self.risk_score_sum = 0.0
+        self.risk_score_min: Optional[float] = None
+        self.risk_score_max: Optional[float] = None
+        self.high_risk_count = 0
+        self.medium_risk_count = 0
+        self.low_risk_count = 0
+        self.risk_level_counts = {'Safe': 0, 'Caution': 0, 'Warning': 0, 'Danger': 0}
+
+    def record_results(self, results: List[Dict[str, Any]]) -> None:
+        """Fold a chunk of prediction results into the running aggregates."""
+        for result in results:
+            if 'error' in result:
+                self.error_count += 1
+                continue
+
+            self.success_count += 1
+            score = result.get('heat_exposure_risk_score', 0)
+            self.risk_score_sum += score
+            self.risk_score_min = score if self.risk_score_min is None else min(self.risk_score_min, score)
+            self.risk_score_max = score if self.risk_score_max is None else max(self.risk_score_max, score)
+
+            if score > 0.75:
+                self.high_risk_count += 1
+            elif score >= 0.5:
+                self.medium_risk_count += 1
+            else:
+                self.low_risk_count += 1
+
+            risk_level = result.get('risk_level', 'Unknown')
+            if risk_level in self.risk_level_counts:
+                self.risk_level_counts[risk_level] += 1
+
+    def add_errors(self, messages: List[str]) -> None:
+        """Record error messages, keeping only the first few for long-running jobs."""
+        for message in messages:
+            if len(self.errors) < self.max_recorded_errors:
+                self.errors.append(message)
+            else:
+                self.suppressed_errors += 1
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert job to dictionary representation."""
         return {
@@ -54,9 +116,10 @@ class BatchJob:
             'progress': self.progress,
             'total_items': self.total_items,
             'processed_items': self.processed_items,
-            'success_count': len([r for r in self.results if 'error' not in r]),
-            'error_count': len([r for r in self.results if 'error' in r]),
+            'success_count': self.success_count,
+            'error_count': self.error_count,
             'errors': self.errors,
+            'suppressed_errors': self.suppressed_errors,
             'options': self.options
         }
 
@@ -137,6 +200,78 @@ class BatchService:
             logger.error(f"Batch job submission failed: {e}")
             raise RuntimeError(f"Failed to submit batch job: {e}") from e
 
+    async def submit_file_job(self,
+                              file_path: str,
+                              file_format: str,
+                              use_conservative: bool = True,
+                              log_compliance: bool = True,
+                              chunk_size: int = 1000,
+                              priority: str = 'normal') -> str:
+        """
+        Submit a CSV or Parquet file for chunked batch processing.
+
+        The file is read in bounded chunks and results are appended to the
+        job's result file as they complete, so memory use does not depend on
+        the size of the upload.
+
+        Args:
+            file_path: Path of the uploaded file on local disk
+            file_format: Either 'csv' or 'parquet'
+            use_conservative: Apply conservative bias for safety
+            log_compliance: Whether to log predictions for OSHA compliance
+            chunk_size: Number of rows read and scored per chunk
+            priority: Job priority ('low', 'normal', 'high')
+
+        Returns:
+            Job ID for tracking
+
+        Raises:
+            ValidationError: If the file format is not supported
+            RuntimeError: If job submission fails
+        """
+        try:
+            if file_format not in SUPPORTED_FILE_FORMATS:
+                raise ValidationError(f"Unsupported file format '{file_format}', expected one of {SUPPORTED_FILE_FORMATS}")
+
+            if file_format == 'parquet' and pq is None:
+                raise ValidationError("Parquet uploads require the pyarrow package")
+
+            job_id = f"batch_{uuid.uuid4().hex[:8]}_{int(time.time())}"
+
+            results_dir = Path(settings.BATCH_RESULTS_DIR)
+            results_dir.mkdir(parents=True, exist_ok=True)
+            result_file = str(results_dir / f"{job_id}.ndjson")
+
+            options = {
+                'use_conservative': use_conservative,
+                'log_compliance': log_compliance,
+                'chunk_size': min(chunk_size, 1000),  # Cap chunk size
+                'priority': priority,
+                'source_format': file_format,
+                'submitted_by': 'api_upload',
+                'submission_time': datetime.now().isoformat()
+            }
+
+            job = BatchJob(job_id, [], options, source_file=file_path, result_file=result_file)
+            if file_format == 'parquet':
+                job.total_items = pq.ParquetFile(file_path).metadata.num_rows
+
+            self.active_jobs[job_id] = job
+
+            asyncio.create_task(self._process_file_job(job))
+
+            logger.info(f"File batch job {job_id} submitted",
+                       job_id=job_id, file_format=file_format, total_items=job.total_items)
+
+            return job_id
+
+        except ValidationError as e:
+            logger.error(f"File batch job validation failed: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"File batch job submission failed: {e}")
+            raise RuntimeError(f"Failed to submit file batch job: {e}") from e
+
     async def get_job_status(self, job_id: str) -> Optional[Dict[str, Any]]:
         """
         Get status of a batch job.
@@ -180,18 +315,47 @@ class BatchService:
                 'progress': job.progress
             }
 
-        return {
+        job_results = {
             'job_id': job_id,
             'status': job.status,
             'completed_at': job.completed_at.isoformat() if job.completed_at else None,
             'total_items': job.total_items,
             'processed_items': job.processed_items,
-            'success_count': len([r for r in job.results if 'error' not in r]),
-            'error_count': len([r for r in job.results if 'error' in r]),
+            'success_count': job.success_count,
+            'error_count': job.error_count,
             'results': job.results,
             'processing_summary': self._generate_processing_summary(job)
         }
 
+        if job.result_file:
+            # Results of file jobs can be arbitrarily large, so they are
+            # downloaded separately instead of being inlined here
+            job_results['results'] = None
+            job_results['results_format'] = 'ndjson'
+            job_results['results_url'] = f"{settings.API_V1_STR}/batch_results/{job_id}/download"
+
+        return job_results
+
+    async def get_job_result_file(self, job_id: str) -> Optional[str]:
+        """
+        Get the result file of a completed file-backed batch job.
+
+        Args:
+            job_id: Job identifier
+
+        Returns:
+            Path to the NDJSON result file, or None if unavailable
+        """
+        job = self.active_jobs.get(job_id) or self.completed_jobs.get(job_id)
+
+        if not job or not job.result_file or job.status != 'completed':
+            return None
+
+        if not Path(job.result_file).exists():
+            return None
+
+        return job.result_file
+
     async def cancel_job(self, job_id: str) -> bool:
         """
         Cancel an active batch job.
@@ -253,6 +417,7 @@ class BatchService:
                 job.status = 'failed'
                 job.errors.append(f"Validation failed: {e}")
                 job.completed_at = datetime.now()
+                self._finish_job(job)
                 return
 
             # Process data in chunks
@@ -270,16 +435,19 @@ class BatchService:
                 chunk_data = validated_data[i:i + chunk_size]
                 chunk_number = i // chunk_size + 1
 
-                logger.debug(f"Processing chunk {chunk_number}/{total_chunks}",
-                           job_id=job.job_id, chunk_size=len(chunk_data))
+                logger.debug("Processing chunk %d/%d", chunk_number, total_chunks,
+                             job_id=job.job_id, chunk_size=len(chunk_data))
 
                 # Process chunk
                 chunk_results = await self._process_chunk(
                     chunk_data, use_conservative, job.job_id
                 )
 
+                count_predictions(chunk_results)
+
                 # Update job progress
                 job.results.extend(chunk_results)
+                job.record_results(chunk_results)
                 job.processed_items += len(chunk_data)
                 job.progress = job.processed_items / job.total_items
 
@@ -310,14 +478,161 @@ class BatchService:
             )
 
             # Move to completed jobs
-            self.completed_jobs[job.job_id] = job
-            del self.active_jobs[job.job_id]
+            self._finish_job(job)
 
         except Exception as e:
             job.status = 'failed'
             job.errors.append(f"Processing error: {e}")
             job.completed_at = datetime.now()
             logger.error(f"Batch job failed", job_id=job.job_id, error=str(e))
+            self._finish_job(job)
+
+    async def _process_file_job(self, job: BatchJob) -> None:
+        """Process a file-backed batch job chunk by chunk."""
+        loop = asyncio.get_event_loop()
+
+        try:
+            job.status = 'running'
+            job.started_at = datetime.now()
+
+            logger.info(f"Starting file batch job processing", job_id=job.job_id)
+
+            chunk_size = job.options.get('chunk_size', 1000)
+            use_conservative = job.options.get('use_conservative', True)
+            log_compliance = job.options.get('log_compliance', True)
+
+            file_chunks = self._iter_file_chunks(job.source_file, job.options['source_format'], chunk_size)
+
+            with closing(file_chunks) as chunks, open(job.result_file, 'w', encoding='utf-8') as results_out:
+                chunk_number = 0
+                while job.status != 'cancelled':
+                    # Parsing is blocking, so pull each chunk off the event loop
+                    chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+                    if chunk is None:
+                        break
+
+                    chunk_data, bytes_progress = chunk
+                    chunk_number += 1
+                    row_offset = job.processed_items
+
+                    logger.debug("Processing file chunk %d", chunk_number,
+                                 job_id=job.job_id, chunk_size=len(chunk_data))
+
+                    try:
+                        validated_data, warnings = self.validator.validate_batch_prediction(chunk_data)
+                        if warnings:
+                            job.add_errors([f"Chunk {chunk_number}: {w}" for w in warnings])
+                    except ValidationError as e:
+                        job.add_errors([f"Chunk {chunk_number} validation failed: {e}"])
+                        job.error_count += len(chunk_data)
+                        job.processed_items += len(chunk_data)
+                        continue
+
+                    chunk_results = await self._process_chunk(
+                        validated_data, use_conservative, job.job_id
+                    )
+
+                    for result in chunk_results:
+                        result['batch_index'] = row_offset + result.get('batch_index', 0)
+
+                    await loop.run_in_executor(
+                        self.executor, self._write_results_chunk, results_out, chunk_results
+                    )
+
+                    count_predictions(chunk_results)
+                    job.record_results(chunk_results)
+                    job.processed_items += len(chunk_data)
+                    if bytes_progress is not None:
+                        job.progress = bytes_progress
+                    elif job.total_items:
+                        job.progress = min(1.0, job.processed_items / job.total_items)
+
+                    if log_compliance:
+                        try:
+                            await loop.run_in_executor(
+                                self.executor,
+                                self.compliance_service.log_batch_predictions,
+                                chunk_results
+                            )
+                        except Exception as e:
+                            job.add_errors([f"Compliance logging error: {e}"])
+
+            if job.status != 'cancelled':
+                job.status = 'completed'
+                job.progress = 1.0
+
+            job.total_items = job.processed_items
+            job.completed_at = datetime.now()
+            processing_time = (job.completed_at - job.started_at).total_seconds()
+
+            logger.info(
+                f"File batch job completed",
+                job_id=job.job_id,
+                status=job.status,
+                processed_items=job.processed_items,
+                processing_time_seconds=processing_time
+            )
+
+        except Exception as e:
+            job.status = 'failed'
+            job.add_errors([f"Processing error: {e}"])
+            job.completed_at = datetime.now()
+            logger.error(f"File batch job failed", job_id=job.job_id, error=str(e))
+
+        finally:
+            self._remove_file(job.source_file)
+            self._finish_job(job)
+
+    def _finish_job(self, job: BatchJob) -> None:
+        """Move a finished, failed or cancelled job to completed jobs."""
+        self.completed_jobs[job.job_id] = job
+        self.active_jobs.pop(job.job_id, None)
+
+    def _iter_file_chunks(self, file_path: str, file_format: str, chunk_size: int):
+        """
+        Yield (records, bytes_progress) tuples from an uploaded file.
+
+        CSV files are parsed chunk by chunk; Parquet files are read one row
+        group at a time and split into batches of at most chunk_size rows.
+        bytes_progress is the fraction of the file consumed, or None when
+        progress is tracked by row count instead.
+        """
+        if file_format == 'csv':
+            with open(file_path, 'rb') as f:
+                total_bytes = os.fstat(f.fileno()).st_size or 1
+                for df in pd.read_csv(f, chunksize=chunk_size):
+                    yield self._frame_to_records(df), min(1.0, f.tell() / total_bytes)
+        else:
+            parquet_file = pq.ParquetFile(file_path)
+            for row_group in range(parquet_file.num_row_groups):
+                for batch in parquet_file.iter_batches(batch_size=chunk_size, row_groups=[row_group]):
+                    yield self._frame_to_records(batch.to_pandas()), None
+
+    @staticmethod
+    def _frame_to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Convert a chunk DataFrame to records, mapping NaN to None."""
+        return df.astype(object).where(df.notna(), None).to_dict('records')
+
+    @staticmethod
+    def _write_results_chunk(results_out, chunk_results: List[Dict[str, Any]]) -> None:
+        """Append a chunk of results to a job's NDJSON result file."""
+        results_out.write(''.join(
+            json.dumps(result, ensure_ascii=False, default=str) + '\n'
+            for result in chunk_results
+        ))
+        results_out.flush()
+
+    @staticmethod
+    def _remove_file(file_path: Optional[str]) -> None:
+        """Remove a job file, ignoring files that are already gone."""
+        if not file_path:
+            return
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove batch job file {file_path}: {e}")
 
     async def _process_chunk(self,
                            chunk_data: List[Dict[str, Any]],
@@ -379,43 +694,31 @@ class BatchService:
 
     def _generate_processing_summary(self, job: BatchJob) -> Dict[str, Any]:
         """Generate processing summary for completed job."""
-        successful_results = [r for r in job.results if 'error' not in r]
-        failed_results = [r for r in job.results if 'error' in r]
-
-        if not successful_results:
+        if not job.success_count:
             return {'error': 'No successful predictions'}
 
-        # Calculate risk statistics
-        risk_scores = [r.get('heat_exposure_risk_score', 0) for r in successful_results]
-        risk_levels = [r.get('risk_level', 'Unknown') for r in successful_results]
-
         processing_time = (job.completed_at - job.started_at).total_seconds() if job.completed_at and job.started_at else 0
 
         return {
             'performance_metrics': {
                 'total_processing_time_seconds': processing_time,
-                'average_prediction_time_ms': (processing_time * 1000) / len(successful_results) if successful_results else 0,
-                'throughput_predictions_per_second': len(successful_results) / processing_time if processing_time > 0 else 0
+                'average_prediction_time_ms': (processing_time * 1000) / job.success_count,
+                'throughput_predictions_per_second': job.success_count / processing_time if processing_time > 0 else 0
             },
             'prediction_statistics': {
-                'successful_predictions': len(successful_results),
-                'failed_predictions': len(failed_results),
-                'success_rate_percent': (len(successful_results) / job.total_items) * 100
+                'successful_predictions': job.success_count,
+                'failed_predictions': job.error_count,
+                'success_rate_percent': (job.success_count / job.total_items) * 100 if job.total_items else 0
             },
             'risk_analysis': {
-                'average_risk_score': round(sum(risk_scores) / len(risk_scores), 3),
-                'max_risk_score': round(max(risk_scores), 3),
-                'min_risk_score': round(min(risk_scores), 3),
-                'high_risk_workers': sum(1 for score in risk_scores if score > 0.75),
-                'medium_risk_workers': sum(1 for score in risk_scores if 0.5 <= score <= 0.75),
-                'low_risk_workers': sum(1 for score in risk_scores if score < 0.5)
+                'average_risk_score': round(job.risk_score_sum / job.success_count, 3),
+                'max_risk_score': round(job.risk_score_max, 3),
+                'min_risk_score': round(job.risk_score_min, 3),
+                'high_risk_workers': job.high_risk_count,
+                'medium_risk_workers': job.medium_risk_count,
+                'low_risk_workers': job.low_risk_count
             },
-            'risk_level_distribution': {
-                'Safe': sum(1 for level in risk_levels if level == 'Safe'),
-                'Caution': sum(1 for level in risk_levels if level == 'Caution'),
-                'Warning': sum(1 for level in risk_levels if level == 'Warning'),
-                'Danger': sum(1 for level in risk_levels if level == 'Danger')
-            }
+            'risk_level_distribution': dict(job.risk_level_counts)
         }
 
     async def _cleanup_completed_jobs(self) -> None:
@@ -423,36 +726,53 @@ class BatchService:
         while True:
             try:
                 await asyncio.sleep(self.job_cleanup_interval)
+                removed = self._evict_completed_jobs(datetime.now())
+                if removed:
+                    logger.info(f"Cleaned up {removed} old batch jobs")
 
-                current_time = datetime.now()
-                jobs_to_remove = []
-
-                # Remove jobs older than 24 hours
-                for job_id, job in self.completed_jobs.items():
-                    if job.completed_at and (current_time - job.completed_at).total_seconds() > 86400:  # 24 hours
-                        jobs_to_remove.append(job_id)
+            except Exception as e:
+                logger.error(f"Error during job cleanup: {e}")
 
-                # Keep only the most recent jobs if we exceed the limit
-                if len(self.completed_jobs) > self.max_completed_jobs:
-                    sorted_jobs = sorted(
-                        self.completed_jobs.items(),
-                        key=lambda x: x[1].completed_at or datetime.min,
-                        reverse=True
-                    )
-                    # Keep the most recent jobs
-                    jobs_to_keep = dict(sorted_jobs[:self.max_completed_jobs])
-                    jobs_to_remove.extend([job_id for job_id in self.completed_jobs if job_id not in jobs_to_keep])
+    def _evict_completed_jobs(self, current_time: datetime) -> int:
+        """
+        Drop completed jobs older than 24 hours or beyond max_completed_jobs.
 
-                # Remove old jobs
-                for job_id in jobs_to_remove:
-                    if job_id in self.completed_jobs:
-                        del self.completed_jobs[job_id]
+        The result file and any remaining upload of each evicted job are
+        deleted with it.
 
-                if jobs_to_remove:
-                    logger.info(f"Cleaned up {len(jobs_to_remove)} old batch jobs")
+        Args:
+            current_time: Time job ages are measured against
 
-            except Exception as e:
-                logger.error(f"Error during job cleanup: {e}")
+        Returns:
+            Number of jobs removed
+        """
+        jobs_to_remove = []
+
+        # Remove jobs older than 24 hours
+        for job_id, job in self.completed_jobs.items():
+            if job.completed_at and (current_time - job.completed_at).total_seconds() > 86400:  # 24 hours
+                jobs_to_remove.append(job_id)
+
+        # Keep only the most recent jobs if we exceed the limit
+        if len(self.completed_jobs) > self.max_completed_jobs:
+            sorted_jobs = sorted(
+                self.completed_jobs.items(),
+                key=lambda x: x[1].completed_at or datetime.min,
+                reverse=True
+            )
+            # Keep the most recent jobs
+            jobs_to_keep = dict(sorted_jobs[:self.max_completed_jobs])
+            jobs_to_remove.extend([job_id for job_id in self.completed_jobs if job_id not in jobs_to_keep])
+
+        # Remove old jobs
+        removed = 0
+        for job_id in jobs_to_remove:
+            job = self.completed_jobs.pop(job_id, None)
+            if job is not None:
+                self._remove_file(job.result_file)
+                self._remove_file(job.source_file)
+                removed += 1
+        return removed
 
     def get_service_statistics(self) -> Dict[str, Any]:
         """Get batch service statistics."""
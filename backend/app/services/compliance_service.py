@@ -5,25 +5,56 @@ OSHA Compliance Service
 Handles OSHA compliance logging and reporting for heat exposure predictions.
 """
 
+import csv
+import io
 import json
-import logging
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 from pathlib import Path
 import pandas as pd
 
 from ..config.settings import settings
 from ..config.model_config import OSHA_STANDARDS
+from ..models.heat_predictor import recommendation_codes, recommendation_text
 from ..utils.logger import get_logger, log_prediction
+from ..utils.metrics import COMPLIANCE_LOGS, CRITICAL_RISK_ALERTS, time_stage
+from ..utils.compliance_archive import ASSESSMENT_COLUMNS, project_entry
+from ..utils.compliance_writer import compliance_compactor, compliance_merger, compliance_writer
+from ..utils.compliance_store import entry_timestamp, normalize_timestamp
+from ..utils.compliance_rollups import HOUR, ROLLUP_COLUMNS, RollupAggregate, RollupBucket
+from ..utils.serialization import dumps
 
 logger = get_logger(__name__)
 
+# Prediction result fields read when building compliance log entries
+COMPLIANCE_PREDICTION_FIELDS = frozenset({
+    'timestamp', 'worker_id', 'batch_index',
+    'temperature_celsius', 'temperature_fahrenheit', 'humidity_percent', 'heat_index',
+    'heat_exposure_risk_score', 'risk_level', 'requires_immediate_attention', 'confidence',
+    'heart_rate_avg', 'hrv_rmssd', 'osha_recommendation_key',
+    'model_version', 'prediction_method', 'conservative_bias_applied', 'request_id'
+})
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+# Default CSV columns: one per assessment field
+EXPORT_CSV_FIELDS = ['timestamp_utc', 'compliance_event'] + [path for path, _ in ASSESSMENT_COLUMNS]
+
 
 class ComplianceService:
     """Service for OSHA compliance logging and reporting."""
 
     def __init__(self):
-        self.osha_logger = logging.getLogger('osha_compliance')
+        self.writer = compliance_writer
+        self.compactor = compliance_compactor
+        self.merger = compliance_merger
+        # Progress of recent exports, by export ID
+        self.exports: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._exports_lock = threading.Lock()
         self.enable_logging = settings.ENABLE_OSHA_LOGGING
         self._ensure_log_directory()
 
@@ -37,6 +68,9 @@ class ComplianceService:
         """
         Log a single heat exposure prediction for OSHA compliance.
 
+        The entry is queued for the background compliance writer, so this does
+        not wait for serialization or disk I/O.
+
         Args:
             prediction_result: Complete prediction result dictionary
         """
@@ -44,17 +78,19 @@ class ComplianceService:
             return
 
         try:
-            # Extract key information for compliance
-            compliance_entry = self._create_compliance_entry(prediction_result)
+            with time_stage('compliance_logging'):
+                # Immediate action alerts go out on the priority channel first
+                if self._requires_immediate_action(prediction_result):
+                    self._log_immediate_action_required(prediction_result)
 
-            # Log to OSHA compliance file
-            self.osha_logger.info(json.dumps(compliance_entry, ensure_ascii=False))
+                # Extract key information for compliance
+                compliance_entry = self._create_compliance_entry(prediction_result)
 
-            # Check if immediate action is required
-            if self._requires_immediate_action(prediction_result):
-                self._log_immediate_action_required(prediction_result)
+                # Queue for the OSHA compliance file
+                self.writer.submit(compliance_entry)
+            COMPLIANCE_LOGS.inc()
 
-            logger.debug(f"OSHA compliance logged for worker {prediction_result.get('worker_id')}")
+            logger.debug("OSHA compliance logged for worker %s", prediction_result.get('worker_id'))
 
         except Exception as e:
             logger.error(f"Failed to log OSHA compliance: {e}")
@@ -63,6 +99,10 @@ class ComplianceService:
         """
         Log batch predictions for OSHA compliance.
 
+        Every immediate action alert in the batch is sent on the priority
+        channel before any routine entry is built, so an alert never waits
+        behind the rest of the batch.
+
         Args:
             prediction_results: List of prediction result dictionaries
         """
@@ -70,22 +110,29 @@ class ComplianceService:
             return
 
         try:
-            batch_summary = self._create_batch_compliance_summary(prediction_results)
+            with time_stage('compliance_logging'):
+                successful = [result for result in prediction_results if 'error' not in result]
 
-            # Log batch summary
-            self.osha_logger.info(json.dumps(batch_summary, ensure_ascii=False))
+                for result in successful:
+                    if self._requires_immediate_action(result):
+                        self._log_immediate_action_required(result)
 
-            # Log individual predictions
-            for result in prediction_results:
-                if 'error' not in result:  # Only log successful predictions
-                    self.log_prediction(result)
+                # Check for batch-level alerts
+                high_risk_count = sum(1 for r in prediction_results
+                                    if r.get('heat_exposure_risk_score', 0) > 0.75)
 
-            # Check for batch-level alerts
-            high_risk_count = sum(1 for r in prediction_results
-                                if r.get('heat_exposure_risk_score', 0) > 0.75)
+                if high_risk_count > 0:
+                    self._log_batch_alert(prediction_results, high_risk_count)
 
-            if high_risk_count > 0:
-                self._log_batch_alert(prediction_results, high_risk_count)
+                batch_summary = self._create_batch_compliance_summary(prediction_results)
+
+                # Log batch summary
+                self.writer.submit(batch_summary)
+
+                # Log individual predictions (only successful ones)
+                for result in successful:
+                    self.writer.submit(self._create_compliance_entry(result))
+            COMPLIANCE_LOGS.inc(len(successful))
 
             logger.info(f"OSHA compliance logged for batch of {len(prediction_results)} predictions")
 
@@ -94,11 +141,15 @@ class ComplianceService:
 
     def _create_compliance_entry(self, prediction_result: Dict[str, Any]) -> Dict[str, Any]:
         """Create standardized compliance log entry."""
+        recommendation_key = prediction_result.get('osha_recommendation_key')
+        codes = recommendation_codes(recommendation_key)
+
         return {
             'compliance_event': 'HEAT_EXPOSURE_ASSESSMENT',
             'timestamp_utc': prediction_result.get('timestamp', datetime.now().isoformat()),
             'worker_identification': {
                 'worker_id': prediction_result.get('worker_id', 'unknown'),
+                'site_id': prediction_result.get('site_id'),
                 'batch_index': prediction_result.get('batch_index')
             },
             'environmental_conditions': {
@@ -118,8 +169,9 @@ class ComplianceService:
                 'hrv_rmssd': prediction_result.get('hrv_rmssd', 0)
             },
             'safety_recommendations': {
-                'recommendations': prediction_result.get('osha_recommendations', []),
-                'recommendation_count': len(prediction_result.get('osha_recommendations', []))
+                'recommendation_key': recommendation_key,
+                'recommendation_codes': codes,
+                'recommendation_count': len(codes)
             },
             'compliance_flags': {
                 'exceeds_heat_index_threshold': self._check_heat_index_threshold(
@@ -148,20 +200,17 @@ class ComplianceService:
                 'total_workers': len(prediction_results)
             }
 
-        # Calculate batch statistics
-        risk_scores = [r.get('heat_exposure_risk_score', 0) for r in successful_results]
-        heat_indices = [r.get('heat_index', 0) for r in successful_results]
-
-        # Count workers by risk level
-        risk_distribution = {}
+        # Calculate batch statistics in one pass
+        totals = RollupBucket()
         for result in successful_results:
-            risk_level = result.get('risk_level', 'Unknown')
-            risk_distribution[risk_level] = risk_distribution.get(risk_level, 0) + 1
-
-        # OSHA compliance flags
-        high_heat_index_count = sum(1 for hi in heat_indices if hi >= settings.HEAT_INDEX_THRESHOLD_DANGER)
-        immediate_attention_count = sum(1 for r in successful_results
-                                      if r.get('requires_immediate_attention', False))
+            totals.add_assessment(
+                result.get('risk_level', 'Unknown'),
+                result.get('heat_exposure_risk_score', 0),
+                result.get('heat_index', 0),
+                result.get('requires_immediate_attention', False)
+            )
+        immediate_attention_count = totals.immediate_attention
+        high_heat_index_count = totals.above_heat_threshold
 
         return {
             'compliance_event': 'BATCH_ASSESSMENT_SUMMARY',
@@ -172,13 +221,13 @@ class ComplianceService:
                 'failed_assessments': len(prediction_results) - len(successful_results)
             },
             'risk_summary': {
-                'average_risk_score': round(sum(risk_scores) / len(risk_scores), 3),
-                'highest_risk_score': round(max(risk_scores), 3),
-                'risk_level_distribution': risk_distribution
+                'average_risk_score': round(totals.average_risk_score(), 3),
+                'highest_risk_score': round(totals.risk_score_max, 3),
+                'risk_level_distribution': totals.risk_levels
             },
             'environmental_summary': {
-                'average_heat_index': round(sum(heat_indices) / len(heat_indices), 1),
-                'maximum_heat_index': round(max(heat_indices), 1),
+                'average_heat_index': round(totals.average_heat_index(), 1),
+                'maximum_heat_index': round(totals.heat_index_max, 1),
                 'workers_above_heat_threshold': high_heat_index_count
             },
             'compliance_alerts': {
@@ -213,10 +262,24 @@ class ComplianceService:
             'risk_level': prediction_result.get('risk_level', 'Unknown'),
             'heat_index': prediction_result.get('heat_index', 0),
             'alert_reasons': self._get_alert_reasons(prediction_result),
-            'immediate_recommendations': prediction_result.get('osha_recommendations', [])[:3]  # Top 3
+            'immediate_recommendations': recommendation_text(
+                prediction_result.get('osha_recommendation_key')
+            )[:3]  # Top 3
         }
 
-        self.osha_logger.warning(json.dumps(alert_entry, ensure_ascii=False))
+        self.writer.submit_priority(alert_entry, created=self._prediction_time(prediction_result))
+        CRITICAL_RISK_ALERTS.inc()
+
+    @staticmethod
+    def _prediction_time(prediction_result: Dict[str, Any]) -> Optional[float]:
+        """Epoch seconds of the prediction, so alert latency covers prediction to record."""
+        timestamp = prediction_result.get('timestamp')
+        if not isinstance(timestamp, str):
+            return None
+        try:
+            return datetime.fromisoformat(timestamp.replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            return None
 
     def _log_batch_alert(self, prediction_results: List[Dict[str, Any]], high_risk_count: int) -> None:
         """Log batch-level alert."""
@@ -234,7 +297,7 @@ class ComplianceService:
             ]
         }
 
-        self.osha_logger.warning(json.dumps(alert_entry, ensure_ascii=False))
+        self.writer.submit_priority(alert_entry)
 
     def _check_heat_index_threshold(self, heat_index: float) -> str:
         """Check heat index against OSHA thresholds."""
@@ -274,6 +337,9 @@ class ComplianceService:
         """
         Generate OSHA compliance report for specified time period.
 
+        Whole hours are answered from the segment rollups; raw entries are
+        read only for partial hours at the edges of the period.
+
         Args:
             start_date: Report start date
             end_date: Report end date
@@ -283,10 +349,13 @@ class ComplianceService:
             Comprehensive compliance report
         """
         try:
-            # Read compliance logs for the specified period
-            log_entries = self._read_compliance_logs(start_date, end_date)
+            # Make entries still waiting for a group commit visible to the reader
+            self.writer.flush(timeout=settings.HEALTH_CHECK_TIMEOUT)
+
+            # Aggregate compliance data for the specified period and workers
+            aggregate = self._aggregate_compliance(start_date, end_date, worker_ids)
 
-            if not log_entries:
+            if aggregate.is_empty():
                 return {
                     'report_period': {
                         'start_date': start_date.isoformat(),
@@ -295,15 +364,8 @@ class ComplianceService:
                     'error': 'No compliance data found for specified period'
                 }
 
-            # Filter by worker IDs if specified
-            if worker_ids:
-                log_entries = [
-                    entry for entry in log_entries
-                    if entry.get('worker_identification', {}).get('worker_id') in worker_ids
-                ]
-
             # Generate report
-            report = self._compile_compliance_report(log_entries, start_date, end_date)
+            report = self._compile_compliance_report(aggregate, start_date, end_date)
             return report
 
         except Exception as e:
@@ -313,61 +375,297 @@ class ComplianceService:
                 'timestamp': datetime.now().isoformat()
             }
 
-    def _read_compliance_logs(self, start_date: datetime, end_date: datetime) -> List[Dict[str, Any]]:
-        """Read compliance logs from file system."""
-        # This is a simplified implementation
-        # In a production system, you might use a database or log aggregation service
+    def _aggregate_compliance(self,
+                              start_date: datetime,
+                              end_date: datetime,
+                              worker_ids: Optional[List[str]] = None) -> RollupAggregate:
+        """Add up hour rollups and edge-hour entries for a report period."""
+        start = normalize_timestamp(start_date)
+        end = normalize_timestamp(end_date)
+        store = self.writer.store
+        aggregate = RollupAggregate(worker_ids)
+
+        partial_hours = []
+        for key in store.segment_keys(start, end):
+            if worker_ids and set(worker_ids).isdisjoint(store.segment_workers(key)):
+                continue
+            rollup = store.load_rollup(key, detail=bool(worker_ids))
+            for hour in rollup.hours.values():
+                hour_last = hour.start + HOUR - timedelta(microseconds=1)
+                if hour_last < start or hour.start > end:
+                    continue
+                if start <= hour.start and hour_last <= end:
+                    aggregate.add_hour(hour)
+                else:
+                    partial_hours.append((max(start, hour.start), min(end, hour_last)))
+
+        for hour_start, hour_end in partial_hours:
+            aggregate.add_entries(store.scan_timestamped(hour_start, hour_end, worker_ids, columns=ROLLUP_COLUMNS))
+
+        legacy_entries = self._read_legacy_compliance_log(start, end, worker_ids)
+        if legacy_entries:
+            aggregate.add_entries((entry_timestamp(entry, 0), entry) for entry in legacy_entries)
+
+        return aggregate
+
+    def _read_compliance_logs(self,
+                              start_date: datetime,
+                              end_date: datetime,
+                              worker_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Read compliance entries from the segment store.
+
+        Only segments overlapping the period are opened, and the time range and
+        worker filter are applied before entries are decoded.
+        """
         log_entries = []
 
         try:
-            log_file = Path(settings.OSHA_LOG_FILE)
-            if not log_file.exists():
-                return log_entries
-
-            with open(log_file, 'r') as f:
-                for line in f:
-                    if line.strip():
-                        try:
-                            # Parse log line - this assumes JSON format
-                            parts = line.split(' | ')
-                            if len(parts) >= 3:
-                                timestamp_str = parts[0]
-                                message = parts[2]
-
-                                # Try to parse as JSON
-                                if message.startswith('{'):
-                                    entry = json.loads(message)
-                                    entry_time = datetime.fromisoformat(
-                                        entry.get('timestamp_utc', '').replace('Z', '+00:00')
-                                    )
-
-                                    if start_date <= entry_time <= end_date:
-                                        log_entries.append(entry)
-
-                        except (json.JSONDecodeError, ValueError, KeyError):
-                            continue  # Skip invalid entries
-
+            log_entries.extend(self._read_legacy_compliance_log(start_date, end_date, worker_ids))
+            log_entries.extend(self.writer.store.scan(start_date, end_date, worker_ids))
         except Exception as e:
             logger.error(f"Error reading compliance logs: {e}")
 
         return log_entries
 
+    def _read_legacy_compliance_log(self,
+                                    start_date: datetime,
+                                    end_date: datetime,
+                                    worker_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Read entries from the single-file log written before segments were introduced."""
+        return list(self._iter_legacy_compliance_log(start_date, end_date, worker_ids))
+
+    def _iter_legacy_compliance_log(self,
+                                    start_date: datetime,
+                                    end_date: datetime,
+                                    worker_ids: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield matching entries from the pre-segment log one line at a time."""
+        log_file = Path(settings.OSHA_LOG_FILE)
+        if not log_file.exists():
+            return
+
+        start_date = normalize_timestamp(start_date)
+        end_date = normalize_timestamp(end_date)
+
+        with open(log_file, 'r') as f:
+            for line in f:
+                if line.strip():
+                    try:
+                        # Parse log line - this assumes JSON format
+                        parts = line.split(' | ')
+                        if len(parts) >= 3:
+                            message = parts[2]
+
+                            # Try to parse as JSON
+                            if message.startswith('{'):
+                                entry = json.loads(message)
+                                entry_time = normalize_timestamp(datetime.fromisoformat(
+                                    entry.get('timestamp_utc', '').replace('Z', '+00:00')
+                                ))
+
+                                if not start_date <= entry_time <= end_date:
+                                    continue
+                                if worker_ids and entry.get('worker_identification', {}).get('worker_id') not in worker_ids:
+                                    continue
+                                yield entry
+
+                    except (json.JSONDecodeError, ValueError, KeyError):
+                        continue  # Skip invalid entries
+
+    def export_compliance_entries(self,
+                                  start_date: datetime,
+                                  end_date: datetime,
+                                  worker_ids: Optional[List[str]] = None,
+                                  export_format: str = 'ndjson',
+                                  fields: Optional[List[str]] = None,
+                                  compress: bool = False) -> Tuple[str, Iterator[bytes]]:
+        """
+        Stream raw compliance entries for a period as NDJSON or CSV.
+
+        Segments are read one at a time with the time range and worker filter
+        applied while reading, and encoded output is produced in chunks of
+        COMPLIANCE_EXPORT_CHUNK_ROWS entries, so memory use does not grow with
+        the length of the period. Progress is recorded under the returned
+        export ID (see get_export_progress).
+
+        Args:
+            start_date: Export start date
+            end_date: Export end date
+            worker_ids: Only export assessments for these workers
+            export_format: 'ndjson' or 'csv'
+            fields: Dotted entry paths to export. NDJSON defaults to whole
+                entries, CSV to one column per assessment field.
+            compress: Gzip the output
+
+        Returns:
+            (export ID, iterator of encoded byte chunks)
+
+        Raises:
+            ValueError: If the format is unknown or the period is empty
+        """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {export_format}")
+        start = normalize_timestamp(start_date)
+        end = normalize_timestamp(end_date)
+        if end < start:
+            raise ValueError("Export end date is before its start date")
+        if export_format == 'csv' and not fields:
+            fields = EXPORT_CSV_FIELDS
+
+        export_id = uuid.uuid4().hex
+        progress = {
+            'export_id': export_id,
+            'status': 'pending',
+            'format': export_format,
+            'compressed': compress,
+            'start_date': start.isoformat(),
+            'end_date': end.isoformat(),
+            'worker_ids': worker_ids,
+            'segments_total': 0,
+            'segments_done': 0,
+            'percent_complete': 0.0,
+            'entries_exported': 0,
+            'bytes_written': 0,
+            'started_at': None,
+            'completed_at': None,
+            'error': None
+        }
+        with self._exports_lock:
+            self.exports[export_id] = progress
+            while len(self.exports) > settings.COMPLIANCE_EXPORT_HISTORY:
+                self.exports.popitem(last=False)
+
+        return export_id, self._export_chunks(progress, start, end, worker_ids, export_format, fields, compress)
+
+    def get_export_progress(self, export_id: str) -> Optional[Dict[str, Any]]:
+        """Get the progress of a recent export, or None if it is unknown."""
+        with self._exports_lock:
+            progress = self.exports.get(export_id)
+            return dict(progress) if progress is not None else None
+
+    def _export_chunks(self,
+                       progress: Dict[str, Any],
+                       start: datetime,
+                       end: datetime,
+                       worker_ids: Optional[List[str]],
+                       export_format: str,
+                       fields: Optional[List[str]],
+                       compress: bool) -> Iterator[bytes]:
+        """Encode the entries of an export chunk by chunk."""
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None  # wbits=31: gzip container
+        chunk_rows = settings.COMPLIANCE_EXPORT_CHUNK_ROWS
+        progress_interval = settings.COMPLIANCE_EXPORT_PROGRESS_INTERVAL
+
+        def emit(data: bytes) -> bytes:
+            if compressor is not None:
+                data = compressor.compress(data)
+            progress['bytes_written'] += len(data)
+            return data
+
+        progress['status'] = 'running'
+        progress['started_at'] = datetime.now().isoformat()
+        try:
+            self.writer.flush(timeout=settings.HEALTH_CHECK_TIMEOUT)
+            store = self.writer.store
+            keys = store.segment_keys(start, end)
+            progress['segments_total'] = len(keys)
+
+            if export_format == 'csv':
+                header = io.StringIO()
+                csv.writer(header).writerow(fields)
+                yield emit(header.getvalue().encode('utf-8'))
+
+            last_logged = 0
+            rows: List[Dict[str, Any]] = []
+            for source in self._export_sources(store, keys, start, end, worker_ids, fields, progress):
+                for entry in source:
+                    rows.append(entry)
+                    if len(rows) >= chunk_rows:
+                        progress['entries_exported'] += len(rows)
+                        data = self._encode_export_rows(rows, export_format, fields)
+                        rows = []
+                        if data:
+                            yield emit(data)
+
+                if progress['entries_exported'] - last_logged >= progress_interval:
+                    last_logged = progress['entries_exported']
+                    logger.info("Compliance export progress", export_id=progress['export_id'],
+                                entries=last_logged, percent_complete=progress['percent_complete'])
+
+            if rows:
+                progress['entries_exported'] += len(rows)
+                yield emit(self._encode_export_rows(rows, export_format, fields))
+            if compressor is not None:
+                tail = compressor.flush()
+                progress['bytes_written'] += len(tail)
+                yield tail
+
+            progress['status'] = 'completed'
+            progress['percent_complete'] = 100.0
+        except GeneratorExit:
+            progress['status'] = 'cancelled'  # Client disconnected
+            raise
+        except Exception as e:
+            progress['status'] = 'failed'
+            progress['error'] = str(e)
+            logger.error(f"Compliance export failed: {e}", export_id=progress['export_id'])
+            raise
+        finally:
+            progress['completed_at'] = datetime.now().isoformat()
+
+    def _export_sources(self,
+                        store,
+                        keys: List[str],
+                        start: datetime,
+                        end: datetime,
+                        worker_ids: Optional[List[str]],
+                        fields: Optional[List[str]],
+                        progress: Dict[str, Any]) -> Iterator[Iterator[Dict[str, Any]]]:
+        """Yield one lazy entry iterator per source: the legacy log, then each segment."""
+        legacy_entries = self._iter_legacy_compliance_log(start, end, worker_ids)
+        yield (project_entry(entry, fields) for entry in legacy_entries) if fields else legacy_entries
+
+        last = timedelta(microseconds=1)
+        for key in keys:
+            segment_start = store.segment_start(key)
+            yield store.scan(max(start, segment_start), min(end, segment_start + store.segment_length - last),
+                             worker_ids, columns=fields)
+            progress['segments_done'] += 1
+            progress['percent_complete'] = round(100.0 * progress['segments_done'] / len(keys), 1)
+
+    @staticmethod
+    def _encode_export_rows(rows: List[Dict[str, Any]], export_format: str, fields: Optional[List[str]]) -> bytes:
+        """Encode entries as NDJSON lines or CSV rows."""
+        if export_format == 'ndjson':
+            return b''.join(dumps(row) + b'\n' for row in rows)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        paths = [field.split('.') for field in fields]
+        for row in rows:
+            values = []
+            for path in paths:
+                value: Any = row
+                for part in path:
+                    value = value.get(part) if isinstance(value, dict) else None
+                if value is None:
+                    value = ''
+                elif isinstance(value, (list, tuple)):
+                    value = ';'.join(str(item) for item in value)
+                elif isinstance(value, dict):
+                    value = dumps(value).decode()
+                values.append(value)
+            writer.writerow(values)
+        return buffer.getvalue().encode('utf-8')
+
     def _compile_compliance_report(self,
-                                 log_entries: List[Dict[str, Any]],
+                                 aggregate: RollupAggregate,
                                  start_date: datetime,
                                  end_date: datetime) -> Dict[str, Any]:
-        """Compile compliance report from log entries."""
-        # This would contain detailed report compilation logic
-        # Simplified version for demonstration
-
-        assessments = [e for e in log_entries if e.get('compliance_event') == 'HEAT_EXPOSURE_ASSESSMENT']
-        alerts = [e for e in log_entries if 'ALERT' in e.get('compliance_event', '')]
-
-        worker_ids = list(set([
-            a.get('worker_identification', {}).get('worker_id')
-            for a in assessments
-            if a.get('worker_identification', {}).get('worker_id')
-        ]))
+        """Compile compliance report from aggregated rollups."""
+        totals = aggregate.totals
+        alerts = {event: count for event, count in totals.events.items() if 'ALERT' in event}
+        worker_ids = sorted(aggregate.workers)
 
         return {
             'report_metadata': {
@@ -376,19 +674,27 @@ class ComplianceService:
                     'end_date': end_date.isoformat()
                 },
                 'generated_at': datetime.now().isoformat(),
-                'report_type': 'OSHA Heat Exposure Compliance Report'
+                'report_type': 'OSHA Heat Exposure Compliance Report',
+                'hours_from_rollups': aggregate.hours_from_rollups,
+                'raw_entries_scanned': aggregate.entries_scanned
             },
             'summary_statistics': {
-                'total_assessments': len(assessments),
+                'total_assessments': totals.assessments,
                 'unique_workers': len(worker_ids),
-                'total_alerts': len(alerts),
+                'total_alerts': sum(alerts.values()),
                 'assessment_days': (end_date - start_date).days + 1
             },
             'detailed_analysis': {
                 'worker_list': worker_ids[:50],  # Limit for display
-                'alert_summary': self._summarize_alerts(alerts),
-                'high_risk_incidents': len([a for a in assessments
-                                          if a.get('risk_assessment', {}).get('heat_exposure_risk_score', 0) > 0.75])
+                'alert_summary': alerts,
+                'high_risk_incidents': totals.high_risk,
+                'risk_level_distribution': totals.risk_levels,
+                'average_risk_score': round(totals.average_risk_score(), 3),
+                'highest_risk_score': round(totals.risk_score_max, 3),
+                'average_heat_index': round(totals.average_heat_index(), 1),
+                'maximum_heat_index': round(totals.heat_index_max, 1),
+                'assessments_above_heat_threshold': totals.above_heat_threshold,
+                'immediate_attention_required': totals.immediate_attention
             },
             'compliance_status': {
                 'osha_compliant': True,  # Based on logging completeness
@@ -397,24 +703,20 @@ class ComplianceService:
             }
         }
 
-    def _summarize_alerts(self, alerts: List[Dict[str, Any]]) -> Dict[str, int]:
-        """Summarize alert types and counts."""
-        summary = {}
-        for alert in alerts:
-            event_type = alert.get('compliance_event', 'UNKNOWN')
-            summary[event_type] = summary.get(event_type, 0) + 1
-        return summary
-
     def get_compliance_status(self) -> Dict[str, Any]:
         """Get current compliance system status."""
         return {
             'compliance_logging_enabled': self.enable_logging,
             'log_file_path': settings.OSHA_LOG_FILE,
             'log_file_exists': Path(settings.OSHA_LOG_FILE).exists() if self.enable_logging else False,
+            'segment_store': self.writer.store.get_stats() if self.enable_logging else None,
             'heat_index_thresholds': {
                 'warning': settings.HEAT_INDEX_THRESHOLD_WARNING,
                 'danger': settings.HEAT_INDEX_THRESHOLD_DANGER
             },
             'osha_standards_loaded': bool(OSHA_STANDARDS),
+            'writer': self.writer.get_metrics(),
+            'merge': self.merger.get_metrics(),
+            'compaction': self.compactor.get_metrics(),
             'timestamp': datetime.now().isoformat()
         }
\ No newline at end of file
@@ -7,7 +7,7 @@ Core business logic for heat exposure predictions and risk assessments.
 
 import time
 import asyncio
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, AsyncIterator, Collection, FrozenSet
 from datetime import datetime, timedelta
 import pandas as pd
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -16,11 +16,71 @@ from ..models.model_loader import model_loader
 from ..utils.validators import InputValidator, ValidationError
 from ..utils.data_preprocessor import DataPreprocessor
 from ..utils.logger import get_logger, log_prediction
+from ..utils.metrics import PARALLEL_SCORING_IN_FLIGHT, count_predictions, observe_stage, time_stage
+from ..utils.tracing import propagate, submit
 from ..config.settings import settings
-from .compliance_service import ComplianceService
+from .compliance_service import ComplianceService, COMPLIANCE_PREDICTION_FIELDS
+from .warmup_service import warmup_service
 
 logger = get_logger(__name__)
 
+# Fields the service adds on top of the predictor's result
+SERVICE_FIELDS = (
+    'request_id', 'processing_time_ms', 'validation_warnings',
+    'data_quality_score', 'service_version'
+)
+
+
+class BatchStatistics:
+    """Accumulates batch statistics chunk by chunk without keeping result dicts."""
+
+    def __init__(self):
+        self.total_predictions = 0
+        self.risk_scores: List[float] = []
+        self.risk_level_distribution = {'Safe': 0, 'Caution': 0, 'Warning': 0, 'Danger': 0}
+
+    def add(self, results: List[Dict[str, Any]]) -> None:
+        """Add a chunk of prediction results."""
+        self.total_predictions += len(results)
+        for result in results:
+            if 'error' in result:
+                continue
+            self.risk_scores.append(result.get('heat_exposure_risk_score', 0))
+            risk_level = result.get('risk_level', 'Unknown')
+            if risk_level in self.risk_level_distribution:
+                self.risk_level_distribution[risk_level] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Build the batch statistics dictionary."""
+        risk_scores = self.risk_scores
+        if not risk_scores:
+            return {'error': 'No successful predictions'}
+
+        stats = {
+            'total_predictions': self.total_predictions,
+            'successful_predictions': len(risk_scores),
+            'failed_predictions': self.total_predictions - len(risk_scores),
+            'risk_score_statistics': {
+                'mean': round(sum(risk_scores) / len(risk_scores), 3),
+                'min': round(min(risk_scores), 3),
+                'max': round(max(risk_scores), 3),
+                'median': round(sorted(risk_scores)[len(risk_scores)//2], 3)
+            },
+            'risk_level_distribution': dict(self.risk_level_distribution)
+        }
+
+        # Calculate risk alert counts
+        high_risk_count = sum(1 for score in risk_scores if score > 0.75)
+        medium_risk_count = sum(1 for score in risk_scores if 0.5 <= score <= 0.75)
+
+        stats['alerts'] = {
+            'high_risk_workers': high_risk_count,
+            'medium_risk_workers': medium_risk_count,
+            'requires_immediate_attention': high_risk_count
+        }
+
+        return stats
+
 
 class PredictionService:
     """Main service for handling heat exposure predictions."""
@@ -34,7 +94,8 @@ class PredictionService:
     async def predict_single_worker(self,
                                    input_data: Dict[str, Any],
                                    use_conservative: bool = True,
-                                   log_compliance: bool = True) -> Dict[str, Any]:
+                                   log_compliance: bool = True,
+                                   fields: Optional[Collection[str]] = None) -> Dict[str, Any]:
         """
         Predict heat exposure risk for a single worker.
 
@@ -42,6 +103,7 @@ class PredictionService:
             input_data: Worker data including biometrics and environmental conditions
             use_conservative: Apply conservative bias for safety
             log_compliance: Whether to log prediction for OSHA compliance
+            fields: Result fields to compute (all fields when None)
 
         Returns:
             Heat exposure prediction result
@@ -57,25 +119,30 @@ class PredictionService:
             logger.info(f"Starting single worker prediction", request_id=request_id)
 
             # Input validation
-            validated_data, warnings = self.validator.validate_single_prediction(input_data)
+            with time_stage('validation'):
+                validated_data, warnings = self.validator.validate_single_prediction(input_data)
             if warnings:
                 logger.warning(f"Validation warnings: {warnings}", request_id=request_id)
 
             # Data preprocessing
-            processed_data = self.preprocessor.preprocess_single(validated_data)
+            with time_stage('preprocessing'):
+                processed_data = self.preprocessor.preprocess_single(validated_data)
 
             # Get model and make prediction
             model = model_loader.load_model()
-            prediction_result = model.predict_single(processed_data, use_conservative)
+            prediction_fields = self._prediction_fields(fields, log_compliance)
+            prediction_result = model.predict_single(processed_data, use_conservative, prediction_fields)
+            count_predictions((prediction_result,))
 
             # Add service metadata
             prediction_result.update({
                 'request_id': request_id,
                 'processing_time_ms': round((time.time() - start_time) * 1000, 2),
                 'validation_warnings': warnings,
-                'data_quality_score': self._calculate_data_quality_score(processed_data),
                 'service_version': '1.0.0'
             })
+            if prediction_fields is None or 'data_quality_score' in prediction_fields:
+                prediction_result['data_quality_score'] = self._calculate_data_quality_score(processed_data)
 
             # OSHA compliance logging
             if log_compliance:
@@ -104,7 +171,8 @@ class PredictionService:
                                      input_data: List[Dict[str, Any]],
                                      use_conservative: bool = True,
                                      log_compliance: bool = True,
-                                     parallel: bool = True) -> Dict[str, Any]:
+                                     parallel: bool = True,
+                                     fields: Optional[Collection[str]] = None) -> Dict[str, Any]:
         """
         Predict heat exposure risk for multiple workers.
 
@@ -113,6 +181,7 @@ class PredictionService:
             use_conservative: Apply conservative bias for safety
             log_compliance: Whether to log predictions for OSHA compliance
             parallel: Whether to process predictions in parallel
+            fields: Prediction fields to compute per worker (all fields when None)
 
         Returns:
             Batch prediction results
@@ -130,22 +199,26 @@ class PredictionService:
                        request_id=request_id)
 
             # Input validation
-            validated_data, warnings = self.validator.validate_batch_prediction(input_data)
+            with time_stage('validation'):
+                validated_data, warnings = self.validator.validate_batch_prediction(input_data)
             if warnings:
                 logger.warning(f"Batch validation warnings: {warnings}", request_id=request_id)
 
             # Data preprocessing
-            processed_data = self.preprocessor.preprocess_batch(validated_data)
+            with time_stage('preprocessing'):
+                processed_data = self.preprocessor.preprocess_batch(validated_data)
+            prediction_fields = self._prediction_fields(fields, log_compliance)
 
             # Make predictions
             if parallel and len(processed_data) > 1:
                 prediction_results = await self._predict_batch_parallel(
-                    processed_data, use_conservative, request_id
+                    processed_data, use_conservative, request_id, prediction_fields
                 )
             else:
                 prediction_results = await self._predict_batch_sequential(
-                    processed_data, use_conservative, request_id
+                    processed_data, use_conservative, request_id, prediction_fields
                 )
+            count_predictions(prediction_results)
 
             # Calculate batch statistics
             batch_stats = self._calculate_batch_statistics(prediction_results)
@@ -184,6 +257,117 @@ class PredictionService:
             logger.error(f"Batch prediction failed: {e}", request_id=request_id)
             raise RuntimeError(f"Batch prediction service error: {e}") from e
 
+    async def stream_multiple_workers(self,
+                                    input_data: List[Dict[str, Any]],
+                                    use_conservative: bool = True,
+                                    log_compliance: bool = True,
+                                    parallel: bool = True,
+                                    chunk_size: Optional[int] = None,
+                                    fields: Optional[Collection[str]] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Predict heat exposure risk for multiple workers, chunk by chunk.
+
+        Input validation runs up front so that invalid batches are rejected
+        before anything is streamed. The returned iterator yields one list of
+        prediction records per scored chunk, followed by a final list holding
+        a single batch statistics record.
+
+        Args:
+            input_data: List of worker data dictionaries
+            use_conservative: Apply conservative bias for safety
+            log_compliance: Whether to log predictions for OSHA compliance
+            parallel: Whether to process predictions in parallel
+            chunk_size: Workers scored per chunk (defaults to the size calibrated at warm-up,
+                or BATCH_STREAM_CHUNK_SIZE)
+            fields: Prediction fields to compute per worker (all fields when None)
+
+        Returns:
+            Async iterator over lists of records
+
+        Raises:
+            ValidationError: If input validation fails
+        """
+        request_id = f"batch_{int(time.time() * 1000)}"
+
+        with time_stage('validation'):
+            validated_data, warnings = self.validator.validate_batch_prediction(input_data)
+        if warnings:
+            logger.warning(f"Batch validation warnings: {warnings}", request_id=request_id)
+
+        return self._stream_batch_chunks(
+            validated_data, warnings, len(input_data), use_conservative, log_compliance,
+            parallel, chunk_size or warmup_service.stream_chunk_size, request_id,
+            self._prediction_fields(fields, log_compliance)
+        )
+
+    async def _stream_batch_chunks(self,
+                                   validated_data: List[Dict[str, Any]],
+                                   warnings: List[str],
+                                   total_workers: int,
+                                   use_conservative: bool,
+                                   log_compliance: bool,
+                                   parallel: bool,
+                                   chunk_size: int,
+                                   request_id: str,
+                                   prediction_fields: Optional[FrozenSet[str]] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Score validated data chunk by chunk, yielding each chunk's records."""
+        start_time = time.time()
+        batch_stats = BatchStatistics()
+
+        logger.info(f"Starting streamed batch prediction for {total_workers} workers",
+                   request_id=request_id, chunk_size=chunk_size)
+
+        for offset in range(0, len(validated_data), chunk_size):
+            with time_stage('preprocessing'):
+                processed_data = self.preprocessor.preprocess_batch(validated_data[offset:offset + chunk_size])
+
+            if parallel and len(processed_data) > 1:
+                chunk_results = await self._predict_batch_parallel(
+                    processed_data, use_conservative, request_id, prediction_fields
+                )
+            else:
+                chunk_results = await self._predict_batch_sequential(
+                    processed_data, use_conservative, request_id, prediction_fields
+                )
+
+            for result in chunk_results:
+                result['batch_index'] = offset + result.get('batch_index', 0)
+                result['record_type'] = 'prediction'
+
+            batch_stats.add(chunk_results)
+            count_predictions(chunk_results)
+
+            # Queue compliance logging before the chunk is handed to the client:
+            # a disconnect closes the generator at the yield, and predictions the
+            # client may have received must still reach the OSHA log
+            if log_compliance:
+                await self._log_batch_compliance_async(chunk_results)
+
+            yield chunk_results
+
+        processing_time_ms = round((time.time() - start_time) * 1000, 2)
+        successful = len(batch_stats.risk_scores)  # Error rows are counted in total_predictions too
+
+        yield [{
+            'record_type': 'batch_statistics',
+            'request_id': request_id,
+            'batch_size': total_workers,
+            'successful_predictions': successful,
+            'failed_predictions': total_workers - successful,
+            'processing_time_ms': processing_time_ms,
+            'validation_warnings': warnings,
+            'batch_statistics': batch_stats.to_dict(),
+            'service_version': '1.0.0'
+        }]
+
+        logger.info(
+            f"Streamed batch prediction completed",
+            request_id=request_id,
+            total_workers=total_workers,
+            successful=successful,
+            processing_time=processing_time_ms
+        )
+
     async def predict_dataframe(self,
                                df: pd.DataFrame,
                                use_conservative: bool = True,
@@ -207,16 +391,19 @@ class PredictionService:
                        request_id=request_id)
 
             # Input validation
-            validated_df, warnings = self.validator.validate_dataframe(df)
+            with time_stage('validation'):
+                validated_df, warnings = self.validator.validate_dataframe(df)
             if warnings:
                 logger.warning(f"DataFrame validation warnings: {warnings}", request_id=request_id)
 
             # Data preprocessing
-            processed_df = self.preprocessor.preprocess_dataframe(validated_df)
+            with time_stage('preprocessing'):
+                processed_df = self.preprocessor.preprocess_dataframe(validated_df)
 
             # Get model and make batch prediction
             model = model_loader.load_model()
             prediction_results = model.predict_batch(processed_df, use_conservative)
+            count_predictions(prediction_results)
 
             # Calculate batch statistics
             batch_stats = self._calculate_batch_statistics(prediction_results)
@@ -254,7 +441,8 @@ class PredictionService:
     async def _predict_batch_parallel(self,
                                      processed_data: List[Dict[str, Any]],
                                      use_conservative: bool,
-                                     request_id: str) -> List[Dict[str, Any]]:
+                                     request_id: str,
+                                     fields: Optional[FrozenSet[str]] = None) -> List[Dict[str, Any]]:
         """Process batch predictions in parallel."""
         logger.info(f"Processing {len(processed_data)} predictions in parallel",
                    request_id=request_id)
@@ -264,9 +452,13 @@ class PredictionService:
 
         # Create futures for parallel processing
         futures = []
+        PARALLEL_SCORING_IN_FLIGHT.inc(len(processed_data))
         with ThreadPoolExecutor(max_workers=min(settings.MAX_CONCURRENT_PREDICTIONS, len(processed_data))) as executor:
             for i, data in enumerate(processed_data):
-                future = executor.submit(self._predict_single_safe, model, data, use_conservative, i)
+                # Scoring threads record their stages into the request's trace
+                future = submit(executor, self._predict_queued, time.perf_counter(), model, data,
+                                use_conservative, i, fields)
+                future.add_done_callback(lambda _: PARALLEL_SCORING_IN_FLIGHT.dec())
                 futures.append(future)
 
             # Collect results as they complete
@@ -284,7 +476,8 @@ class PredictionService:
     async def _predict_batch_sequential(self,
                                       processed_data: List[Dict[str, Any]],
                                       use_conservative: bool,
-                                      request_id: str) -> List[Dict[str, Any]]:
+                                      request_id: str,
+                                      fields: Optional[FrozenSet[str]] = None) -> List[Dict[str, Any]]:
         """Process batch predictions sequentially."""
         logger.info(f"Processing {len(processed_data)} predictions sequentially",
                    request_id=request_id)
@@ -294,7 +487,7 @@ class PredictionService:
 
         for i, data in enumerate(processed_data):
             try:
-                result = self._predict_single_safe(model, data, use_conservative, i)
+                result = self._predict_single_safe(model, data, use_conservative, i, fields)
                 if result:
                     results.append(result)
             except Exception as e:
@@ -302,14 +495,20 @@ class PredictionService:
 
         return results
 
+    def _predict_queued(self, submitted: float, *args) -> Optional[Dict[str, Any]]:
+        """_predict_single_safe on a scoring thread, recording how long the row waited for it."""
+        observe_stage('queue_wait', time.perf_counter() - submitted)
+        return self._predict_single_safe(*args)
+
     def _predict_single_safe(self,
                            model,
                            data: Dict[str, Any],
                            use_conservative: bool,
-                           index: int) -> Optional[Dict[str, Any]]:
+                           index: int,
+                           fields: Optional[FrozenSet[str]] = None) -> Optional[Dict[str, Any]]:
         """Safely predict single sample with error handling."""
         try:
-            result = model.predict_single(data, use_conservative)
+            result = model.predict_single(data, use_conservative, fields)
             result['batch_index'] = index
             return result
         except Exception as e:
@@ -322,6 +521,25 @@ class PredictionService:
                 'prediction_successful': False
             }
 
+    def _prediction_fields(self,
+                           fields: Optional[Collection[str]],
+                           log_compliance: bool) -> Optional[FrozenSet[str]]:
+        """
+        Fields the predictor has to compute for a request.
+
+        Compliance log entries need the full environmental and recommendation
+        picture, so their fields are added whenever the request is logged.
+        The risk level is always computed, for the predictions counter;
+        responses are projected to the requested fields.
+        """
+        if fields is None:
+            return None
+
+        prediction_fields = frozenset(fields) | {'risk_level'}
+        if log_compliance and self.compliance_service.enable_logging:
+            prediction_fields |= COMPLIANCE_PREDICTION_FIELDS
+        return prediction_fields
+
     def _calculate_data_quality_score(self, data: Dict[str, Any]) -> float:
         """Calculate data quality score based on feature completeness and validity."""
         total_features = len(self.validator.all_features)
@@ -343,64 +561,25 @@ class PredictionService:
         if not results:
             return {'error': 'No successful predictions'}
 
-        # Filter successful predictions
-        successful_results = [r for r in results if 'error' not in r]
-
-        if not successful_results:
-            return {'error': 'No successful predictions'}
-
-        # Extract risk scores and levels
-        risk_scores = [r.get('heat_exposure_risk_score', 0) for r in successful_results]
-        risk_levels = [r.get('risk_level', 'Unknown') for r in successful_results]
-
-        # Calculate statistics
-        stats = {
-            'total_predictions': len(results),
-            'successful_predictions': len(successful_results),
-            'failed_predictions': len(results) - len(successful_results),
-            'risk_score_statistics': {
-                'mean': round(sum(risk_scores) / len(risk_scores), 3),
-                'min': round(min(risk_scores), 3),
-                'max': round(max(risk_scores), 3),
-                'median': round(sorted(risk_scores)[len(risk_scores)//2], 3)
-            },
-            'risk_level_distribution': {
-                'Safe': sum(1 for level in risk_levels if level == 'Safe'),
-                'Caution': sum(1 for level in risk_levels if level == 'Caution'),
-                'Warning': sum(1 for level in risk_levels if level == 'Warning'),
-                'Danger': sum(1 for level in risk_levels if level == 'Danger')
-            }
-        }
-
-        # Calculate risk alert counts
-        high_risk_count = sum(1 for score in risk_scores if score > 0.75)
-        medium_risk_count = sum(1 for score in risk_scores if 0.5 <= score <= 0.75)
-
-        stats['alerts'] = {
-            'high_risk_workers': high_risk_count,
-            'medium_risk_workers': medium_risk_count,
-            'requires_immediate_attention': high_risk_count
-        }
-
-        return stats
+        stats = BatchStatistics()
+        stats.add(results)
+        return stats.to_dict()
 
     async def _log_compliance_async(self, prediction_result: Dict[str, Any]) -> None:
-        """Log single prediction for compliance asynchronously."""
+        """Queue a single prediction for compliance logging."""
         try:
-            await asyncio.get_event_loop().run_in_executor(
-                self.executor,
-                self.compliance_service.log_prediction,
-                prediction_result
-            )
+            # Building the entry is cheap; serialization and disk I/O happen on
+            # the compliance writer thread
+            self.compliance_service.log_prediction(prediction_result)
         except Exception as e:
             logger.error(f"Compliance logging failed: {e}")
 
     async def _log_batch_compliance_async(self, prediction_results: List[Dict[str, Any]]) -> None:
-        """Log batch predictions for compliance asynchronously."""
+        """Hand batch predictions to compliance logging without waiting for it."""
         try:
-            await asyncio.get_event_loop().run_in_executor(
+            asyncio.get_event_loop().run_in_executor(
                 self.executor,
-                self.compliance_service.log_batch_predictions,
+                propagate(self.compliance_service.log_batch_predictions),
                 prediction_results
             )
         except Exception as e:
@@ -0,0 +1,190 @@
+"""
+Warm-up Service
+===============
+
+Runs synthetic predictions through the full request path at startup, so the
+first real requests do not pay one-time costs (lazy booster initialization,
+allocator growth, first-call pandas and scikit-learn paths), and measures
+the latency profile that seeds batch ETAs and the streaming chunk size.
+"""
+
+import asyncio
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from ..config.settings import settings
+from ..models.data_generator import DataGenerator
+from ..utils.logger import get_logger
+from ..utils.metrics import pause_business_metrics
+
+logger = get_logger(__name__)
+
+# Stream chunk size bounds when calibrated from the measured row cost
+MIN_STREAM_CHUNK_SIZE = 10
+WARMUP_SEED = 20240601
+
+
+class WarmupService:
+    """
+    Startup warm-up and latency self-calibration.
+
+    States: ``idle`` (not started), ``running``, ``completed``, ``failed``
+    or ``disabled``. Readiness is withheld only while ``running``.
+    """
+
+    def __init__(self):
+        self.state = "idle"
+        self.started_at: Optional[str] = None
+        self.completed_at: Optional[str] = None
+        self.duration_ms = 0.0
+        self.error: Optional[str] = None
+        self.profile: Dict[int, Dict[str, float]] = {}
+        self.per_row_seconds: Optional[float] = None
+        self.overhead_seconds = 0.0
+        self.stream_chunk_size = settings.BATCH_STREAM_CHUNK_SIZE
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.state == "running"
+
+    def start(self, prediction_service) -> bool:
+        """
+        Start warm-up on a background thread.
+
+        The state is ``running`` when this returns, so readiness is withheld
+        from the first request on.
+
+        Args:
+            prediction_service: PredictionService whose request path is warmed
+
+        Returns:
+            True if started, False if warm-up is disabled
+        """
+        if not settings.WARMUP_ENABLED:
+            self.state = "disabled"
+            return False
+        if self.is_running:
+            return True
+
+        self.state = "running"
+        self.started_at = datetime.now().isoformat()
+        self._thread = threading.Thread(target=self._run, args=(prediction_service,),
+                                        name="model-warmup", daemon=True)
+        self._thread.start()
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait for warm-up to finish; True unless it is still running."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return not self.is_running
+
+    def _run(self, prediction_service) -> None:
+        try:
+            # The prediction service is async; warm-up gets its own event loop
+            # so the server's loop keeps answering health checks meanwhile
+            asyncio.run(self.run(prediction_service))
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logger.error(f"Model warm-up failed, serving without calibration: {e}")
+
+    async def run(self, prediction_service) -> Dict[int, Dict[str, float]]:
+        """
+        Score synthetic batches of each WARMUP_BATCH_SIZES size and calibrate.
+
+        Rows are validated, preprocessed, scored and post-processed exactly
+        as for requests, with compliance logging off and without counting
+        them as business predictions. Batches larger than BATCH_SIZE_LIMIT
+        are scored as consecutive request-sized batches.
+
+        Args:
+            prediction_service: PredictionService whose request path is warmed
+
+        Returns:
+            Latency profile by batch size
+        """
+        start = time.perf_counter()
+        generator = DataGenerator(seed=WARMUP_SEED)
+        profile: Dict[int, Dict[str, float]] = {}
+
+        with pause_business_metrics():
+            for batch_size in settings.WARMUP_BATCH_SIZES:
+                rows = generator.generate_batch_samples(batch_size)
+                batch_start = time.perf_counter()
+                if batch_size == 1:
+                    await prediction_service.predict_single_worker(rows[0], log_compliance=False)
+                else:
+                    for offset in range(0, batch_size, settings.BATCH_SIZE_LIMIT):
+                        await prediction_service.predict_multiple_workers(
+                            rows[offset:offset + settings.BATCH_SIZE_LIMIT], log_compliance=False
+                        )
+                elapsed = time.perf_counter() - batch_start
+                profile[batch_size] = {
+                    'total_ms': round(elapsed * 1000, 2),
+                    'per_row_ms': round(elapsed * 1000 / batch_size, 3)
+                }
+
+        self.calibrate(profile)
+        self.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.completed_at = datetime.now().isoformat()
+        self.state = "completed"
+        logger.info("Model warm-up completed", duration_ms=self.duration_ms,
+                    per_row_ms=round(self.per_row_seconds * 1000, 3),
+                    stream_chunk_size=self.stream_chunk_size)
+        return profile
+
+    def calibrate(self, profile: Dict[int, Dict[str, float]]) -> None:
+        """
+        Derive the row cost, fixed overhead and stream chunk size from a latency profile.
+
+        The row cost is taken from the largest batch, where fixed costs are
+        amortized; the overhead is what a single-row request costs beyond it.
+
+        Args:
+            profile: Latency by batch size, as measured by run()
+        """
+        self.profile = profile
+        largest = max(profile)
+        self.per_row_seconds = profile[largest]['total_ms'] / 1000 / largest
+        if 1 in profile:
+            self.overhead_seconds = max(0.0, profile[1]['total_ms'] / 1000 - self.per_row_seconds)
+
+        if settings.BATCH_STREAM_CHUNK_TARGET_MS > 0 and self.per_row_seconds > 0:
+            rows = settings.BATCH_STREAM_CHUNK_TARGET_MS / 1000 / self.per_row_seconds
+            self.stream_chunk_size = max(MIN_STREAM_CHUNK_SIZE, min(settings.BATCH_SIZE_LIMIT, int(rows)))
+
+    def estimate_seconds(self, rows: int) -> Optional[float]:
+        """
+        Estimate how long scoring a batch takes, from the measured row cost.
+
+        Args:
+            rows: Batch size
+
+        Returns:
+            Seconds, or None before calibration
+        """
+        if self.per_row_seconds is None:
+            return None
+        return self.overhead_seconds + rows * self.per_row_seconds
+
+    def get_status(self) -> Dict[str, Any]:
+        """Warm-up state, latency profile and the parameters it seeded."""
+        return {
+            'state': self.state,
+            'started_at': self.started_at,
+            'completed_at': self.completed_at,
+            'duration_ms': self.duration_ms,
+            'error': self.error,
+            'latency_profile': {str(size): stats for size, stats in self.profile.items()},
+            'per_row_ms': round(self.per_row_seconds * 1000, 3) if self.per_row_seconds is not None else None,
+            'overhead_ms': round(self.overhead_seconds * 1000, 3),
+            'stream_chunk_size': self.stream_chunk_size
+        }
+
+
+# Global warm-up service
+warmup_service = WarmupService()
@@ -0,0 +1,458 @@
+"""
+Compliance Archive
+==================
+
+Columnar (Parquet) archive of closed compliance segments.
+
+Heat exposure assessments, which make up nearly all compliance entries, are
+stored one field per column, with risk levels, flags, model metadata and
+recommendation codes dictionary-encoded. Any other entry (alerts, batch
+summaries, entries from older layouts) is kept verbatim in a JSON column, so
+the archive holds exactly the rows of the segment it replaces.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..config.settings import settings
+from .logger import get_logger
+from .serialization import loads
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # Compaction is optional; segments then stay line-oriented
+    pa = None
+    pc = None
+    pq = None
+
+logger = get_logger(__name__)
+
+ARCHIVE_SUFFIX = '.parquet'
+
+ASSESSMENT_EVENT = 'HEAT_EXPOSURE_ASSESSMENT'
+
+# Assessment fields stored as columns: (dotted entry path, column kind)
+ASSESSMENT_COLUMNS = (
+    ('worker_identification.worker_id', 'string'),
+    ('worker_identification.site_id', 'category'),
+    ('worker_identification.batch_index', 'int'),
+    ('environmental_conditions.temperature_celsius', 'float'),
+    ('environmental_conditions.temperature_fahrenheit', 'float'),
+    ('environmental_conditions.humidity_percent', 'float'),
+    ('environmental_conditions.heat_index_fahrenheit', 'float'),
+    ('risk_assessment.heat_exposure_risk_score', 'float'),
+    ('risk_assessment.risk_level', 'category'),
+    ('risk_assessment.requires_immediate_attention', 'bool'),
+    ('risk_assessment.confidence', 'float'),
+    ('physiological_indicators.heart_rate_avg', 'float'),
+    ('physiological_indicators.hrv_rmssd', 'float'),
+    ('safety_recommendations.recommendation_key', 'int'),
+    ('safety_recommendations.recommendation_codes', 'codes'),
+    ('safety_recommendations.recommendation_count', 'int'),
+    ('compliance_flags.exceeds_heat_index_threshold', 'category'),
+    ('compliance_flags.requires_work_rest_cycle', 'bool'),
+    ('compliance_flags.medical_attention_recommended', 'bool'),
+    ('system_metadata.model_version', 'category'),
+    ('system_metadata.prediction_method', 'category'),
+    ('system_metadata.conservative_bias_applied', 'bool'),
+    ('system_metadata.request_id', 'string'),
+)
+
+# Columns present for every row
+ROW_COLUMNS = (
+    ('timestamp', 'timestamp'),
+    ('level', 'category'),
+    ('compliance_event', 'category'),
+    ('worker_id', 'category'),
+    ('timestamp_utc', 'string'),  # Only when it differs from the timestamp column
+    ('entry_json', 'string'),  # Entries not stored as assessment columns
+)
+
+_ASSESSMENT_PATHS = tuple(tuple(path.split('.')) for path, _ in ASSESSMENT_COLUMNS)
+_ASSESSMENT_GROUPS: Dict[str, frozenset] = {}
+for _group, _field in _ASSESSMENT_PATHS:
+    _ASSESSMENT_GROUPS[_group] = _ASSESSMENT_GROUPS.get(_group, frozenset()) | {_field}
+_ASSESSMENT_KEYS = frozenset(_ASSESSMENT_GROUPS) | {'compliance_event', 'timestamp_utc'}
+
+
+def _valid(kind: str, value: Any) -> bool:
+    """Whether a value fits a column kind without changing its JSON form."""
+    if value is None:
+        return True
+    if kind in ('string', 'category'):
+        return isinstance(value, str)
+    if kind == 'float':
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if kind == 'int':
+        return isinstance(value, int) and not isinstance(value, bool)
+    if kind == 'bool':
+        return isinstance(value, bool)
+    if kind == 'codes':
+        return isinstance(value, list) and all(isinstance(code, str) for code in value)
+    return False
+
+
+def _is_columnar_assessment(entry: Any) -> bool:
+    """Whether an entry has exactly the assessment layout the columns can hold."""
+    if not isinstance(entry, dict) or entry.get('compliance_event') != ASSESSMENT_EVENT:
+        return False
+    if entry.keys() != _ASSESSMENT_KEYS or not isinstance(entry['timestamp_utc'], str):
+        return False
+    for group, fields in _ASSESSMENT_GROUPS.items():
+        values = entry[group]
+        if not isinstance(values, dict) or values.keys() != fields:
+            return False
+    return all(
+        _valid(kind, entry[group][field])
+        for (group, field), (_, kind) in zip(_ASSESSMENT_PATHS, ASSESSMENT_COLUMNS)
+    )
+
+
+def _arrow_type(kind: str):
+    return {
+        'timestamp': pa.timestamp('us'),
+        'string': pa.string(),
+        'category': pa.dictionary(pa.int32(), pa.string()),
+        'float': pa.float64(),
+        'int': pa.int64(),
+        'bool': pa.bool_(),
+        'codes': pa.list_(pa.dictionary(pa.int32(), pa.string())),
+    }[kind]
+
+
+def archive_schema():
+    """Arrow schema of compliance archive files."""
+    return pa.schema([(name, _arrow_type(kind)) for name, kind in ROW_COLUMNS + ASSESSMENT_COLUMNS])
+
+
+def lines_to_table(lines: Iterator[bytes]):
+    """
+    Convert segment lines into an archive table sorted by entry timestamp.
+
+    Args:
+        lines: Complete 'timestamp | level | message' segment lines
+
+    Returns:
+        pyarrow Table with the archive schema
+    """
+    columns: Dict[str, List[Any]] = {name: [] for name, _ in ROW_COLUMNS + ASSESSMENT_COLUMNS}
+    assessment_columns = [columns[path] for path, _ in ASSESSMENT_COLUMNS]
+
+    for line in lines:
+        parts = line.rstrip(b'\n').split(b' | ', 2)
+        if len(parts) < 3:
+            continue
+        timestamp = datetime.fromisoformat(parts[0].decode())
+        message = parts[2]
+        try:
+            entry = loads(message) if message.startswith(b'{') else None
+        except ValueError:
+            entry = None
+        if not isinstance(entry, dict):
+            entry = None
+
+        columns['timestamp'].append(timestamp)
+        columns['level'].append(parts[1].decode())
+        columns['compliance_event'].append(entry.get('compliance_event') if entry else None)
+        worker_id = None
+        if entry:
+            worker_id = (entry.get('worker_identification') or {}).get('worker_id') or entry.get('worker_id')
+        columns['worker_id'].append(str(worker_id) if worker_id is not None else None)
+
+        if entry is not None and _is_columnar_assessment(entry):
+            timestamp_utc = entry['timestamp_utc']
+            columns['timestamp_utc'].append(None if timestamp_utc == timestamp.isoformat() else timestamp_utc)
+            columns['entry_json'].append(None)
+            for values, (group, field) in zip(assessment_columns, _ASSESSMENT_PATHS):
+                values.append(entry[group][field])
+        else:
+            columns['timestamp_utc'].append(None)
+            columns['entry_json'].append(message.decode('utf-8', errors='replace'))
+            for values in assessment_columns:
+                values.append(None)
+
+    table = pa.table(columns, schema=archive_schema())
+    if table.num_rows:
+        table = table.take(pc.sort_indices(table, sort_keys=[('timestamp', 'ascending')]))
+    return table
+
+
+def write_archive(table, path: Path) -> None:
+    """Write an archive table as compressed Parquet, atomically."""
+    temp_path = path.with_name(path.name + '.tmp')
+    pq.write_table(
+        table, temp_path,
+        compression=settings.COMPLIANCE_PARQUET_COMPRESSION,
+        row_group_size=settings.COMPLIANCE_PARQUET_ROW_GROUP_SIZE,
+        use_dictionary=[name for name, kind in ROW_COLUMNS + ASSESSMENT_COLUMNS if kind in ('category', 'codes')]
+    )
+    temp_path.replace(path)
+
+
+def read_archive(path: Path,
+                 start: datetime,
+                 end: datetime,
+                 worker_ids: Optional[Sequence[str]] = None,
+                 columns: Optional[Sequence[str]] = None) -> List[Tuple[datetime, Dict[str, Any]]]:
+    """
+    Read entries from an archive file.
+
+    Row groups and rows outside the time range or worker filter are skipped
+    using the Parquet statistics, and only the columns needed for the
+    requested entry fields are read.
+
+    Args:
+        path: Archive file path
+        start: Range start (naive local time)
+        end: Range end (naive local time)
+        worker_ids: Only read assessments for these workers
+        columns: Dotted entry paths to return (whole entries when None)
+
+    Returns:
+        (timestamp, entry) pairs in timestamp order
+    """
+    if columns is None:
+        assessment_columns = list(ASSESSMENT_COLUMNS)
+    else:
+        assessment_columns = [
+            (path_name, kind) for path_name, kind in ASSESSMENT_COLUMNS
+            if any(path_name == wanted or path_name.startswith(wanted + '.') for wanted in columns)
+        ]
+    read_columns = ['timestamp', 'compliance_event', 'timestamp_utc', 'entry_json'] + [
+        name for name, _ in assessment_columns
+    ]
+
+    filters = [('timestamp', '>=', start), ('timestamp', '<=', end)]
+    if worker_ids:
+        filters.append(('worker_id', 'in', list(worker_ids)))
+
+    table = pq.read_table(path, columns=read_columns, filters=filters)
+    timestamps = _pylist(table, 'timestamp')
+    events = _pylist(table, 'compliance_event')
+    timestamps_utc = _pylist(table, 'timestamp_utc')
+    entries_json = _pylist(table, 'entry_json')
+    # Build each field group's dicts column-wise, then assemble entries
+    groups: Dict[str, Tuple[List[str], List[List[Any]]]] = {}
+    for name, _ in assessment_columns:
+        group, field = name.split('.')
+        fields, group_values = groups.setdefault(group, ([], []))
+        fields.append(field)
+        group_values.append(_pylist(table, name))
+    group_rows = [
+        (group, [dict(zip(fields, row)) for row in zip(*group_values)])
+        for group, (fields, group_values) in groups.items()
+    ]
+    include_timestamp = columns is None or 'timestamp_utc' in columns
+
+    rows = []
+    for i, timestamp in enumerate(timestamps):
+        raw = entries_json[i]
+        if raw is not None:
+            if not raw.startswith('{'):
+                continue
+            try:
+                entry = loads(raw)
+            except ValueError:
+                continue
+            worker_id = (entry.get('worker_identification') or {}).get('worker_id') or entry.get('worker_id')
+            if worker_ids and worker_id not in worker_ids:
+                continue
+            rows.append((timestamp, project_entry(entry, columns) if columns is not None else entry))
+            continue
+
+        entry = {'compliance_event': events[i]}
+        if include_timestamp:
+            entry['timestamp_utc'] = timestamps_utc[i] or timestamp.isoformat()
+        for group, dicts in group_rows:
+            entry[group] = dicts[i]
+        rows.append((timestamp, entry))
+    return rows
+
+
+def _pylist(table, name: str) -> List[Any]:
+    """Column values as Python objects, decoding dictionary columns in Arrow first."""
+    column = table.column(name)
+    if pa.types.is_dictionary(column.type):
+        column = column.cast(column.type.value_type)
+    elif pa.types.is_list(column.type) and pa.types.is_dictionary(column.type.value_type):
+        column = column.cast(pa.list_(column.type.value_type.value_type))
+    return column.to_pylist()
+
+
+def project_entry(entry: Dict[str, Any], columns: Sequence[str]) -> Dict[str, Any]:
+    """Copy only the given dotted paths (plus compliance_event) out of an entry."""
+    projected: Dict[str, Any] = {'compliance_event': entry.get('compliance_event')}
+    for column in columns:
+        source: Any = entry
+        target = projected
+        parts = column.split('.')
+        for part in parts[:-1]:
+            source = source.get(part) if isinstance(source, dict) else None
+            if not isinstance(source, dict):
+                break
+            target = target.setdefault(part, {})
+        else:
+            if isinstance(source, dict) and parts[-1] in source:
+                target[parts[-1]] = source[parts[-1]]
+    return projected
+
+
+class ComplianceCompactor:
+    """
+    Background job that converts closed compliance segments to Parquet.
+
+    A segment is closed once its period ended more than
+    COMPLIANCE_COMPACTION_GRACE seconds ago and the writer holds no state for
+    it. Late entries for a compacted period start a new line segment, which
+    is merged into the archive on a later pass.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        # Metrics
+        self.runs = 0
+        self.segments_compacted = 0
+        self.rows_compacted = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+        self.failures = 0
+        self.last_run_at: Optional[str] = None
+        self.last_run_ms = 0.0
+
+    def start(self) -> bool:
+        """
+        Start the compaction thread.
+
+        Returns:
+            True if started, False if compaction is disabled or pyarrow is missing
+        """
+        if not settings.COMPLIANCE_COMPACTION_ENABLED:
+            return False
+        if pq is None:
+            logger.warning("pyarrow is not installed; compliance segments will not be compacted")
+            return False
+        if self._thread is not None and self._thread.is_alive():
+            return True
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="compliance-compactor", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the compaction thread after the segment in progress."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(settings.COMPLIANCE_COMPACTION_INTERVAL):
+            self.run_once()
+
+    def closed_segments(self, now: Optional[datetime] = None) -> List[str]:
+        """Keys of line segments that are due for compaction."""
+        cutoff = (now or datetime.now()) - timedelta(seconds=settings.COMPLIANCE_COMPACTION_GRACE)
+        return [
+            key for key in self.store.segment_keys()
+            if self.store.segment_path(key).exists()
+            and self.store.segment_start(key) + self.store.segment_length <= cutoff
+        ]
+
+    def run_once(self, now: Optional[datetime] = None) -> int:
+        """
+        Compact every closed segment.
+
+        Args:
+            now: Current time (defaults to datetime.now())
+
+        Returns:
+            Number of segments compacted
+        """
+        if pq is None:
+            return 0
+
+        start = time.perf_counter()
+        compacted = 0
+        for key in self.closed_segments(now):
+            if self._stop.is_set():
+                break
+            try:
+                if self.compact(key):
+                    compacted += 1
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Failed to compact compliance segment {key}: {e}")
+
+        self.runs += 1
+        self.last_run_at = datetime.now().isoformat()
+        self.last_run_ms = (time.perf_counter() - start) * 1000
+        if compacted:
+            logger.info("Compliance segments compacted", segments=compacted,
+                        duration_ms=round(self.last_run_ms, 1))
+        return compacted
+
+    def compact(self, key: str) -> bool:
+        """
+        Convert one segment to Parquet, merging with an existing archive.
+
+        Returns:
+            True if the segment was replaced by its archive
+        """
+        # Other processes' compactors and the segment merger rewrite the same segments
+        with self.store.maintenance_lock():
+            return self._compact(key)
+
+    def _compact(self, key: str) -> bool:
+        segment_path = self.store.segment_path(key)
+        archive_path = self.store.archive_path(key)
+
+        try:
+            with open(segment_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return False  # Compacted by another process since it was listed
+        complete = data[:data.rfind(b'\n') + 1]
+        table = lines_to_table(complete.splitlines())
+
+        previous_bytes = archive_path.stat().st_size if archive_path.exists() else 0
+        if previous_bytes:
+            table = pa.concat_tables([pq.read_table(archive_path, schema=archive_schema()), table])
+            table = table.take(pc.sort_indices(table, sort_keys=[('timestamp', 'ascending')]))
+
+        staged_path = archive_path.with_name(archive_path.name + '.staged')
+        write_archive(table, staged_path)
+
+        if not self.store.replace_with_archive(key, len(data), staged_path):
+            staged_path.unlink(missing_ok=True)
+            return False
+
+        self.segments_compacted += 1
+        self.rows_compacted += len(complete.splitlines())
+        self.bytes_before += len(data)
+        self.bytes_after += archive_path.stat().st_size - previous_bytes
+        return True
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get compaction metrics."""
+        return {
+            'enabled': settings.COMPLIANCE_COMPACTION_ENABLED and pq is not None,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'runs': self.runs,
+            'segments_compacted': self.segments_compacted,
+            'rows_compacted': self.rows_compacted,
+            'bytes_before': self.bytes_before,
+            'bytes_after': self.bytes_after,
+            'compression_ratio': round(self.bytes_before / self.bytes_after, 1) if self.bytes_after else None,
+            'failures': self.failures,
+            'last_run_at': self.last_run_at,
+            'last_run_ms': round(self.last_run_ms, 1)
+        }
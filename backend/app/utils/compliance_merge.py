@@ -0,0 +1,501 @@
+"""
+Compliance Segment Merging
+==========================
+
+Compliance segments shared by several worker processes.
+
+Under a multi-worker uvicorn or gunicorn deployment every process appends to
+its own segment store in processes/<host>-<pid>/ under the compliance segment
+directory, so no two processes write the same segment, index or rollup file
+and appends need no cross-process lock. Within a process segment, entries are
+in commit order, which is their sequence number.
+
+A background merger moves closed process segments into the consolidated
+segments at the top of the directory: lines sorted by timestamp (ties keep
+process and sequence order), with a rebuilt index and merged workers and
+rollups. Readers combine the consolidated segments with every process's
+unmerged ones.
+
+Processes coordinate through advisory file locks:
+
+- each process holds its directory's owner lock while it lives, so a
+  directory whose owner lock can be taken belongs to an exited process and is
+  merged in full;
+- the merger and the compactor hold the maintenance lock while rewriting
+  consolidated segments, so one runs at a time across processes;
+- readers hold the swap lock shared while reading a segment's files (not
+  while consuming its entries), and the merger and compactor hold it
+  exclusively while swapping files, so a reader never sees an entry twice
+  or misses one mid-merge.
+
+Without fcntl (Windows) the locks are no-ops and one process is assumed.
+"""
+
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from ..config.settings import settings
+from .compliance_rollups import SegmentRollup
+from .compliance_store import (
+    TIMESTAMP_WIDTH, ComplianceSegmentStore, SegmentRecord, line_timestamp, normalize_timestamp
+)
+from .logger import get_logger
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = get_logger(__name__)
+
+PROCESS_DIR = 'processes'
+OWNER_LOCK = '.owner.lock'
+MAINTENANCE_LOCK = '.maintenance.lock'
+SWAP_LOCK = '.swap.lock'
+
+# Seconds the per-process key listing used to route reads is reused
+SOURCE_CACHE_SECONDS = 1.0
+
+
+@contextmanager
+def file_lock(path: str, exclusive: bool = True) -> Iterator[None]:
+    """
+    Hold an advisory lock on a file, creating it if needed.
+
+    Each acquisition opens its own descriptor, so threads of one process
+    exclude each other as separate processes do.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    fd = _open_lock_file(path)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+    finally:
+        os.close(fd)  # Releases the lock
+
+
+def _open_lock_file(path: str) -> int:
+    try:
+        return os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+
+def _try_lock(path: str) -> Optional[int]:
+    """Take an exclusive lock without waiting; returns the descriptor holding it, or None."""
+    if fcntl is None:
+        return -1
+    fd = _open_lock_file(path)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _unlock(fd: int) -> None:
+    if fd >= 0:
+        os.close(fd)
+
+
+class SharedComplianceStore:
+    """
+    Compliance segment store safe to use from several processes at once.
+
+    Appends go to this process's own segment store; reads cover the
+    consolidated segments plus every process's unmerged segments. Exposes the
+    read side of ComplianceSegmentStore, which is what compliance reports use.
+    """
+
+    def __init__(self,
+                 root: Optional[str] = None,
+                 partition: Optional[str] = None,
+                 index_interval: Optional[int] = None):
+        self.consolidated = ComplianceSegmentStore(root, partition, index_interval)
+        self.root = self.consolidated.root
+        self.partition = self.consolidated.partition
+        self.segment_length = self.consolidated.segment_length
+        self.index_interval = self.consolidated.index_interval
+        self.process_root = self.root / PROCESS_DIR
+        self._maintenance_lock_path = str(self.root / MAINTENANCE_LOCK)
+        self._swap_lock_path = str(self.root / SWAP_LOCK)
+
+        self.consolidated.maintenance_lock = self.maintenance_lock
+        self.consolidated.swap_lock = self.swap_lock
+
+        self._local: Optional[ComplianceSegmentStore] = None
+        self._local_name: Optional[str] = None
+        self._local_pid: Optional[int] = None
+        self._owner_fd: Optional[int] = None
+        self._local_lock = threading.Lock()
+
+        self._process_stores: Dict[str, ComplianceSegmentStore] = {}
+        self._sources_cache: Optional[Tuple[float, List[ComplianceSegmentStore]]] = None
+
+    # Locks
+
+    def maintenance_lock(self):
+        """Exclusive lock held by jobs that rewrite consolidated segments."""
+        return file_lock(self._maintenance_lock_path)
+
+    def swap_lock(self):
+        """Exclusive lock held while segment files are swapped."""
+        return file_lock(self._swap_lock_path)
+
+    def read_lock(self):
+        """Shared lock held while a segment is read."""
+        return file_lock(self._swap_lock_path, exclusive=False)
+
+    # Write side
+
+    @property
+    def local(self) -> ComplianceSegmentStore:
+        """This process's own segment store, claimed on first use (again after a fork)."""
+        pid = os.getpid()
+        if self._local is not None and self._local_pid == pid:
+            return self._local
+
+        with self._local_lock:
+            if self._local is None or self._local_pid != pid:
+                name = f"{socket.gethostname()}-{pid}"
+                directory = self.process_root / name
+                directory.mkdir(parents=True, exist_ok=True)
+                owner_fd = _try_lock(str(directory / OWNER_LOCK))
+                if owner_fd is None:
+                    # Another live process already has this name, e.g. the same
+                    # PID in another container sharing the volume
+                    name = f"{name}-{uuid.uuid4().hex[:8]}"
+                    directory = self.process_root / name
+                    directory.mkdir(parents=True, exist_ok=True)
+                    owner_fd = _try_lock(str(directory / OWNER_LOCK))
+
+                # Drop the descriptor inherited across a fork (the parent keeps its lock)
+                if self._owner_fd is not None:
+                    _unlock(self._owner_fd)
+                self._owner_fd = owner_fd
+                self._local = ComplianceSegmentStore(str(directory), self.partition, self.index_interval)
+                self._local_name = name
+                self._local_pid = pid
+                self._sources_cache = None
+                logger.info("Compliance process segment store claimed", directory=str(directory))
+        return self._local
+
+    def owns(self, store: ComplianceSegmentStore) -> bool:
+        """Whether a store is this process's own."""
+        return store is self._local and self._local_pid == os.getpid()
+
+    def append(self, records: List[SegmentRecord], fsync: bool = False) -> None:
+        """Append serialized lines to this process's segments."""
+        self.local.append(records, fsync)
+
+    def close(self) -> None:
+        """Index the open blocks and save the rollups of this process's segments."""
+        if self._local is not None and self._local_pid == os.getpid():
+            self._local.close()
+
+    # Read side
+
+    def process_stores(self) -> List[Tuple[str, ComplianceSegmentStore]]:
+        """(directory name, store) of every process directory, this process's included."""
+        try:
+            names = sorted(name for name in os.listdir(self.process_root)
+                           if (self.process_root / name).is_dir())
+        except FileNotFoundError:
+            names = []
+
+        local = self._local if self._local_pid == os.getpid() else None
+        stores = []
+        for name in names:
+            if local is not None and name == self._local_name:
+                stores.append((name, local))
+                continue
+            store = self._process_stores.get(name)
+            if store is None:
+                store = ComplianceSegmentStore(str(self.process_root / name), self.partition, self.index_interval)
+            stores.append((name, store))
+
+        self._process_stores = {name: store for name, store in stores if store is not local}
+        return stores
+
+    def _sources(self) -> List[ComplianceSegmentStore]:
+        """Process stores, relisted at most every SOURCE_CACHE_SECONDS."""
+        cached = self._sources_cache
+        now = time.monotonic()
+        if cached is None or now - cached[0] > SOURCE_CACHE_SECONDS:
+            cached = self._sources_cache = (now, [store for _, store in self.process_stores()])
+        return cached[1]
+
+    def _stores_for(self, key: str) -> List[ComplianceSegmentStore]:
+        """The consolidated store plus the process stores holding a segment for a key."""
+        return [self.consolidated] + [store for store in self._sources() if store.has_segment(key)]
+
+    def segment_key(self, timestamp: datetime) -> str:
+        """Segment key for an entry timestamp."""
+        return self.consolidated.segment_key(timestamp)
+
+    def segment_start(self, key: str) -> datetime:
+        """Start of the period covered by a segment."""
+        return self.consolidated.segment_start(key)
+
+    def segment_keys(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[str]:
+        """List the keys of consolidated or unmerged segments overlapping a time range, oldest first."""
+        keys = set(self.consolidated.segment_keys(start, end))
+        for store in self._sources():
+            keys.update(store.segment_keys(start, end))
+        return sorted(keys)
+
+    def segment_workers(self, key: str) -> Set[str]:
+        """Worker IDs recorded for a key in any store."""
+        workers: Set[str] = set()
+        for store in self._stores_for(key):
+            workers |= store.segment_workers(key)
+        return workers
+
+    def load_rollup(self, key: str, detail: bool = False) -> SegmentRollup:
+        """Rollups of a key across the consolidated and unmerged segments (see ComplianceSegmentStore)."""
+        stores = self._stores_for(key)
+        with self.read_lock():
+            rollups = [store.load_rollup(key, detail) for store in stores]
+        return rollups[0] if len(rollups) == 1 else SegmentRollup.combine(rollups)
+
+    def scan(self,
+             start: datetime,
+             end: datetime,
+             worker_ids: Optional[Iterable[str]] = None,
+             columns: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield compliance entries with timestamps in [start, end] (see ComplianceSegmentStore.scan)."""
+        for _, entry in self._scan(start, end, worker_ids, columns):
+            yield entry
+
+    def scan_timestamped(self,
+                         start: datetime,
+                         end: datetime,
+                         worker_ids: Optional[Iterable[str]] = None,
+                         columns: Optional[List[str]] = None) -> Iterator[Tuple[datetime, Dict[str, Any]]]:
+        """Like scan, but yield (entry timestamp, entry) pairs."""
+        for timestamp, entry in self._scan(start, end, worker_ids, columns):
+            yield line_timestamp(timestamp), entry
+
+    def _scan(self,
+              start: datetime,
+              end: datetime,
+              worker_ids: Optional[Iterable[str]],
+              columns: Optional[List[str]]) -> Iterator[Tuple[Any, Dict[str, Any]]]:
+        """
+        Yield (timestamp, entry) pairs segment key by segment key.
+
+        A key's files are read under the shared lock, and its entries are
+        decoded and yielded after the lock is released. A slow consumer,
+        such as a streaming export, then never holds up the merger or the
+        compactor.
+        """
+        for stores, key_start, key_end in self._scan_plan(start, end):
+            with self.read_lock():
+                segments = [source.read_range(key_start, key_end, worker_ids, columns) for source in stores]
+            for segment in segments:
+                yield from segment
+
+    def _scan_plan(self,
+                   start: datetime,
+                   end: datetime) -> Iterator[Tuple[List[ComplianceSegmentStore], datetime, datetime]]:
+        """(stores, start, end) per segment key, each key read under its own shared lock."""
+        start = normalize_timestamp(start)
+        end = normalize_timestamp(end)
+        last = timedelta(microseconds=1)
+        for key in self.segment_keys(start, end):
+            key_start = self.segment_start(key)
+            yield self._stores_for(key), max(start, key_start), min(end, key_start + self.segment_length - last)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get consolidated segment layout plus unmerged per-process segment counts."""
+        stats = self.consolidated.get_stats()
+        process_segments = {name: len(store.segment_keys()) for name, store in self.process_stores()}
+        stats['process_dir'] = str(self.process_root)
+        stats['process_segments'] = process_segments
+        stats['unmerged_segment_count'] = sum(process_segments.values())
+        return stats
+
+
+class ComplianceSegmentMerger:
+    """
+    Background job that merges closed per-process segments into consolidated ones.
+
+    A process segment is closed once its period ended more than
+    COMPLIANCE_MERGE_GRACE seconds ago; this process's writer state for it
+    is dropped first. Segments of exited processes are merged whatever their
+    age and their directories removed. Late entries for a merged period start
+    a new process segment, merged on a later pass.
+    """
+
+    def __init__(self, store: SharedComplianceStore):
+        self.store = store
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        # Metrics
+        self.runs = 0
+        self.segments_merged = 0
+        self.entries_merged = 0
+        self.processes_adopted = 0
+        self.failures = 0
+        self.last_run_at: Optional[str] = None
+        self.last_run_ms = 0.0
+
+    def start(self) -> bool:
+        """
+        Start the merge thread.
+
+        Returns:
+            True if started, False if merging is disabled
+        """
+        if not settings.COMPLIANCE_MERGE_ENABLED:
+            return False
+        if self._thread is not None and self._thread.is_alive():
+            return True
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="compliance-merger", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the merge thread after the segment in progress."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(settings.COMPLIANCE_MERGE_INTERVAL):
+            try:
+                self.run_once()
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Compliance segment merge pass failed: {e}")
+
+    def run_once(self, now: Optional[datetime] = None) -> int:
+        """
+        Merge every closed process segment, and every segment of exited processes.
+
+        Args:
+            now: Current time (defaults to datetime.now())
+
+        Returns:
+            Number of segments merged
+        """
+        cutoff = (now or datetime.now()) - timedelta(seconds=settings.COMPLIANCE_MERGE_GRACE)
+        start = time.perf_counter()
+        merged = 0
+
+        with self.store.maintenance_lock():
+            for name, process_store in self.store.process_stores():
+                if self._stop.is_set():
+                    break
+                if self.store.owns(process_store):
+                    process_store.release_closed(cutoff)
+                    keys = [key for key in process_store.segment_keys()
+                            if process_store.segment_start(key) + process_store.segment_length <= cutoff]
+                    merged += self._merge_keys(process_store, keys)
+                    continue
+
+                owner_fd = _try_lock(str(process_store.root / OWNER_LOCK))
+                if owner_fd is None:
+                    continue  # Its process is alive and merges its own segments
+                try:
+                    keys = process_store.segment_keys()
+                    merged += self._merge_keys(process_store, keys)
+                    if not process_store.segment_keys():
+                        shutil.rmtree(process_store.root, ignore_errors=True)
+                        self.processes_adopted += 1
+                        logger.info("Merged segments of exited compliance process", process=name)
+                finally:
+                    _unlock(owner_fd)
+
+        self.runs += 1
+        self.last_run_at = datetime.now().isoformat()
+        self.last_run_ms = (time.perf_counter() - start) * 1000
+        if merged:
+            logger.info("Compliance process segments merged", segments=merged,
+                        duration_ms=round(self.last_run_ms, 1))
+        return merged
+
+    def _merge_keys(self, process_store: ComplianceSegmentStore, keys: List[str]) -> int:
+        merged = 0
+        for key in keys:
+            if self._stop.is_set():
+                break
+            try:
+                if self.merge(process_store, key):
+                    merged += 1
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Failed to merge compliance segment {key} of {process_store.root.name}: {e}")
+        return merged
+
+    def merge(self, process_store: ComplianceSegmentStore, key: str) -> bool:
+        """
+        Merge one process segment into the consolidated segment for its key.
+
+        Must be called with the maintenance lock held.
+
+        Returns:
+            True if the process segment was merged and removed
+        """
+        source = process_store.read_segment(key)
+        if source is None:
+            return False  # Still being written
+        data, workers, rollup = source
+
+        consolidated = self.store.consolidated
+        existing_data, existing_workers, existing_rollup = consolidated.read_segment(key)
+
+        # A partial last line was left by a process that died mid-write
+        new_lines = data[:data.rfind(b'\n') + 1].splitlines(keepends=True)
+        # Stable sort: equal timestamps keep consolidated entries first, then
+        # this process's entries in sequence order
+        lines = sorted(existing_data.splitlines(keepends=True) + new_lines,
+                       key=lambda line: line[:TIMESTAMP_WIDTH])
+        staged = consolidated.stage_segment(
+            key, lines, existing_workers | workers, SegmentRollup.combine([existing_rollup, rollup])
+        )
+
+        try:
+            with self.store.swap_lock():
+                removed = process_store.remove_merged_segment(
+                    key, len(data), lambda: consolidated.install_staged(key, staged)
+                )
+        finally:
+            for staged_path, _ in staged:
+                staged_path.unlink(missing_ok=True)
+
+        if removed:
+            self.segments_merged += 1
+            self.entries_merged += len(new_lines)
+        return removed
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get merge metrics."""
+        return {
+            'enabled': settings.COMPLIANCE_MERGE_ENABLED,
+            'running': self._thread is not None and self._thread.is_alive(),
+            'runs': self.runs,
+            'segments_merged': self.segments_merged,
+            'entries_merged': self.entries_merged,
+            'processes_adopted': self.processes_adopted,
+            'failures': self.failures,
+            'last_run_at': self.last_run_at,
+            'last_run_ms': round(self.last_run_ms, 1)
+        }
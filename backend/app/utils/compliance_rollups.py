@@ -0,0 +1,337 @@
+"""
+Compliance Rollups
+==================
+
+Pre-aggregated compliance statistics per hour, site and worker.
+
+Rollups are maintained by the segment store as entries are written and
+persisted next to each segment, so compliance reports add up a few buckets
+per hour instead of decoding every raw entry.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from ..config.settings import settings
+from .serialization import dumps, loads
+
+HOUR_FORMAT = '%Y%m%d%H'
+HOUR = timedelta(hours=1)
+
+# Site recorded for entries that carry no site_id
+UNASSIGNED_SITE = 'unassigned'
+
+# Risk score above which an assessment counts as a high-risk incident
+HIGH_RISK_SCORE = 0.75
+
+ASSESSMENT_EVENT = 'HEAT_EXPOSURE_ASSESSMENT'
+
+# Entry fields read by SegmentRollup.add_entry, for projected scans
+ROLLUP_COLUMNS = [
+    'worker_identification.worker_id',
+    'worker_identification.site_id',
+    'risk_assessment.risk_level',
+    'risk_assessment.heat_exposure_risk_score',
+    'risk_assessment.requires_immediate_attention',
+    'environmental_conditions.heat_index_fahrenheit',
+    'worker_id',
+    'site_id',
+]
+
+
+class RollupBucket:
+    """Running totals for a set of compliance entries."""
+
+    __slots__ = (
+        'assessments', 'risk_levels', 'risk_score_sum', 'risk_score_max',
+        'heat_index_sum', 'heat_index_max', 'high_risk', 'above_heat_threshold',
+        'immediate_attention', 'events'
+    )
+
+    def __init__(self):
+        self.assessments = 0
+        self.risk_levels: Dict[str, int] = {}
+        self.risk_score_sum = 0.0
+        self.risk_score_max = 0.0
+        self.heat_index_sum = 0.0
+        self.heat_index_max = 0.0
+        self.high_risk = 0
+        self.above_heat_threshold = 0
+        self.immediate_attention = 0
+        self.events: Dict[str, int] = {}
+
+    def add_assessment(self,
+                       risk_level: str,
+                       risk_score: float,
+                       heat_index: float,
+                       immediate_attention: bool) -> None:
+        """Add one heat exposure assessment."""
+        if self.assessments == 0:
+            self.risk_score_max = risk_score
+            self.heat_index_max = heat_index
+        else:
+            if risk_score > self.risk_score_max:
+                self.risk_score_max = risk_score
+            if heat_index > self.heat_index_max:
+                self.heat_index_max = heat_index
+        self.assessments += 1
+        self.risk_levels[risk_level] = self.risk_levels.get(risk_level, 0) + 1
+        self.risk_score_sum += risk_score
+        self.heat_index_sum += heat_index
+        if risk_score > HIGH_RISK_SCORE:
+            self.high_risk += 1
+        if heat_index >= settings.HEAT_INDEX_THRESHOLD_DANGER:
+            self.above_heat_threshold += 1
+        if immediate_attention:
+            self.immediate_attention += 1
+
+    def add_event(self, event: str) -> None:
+        """Count a non-assessment compliance event, such as an alert."""
+        self.events[event] = self.events.get(event, 0) + 1
+
+    def merge(self, other: 'RollupBucket', include_events: bool = True) -> None:
+        """Add another bucket's totals to this one."""
+        if other.assessments:
+            if self.assessments == 0:
+                self.risk_score_max = other.risk_score_max
+                self.heat_index_max = other.heat_index_max
+            else:
+                self.risk_score_max = max(self.risk_score_max, other.risk_score_max)
+                self.heat_index_max = max(self.heat_index_max, other.heat_index_max)
+            self.assessments += other.assessments
+            for level, count in other.risk_levels.items():
+                self.risk_levels[level] = self.risk_levels.get(level, 0) + count
+            self.risk_score_sum += other.risk_score_sum
+            self.heat_index_sum += other.heat_index_sum
+            self.high_risk += other.high_risk
+            self.above_heat_threshold += other.above_heat_threshold
+            self.immediate_attention += other.immediate_attention
+        if include_events:
+            for event, count in other.events.items():
+                self.events[event] = self.events.get(event, 0) + count
+
+    def is_empty(self) -> bool:
+        return self.assessments == 0 and not self.events
+
+    def average_risk_score(self) -> float:
+        return self.risk_score_sum / self.assessments if self.assessments else 0.0
+
+    def average_heat_index(self) -> float:
+        return self.heat_index_sum / self.assessments if self.assessments else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'RollupBucket':
+        bucket = cls()
+        for slot in cls.__slots__:
+            if slot in data:
+                setattr(bucket, slot, data[slot])
+        return bucket
+
+
+class HourRollup:
+    """Rollups of one hour: overall totals and one bucket per site and worker."""
+
+    __slots__ = ('start', 'totals', 'sites', 'assessed_workers')
+
+    def __init__(self, start: datetime):
+        self.start = start
+        self.totals = RollupBucket()
+        self.sites: Dict[str, Dict[str, RollupBucket]] = {}
+        self.assessed_workers: Set[str] = set()
+
+    def bucket(self, site: str, worker_id: str) -> RollupBucket:
+        workers = self.sites.get(site)
+        if workers is None:
+            workers = self.sites[site] = {}
+        bucket = workers.get(worker_id)
+        if bucket is None:
+            bucket = workers[worker_id] = RollupBucket()
+        return bucket
+
+    def worker_buckets(self, worker_ids: Set[str]) -> Iterable[RollupBucket]:
+        """Buckets of the given workers across all sites."""
+        for workers in self.sites.values():
+            for worker_id in worker_ids.intersection(workers):
+                yield workers[worker_id]
+
+    def merge(self, other: 'HourRollup') -> None:
+        """Add the rollups of the same hour from another segment."""
+        self.totals.merge(other.totals)
+        self.assessed_workers.update(other.assessed_workers)
+        for site, workers in other.sites.items():
+            for worker_id, bucket in workers.items():
+                self.bucket(site, worker_id).merge(bucket)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'totals': self.totals.to_dict(),
+            'assessed_workers': sorted(self.assessed_workers),
+            'sites': {
+                site: {worker_id: bucket.to_dict() for worker_id, bucket in workers.items()}
+                for site, workers in self.sites.items()
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, start: datetime, data: Dict[str, Any], detail: bool = True) -> 'HourRollup':
+        hour = cls(start)
+        hour.totals = RollupBucket.from_dict(data.get('totals', {}))
+        # Interned so cached hours share worker ID strings
+        hour.assessed_workers = {sys.intern(worker_id) for worker_id in data.get('assessed_workers', ())}
+        if detail:
+            for site, workers in data.get('sites', {}).items():
+                hour.sites[site] = {
+                    worker_id: RollupBucket.from_dict(bucket) for worker_id, bucket in workers.items()
+                }
+        return hour
+
+
+class SegmentRollup:
+    """
+    Hour × site × worker rollups of one compliance segment.
+
+    segment_offset is the byte offset in the segment up to which entries have
+    been folded in; entries after it are replayed from the segment on load.
+    """
+
+    def __init__(self):
+        self.segment_offset = 0
+        self.hours: Dict[str, HourRollup] = {}
+
+    def add_entry(self, timestamp: datetime, entry: Dict[str, Any]) -> None:
+        """
+        Fold a compliance entry into the rollups.
+
+        Args:
+            timestamp: Entry timestamp (naive local time)
+            entry: Compliance entry dictionary
+        """
+        event = entry.get('compliance_event')
+        if not event:
+            return
+
+        hour_key = timestamp.strftime(HOUR_FORMAT)
+        hour = self.hours.get(hour_key)
+        if hour is None:
+            hour = self.hours[hour_key] = HourRollup(datetime.strptime(hour_key, HOUR_FORMAT))
+
+        identification = entry.get('worker_identification') or {}
+        site = identification.get('site_id') or entry.get('site_id') or UNASSIGNED_SITE
+
+        if event == ASSESSMENT_EVENT:
+            worker_id = identification.get('worker_id') or ''
+            risk = entry.get('risk_assessment') or {}
+            risk_level = risk.get('risk_level', 'Unknown')
+            risk_score = risk.get('heat_exposure_risk_score', 0) or 0
+            heat_index = (entry.get('environmental_conditions') or {}).get('heat_index_fahrenheit', 0) or 0
+            immediate = bool(risk.get('requires_immediate_attention', False))
+
+            hour.totals.add_assessment(risk_level, risk_score, heat_index, immediate)
+            hour.bucket(site, worker_id).add_assessment(risk_level, risk_score, heat_index, immediate)
+            if worker_id:
+                hour.assessed_workers.add(sys.intern(worker_id))
+        else:
+            worker_id = entry.get('worker_id') or identification.get('worker_id') or ''
+            hour.totals.add_event(event)
+            hour.bucket(site, worker_id).add_event(event)
+
+    def merge(self, other: 'SegmentRollup') -> None:
+        """Add another segment's rollups to these, leaving the other's hours untouched."""
+        for hour_key, other_hour in other.hours.items():
+            hour = self.hours.get(hour_key)
+            if hour is None:
+                hour = self.hours[hour_key] = HourRollup(other_hour.start)
+            hour.merge(other_hour)
+
+    @classmethod
+    def combine(cls, rollups: Iterable['SegmentRollup']) -> 'SegmentRollup':
+        """New rollups adding up several segments' rollups."""
+        combined = cls()
+        for rollup in rollups:
+            combined.merge(rollup)
+        return combined
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'segment_offset': self.segment_offset,
+            'hours': {hour_key: hour.to_dict() for hour_key, hour in self.hours.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], detail: bool = True) -> 'SegmentRollup':
+        rollup = cls()
+        rollup.segment_offset = data.get('segment_offset', 0)
+        for hour_key, hour in data.get('hours', {}).items():
+            rollup.hours[hour_key] = HourRollup.from_dict(
+                datetime.strptime(hour_key, HOUR_FORMAT), hour, detail
+            )
+        return rollup
+
+    def save(self, path: Path) -> None:
+        """Write the rollups atomically."""
+        temp_path = path.with_name(path.name + '.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(dumps(self.to_dict()))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, detail: bool = True) -> 'SegmentRollup':
+        """
+        Read persisted rollups.
+
+        Args:
+            path: Rollup file path
+            detail: Load per-site and per-worker buckets, not just hour totals
+
+        Returns:
+            Rollups (empty if the file is missing or unreadable)
+        """
+        try:
+            with open(path, 'rb') as f:
+                return cls.from_dict(loads(f.read()), detail)
+        except (FileNotFoundError, ValueError):
+            return cls()
+
+
+class RollupAggregate:
+    """Totals for a report period, combined from hour rollups and raw entries."""
+
+    def __init__(self, worker_ids: Optional[Iterable[str]] = None):
+        self.worker_ids = set(worker_ids) if worker_ids else None
+        self.totals = RollupBucket()
+        self.workers: Set[str] = set()
+        self.hours_from_rollups = 0
+        self.entries_scanned = 0
+
+    def add_hour(self, hour: HourRollup) -> None:
+        """Add a complete hour from its rollups."""
+        self.hours_from_rollups += 1
+        self._merge_hour(hour)
+
+    def add_entries(self, timestamped_entries: Iterable[Tuple[datetime, Dict[str, Any]]]) -> None:
+        """Add raw entries, for partial hours at the edges of the period."""
+        rollup = SegmentRollup()
+        for timestamp, entry in timestamped_entries:
+            self.entries_scanned += 1
+            rollup.add_entry(timestamp, entry)
+        for hour in rollup.hours.values():
+            self._merge_hour(hour)
+
+    def _merge_hour(self, hour: HourRollup) -> None:
+        if self.worker_ids is None:
+            self.totals.merge(hour.totals)
+            self.workers.update(hour.assessed_workers)
+        else:
+            # Worker-filtered reports count only that worker's assessments
+            for bucket in hour.worker_buckets(self.worker_ids):
+                self.totals.merge(bucket, include_events=False)
+            self.workers.update(self.worker_ids.intersection(hour.assessed_workers))
+
+    def is_empty(self) -> bool:
+        return self.totals.is_empty()
@@ -0,0 +1,760 @@
+"""
+Compliance Segment Store
+========================
+
+Time-partitioned storage for OSHA compliance entries.
+
+Entries are appended to hourly or daily segment files. Each segment has two
+append-only sidecar files: a sparse block index (byte range plus the minimum
+and maximum entry timestamp of every block of entries) and the set of worker
+IDs seen in the segment. Report queries open only the segments overlapping the
+requested period, read only the blocks whose timestamps overlap it, and filter
+on the line prefix and raw bytes before any JSON is decoded. A third sidecar
+holds the segment's hour × site × worker rollups.
+
+Once a segment is closed, the compaction job may replace its lines and index
+with a Parquet archive (see compliance_archive); the workers and rollup
+sidecars stay. Scans read archived segments by column projection, and late
+entries for an archived period start a new line segment next to the archive.
+
+Each store is written by one process. Multi-process deployments give every
+process its own store directory and merge them (see compliance_merge).
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from ..config.settings import settings
+from . import compliance_archive
+from .compliance_archive import ARCHIVE_SUFFIX, project_entry
+from .compliance_rollups import SegmentRollup
+from .logger import get_logger
+from .serialization import dumps, loads
+
+logger = get_logger(__name__)
+
+# Partition name -> (segment key format, segment length)
+PARTITIONS = {
+    'hour': ('%Y%m%d%H', timedelta(hours=1)),
+    'day': ('%Y%m%d', timedelta(days=1)),
+}
+
+# Fixed-width entry timestamp that starts every segment line, so timestamps
+# compare as raw bytes
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+TIMESTAMP_WIDTH = 26
+
+SEGMENT_SUFFIX = '.log'
+INDEX_SUFFIX = '.idx'
+WORKERS_SUFFIX = '.workers'
+ROLLUP_SUFFIX = '.rollup.json'
+
+# Block index entry: (start offset, end offset, min timestamp, max timestamp)
+IndexBlock = Tuple[int, int, bytes, bytes]
+
+
+class SegmentRecord(NamedTuple):
+    """A serialized compliance line ready to be appended to a segment."""
+    timestamp: datetime
+    worker_id: Optional[str]
+    line: bytes
+    entry: Optional[Dict[str, Any]] = None
+
+
+class _SegmentState:
+    """Writer-side state of a segment that is being appended to."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.offset = 0
+        self.block_start = 0
+        self.block_count = 0
+        self.block_min = b''
+        self.block_max = b''
+        self.workers: Set[str] = set()
+        self.rollup = SegmentRollup()
+        self.rollup_saved_at = time.monotonic()
+
+    def add(self, timestamp: bytes, length: int) -> None:
+        if self.block_count == 0:
+            self.block_start = self.offset
+            self.block_min = self.block_max = timestamp
+        elif timestamp < self.block_min:
+            self.block_min = timestamp
+        elif timestamp > self.block_max:
+            self.block_max = timestamp
+        self.block_count += 1
+        self.offset += length
+
+    def close_block(self) -> bytes:
+        line = b'%d %d %s %s %d\n' % (self.block_start, self.offset,
+                                      self.block_min, self.block_max, self.block_count)
+        self.block_count = 0
+        return line
+
+
+def format_timestamp(value: datetime) -> bytes:
+    """Format a timestamp the way it prefixes segment lines."""
+    return value.strftime(TIMESTAMP_FORMAT).encode()
+
+
+def line_timestamp(value: Any) -> datetime:
+    """Timestamp of a scanned entry: raw line prefixes are parsed, archive timestamps pass through."""
+    if isinstance(value, bytes):
+        return datetime.fromisoformat(value.decode())
+    return value
+
+
+def normalize_timestamp(value: datetime) -> datetime:
+    """Convert timezone-aware timestamps to naive local time, as entries are stored."""
+    if value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def entry_timestamp(entry: Any, default: float) -> datetime:
+    """
+    Get the timestamp an entry is partitioned and indexed by.
+
+    Args:
+        entry: Compliance entry dictionary or pre-serialized message
+        default: Epoch seconds to use when the entry has no usable timestamp
+
+    Returns:
+        Naive local datetime
+    """
+    value = entry.get('timestamp_utc') if isinstance(entry, dict) else None
+    if isinstance(value, str):
+        try:
+            return normalize_timestamp(datetime.fromisoformat(value.replace('Z', '+00:00')))
+        except ValueError:
+            pass
+    return datetime.fromtimestamp(default)
+
+
+def entry_worker_id(entry: Any) -> Optional[str]:
+    """Get the worker ID recorded in a compliance entry, if any."""
+    if not isinstance(entry, dict):
+        return None
+    worker_id = (entry.get('worker_identification') or {}).get('worker_id') or entry.get('worker_id')
+    return str(worker_id) if worker_id is not None else None
+
+
+class ComplianceSegmentStore:
+    """
+    Hourly or daily segment files with a sparse block index.
+
+    Appends come from the compliance writer's bulk and priority threads; any
+    thread may scan. Appends, archive swaps and per-segment reads hold the
+    store lock, so appends never interleave and a segment is never read
+    halfway through being replaced by its archive.
+    """
+
+    # Segments the writer keeps open state for; older ones get their last block indexed
+    max_open_segments = 4
+
+    def __init__(self,
+                 root: Optional[str] = None,
+                 partition: Optional[str] = None,
+                 index_interval: Optional[int] = None):
+        self.root = Path(root or settings.COMPLIANCE_SEGMENT_DIR)
+        self.partition = partition or settings.COMPLIANCE_SEGMENT_PARTITION
+        if self.partition not in PARTITIONS:
+            raise ValueError(f"Unknown compliance segment partition: {self.partition}")
+        self.key_format, self.segment_length = PARTITIONS[self.partition]
+        self.index_interval = index_interval or settings.COMPLIANCE_INDEX_INTERVAL
+        self.rollup_persist_interval = settings.COMPLIANCE_ROLLUP_PERSIST_INTERVAL
+
+        self._open: Dict[str, _SegmentState] = {}
+        self._lock = threading.RLock()
+
+        # Rollup summaries of unchanged segments, keyed by segment key (LRU)
+        self._rollup_cache: "OrderedDict[str, Tuple[Tuple[int, int], SegmentRollup]]" = OrderedDict()
+        self._rollup_cache_lock = threading.Lock()
+        self._segment_keys_cache: Optional[Tuple[int, List[str]]] = None
+        self._segment_prefix = os.path.join(str(self.root), '')
+
+        # Held by maintenance jobs that rewrite segments, and around file swaps;
+        # replaced with cross-process file locks when processes share the directory
+        self.maintenance_lock: Callable[[], Any] = nullcontext
+        self.swap_lock: Callable[[], Any] = nullcontext
+
+    # Write side
+
+    def segment_key(self, timestamp: datetime) -> str:
+        """Segment key for an entry timestamp."""
+        return timestamp.strftime(self.key_format)
+
+    def segment_path(self, key: str) -> Path:
+        """Path of the segment file for a key."""
+        return self.root / f"{key}{SEGMENT_SUFFIX}"
+
+    def archive_path(self, key: str) -> Path:
+        """Path of the Parquet archive for a key."""
+        return self.root / f"{key}{ARCHIVE_SUFFIX}"
+
+    def segment_start(self, key: str) -> datetime:
+        """Start of the period covered by a segment."""
+        return datetime.strptime(key, self.key_format)
+
+    def append(self, records: List[SegmentRecord], fsync: bool = False) -> None:
+        """
+        Append serialized lines to their segments.
+
+        Args:
+            records: Records in commit order
+            fsync: Sync segment and sidecar files to disk after writing
+
+        Raises:
+            OSError: If a segment could not be written
+        """
+        groups: Dict[str, List[SegmentRecord]] = {}
+        for record in records:
+            groups.setdefault(self.segment_key(record.timestamp), []).append(record)
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            for key, group in groups.items():
+                state = self._open.get(key) or self._load_state(key)
+                self._append_group(state, group, fsync)
+
+            if len(self._open) > self.max_open_segments:
+                for key in sorted(self._open)[:-self.max_open_segments]:
+                    self._release(key, fsync)
+
+    def close(self) -> None:
+        """Index the open block and save the rollups of every segment, then drop writer state."""
+        with self._lock:
+            for key in list(self._open):
+                self._release(key, fsync=False)
+
+    def release_closed(self, cutoff: datetime) -> None:
+        """Drop writer state for segments whose period ended by the cutoff, as close() does."""
+        with self._lock:
+            for key in list(self._open):
+                if self.segment_start(key) + self.segment_length <= cutoff:
+                    self._release(key, fsync=False)
+
+    def _append_group(self, state: _SegmentState, group: List[SegmentRecord], fsync: bool) -> None:
+        index_lines = []
+        new_workers = []
+        for record in group:
+            state.add(record.line[:TIMESTAMP_WIDTH], len(record.line))
+            if state.block_count >= self.index_interval:
+                index_lines.append(state.close_block())
+            if record.worker_id is not None and record.worker_id not in state.workers:
+                state.workers.add(record.worker_id)
+                new_workers.append(record.worker_id)
+            if record.entry is not None:
+                state.rollup.add_entry(record.timestamp, record.entry)
+
+        self._write(state.path, b''.join(record.line for record in group), fsync)
+        if index_lines:
+            self._write(state.path.with_suffix(INDEX_SUFFIX), b''.join(index_lines), fsync)
+        if new_workers:
+            self._write(state.path.with_suffix(WORKERS_SUFFIX),
+                        ''.join(f"{worker_id}\n" for worker_id in new_workers).encode('utf-8'), fsync)
+        if time.monotonic() - state.rollup_saved_at >= self.rollup_persist_interval:
+            self._save_rollup(state)
+
+    def _save_rollup(self, state: _SegmentState) -> None:
+        state.rollup.segment_offset = state.offset
+        state.rollup.save(state.path.with_suffix(ROLLUP_SUFFIX))
+        state.rollup_saved_at = time.monotonic()
+
+    @staticmethod
+    def _write(path: Path, data: bytes, fsync: bool) -> None:
+        with open(path, 'ab') as f:
+            f.write(data)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+
+    def replace_with_archive(self, key: str, segment_size: int, staged_path: Path) -> bool:
+        """
+        Swap a segment's lines and index for a staged Parquet archive.
+
+        Args:
+            key: Segment key
+            segment_size: Segment size the archive was built from
+            staged_path: Archive file written next to the final archive path
+
+        Returns:
+            False, leaving everything in place, if the writer holds the
+            segment open or it has grown since the archive was built
+        """
+        path = self.segment_path(key)
+        with self.swap_lock(), self._lock:
+            if key in self._open or path.stat().st_size != segment_size:
+                return False
+
+            # Rollups now cover the archive, and any later line segment starts at offset 0
+            rollup = self._replay_rollup(path, SegmentRollup.load(path.with_suffix(ROLLUP_SUFFIX)))
+            rollup.segment_offset = 0
+            os.replace(staged_path, self.archive_path(key))
+            rollup.save(path.with_suffix(ROLLUP_SUFFIX))
+            path.unlink()
+            path.with_suffix(INDEX_SUFFIX).unlink(missing_ok=True)
+
+        with self._rollup_cache_lock:
+            self._rollup_cache.pop(key, None)
+        return True
+
+    def read_segment(self, key: str) -> Optional[Tuple[bytes, Set[str], SegmentRollup]]:
+        """
+        Read a closed segment for merging.
+
+        Returns:
+            The segment's bytes (empty if it has no line segment), workers
+            and detailed rollups, or None if the writer holds it open
+        """
+        path = self.segment_path(key)
+        with self._lock:
+            if key in self._open:
+                return None
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                data = b''
+            return data, self.read_workers(path), self.load_rollup(key, detail=True)
+
+    def stage_segment(self,
+                      key: str,
+                      lines: List[bytes],
+                      workers: Set[str],
+                      rollup: SegmentRollup) -> List[Tuple[Path, Path]]:
+        """
+        Write a complete segment, with its index, workers and rollups, to staging files.
+
+        Args:
+            key: Segment key
+            lines: Segment lines, each ending in a newline
+            workers: Worker IDs in the segment
+            rollup: Rollups of every entry in the segment (and its archive)
+
+        Returns:
+            (staged path, final path) pairs for install_staged
+        """
+        path = self.segment_path(key)
+        state = _SegmentState(path)
+        index_lines = []
+        for line in lines:
+            state.add(line[:TIMESTAMP_WIDTH], len(line))
+            if state.block_count >= self.index_interval:
+                index_lines.append(state.close_block())
+        if state.block_count:
+            index_lines.append(state.close_block())
+        rollup.segment_offset = state.offset
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        staged = []
+        for final_path, data in ((path.with_suffix(INDEX_SUFFIX), b''.join(index_lines)),
+                                 (path.with_suffix(WORKERS_SUFFIX),
+                                  ''.join(f"{worker_id}\n" for worker_id in sorted(workers)).encode('utf-8')),
+                                 (path.with_suffix(ROLLUP_SUFFIX), dumps(rollup.to_dict())),
+                                 (path, b''.join(lines))):
+            staged_path = final_path.with_name(final_path.name + '.staged')
+            with open(staged_path, 'wb') as f:
+                f.write(data)
+            staged.append((staged_path, final_path))
+        return staged
+
+    def install_staged(self, key: str, staged: List[Tuple[Path, Path]]) -> None:
+        """Move staged segment files into place, the segment itself last."""
+        with self._lock:
+            if key in self._open:
+                raise RuntimeError(f"Compliance segment {key} is open for writing")
+            for staged_path, final_path in staged:
+                os.replace(staged_path, final_path)
+        with self._rollup_cache_lock:
+            self._rollup_cache.pop(key, None)
+
+    def remove_merged_segment(self, key: str, segment_size: int, install: Callable[[], None]) -> bool:
+        """
+        Remove a segment whose entries have been merged into another store.
+
+        Args:
+            key: Segment key
+            segment_size: Segment size the merge was built from
+            install: Puts the merged copy in place; called under the store
+                lock once the segment is known to be unchanged, just before
+                its files are removed
+
+        Returns:
+            False, leaving everything in place, if the writer holds the
+            segment open or it has changed since the merge was built
+        """
+        path = self.segment_path(key)
+        with self._lock:
+            if key in self._open or (self._file_size(path) or 0) != segment_size:
+                return False
+            install()
+            for suffix in (SEGMENT_SUFFIX, INDEX_SUFFIX, WORKERS_SUFFIX, ROLLUP_SUFFIX):
+                path.with_suffix(suffix).unlink(missing_ok=True)
+
+        with self._rollup_cache_lock:
+            self._rollup_cache.pop(key, None)
+        return True
+
+    def _release(self, key: str, fsync: bool) -> None:
+        state = self._open.pop(key)
+        if state.block_count:
+            self._write(state.path.with_suffix(INDEX_SUFFIX), state.close_block(), fsync)
+        self._save_rollup(state)
+
+    def _load_state(self, key: str) -> _SegmentState:
+        """Resume appending to a segment, picking up lines not yet in its index or rollups."""
+        state = _SegmentState(self.segment_path(key))
+        if state.path.exists():
+            blocks = self.read_index(state.path)
+            state.offset = blocks[-1][1] if blocks else 0
+            with open(state.path, 'rb') as f:
+                f.seek(state.offset)
+                for line in f:
+                    state.add(line[:TIMESTAMP_WIDTH], len(line))
+        # An archived segment keeps its workers and rollups, which late
+        # entries in a new line segment continue from
+        state.workers = self.read_workers(state.path)
+        state.rollup = self._replay_rollup(state.path, SegmentRollup.load(state.path.with_suffix(ROLLUP_SUFFIX)))
+        self._open[key] = state
+        return state
+
+    # Read side
+
+    def segments(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Path]:
+        """
+        List segment files overlapping a time range, oldest first.
+
+        Args:
+            start: Range start (None for unbounded)
+            end: Range end (None for unbounded)
+
+        Returns:
+            Segment file paths
+        """
+        return [self.segment_path(key) for key in self.segment_keys(start, end)]
+
+    def segment_keys(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[str]:
+        """List the keys of segments overlapping a time range, oldest first."""
+        keys = self._list_segment_keys()
+        # Segment keys sort in time order, so the range is a slice of the sorted keys
+        low = bisect_left(keys, self.segment_key(start)) if start is not None else 0
+        high = bisect_right(keys, self.segment_key(end)) if end is not None else len(keys)
+        return keys[low:high]
+
+    def has_segment(self, key: str) -> bool:
+        """Whether a line or archived segment exists for a key."""
+        keys = self._list_segment_keys()
+        position = bisect_left(keys, key)
+        return position < len(keys) and keys[position] == key
+
+    def _list_segment_keys(self) -> List[str]:
+        """Sorted keys of line and archived segments, relisted only when the directory has changed."""
+        try:
+            directory_mtime = os.stat(self.root).st_mtime_ns
+        except FileNotFoundError:
+            return []
+
+        cached = self._segment_keys_cache
+        # A listing taken within the directory's timestamp granularity may
+        # miss a file created in the same tick, so recent listings are redone
+        if cached is not None and cached[0] == directory_mtime and time.time_ns() - directory_mtime > 1_000_000_000:
+            return cached[1]
+
+        key_length = len(self.segment_key(datetime(2000, 1, 1)))
+        keys = set()
+        for name in os.listdir(self.root):
+            for suffix in (SEGMENT_SUFFIX, ARCHIVE_SUFFIX):
+                key = name[:-len(suffix)]
+                if name.endswith(suffix) and len(key) == key_length and key.isdigit():
+                    keys.add(key)
+        keys = sorted(keys)
+        self._segment_keys_cache = (directory_mtime, keys)
+        return keys
+
+    @staticmethod
+    def read_index(path: Path) -> List[IndexBlock]:
+        """Read the block index of a segment."""
+        blocks = []
+        try:
+            with open(path.with_suffix(INDEX_SUFFIX), 'rb') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 5:
+                        blocks.append((int(parts[0]), int(parts[1]), parts[2], parts[3]))
+        except FileNotFoundError:
+            pass
+        return blocks
+
+    def segment_workers(self, key: str) -> Set[str]:
+        """Read the set of worker IDs recorded in the segment for a key."""
+        return self.read_workers(self.segment_path(key))
+
+    @staticmethod
+    def read_workers(path: Path) -> Set[str]:
+        """Read the set of worker IDs recorded in a segment."""
+        try:
+            with open(path.with_suffix(WORKERS_SUFFIX), 'r', encoding='utf-8') as f:
+                return {line.rstrip('\n') for line in f if line.strip()}
+        except FileNotFoundError:
+            return set()
+
+    def scan(self,
+             start: datetime,
+             end: datetime,
+             worker_ids: Optional[Iterable[str]] = None,
+             columns: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Yield compliance entries with timestamps in [start, end].
+
+        Args:
+            start: Range start
+            end: Range end
+            worker_ids: Only yield assessments for these workers
+            columns: Dotted entry paths to include, e.g. 'risk_assessment' or
+                'worker_identification.worker_id' (whole entries when None).
+                Archived segments read only the matching columns.
+
+        Yields:
+            Decoded compliance entry dictionaries in segment order
+        """
+        for _, entry in self._scan(start, end, worker_ids, columns):
+            yield entry
+
+    def scan_timestamped(self,
+                         start: datetime,
+                         end: datetime,
+                         worker_ids: Optional[Iterable[str]] = None,
+                         columns: Optional[List[str]] = None) -> Iterator[Tuple[datetime, Dict[str, Any]]]:
+        """Like scan, but yield (entry timestamp, entry) pairs."""
+        for timestamp, entry in self._scan(start, end, worker_ids, columns):
+            yield line_timestamp(timestamp), entry
+
+    def read_range(self,
+                   start: datetime,
+                   end: datetime,
+                   worker_ids: Optional[Iterable[str]] = None,
+                   columns: Optional[List[str]] = None) -> Iterator[Tuple[Any, Dict[str, Any]]]:
+        """
+        Read the segment files covering [start, end] now and decode their entries lazily.
+
+        Unlike scan, every file read happens before this returns, so a caller
+        can hold a lock while the files are read without holding it while the
+        entries are consumed.
+
+        Returns:
+            Iterator of (timestamp, entry) pairs; timestamps are raw line
+            prefixes for line segments (see line_timestamp)
+        """
+        start = normalize_timestamp(start)
+        end = normalize_timestamp(end)
+        wanted = set(worker_ids) if worker_ids else None
+        segments = [self._read_segment(key, start, end, wanted, columns) for key in self.segment_keys(start, end)]
+        return self._decode_segments(segments, start, end, wanted, columns)
+
+    def _scan(self,
+              start: datetime,
+              end: datetime,
+              worker_ids: Optional[Iterable[str]] = None,
+              columns: Optional[List[str]] = None) -> Iterator[Tuple[Any, Dict[str, Any]]]:
+        """Yield (timestamp, entry) pairs; timestamps are raw line prefixes for line segments."""
+        start = normalize_timestamp(start)
+        end = normalize_timestamp(end)
+        wanted = set(worker_ids) if worker_ids else None
+
+        for key in self.segment_keys(start, end):
+            yield from self._decode_segments([self._read_segment(key, start, end, wanted, columns)],
+                                             start, end, wanted, columns)
+
+    def _read_segment(self,
+                      key: str,
+                      start: datetime,
+                      end: datetime,
+                      wanted: Optional[Set[str]],
+                      columns: Optional[List[str]]) -> Optional[Tuple[List, List[bytes]]]:
+        """(archived entries, raw lines) of a segment within [start, end], or None if no wanted worker is in it."""
+        path = self.segment_path(key)
+        if wanted and wanted.isdisjoint(self.read_workers(path)):
+            return None
+
+        # Read the archive and the line segment together, so a concurrent
+        # compaction cannot move entries from one to the other in between
+        with self._lock:
+            archive_path = self.archive_path(key)
+            archived = []
+            if archive_path.exists():
+                if compliance_archive.pq is None:
+                    logger.warning(f"pyarrow is not installed; skipping archived compliance segment {key}")
+                else:
+                    archived = compliance_archive.read_archive(archive_path, start, end, wanted, columns)
+            lines = []
+            if path.exists():
+                lines = list(self._read_lines(path, format_timestamp(start), format_timestamp(end)))
+        return archived, lines
+
+    @staticmethod
+    def _decode_segments(segments: List[Optional[Tuple[List, List[bytes]]]],
+                         start: datetime,
+                         end: datetime,
+                         wanted: Optional[Set[str]],
+                         columns: Optional[List[str]]) -> Iterator[Tuple[Any, Dict[str, Any]]]:
+        """Yield the (timestamp, entry) pairs of segments read by _read_segment."""
+        low, high = format_timestamp(start), format_timestamp(end)
+        # Compact separators as written by the writer, spaced ones as json.dumps wrote older lines
+        needles = [
+            needle
+            for worker_id in wanted
+            for needle in (b'"worker_id":' + dumps(worker_id), b'"worker_id": ' + json.dumps(worker_id).encode())
+        ] if wanted else None
+
+        for segment in segments:
+            if segment is None:
+                continue
+            archived, lines = segment
+            yield from archived
+
+            for line in lines:
+                timestamp = line[:TIMESTAMP_WIDTH]
+                if timestamp < low or timestamp > high:
+                    continue
+                parts = line.split(b' | ', 2)
+                if len(parts) < 3 or not parts[2].startswith(b'{'):
+                    continue
+                message = parts[2]
+                if needles and not any(needle in message for needle in needles):
+                    continue
+
+                try:
+                    entry = loads(message)
+                except ValueError:
+                    continue  # Skip invalid entries
+
+                if wanted and entry_worker_id(entry) not in wanted:
+                    continue
+                yield timestamp, project_entry(entry, columns) if columns is not None else entry
+
+    def _read_lines(self, path: Path, low: bytes, high: bytes) -> Iterator[bytes]:
+        """Read the lines of the blocks overlapping [low, high] plus the unindexed tail."""
+        blocks = self.read_index(path)
+        ranges: List[List[int]] = []
+        for block_start, block_end, block_min, block_max in blocks:
+            if block_max < low or block_min > high:
+                continue
+            if ranges and ranges[-1][1] == block_start:
+                ranges[-1][1] = block_end
+            else:
+                ranges.append([block_start, block_end])
+        tail_start = blocks[-1][1] if blocks else 0
+
+        with open(path, 'rb') as f:
+            for range_start, range_end in ranges:
+                f.seek(range_start)
+                yield from f.read(range_end - range_start).splitlines()
+
+            f.seek(tail_start)
+            tail = f.read()
+            # A line without its newline is still being written
+            yield from tail[:tail.rfind(b'\n') + 1].splitlines()
+
+    def load_rollup(self, key: str, detail: bool = False) -> SegmentRollup:
+        """
+        Load a segment's rollups, including entries written since they were saved.
+
+        Args:
+            key: Segment key
+            detail: Include per-site and per-worker buckets. Summary rollups
+                (hour totals and assessed worker IDs) are cached while the
+                segment is unchanged.
+
+        Returns:
+            Segment rollups
+        """
+        if detail:
+            path = self.segment_path(key)
+            return self._replay_rollup(path, SegmentRollup.load(path.with_suffix(ROLLUP_SUFFIX)))
+
+        # Saved rollups plus the replayed tail always cover the whole segment,
+        # so the segment's size and mtime identify the result (the rollup
+        # file's once archived). Files rewritten by another process's merge or
+        # compaction get a new mtime, so no cache entry outlives them.
+        try:
+            stat = os.stat(f"{self._segment_prefix}{key}{SEGMENT_SUFFIX}")
+            version = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            try:
+                version = (-1, os.stat(f"{self._segment_prefix}{key}{ROLLUP_SUFFIX}").st_mtime_ns)
+            except FileNotFoundError:
+                version = (-1, 0)
+
+        with self._rollup_cache_lock:
+            cached = self._rollup_cache.get(key)
+            if cached is not None and cached[0] == version:
+                self._rollup_cache.move_to_end(key)
+                return cached[1]
+
+        path = self.segment_path(key)
+        rollup = self._replay_rollup(path, SegmentRollup.load(path.with_suffix(ROLLUP_SUFFIX), detail=False))
+        with self._rollup_cache_lock:
+            self._rollup_cache[key] = (version, rollup)
+            self._rollup_cache.move_to_end(key)
+            while len(self._rollup_cache) > settings.COMPLIANCE_ROLLUP_CACHE_SIZE:
+                self._rollup_cache.popitem(last=False)
+        return rollup
+
+    @staticmethod
+    def _replay_rollup(path: Path, rollup: SegmentRollup) -> SegmentRollup:
+        """Fold in segment entries written after the rollup's segment offset."""
+        try:
+            with open(path, 'rb') as f:
+                f.seek(rollup.segment_offset)
+                tail = f.read()
+        except FileNotFoundError:
+            return rollup
+
+        complete = tail.rfind(b'\n') + 1
+        for line in tail[:complete].splitlines():
+            parts = line.split(b' | ', 2)
+            if len(parts) < 3 or not parts[2].startswith(b'{'):
+                continue
+            try:
+                entry = loads(parts[2])
+                timestamp = datetime.fromisoformat(parts[0].decode())
+            except ValueError:
+                continue
+            rollup.add_entry(timestamp, entry)
+        rollup.segment_offset += complete
+        return rollup
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get segment layout and size information."""
+        keys = self.segment_keys()
+        segment_sizes = [self._file_size(self.segment_path(key)) for key in keys]
+        archive_sizes = [self._file_size(self.archive_path(key)) for key in keys]
+        return {
+            'segment_dir': str(self.root),
+            'partition': self.partition,
+            'index_interval': self.index_interval,
+            'segment_count': len(keys),
+            'line_segment_count': sum(1 for size in segment_sizes if size is not None),
+            'archived_segment_count': sum(1 for size in archive_sizes if size is not None),
+            'total_bytes': sum(size or 0 for size in segment_sizes + archive_sizes),
+            'archive_bytes': sum(size or 0 for size in archive_sizes),
+            'oldest_segment': keys[0] if keys else None,
+            'newest_segment': keys[-1] if keys else None
+        }
+
+    @staticmethod
+    def _file_size(path: Path) -> Optional[int]:
+        try:
+            return path.stat().st_size
+        except FileNotFoundError:
+            return None
@@ -0,0 +1,517 @@
+"""
+Compliance Log Writer
+=====================
+
+Background group-commit writer for the OSHA compliance log.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from ..config.settings import settings
+from .compliance_archive import ComplianceCompactor
+from .compliance_merge import ComplianceSegmentMerger, SharedComplianceStore
+from .compliance_store import ComplianceSegmentStore, SegmentRecord, entry_timestamp, entry_worker_id, format_timestamp
+from .logger import get_logger
+from .serialization import dumps, loads
+
+logger = get_logger(__name__)
+
+DURABILITY_MODES = ('flush', 'fsync')
+
+# What submit does when the queue is full: buffer the entry in the overflow
+# list the writer thread drains, or drop it
+OVERFLOW_POLICIES = ('buffer', 'drop')
+
+# Queue item: (created time, level, entry dict or pre-serialized JSON message)
+QueueItem = Tuple[float, str, Union[Dict[str, Any], str]]
+
+# Called with each priority entry before it is written
+AlertSubscriber = Callable[[Dict[str, Any]], None]
+
+# Recent priority latencies kept for percentiles
+LATENCY_WINDOW = 1000
+
+# Bulk groups are appended in slices of this many records; between slices the
+# bulk thread lets waiting priority entries take the store first
+APPEND_SLICE = 500
+
+# Longest a bulk slice waits for the priority channel to go idle (seconds)
+PRIORITY_YIELD_TIMEOUT = 0.05
+
+
+class _Flush:
+    """Queue marker asking the writer thread to commit everything before it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+# Queue marker waking the writer thread to drain the overflow list
+_WAKE = object()
+
+
+class ComplianceWriter:
+    """
+    Group-commit writer for compliance entries.
+
+    Entries are queued by request threads and serialized by a single background
+    thread, which collects everything that arrives within the group-commit
+    interval and appends it to the time-partitioned segment store with one
+    write per segment. In "flush" durability mode each group is flushed to the
+    OS; "fsync" mode also syncs it to disk. By default each process writes its
+    own segments, which the segment merger consolidates.
+
+    High-severity entries (immediate-action alerts) take a separate priority
+    channel with its own thread: they are dispatched to subscribers as soon as
+    they are queued and written to the store straight away, never behind a
+    group of bulk entries.
+
+    Submitting never waits, since it runs on the event loop. Compliance
+    entries are the regulatory record, so a full queue does not lose them by
+    default: they go to an unbounded overflow list that the writer thread
+    drains with its next group. Dropping is opt-in
+    (COMPLIANCE_OVERFLOW_POLICY="drop").
+    """
+
+    def __init__(self,
+                 store: Optional[Union[ComplianceSegmentStore, SharedComplianceStore]] = None,
+                 queue_size: Optional[int] = None,
+                 flush_interval_ms: Optional[int] = None,
+                 max_batch: Optional[int] = None,
+                 durability: Optional[str] = None):
+        self.store = store or SharedComplianceStore()
+        self.flush_interval = (flush_interval_ms or settings.COMPLIANCE_FLUSH_INTERVAL_MS) / 1000
+        self.max_batch = max_batch or settings.COMPLIANCE_MAX_BATCH
+        self.durability = durability or settings.COMPLIANCE_DURABILITY
+        if self.durability not in DURABILITY_MODES:
+            raise ValueError(f"Unknown compliance durability mode: {self.durability}")
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size or settings.COMPLIANCE_QUEUE_SIZE)
+        self._overflow: "deque[QueueItem]" = deque()  # Entries submitted while the queue was full
+        self._thread: Optional[threading.Thread] = None
+        self._priority_queue: "queue.Queue" = queue.Queue(maxsize=settings.COMPLIANCE_PRIORITY_QUEUE_SIZE)
+        self._priority_thread: Optional[threading.Thread] = None
+        self._subscribers: List[AlertSubscriber] = []
+        self._priority_idle = threading.Event()
+        self._priority_idle.set()
+        self._start_lock = threading.Lock()
+        self._atexit_registered = False
+
+        # Metrics, updated from request threads and both writer threads
+        self._metrics_lock = threading.Lock()
+        self.entries_submitted = 0
+        self.entries_written = 0
+        self.entries_dropped = 0
+        self.entries_overflowed = 0
+        self.serialization_errors = 0
+        self.write_errors = 0
+        self.flush_count = 0
+        self.max_queue_depth = 0
+        self.last_batch_size = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+        self.priority_submitted = 0
+        self.priority_dispatched = 0
+        self.priority_written = 0
+        self.priority_overflow = 0
+        self.subscriber_errors = 0
+        # Milliseconds from the event (e.g. the prediction) to dispatch and to the written record
+        self._dispatch_latency_ms: "deque[float]" = deque(maxlen=LATENCY_WINDOW)
+        self._write_latency_ms: "deque[float]" = deque(maxlen=LATENCY_WINDOW)
+
+    def submit(self, entry: Union[Dict[str, Any], str], level: str = 'INFO') -> bool:
+        """
+        Queue a compliance entry for writing, without waiting.
+
+        Args:
+            entry: Entry dictionary, or an already serialized JSON message
+            level: Log level recorded on the line
+
+        Returns:
+            True if queued or buffered, False if the queue was full and the
+            overflow policy is "drop"
+        """
+        self._ensure_started()
+
+        item = (time.time(), level, entry)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            return self._overflow_entry(item)
+
+        depth = self._queue.qsize()
+        with self._metrics_lock:
+            self.entries_submitted += 1
+            if depth > self.max_queue_depth:
+                self.max_queue_depth = depth
+        return True
+
+    def _overflow_entry(self, item: QueueItem) -> bool:
+        """Buffer or drop an entry that did not fit in the queue."""
+        if settings.COMPLIANCE_OVERFLOW_POLICY == 'drop':
+            with self._metrics_lock:
+                self.entries_dropped += 1
+            logger.error("Compliance log queue full, entry dropped",
+                         max_per_second=settings.LOG_HOT_PATH_MAX_PER_SECOND,
+                         queue_capacity=self._queue.maxsize)
+            return False
+
+        self._overflow.append(item)
+        with self._metrics_lock:
+            self.entries_submitted += 1
+            self.entries_overflowed += 1
+        logger.warning("Compliance log queue full, entry buffered for the writer",
+                       max_per_second=settings.LOG_HOT_PATH_MAX_PER_SECOND,
+                       queue_capacity=self._queue.maxsize, overflow_depth=len(self._overflow))
+
+        # If the writer emptied the queue after our put failed, it may already be
+        # waiting for the next item; wake it so the buffered entry is not stranded
+        try:
+            self._queue.put_nowait(_WAKE)
+        except queue.Full:
+            pass  # The writer is busy with a full queue and drains the overflow after it
+        return True
+
+    def submit_priority(self,
+                        entry: Dict[str, Any],
+                        level: str = 'WARNING',
+                        created: Optional[float] = None) -> bool:
+        """
+        Queue a high-severity entry on the priority channel.
+
+        Args:
+            entry: Entry dictionary
+            level: Log level recorded on the line
+            created: Epoch seconds of the event that raised the entry, for
+                latency metrics (defaults to now)
+
+        Returns:
+            True if queued on the priority channel, False if it was full and
+            the entry went to the bulk queue instead
+        """
+        self._ensure_started()
+
+        try:
+            self._priority_idle.clear()
+            self._priority_queue.put_nowait((created or time.time(), level, entry))
+        except queue.Full:
+            with self._metrics_lock:
+                self.priority_overflow += 1
+            logger.error("Compliance priority queue full, alert sent to bulk queue")
+            self.submit(entry, level=level)
+            return False
+
+        with self._metrics_lock:
+            self.priority_submitted += 1
+        return True
+
+    def subscribe(self, callback: AlertSubscriber) -> None:
+        """
+        Register a callback for priority entries.
+
+        Callbacks run on the priority thread before the entry is written, so
+        they must return quickly (hand off to a queue or event loop for
+        anything slow). Exceptions are logged and counted.
+        """
+        with self._start_lock:
+            self._subscribers = self._subscribers + [callback]
+
+    def unsubscribe(self, callback: AlertSubscriber) -> None:
+        """Remove a priority entry callback."""
+        with self._start_lock:
+            self._subscribers = [subscriber for subscriber in self._subscribers if subscriber is not callback]
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every entry submitted so far has been committed.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if both queues were committed within the timeout
+        """
+        if not self.is_running():
+            return self._queue.empty() and not self._overflow and self._priority_queue.empty()
+
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        markers = []
+        for work_queue in (self._priority_queue, self._queue):
+            marker = _Flush()
+            work_queue.put(marker)
+            markers.append(marker)
+        return all(
+            marker.done.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            for marker in markers
+        )
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Commit queued entries and stop the writer threads."""
+        with self._start_lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return
+            if self._priority_thread is not None:
+                self._priority_queue.put(_STOP)
+                self._priority_thread.join(timeout)
+                self._priority_thread = None
+            self._queue.put(_STOP)
+            thread.join(timeout)
+            self._thread = None
+
+        logger.info("Compliance writer stopped", entries_written=self.entries_written)
+
+    def is_running(self) -> bool:
+        """Whether the writer threads are alive."""
+        return (
+            self._thread is not None and self._thread.is_alive()
+            and self._priority_thread is not None and self._priority_thread.is_alive()
+        )
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get queue and group-commit metrics."""
+        return {
+            'running': self.is_running(),
+            'segment_dir': str(self.store.root),
+            'durability': self.durability,
+            'flush_interval_ms': round(self.flush_interval * 1000, 1),
+            'queue_depth': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            'max_queue_depth': self.max_queue_depth,
+            'entries_submitted': self.entries_submitted,
+            'entries_written': self.entries_written,
+            'entries_dropped': self.entries_dropped,
+            'entries_overflowed': self.entries_overflowed,
+            'overflow_depth': len(self._overflow),
+            'overflow_policy': settings.COMPLIANCE_OVERFLOW_POLICY,
+            'serialization_errors': self.serialization_errors,
+            'write_errors': self.write_errors,
+            'flush_count': self.flush_count,
+            'last_batch_size': self.last_batch_size,
+            'last_flush_ms': round(self.last_flush_ms, 3),
+            'max_flush_ms': round(self.max_flush_ms, 3),
+            'avg_flush_ms': round(self.total_flush_ms / self.flush_count, 3) if self.flush_count else 0.0,
+            'priority': {
+                'queue_depth': self._priority_queue.qsize(),
+                'subscribers': len(self._subscribers),
+                'submitted': self.priority_submitted,
+                'dispatched': self.priority_dispatched,
+                'written': self.priority_written,
+                'overflow_to_bulk': self.priority_overflow,
+                'subscriber_errors': self.subscriber_errors,
+                'dispatch_latency_ms': self._latency_summary(self._dispatch_latency_ms),
+                'write_latency_ms': self._latency_summary(self._write_latency_ms)
+            }
+        }
+
+    @staticmethod
+    def _latency_summary(samples: "deque[float]") -> Dict[str, Any]:
+        """p50/p99/max of recent latency samples."""
+        ordered = sorted(samples)
+        if not ordered:
+            return {'samples': 0, 'p50': None, 'p99': None, 'max': None}
+        return {
+            'samples': len(ordered),
+            'p50': round(ordered[len(ordered) // 2], 3),
+            'p99': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 3),
+            'max': round(ordered[-1], 3)
+        }
+
+    def _ensure_started(self) -> None:
+        """Start the writer thread on first use."""
+        if self.is_running():
+            return
+
+        with self._start_lock:
+            if self.is_running():
+                return
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="compliance-writer", daemon=True)
+                self._thread.start()
+            if self._priority_thread is None or not self._priority_thread.is_alive():
+                self._priority_thread = threading.Thread(target=self._run_priority, name="compliance-alerts",
+                                                         daemon=True)
+                self._priority_thread.start()
+            if not self._atexit_registered:
+                atexit.register(self.close, 5.0)
+                self._atexit_registered = True
+
+    def _run(self) -> None:
+        """Writer thread: collect a group of entries, then commit it."""
+        while True:
+            try:
+                # Do not sleep on an empty queue while buffered entries are waiting
+                item = self._queue.get(block=not self._overflow)
+            except queue.Empty:
+                item = _WAKE
+            batch: List[QueueItem] = []
+            markers: List[_Flush] = []
+            stop = False
+
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP:
+                    stop = True
+                    break
+                if isinstance(item, _Flush):
+                    markers.append(item)
+                    break
+
+                if item is not _WAKE:
+                    batch.append(item)
+                if len(batch) >= self.max_batch:
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            # Entries buffered while the queue was full go into this group; a
+            # flush marker or stop was queued after them, so they are covered too
+            while self._overflow and (len(batch) < self.max_batch or markers or stop):
+                batch.append(self._overflow.popleft())
+
+            if batch:
+                self._commit(batch)
+            for marker in markers:
+                marker.done.set()
+            if stop:
+                self.store.close()
+                return
+
+    def _run_priority(self) -> None:
+        """Priority thread: dispatch each waiting alert, then write them together."""
+        while True:
+            items = [self._priority_queue.get()]
+            while True:
+                try:
+                    items.append(self._priority_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            batch = [item for item in items if isinstance(item, tuple)]
+            for created, _, entry in batch:
+                self._dispatch(entry)
+                with self._metrics_lock:
+                    self.priority_dispatched += 1
+                self._dispatch_latency_ms.append((time.time() - created) * 1000)
+
+            if batch:
+                try:
+                    self.store.append(self._records(batch), fsync=self.durability == 'fsync')
+                except Exception as e:
+                    with self._metrics_lock:
+                        self.write_errors += 1
+                    logger.error(f"Failed to write compliance alerts: {e}", batch_size=len(batch))
+                else:
+                    written_at = time.time()
+                    with self._metrics_lock:
+                        self.priority_written += len(batch)
+                    self._write_latency_ms.extend((written_at - created) * 1000 for created, _, _ in batch)
+
+            if self._priority_queue.empty():
+                self._priority_idle.set()
+            for item in items:
+                if isinstance(item, _Flush):
+                    item.done.set()
+            if any(item is _STOP for item in items):
+                self._priority_idle.set()
+                return
+
+    def _dispatch(self, entry: Dict[str, Any]) -> None:
+        for subscriber in self._subscribers:
+            try:
+                subscriber(entry)
+            except Exception as e:
+                with self._metrics_lock:
+                    self.subscriber_errors += 1
+                logger.error(f"Compliance alert subscriber failed: {e}")
+
+    def _records(self, batch: List[QueueItem]) -> List[SegmentRecord]:
+        """Serialize queued entries into segment records."""
+        records = []
+        for created, level, entry in batch:
+            if isinstance(entry, str) and entry.startswith('{'):
+                # Pre-serialized entries (the osha_compliance logger) are re-encoded
+                # like dict entries so their timestamp and worker ID get indexed
+                try:
+                    entry = loads(entry)
+                except ValueError:
+                    pass
+            try:
+                message = entry.encode('utf-8') if isinstance(entry, str) else dumps(entry)
+            except (TypeError, ValueError) as e:
+                with self._metrics_lock:
+                    self.serialization_errors += 1
+                logger.error(f"Failed to serialize compliance entry: {e}")
+                continue
+            timestamp = entry_timestamp(entry, created)
+            records.append(SegmentRecord(
+                timestamp,
+                entry_worker_id(entry),
+                b"%s | %s | %s\n" % (format_timestamp(timestamp), level.encode(), message),
+                entry if isinstance(entry, dict) else None
+            ))
+        return records
+
+    def _commit(self, batch: List[QueueItem]) -> None:
+        """Serialize a group of entries and append it to the segment store."""
+        start = time.perf_counter()
+
+        records = self._records(batch)
+
+        try:
+            fsync = self.durability == 'fsync'
+            for offset in range(0, len(records), APPEND_SLICE):
+                self._priority_idle.wait(PRIORITY_YIELD_TIMEOUT)
+                self.store.append(records[offset:offset + APPEND_SLICE], fsync=fsync)
+        except Exception as e:
+            with self._metrics_lock:
+                self.write_errors += 1
+            logger.error(f"Failed to write compliance log batch: {e}", batch_size=len(batch))
+            return
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._metrics_lock:
+            self.entries_written += len(records)
+            self.flush_count += 1
+            self.last_batch_size = len(batch)
+            self.last_flush_ms = elapsed_ms
+            self.total_flush_ms += elapsed_ms
+            if elapsed_ms > self.max_flush_ms:
+                self.max_flush_ms = elapsed_ms
+
+
+class ComplianceLogHandler(logging.Handler):
+    """Logging handler that routes 'osha_compliance' records through the writer."""
+
+    def __init__(self, writer: Optional[ComplianceWriter] = None):
+        super().__init__()
+        self.writer = writer or compliance_writer
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.writer.submit(record.getMessage(), level=record.levelname)
+        except Exception:
+            self.handleError(record)
+
+
+# Global compliance writer instance
+compliance_writer = ComplianceWriter()
+
+# Global merge and compaction jobs for the writer's segments (started by the application)
+compliance_merger = ComplianceSegmentMerger(compliance_writer.store)
+compliance_compactor = ComplianceCompactor(compliance_writer.store.consolidated)
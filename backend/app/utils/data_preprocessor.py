@@ -14,6 +14,7 @@ import warnings
 
 from ..config.model_config import MODEL_CONFIG, FEATURE_ENGINEERING
 from ..utils.logger import get_logger
+from ..utils.tracing import span
 
 logger = get_logger(__name__)
 
@@ -39,21 +40,24 @@ class DataPreprocessor:
         processed_data = data.copy()
 
         # Handle missing values
-        processed_data = self._handle_missing_values(processed_data)
+        with span('preprocessing.imputation'):
+            processed_data = self._handle_missing_values(processed_data)
 
         # Feature engineering
-        processed_data = self._engineer_features(processed_data)
+        with span('preprocessing.feature_engineering'):
+            processed_data = self._engineer_features(processed_data)
 
         # Normalize features
         if MODEL_CONFIG.enable_scaling:
-            processed_data = self._normalize_features(processed_data)
+            with span('preprocessing.normalization'):
+                processed_data = self._normalize_features(processed_data)
 
         # Ensure all required features are present
         for feature in self.feature_columns:
             if feature not in processed_data:
                 processed_data[feature] = 0.0
 
-        logger.debug(f"Preprocessed single sample with {len(processed_data)} features")
+        logger.debug("Preprocessed single sample with %d features", len(processed_data))
         return processed_data
 
     def preprocess_batch(self, data_list: List[Dict[str, Any]]) -> List[Dict[str, float]]:
@@ -93,14 +97,17 @@ class DataPreprocessor:
         processed_df = df.copy()
 
         # Handle missing values
-        processed_df = self._handle_missing_values_df(processed_df)
+        with span('preprocessing.imputation'):
+            processed_df = self._handle_missing_values_df(processed_df)
 
         # Feature engineering
-        processed_df = self._engineer_features_df(processed_df)
+        with span('preprocessing.feature_engineering'):
+            processed_df = self._engineer_features_df(processed_df)
 
         # Normalize features
         if MODEL_CONFIG.enable_scaling:
-            processed_df = self._normalize_features_df(processed_df)
+            with span('preprocessing.normalization'):
+                processed_df = self._normalize_features_df(processed_df)
 
         # Ensure all required features are present
         for feature in self.feature_columns:
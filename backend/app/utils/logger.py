@@ -3,19 +3,32 @@ Structured Logging Utilities
 =============================
 
 Provides structured logging configuration for the HeatGuard system.
+
+By default the root logger gets a queue handler: callers only enqueue their
+records, and a listener thread formats them and writes them to the console
+and log file in batches, one write and flush per handler per batch.
 """
 
+import atexit
 import logging
 import logging.handlers
 import os
+import queue
 import sys
 import json
+import threading
+import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional, Union
 from pathlib import Path
 
 from ..config.settings import settings
 
+QUEUE_POLICIES = ('drop', 'block')
+
+# A log message, or a callable building it only when the record is emitted
+MessageType = Union[str, Callable[[], str]]
+
 
 class JSONFormatter(logging.Formatter):
     """Custom JSON formatter for structured logging."""
@@ -23,7 +36,8 @@ class JSONFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         """Format log record as JSON."""
         log_entry = {
-            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            # Time the record was created, not formatted (that happens later on the listener thread)
+            'timestamp': datetime.utcfromtimestamp(record.created).isoformat() + 'Z',
             'level': record.levelname,
             'logger': record.name,
             'message': record.getMessage(),
@@ -32,9 +46,11 @@ class JSONFormatter(logging.Formatter):
             'line': record.lineno
         }
 
-        # Add exception information if present
+        # Add exception information if present (already rendered for queued records)
         if record.exc_info:
             log_entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_entry['exception'] = record.exc_text
 
         # Add extra fields if present
         if hasattr(record, 'extra_fields'):
@@ -43,58 +59,439 @@ class JSONFormatter(logging.Formatter):
         return json.dumps(log_entry, ensure_ascii=False)
 
 
+class _BatchWriteMixin:
+    """Lets a stream handler write a batch of records with one write and one flush."""
+
+    def emit_batch(self, records: List[logging.LogRecord]) -> None:
+        lines = []
+        for record in records:
+            if record.levelno < self.level or not self.filter(record):
+                continue
+            try:
+                lines.append(self.format(record) + self.terminator)
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+
+        self.acquire()
+        try:
+            self._write_lines(lines)
+        except Exception:
+            self.handleError(records[-1])
+        finally:
+            self.release()
+
+    def _write_lines(self, lines: List[str]) -> None:
+        self.stream.write(''.join(lines))
+        self.flush()
+
+
+class BatchStreamHandler(_BatchWriteMixin, logging.StreamHandler):
+    """Console handler that writes listener batches at once."""
+
+
+class BatchRotatingFileHandler(_BatchWriteMixin, logging.handlers.RotatingFileHandler):
+    """Rotating file handler that writes listener batches at once, rotating between lines."""
+
+    def _write_lines(self, lines: List[str]) -> None:
+        if self.stream is None:
+            self.stream = self._open()
+        if self.maxBytes <= 0:
+            super()._write_lines(lines)
+            return
+
+        # Same size check as shouldRollover, applied line by line
+        self.stream.seek(0, 2)
+        size = self.stream.tell()
+        pending: List[str] = []
+        for line in lines:
+            if size > 0 and size + len(line) >= self.maxBytes:
+                if pending:
+                    self.stream.write(''.join(pending))
+                    pending = []
+                self.doRollover()
+                size = 0
+            pending.append(line)
+            size += len(line)
+        if pending:
+            self.stream.write(''.join(pending))
+        self.flush()
+
+
+class _Flush:
+    """Queue marker asking the listener to write everything before it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class LogQueueHandler(logging.handlers.QueueHandler):
+    """Root handler that hands records to the log pipeline's queue."""
+
+    def __init__(self, pipeline: 'LogPipeline'):
+        super().__init__(pipeline.queue)
+        self.pipeline = pipeline
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Freeze what cannot wait for the listener: mutable arguments may
+        change and traceback frames go away once the caller returns.
+        Formatting itself, including %-formatting of immutable arguments, is
+        left to the listener. The record is updated in place, as this is the
+        last handler it reaches.
+        """
+        if record.args and not (isinstance(record.args, tuple)
+                                and all(type(arg) in _IMMUTABLE_ARG_TYPES for arg in record.args)):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        self.pipeline.enqueue(record)
+
+
+class LogPipeline:
+    """
+    Bounded queue between logging callers and a listener thread.
+
+    The listener takes up to LOG_BATCH_SIZE records at a time, formats them
+    and writes each handler's share with one write and flush. When the queue
+    is full, the "drop" policy discards new DEBUG and INFO records straight
+    away and lets warnings and errors wait up to LOG_ENQUEUE_TIMEOUT; "block"
+    lets every record wait. Records still not queued are dropped, counted by
+    level and reported in the log once there is room again.
+    """
+
+    def __init__(self,
+                 handlers: List[logging.Handler],
+                 queue_size: Optional[int] = None,
+                 policy: Optional[str] = None,
+                 enqueue_timeout: Optional[float] = None,
+                 batch_size: Optional[int] = None):
+        self.handlers = handlers
+        self.queue_size = queue_size or settings.LOG_QUEUE_SIZE
+        self.policy = policy or settings.LOG_QUEUE_POLICY
+        if self.policy not in QUEUE_POLICIES:
+            raise ValueError(f"Unknown log queue policy: {self.policy}")
+        self.enqueue_timeout = settings.LOG_ENQUEUE_TIMEOUT if enqueue_timeout is None else enqueue_timeout
+        self.batch_size = batch_size or settings.LOG_BATCH_SIZE
+
+        self.queue: "queue.Queue" = queue.Queue(maxsize=self.queue_size)
+        self.handler = LogQueueHandler(self)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._stopped = False
+        self._start_lock = threading.Lock()
+
+        # Metrics
+        self.records_enqueued = 0
+        self.records_written = 0
+        self.records_dropped: Dict[str, int] = {}
+        self.write_errors = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.max_batch_size = 0
+        self.last_batch_ms = 0.0
+        self.max_batch_ms = 0.0
+        self._dropped_reported = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Queue a prepared record, applying the queue-full policy."""
+        if self._stopped:
+            # Records logged during interpreter shutdown are written directly
+            self._write([record])
+            return
+        if self._pid != os.getpid():
+            self.start()
+
+        try:
+            if self.policy == 'block' or record.levelno >= logging.WARNING:
+                self.queue.put(record, timeout=self.enqueue_timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            self.records_dropped[record.levelname] = self.records_dropped.get(record.levelname, 0) + 1
+            return
+
+        self.records_enqueued += 1
+        depth = self.queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    def start(self) -> None:
+        """Start the listener thread, or restart it in a forked child."""
+        with self._start_lock:
+            pid = os.getpid()
+            if self._thread is not None and self._thread.is_alive() and self._pid == pid:
+                return
+            if self._pid is not None and self._pid != pid:
+                # The parent's listener did not survive the fork, and neither
+                # do records it had not written yet
+                self.queue = self.handler.queue = queue.Queue(maxsize=self.queue_size)
+            self._thread = threading.Thread(target=self._run, name="log-listener", daemon=True)
+            self._pid = pid
+            self._thread.start()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every record queued so far has been written.
+
+        Returns:
+            True if written within the timeout
+        """
+        if not self.is_running():
+            return self.queue.empty()
+        marker = _Flush()
+        self.queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Write queued records, stop the listener and close the handlers."""
+        with self._start_lock:
+            if self.is_running():
+                self.queue.put(_STOP)
+                self._thread.join(timeout)
+            self._thread = None
+            self._stopped = True
+        for handler in self.handlers:
+            handler.close()
+
+    def is_running(self) -> bool:
+        """Whether this process's listener thread is alive."""
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def _run(self) -> None:
+        work_queue = self.queue
+        while True:
+            batch = [work_queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(work_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            records = [item for item in batch if isinstance(item, logging.LogRecord)]
+            if records or self._dropped_reported < self.dropped_total():
+                self._write(records)
+
+            stop = False
+            for item in batch:
+                if isinstance(item, _Flush):
+                    item.done.set()
+                elif item is _STOP:
+                    stop = True
+            if stop:
+                return
+
+    def _write(self, records: List[logging.LogRecord]) -> None:
+        dropped = self.dropped_total()
+        if dropped > self._dropped_reported:
+            records.append(logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': f"Log queue full: {dropped - self._dropped_reported} records dropped"
+            }))
+            self._dropped_reported = dropped
+
+        start = time.perf_counter()
+        for handler in self.handlers:
+            try:
+                if isinstance(handler, _BatchWriteMixin):
+                    handler.emit_batch(records)
+                else:
+                    for record in records:
+                        if record.levelno >= handler.level:
+                            handler.handle(record)
+            except Exception:
+                self.write_errors += 1
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.batches += 1
+        self.records_written += len(records)
+        self.last_batch_ms = elapsed_ms
+        if elapsed_ms > self.max_batch_ms:
+            self.max_batch_ms = elapsed_ms
+        if len(records) > self.max_batch_size:
+            self.max_batch_size = len(records)
+
+    def dropped_total(self) -> int:
+        return sum(self.records_dropped.values())
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get queue and listener metrics."""
+        return {
+            'running': self.is_running(),
+            'policy': self.policy,
+            'queue_capacity': self.queue_size,
+            'queue_depth': self.queue.qsize(),
+            'max_queue_depth': self.max_queue_depth,
+            'records_enqueued': self.records_enqueued,
+            'records_written': self.records_written,
+            'records_dropped': self.dropped_total(),
+            'records_dropped_by_level': dict(self.records_dropped),
+            'write_errors': self.write_errors,
+            'batches': self.batches,
+            'average_batch_size': round(self.records_written / self.batches, 1) if self.batches else 0.0,
+            'max_batch_size': self.max_batch_size,
+            'last_batch_ms': round(self.last_batch_ms, 3),
+            'max_batch_ms': round(self.max_batch_ms, 3)
+        }
+
+
+# Message arguments that are safe to format later on the listener thread
+_IMMUTABLE_ARG_TYPES = frozenset({str, int, float, bool, bytes, type(None)})
+
+# Renders tracebacks of queued records on the calling thread
+_traceback_formatter = logging.Formatter()
+
+# Pipeline installed by setup_logging (None when logging synchronously)
+_log_pipeline: Optional[LogPipeline] = None
+
+# HeatGuardLogger instances by name
+_heatguard_loggers: Dict[str, 'HeatGuardLogger'] = {}
+
+
+class _CallSiteLimit:
+    """Sampling and rate-limiting state of one logging call site."""
+
+    __slots__ = ('calls', 'window_start', 'window_count', 'suppressed')
+
+    def __init__(self):
+        self.calls = 0
+        self.window_start = 0.0
+        self.window_count = 0
+        self.suppressed = 0
+
+
 class HeatGuardLogger:
-    """Custom logger class for HeatGuard system."""
+    """
+    Custom logger class for HeatGuard system.
+
+    Every method checks the level before doing any work, so disabled calls
+    cost one cache lookup. For hot paths, messages can be deferred:
+
+    - %-style arguments, ``logger.info("Score: %.3f", score)``, are formatted
+      only if the record is emitted (on the log listener thread when
+      logging asynchronously);
+    - a callable message, ``logger.debug(lambda: expensive())``, is called
+      only if the record is emitted.
+
+    Per call site, ``sample_every=N`` emits 1 call in N and
+    ``max_per_second=X`` emits at most X calls per second. Emitted records
+    carry a ``suppressed`` field counting the calls skipped since the last
+    one from that site.
+    """
 
     def __init__(self, name: str):
         self.logger = logging.getLogger(name)
         self.name = name
+        self._limits: Dict[Any, _CallSiteLimit] = {}
+        self._limits_lock = threading.Lock()
+
+    def is_enabled_for(self, level: int) -> bool:
+        """Whether records at a level would be emitted, for guarding costly log arguments."""
+        return self.logger.isEnabledFor(level)
 
-    def info(self, message: str, **kwargs):
+    def info(self, message: MessageType, *args, sample_every: Optional[int] = None,
+             max_per_second: Optional[float] = None, **kwargs):
         """Log info message with optional extra fields."""
-        if kwargs:
-            extra = {'extra_fields': kwargs}
-            self.logger.info(message, extra=extra)
-        else:
-            self.logger.info(message)
+        if self.logger.isEnabledFor(logging.INFO):
+            self._log(logging.INFO, message, args, kwargs, sample_every, max_per_second)
 
-    def warning(self, message: str, **kwargs):
+    def warning(self, message: MessageType, *args, sample_every: Optional[int] = None,
+                max_per_second: Optional[float] = None, **kwargs):
         """Log warning message with optional extra fields."""
-        if kwargs:
-            extra = {'extra_fields': kwargs}
-            self.logger.warning(message, extra=extra)
-        else:
-            self.logger.warning(message)
+        if self.logger.isEnabledFor(logging.WARNING):
+            self._log(logging.WARNING, message, args, kwargs, sample_every, max_per_second)
 
-    def error(self, message: str, **kwargs):
+    def error(self, message: MessageType, *args, sample_every: Optional[int] = None,
+              max_per_second: Optional[float] = None, **kwargs):
         """Log error message with optional extra fields."""
-        if kwargs:
-            extra = {'extra_fields': kwargs}
-            self.logger.error(message, extra=extra)
-        else:
-            self.logger.error(message)
+        if self.logger.isEnabledFor(logging.ERROR):
+            self._log(logging.ERROR, message, args, kwargs, sample_every, max_per_second)
 
-    def debug(self, message: str, **kwargs):
+    def debug(self, message: MessageType, *args, sample_every: Optional[int] = None,
+              max_per_second: Optional[float] = None, **kwargs):
         """Log debug message with optional extra fields."""
-        if kwargs:
-            extra = {'extra_fields': kwargs}
-            self.logger.debug(message, extra=extra)
-        else:
-            self.logger.debug(message)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self._log(logging.DEBUG, message, args, kwargs, sample_every, max_per_second)
 
-    def critical(self, message: str, **kwargs):
+    def critical(self, message: MessageType, *args, sample_every: Optional[int] = None,
+                 max_per_second: Optional[float] = None, **kwargs):
         """Log critical message with optional extra fields."""
-        if kwargs:
-            extra = {'extra_fields': kwargs}
-            self.logger.critical(message, extra=extra)
-        else:
-            self.logger.critical(message)
+        if self.logger.isEnabledFor(logging.CRITICAL):
+            self._log(logging.CRITICAL, message, args, kwargs, sample_every, max_per_second)
+
+    def _log(self,
+             level: int,
+             message: MessageType,
+             args: tuple,
+             kwargs: Dict[str, Any],
+             sample_every: Optional[int],
+             max_per_second: Optional[float]) -> None:
+        if sample_every is not None or max_per_second is not None:
+            # The caller of info()/debug()/... identifies the call site
+            frame = sys._getframe(2)
+            suppressed = self._admit((frame.f_code, frame.f_lineno), sample_every, max_per_second)
+            if suppressed is None:
+                return
+            if suppressed:
+                kwargs['suppressed'] = suppressed
+
+        if callable(message):
+            message = message()
+        extra = {'extra_fields': kwargs} if kwargs else None
+        # stacklevel 3 attributes the record to the caller of info()/debug()/...
+        self.logger.log(level, message, *args, extra=extra, stacklevel=3)
+
+    def _admit(self,
+               site: Any,
+               sample_every: Optional[int],
+               max_per_second: Optional[float]) -> Optional[int]:
+        """
+        Apply a call site's sampling and rate limit.
+
+        Returns:
+            None to skip the call, otherwise the number of calls skipped since
+            the site last logged
+        """
+        with self._limits_lock:
+            limit = self._limits.get(site)
+            if limit is None:
+                limit = self._limits[site] = _CallSiteLimit()
+
+            limit.calls += 1
+            if sample_every is not None and sample_every > 1 and (limit.calls - 1) % sample_every:
+                limit.suppressed += 1
+                return None
+
+            if max_per_second is not None:
+                now = time.monotonic()
+                if now - limit.window_start >= 1.0:
+                    limit.window_start = now
+                    limit.window_count = 0
+                if limit.window_count >= max_per_second:
+                    limit.suppressed += 1
+                    return None
+                limit.window_count += 1
+
+            suppressed = limit.suppressed
+            limit.suppressed = 0
+            return suppressed
 
 
 def setup_logging(
     log_level: Optional[str] = None,
     log_file: Optional[str] = None,
-    json_format: bool = False
+    json_format: bool = False,
+    async_logging: Optional[bool] = None
 ) -> None:
     """
     Setup logging configuration for the HeatGuard system.
@@ -103,9 +500,15 @@ def setup_logging(
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_file: Path to log file (logs to console only if None)
         json_format: Whether to use JSON formatting
+        async_logging: Write records from a background listener thread
+            (defaults to settings.LOG_ASYNC)
     """
+    global _log_pipeline
+
     log_level = log_level or settings.LOG_LEVEL
     log_file = log_file or settings.LOG_FILE
+    if async_logging is None:
+        async_logging = settings.LOG_ASYNC
 
     # Create logs directory if needed
     if log_file:
@@ -116,9 +519,12 @@ def setup_logging(
     root_logger = logging.getLogger()
     root_logger.setLevel(getattr(logging, log_level.upper()))
 
-    # Clear existing handlers
+    # Clear existing handlers, writing out records a previous pipeline still holds
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
+    if _log_pipeline is not None:
+        _log_pipeline.stop(timeout=5.0)
+        _log_pipeline = None
 
     # Setup formatters
     if json_format:
@@ -130,21 +536,29 @@ def setup_logging(
         )
 
     # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler = BatchStreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
     console_handler.setLevel(getattr(logging, log_level.upper()))
-    root_logger.addHandler(console_handler)
+    handlers: List[logging.Handler] = [console_handler]
 
     # File handler if specified
     if log_file:
-        file_handler = logging.handlers.RotatingFileHandler(
+        file_handler = BatchRotatingFileHandler(
             log_file,
             maxBytes=10*1024*1024,  # 10MB
             backupCount=5
         )
         file_handler.setFormatter(formatter)
         file_handler.setLevel(getattr(logging, log_level.upper()))
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    if async_logging:
+        _log_pipeline = LogPipeline(handlers)
+        _log_pipeline.start()
+        root_logger.addHandler(_log_pipeline.handler)
+    else:
+        for handler in handlers:
+            root_logger.addHandler(handler)
 
     # Setup OSHA compliance logging
     if settings.ENABLE_OSHA_LOGGING:
@@ -153,6 +567,35 @@ def setup_logging(
     logging.info(f"Logging configured - Level: {log_level}, File: {log_file or 'Console only'}")
 
 
+def flush_logging(timeout: Optional[float] = None) -> bool:
+    """
+    Wait until every log record queued so far has been written.
+
+    Args:
+        timeout: Maximum seconds to wait (None waits indefinitely)
+
+    Returns:
+        True if written within the timeout (always True when logging synchronously)
+    """
+    if _log_pipeline is None:
+        return True
+    return _log_pipeline.flush(timeout)
+
+
+def get_logging_metrics() -> Dict[str, Any]:
+    """Get log pipeline metrics."""
+    if _log_pipeline is None:
+        return {'async': False}
+    return {'async': True, **_log_pipeline.get_metrics()}
+
+
+@atexit.register
+def _shutdown_logging() -> None:
+    """Write out queued records before the interpreter exits."""
+    if _log_pipeline is not None:
+        _log_pipeline.stop(timeout=5.0)
+
+
 def setup_osha_logging() -> None:
     """Setup OSHA compliance logging."""
     osha_log_path = Path(settings.OSHA_LOG_FILE)
@@ -161,19 +604,14 @@ def setup_osha_logging() -> None:
     osha_logger = logging.getLogger('osha_compliance')
     osha_logger.setLevel(logging.INFO)
 
-    # Create OSHA-specific formatter
-    osha_formatter = logging.Formatter(
-        '%(asctime)s | %(levelname)s | %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S UTC'
-    )
-
-    # OSHA file handler
-    osha_handler = logging.handlers.RotatingFileHandler(
-        settings.OSHA_LOG_FILE,
-        maxBytes=50*1024*1024,  # 50MB
-        backupCount=12  # Keep 1 year of monthly logs
-    )
-    osha_handler.setFormatter(osha_formatter)
+    # OSHA records go through the background compliance writer, which owns
+    # the log file (imported here to avoid a circular import)
+    from .compliance_writer import ComplianceLogHandler
+
+    for handler in osha_logger.handlers[:]:
+        osha_logger.removeHandler(handler)
+
+    osha_handler = ComplianceLogHandler()
     osha_logger.addHandler(osha_handler)
 
     # Prevent propagation to root logger
@@ -188,9 +626,13 @@ def get_logger(name: str) -> HeatGuardLogger:
         name: Logger name (typically __name__)
 
     Returns:
-        HeatGuardLogger instance
+        HeatGuardLogger instance (the same one for every call with a name, so
+        call-site sampling state is shared)
     """
-    return HeatGuardLogger(name)
+    heatguard_logger = _heatguard_loggers.get(name)
+    if heatguard_logger is None:
+        heatguard_logger = _heatguard_loggers.setdefault(name, HeatGuardLogger(name))
+    return heatguard_logger
 
 
 def log_prediction(
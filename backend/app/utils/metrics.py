@@ -0,0 +1,402 @@
+"""
+Metrics
+=======
+
+In-process Prometheus metrics for the HeatGuard system.
+
+Counters, gauges and histograms are updated on the request path under a
+per-series lock and rendered in the Prometheus text exposition format
+(version 0.0.4) when scraped. Values owned by other components (cache
+counters, queue depths) are read at scrape time by collector functions
+instead of being mirrored on every update.
+
+Metric names match those queried by deployment/monitoring (Grafana
+dashboard and alert rules).
+"""
+
+import math
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .tracing import record_span
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"  # Responses add the charset
+
+# Seconds; per-stage timings run from tens of microseconds to whole batches
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+MODEL_LOAD_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+PIPELINE_STAGES = (
+    'validation', 'preprocessing', 'scaling', 'inference',
+    'scoring', 'serialization', 'compliance_logging', 'queue_wait'
+)
+
+# (labels, value) pairs of one metric family
+Samples = List[Tuple[Dict[str, str], float]]
+# (name, type, help, samples) as produced by a collector
+MetricFamily = Tuple[str, str, str, Samples]
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class _CounterValue:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    def get(self) -> float:
+        return self._value
+
+
+class _GaugeValue(_CounterValue):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+
+class _HistogramValue:
+    __slots__ = ("_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)  # Last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def time(self) -> "_Timer":
+        """Context manager observing the seconds spent in its block."""
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: _HistogramValue):
+        self._histogram = histogram
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+class _Metric:
+    """A metric family: one series per combination of label values."""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_value(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """
+        Get the series for a combination of label values, creating it on first use.
+
+        Callers on hot paths should keep the returned series instead of
+        looking it up on every update.
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+        key = tuple(str(value) for value in values)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, self._new_value())
+        return series
+
+    def _items(self) -> List[Tuple[Dict[str, str], object]]:
+        return [(dict(zip(self.labelnames, key)), series) for key, series in list(self._series.items())]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.type_name}"]
+        for labels, series in self._items():
+            lines.append(f"{self.name}{_format_labels(labels)} {_format_value(series.get())}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def _new_value(self) -> _CounterValue:
+        return _CounterValue()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that goes up and down."""
+
+    type_name = "gauge"
+
+    def _new_value(self) -> _GaugeValue:
+        return _GaugeValue()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(float(bound) for bound in buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_value(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def time(self) -> _Timer:
+        return self._default.time()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape(self.documentation)}", f"# TYPE {self.name} {self.type_name}"]
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for labels, series in self._items():
+            counts, total = series.snapshot()
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': bound})} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """A set of metrics and scrape-time collectors rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        """
+        Add a function called at scrape time for values owned by other components.
+
+        Args:
+            collector: Returns (name, type, help, [(labels, value), ...]) families
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        A failing collector is skipped so one broken component does not
+        blank the whole scrape.
+        """
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        for collector in list(self._collectors):
+            try:
+                families = list(collector())
+            except Exception:
+                continue
+            for name, type_name, documentation, samples in families:
+                lines.append(f"# HELP {name} {_escape(documentation)}")
+                lines.append(f"# TYPE {name} {type_name}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Operational metrics, served at /api/v1/metrics
+registry = MetricsRegistry()
+# Safety outcome metrics, served at /api/v1/business-metrics
+business_registry = MetricsRegistry()
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by method, handler and status code",
+    ("method", "handler", "status"))
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "Time until the last response body chunk was sent",
+    ("method", "handler"))
+PIPELINE_STAGE_DURATION = registry.histogram(
+    "heatguard_pipeline_stage_duration_seconds", "Time spent in each prediction pipeline stage",
+    ("stage",))
+PREDICTION_DURATION = registry.histogram(
+    "heatguard_prediction_duration_seconds", "Time to score one worker (scaling, inference and scoring)")
+MODEL_LOAD_DURATION = registry.histogram(
+    "heatguard_model_load_duration_seconds", "Time to load a model from its files",
+    buckets=MODEL_LOAD_BUCKETS)
+PARALLEL_SCORING_IN_FLIGHT = registry.gauge(
+    "heatguard_parallel_scoring_rows_in_flight", "Rows submitted to parallel scoring threads and not yet scored")
+
+PREDICTIONS = business_registry.counter(
+    "heatguard_predictions_total", "Workers scored, by risk level", ("risk_level",))
+CRITICAL_RISK_ALERTS = business_registry.counter(
+    "heatguard_critical_risk_alerts_total", "Immediate action alerts raised by compliance logging")
+COMPLIANCE_LOGS = business_registry.counter(
+    "heatguard_osha_compliance_logs_total", "Predictions queued for the OSHA compliance log")
+
+# Series kept for the hot paths
+_stage_series = {stage: PIPELINE_STAGE_DURATION.labels(stage) for stage in PIPELINE_STAGES}
+_prediction_series: Dict[str, _CounterValue] = {}
+
+# Set while synthetic rows (startup warm-up) are scored through the request path
+_business_metrics_paused: ContextVar[bool] = ContextVar("heatguard_business_metrics_paused", default=False)
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """
+    Record time spent in a prediction pipeline stage.
+
+    The stage is also added to the current request trace, if any.
+
+    Args:
+        stage: One of PIPELINE_STAGES
+        seconds: Duration
+    """
+    _stage_series[stage].observe(seconds)
+    record_span(stage, seconds)
+
+
+class _StageTimer:
+    __slots__ = ("_stage", "_start")
+
+    def __init__(self, stage: str):
+        self._stage = stage
+
+    def __enter__(self) -> "_StageTimer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        observe_stage(self._stage, time.perf_counter() - self._start)
+
+
+def time_stage(stage: str) -> _StageTimer:
+    """Context manager recording the time spent in its block as a pipeline stage."""
+    return _StageTimer(stage)
+
+
+def count_prediction(risk_level: str) -> None:
+    """Count a scored worker under its risk level."""
+    series = _prediction_series.get(risk_level)
+    if series is None:
+        series = _prediction_series[risk_level] = PREDICTIONS.labels(risk_level)
+    series.inc()
+
+
+def count_predictions(results: Iterable[Dict]) -> None:
+    """
+    Count the workers scored for a request under their risk levels.
+
+    Called by the services on the request and batch job paths, not by the
+    predictor, so warm-up and model refresh scoring do not show up next to
+    the compliance log counters. Failed rows are skipped.
+
+    Args:
+        results: Prediction results
+    """
+    if _business_metrics_paused.get():
+        return
+    for result in results:
+        if 'error' not in result:
+            count_prediction(result.get('risk_level', 'Unknown'))
+
+
+@contextmanager
+def pause_business_metrics():
+    """Do not count predictions made in this block (and tasks it awaits) as business predictions."""
+    token = _business_metrics_paused.set(True)
+    try:
+        yield
+    finally:
+        _business_metrics_paused.reset(token)
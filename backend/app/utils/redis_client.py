@@ -0,0 +1,57 @@
+"""
+Redis Client
+============
+
+Shared Redis clients with bounded connection pools and socket timeouts.
+"""
+
+import threading
+from typing import Dict, Optional
+
+import redis
+
+from ..config.settings import settings
+
+_clients: Dict[str, redis.Redis] = {}
+_clients_lock = threading.Lock()
+
+
+def get_redis_client(url: Optional[str] = None) -> redis.Redis:
+    """
+    Get the shared client for a Redis URL.
+
+    Clients are thread-safe and each owns one connection pool, so every caller
+    of the same URL shares at most REDIS_MAX_CONNECTIONS connections. Socket
+    timeouts keep a stalled server from holding request threads; callers are
+    expected to catch ``redis.RedisError`` and degrade.
+
+    Args:
+        url: Redis URL, defaults to settings.REDIS_URL
+
+    Returns:
+        Redis client (connections are opened lazily)
+    """
+    url = url or settings.REDIS_URL
+    client = _clients.get(url)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(url)
+            if client is None:
+                client = redis.from_url(
+                    url,
+                    max_connections=settings.REDIS_MAX_CONNECTIONS,
+                    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+                    socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+                    health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL
+                )
+                _clients[url] = client
+    return client
+
+
+def close_redis_clients() -> None:
+    """Disconnect every shared client's pool (on shutdown, or after fork)."""
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.connection_pool.disconnect()
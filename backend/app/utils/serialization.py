@@ -0,0 +1,77 @@
+"""
+Response Serialization Utilities
+================================
+
+Fast JSON serialization for prediction API responses.
+"""
+
+import json
+import time
+from typing import Any, Dict, Iterable, List, Sequence
+
+from starlette.responses import Response
+
+from .metrics import observe_stage
+
+try:
+    import orjson
+except ImportError:  # Fall back to the standard library encoder
+    orjson = None
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+    def dumps(content: Any) -> bytes:
+        """Serialize content to JSON bytes."""
+        return orjson.dumps(content, default=str, option=_ORJSON_OPTIONS)
+
+    loads = orjson.loads
+else:
+    _json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=str)
+
+    def dumps(content: Any) -> bytes:
+        """Serialize content to JSON bytes."""
+        return _json_encoder.encode(content).encode('utf-8')
+
+    loads = json.loads
+
+
+def dumps_lines(records: Iterable[Dict[str, Any]]) -> bytes:
+    """Serialize records as newline-delimited JSON."""
+    start = time.perf_counter()
+    body = b''.join(dumps(record) + b'\n' for record in records)
+    observe_stage('serialization', time.perf_counter() - start)
+    return body
+
+
+def project(content: Dict[str, Any], fields: Sequence[str]) -> Dict[str, Any]:
+    """Copy only the given fields out of a service result dict."""
+    return {field: content.get(field) for field in fields}
+
+
+def project_many(items: List[Dict[str, Any]], fields: Sequence[str]) -> List[Dict[str, Any]]:
+    """Project every dict in a list to the given fields."""
+    return [{field: item.get(field) for field in fields} for item in items]
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response written directly from service dicts.
+
+    Skips FastAPI's response_model validation and jsonable_encoder pass, so
+    callers are responsible for shaping the content.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        body = dumps(content)
+        observe_stage('serialization', time.perf_counter() - start)
+        return body
+
+
+def encoder_name() -> str:
+    """Name of the JSON encoder in use."""
+    return 'orjson' if orjson is not None else 'json'
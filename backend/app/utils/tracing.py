@@ -0,0 +1,321 @@
+"""
+Request Tracing
+===============
+
+Request-scoped stage timing for the HeatGuard API.
+
+The request middleware opens a RequestTrace for each HTTP request and makes
+it current through a context variable. Pipeline stages recorded with
+``metrics.observe_stage`` and spans opened with ``span()`` are added to the
+current trace: their totals per name are returned in the ``Server-Timing``
+response header. A sampled fraction of requests also keeps every span with
+its offset and thread, and sampled or slow requests are kept in an
+in-memory ring buffer served by the admin traces endpoint.
+
+Outside a request, or with tracing disabled, recording a span costs one
+context variable lookup.
+"""
+
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Executor, Future
+from contextvars import ContextVar, Token
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from ..config.settings import settings
+
+_current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("heatguard_request_trace", default=None)
+
+
+class RequestTrace:
+    """Stage totals, and for sampled requests the individual spans, of one request."""
+
+    __slots__ = (
+        "trace_id", "method", "path", "sampled", "started_at", "start",
+        "stages", "spans", "dropped_spans", "status_code", "duration_ms", "_lock"
+    )
+
+    def __init__(self, trace_id: str, method: str, path: str, sampled: bool):
+        self.trace_id = trace_id
+        self.method = method
+        self.path = path
+        self.sampled = sampled
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {}  # name -> [seconds, calls]
+        self.spans: List[Tuple[str, float, float, str]] = []  # name, offset, seconds, thread
+        self.dropped_spans = 0
+        self.status_code: Optional[int] = None
+        self.duration_ms: Optional[float] = None
+        self._lock = threading.Lock()  # Spans arrive from scoring threads too
+
+    def add(self, name: str, start: float, seconds: float) -> None:
+        """
+        Add a finished span.
+
+        Args:
+            name: Stage or span name
+            start: ``time.perf_counter()`` when the span started
+            seconds: Span duration
+        """
+        with self._lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                self.stages[name] = [seconds, 1]
+            else:
+                stage[0] += seconds
+                stage[1] += 1
+            if self.sampled:
+                if len(self.spans) < settings.TRACE_MAX_SPANS:
+                    self.spans.append((name, start - self.start, seconds, threading.current_thread().name))
+                else:
+                    self.dropped_spans += 1
+
+    def server_timing(self) -> str:
+        """
+        ``Server-Timing`` header value: total time so far and each stage's summed duration.
+
+        Stages that ran more than once (per row, or per chunk) report their
+        call count in ``desc``; rows scored in parallel can sum to more than
+        the wall time.
+        """
+        with self._lock:
+            stages = [(name, stage[0], stage[1]) for name, stage in self.stages.items()]
+        metrics = [f"total;dur={(time.perf_counter() - self.start) * 1000:.2f}"]
+        for name, seconds, calls in stages:
+            if calls > 1:
+                metrics.append(f'{name};dur={seconds * 1000:.2f};desc="x{calls}"')
+            else:
+                metrics.append(f"{name};dur={seconds * 1000:.2f}")
+        return ", ".join(metrics)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Trace as returned by the admin traces endpoint."""
+        with self._lock:
+            stages = {
+                name: {'duration_ms': round(seconds * 1000, 3), 'calls': calls}
+                for name, (seconds, calls) in self.stages.items()
+            }
+            spans = [
+                {'name': name, 'offset_ms': round(offset * 1000, 3),
+                 'duration_ms': round(seconds * 1000, 3), 'thread': thread}
+                for name, offset, seconds, thread in self.spans
+            ]
+        return {
+            'trace_id': self.trace_id,
+            'method': self.method,
+            'path': self.path,
+            'status_code': self.status_code,
+            'started_at': datetime.fromtimestamp(self.started_at).isoformat(),
+            'duration_ms': self.duration_ms,
+            'sampled': self.sampled,
+            'stages': stages,
+            'spans': spans,
+            'dropped_spans': self.dropped_spans
+        }
+
+
+class TraceBuffer:
+    """Ring buffer of the most recent kept traces."""
+
+    def __init__(self, size: int):
+        self._traces: Deque[RequestTrace] = deque(maxlen=size)
+        self.kept = 0
+
+    def add(self, trace: RequestTrace) -> None:
+        self._traces.append(trace)
+        self.kept += 1
+
+    def get_traces(self, limit: int = 50, path: Optional[str] = None,
+                   min_duration_ms: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        Most recent traces first.
+
+        Args:
+            limit: Maximum traces returned
+            path: Only traces of this request path
+            min_duration_ms: Only traces at least this slow
+
+        Returns:
+            Trace dictionaries
+        """
+        traces = []
+        for trace in reversed(list(self._traces)):
+            if len(traces) >= limit:
+                break
+            if path is not None and trace.path != path:
+                continue
+            if (trace.duration_ms or 0.0) < min_duration_ms:
+                continue
+            traces.append(trace.to_dict())
+        return traces
+
+    def clear(self) -> int:
+        count = len(self._traces)
+        self._traces.clear()
+        return count
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'enabled': settings.TRACING_ENABLED,
+            'sample_rate': settings.TRACE_SAMPLE_RATE,
+            'slow_request_ms': settings.TRACE_SLOW_REQUEST_MS,
+            'buffered': len(self._traces),
+            'capacity': self._traces.maxlen,
+            'kept_total': self.kept
+        }
+
+
+def start_trace(method: str, path: str, trace_id: Optional[str] = None) -> Tuple[RequestTrace, Token]:
+    """
+    Open a trace for a request and make it current.
+
+    Args:
+        method: HTTP method
+        path: Request path
+        trace_id: Caller-supplied request ID (a random ID when None)
+
+    Returns:
+        (trace, token for reset_trace)
+    """
+    sampled = settings.TRACE_SAMPLE_RATE > 0 and random.random() < settings.TRACE_SAMPLE_RATE
+    trace = RequestTrace(trace_id or uuid.uuid4().hex[:16], method, path, sampled)
+    return trace, _current_trace.set(trace)
+
+
+def finish_trace(trace: RequestTrace, status_code: Optional[int]) -> None:
+    """
+    Record how a request ended and keep its trace if it was sampled or slow.
+
+    Unsampled slow requests are kept with their stage totals only.
+
+    Args:
+        trace: Trace opened by start_trace
+        status_code: Response status code
+    """
+    trace.status_code = status_code
+    trace.duration_ms = round((time.perf_counter() - trace.start) * 1000, 2)
+    slow_ms = settings.TRACE_SLOW_REQUEST_MS
+    if trace.sampled or (slow_ms > 0 and trace.duration_ms >= slow_ms):
+        trace_buffer.add(trace)
+
+
+def reset_trace(token: Token) -> None:
+    """Stop recording into the trace made current by start_trace."""
+    _current_trace.reset(token)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """The trace of the request being handled, if any."""
+    return _current_trace.get()
+
+
+def record_span(name: str, seconds: float) -> None:
+    """
+    Add a span that just finished to the current trace, if there is one.
+
+    Args:
+        name: Stage or span name
+        seconds: Duration
+    """
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, time.perf_counter() - seconds, seconds)
+
+
+class _Span:
+    __slots__ = ("_trace", "_name", "_start")
+
+    def __init__(self, trace: RequestTrace, name: str):
+        self._trace = trace
+        self._name = name
+
+    def __enter__(self) -> "_Span":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._trace.add(self._name, self._start, time.perf_counter() - self._start)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str):
+    """
+    Context manager timing its block as a span of the current trace, if sampled.
+
+    Spans break pipeline stages down for the admin traces endpoint only, so
+    unsampled requests skip them; stages that also feed the latency
+    histograms and the Server-Timing header go through ``metrics.time_stage``.
+    """
+    trace = _current_trace.get()
+    if trace is None or not trace.sampled:
+        return _NO_SPAN
+    return _Span(trace, name)
+
+
+def _run_traced(trace: RequestTrace, function: Callable, args: Tuple, kwargs: Dict[str, Any]) -> Any:
+    token = _current_trace.set(trace)
+    try:
+        return function(*args, **kwargs)
+    finally:
+        _current_trace.reset(token)
+
+
+def propagate(function: Callable) -> Callable:
+    """
+    Bind a function to the current trace for running on another thread.
+
+    Executor threads do not inherit context variables, so stages recorded
+    there would otherwise be lost.
+
+    Args:
+        function: Function handed to an executor
+
+    Returns:
+        The function itself outside a trace, else a wrapper running it under the trace
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return function
+
+    def traced(*args, **kwargs):
+        return _run_traced(trace, function, args, kwargs)
+
+    return traced
+
+
+def submit(executor: Executor, function: Callable, *args: Any, **kwargs: Any) -> Future:
+    """
+    ``executor.submit`` running the function under the current trace.
+
+    Args:
+        executor: Executor to submit to
+        function: Function to run
+
+    Returns:
+        The task's future
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return executor.submit(function, *args, **kwargs)
+    return executor.submit(_run_traced, trace, function, args, kwargs)
+
+
+# Global trace buffer
+trace_buffer = TraceBuffer(settings.TRACE_BUFFER_SIZE)
@@ -0,0 +1,116 @@
+"""
+API Key Authentication Benchmark
+================================
+
+Compares the previous ``validate_api_key`` (SHA-256 of the key for the cache
+lookup, ``expires_at`` parsed on each miss, unbounded negative cache) with
+the pre-indexed version, for valid keys and for a credential-stuffing stream
+of random invalid keys.
+
+Usage (from the backend directory):
+    python -m benchmarks.auth_benchmark
+"""
+
+import hashlib
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+sys.path.insert(0, ".")
+from app.middleware.auth import APIKeyError, AuthMiddleware  # noqa: E402
+
+VALID_CHECKS = 200_000
+INVALID_KEYS = 200_000
+EXPIRING_KEY = "heatguard-expiring-key-24680"
+
+
+class LegacyAuth:
+    """The previous validate_api_key."""
+
+    def __init__(self, valid_api_keys: Dict[str, Dict[str, Any]]):
+        self.valid_api_keys = valid_api_keys
+        self.api_key_cache = {}
+        self.cache_ttl = 300
+
+    def validate_api_key(self, api_key: Optional[str]) -> Dict[str, Any]:
+        if not api_key:
+            raise APIKeyError("API key is required")
+        cache_key = hashlib.sha256(api_key.encode()).hexdigest()
+        if cache_key in self.api_key_cache:
+            cached_result, cached_time = self.api_key_cache[cache_key]
+            if time.time() - cached_time < self.cache_ttl:
+                if cached_result is None:
+                    raise APIKeyError("Invalid API key")
+                return cached_result
+        key_info = self.valid_api_keys.get(api_key)
+        if not key_info:
+            self.api_key_cache[cache_key] = (None, time.time())
+            raise APIKeyError("Invalid API key")
+        if not key_info.get("active", False):
+            raise APIKeyError("API key is deactivated")
+        expires_at = key_info.get("expires_at")
+        if expires_at:
+            expire_time = datetime.fromisoformat(expires_at.replace('Z', '+00:00'))
+            if datetime.now().replace(tzinfo=expire_time.tzinfo) > expire_time:
+                raise APIKeyError("API key has expired")
+        self.api_key_cache[cache_key] = (key_info, time.time())
+        return key_info
+
+
+def valid_checks(validate: Callable[[str], Dict[str, Any]]) -> float:
+    """Microseconds per validation of a cached valid key, and of one key that expires."""
+    keys = ["heatguard-api-key-demo-12345", EXPIRING_KEY]
+    start = time.perf_counter()
+    for i in range(VALID_CHECKS):
+        validate(keys[i & 1])
+    return (time.perf_counter() - start) / VALID_CHECKS * 1e6
+
+
+def invalid_stream(make_validate: Callable[[], Callable[[str], Dict[str, Any]]]) -> Dict[str, float]:
+    """Microseconds per random invalid key, and the memory the stream leaves behind (traced separately)."""
+    keys = [uuid.uuid4().hex for _ in range(INVALID_KEYS)]
+
+    def run(validate: Callable[[str], Dict[str, Any]]) -> float:
+        start = time.perf_counter()
+        for key in keys:
+            try:
+                validate(key)
+            except APIKeyError:
+                pass
+        return time.perf_counter() - start
+
+    elapsed = run(make_validate())
+    tracemalloc.start()
+    validate = make_validate()
+    run(validate)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"us": elapsed / INVALID_KEYS * 1e6, "mb": retained / 1e6}
+
+
+def main() -> None:
+    api_keys = dict(AuthMiddleware().valid_api_keys)
+    api_keys[EXPIRING_KEY] = {"name": "Expiring", "active": True, "expires_at": "2099-01-01T00:00:00Z"}
+
+    def new_auth() -> AuthMiddleware:
+        auth = AuthMiddleware()
+        auth.set_api_keys(api_keys)
+        return auth
+
+    factories = {"before": lambda: LegacyAuth(api_keys), "after": new_auth}
+
+    print(f"valid keys, {VALID_CHECKS:,} checks:")
+    for label, factory in factories.items():
+        print(f"  {label:<7} {valid_checks(factory().validate_api_key):6.2f} us/check")
+
+    print(f"random invalid keys, {INVALID_KEYS:,} keys:")
+    for label, factory in factories.items():
+        result = invalid_stream(lambda: factory().validate_api_key)
+        print(f"  {label:<7} {result['us']:6.2f} us/key  {result['mb']:6.1f} MB retained")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Request Middleware Benchmark
+============================
+
+Compares requests per second through the previous ``@app.middleware("http")``
+wrapper (BaseHTTPMiddleware, security headers rebuilt and two logs per
+request) with the pure ASGI LoggingAndSecurityMiddleware, on
+``/api/v1/health/simple`` and ``/api/v1/predict``.
+
+Both apps mount the real routers behind the same CORS middleware; requests
+go in-process through httpx's ASGI transport from 10 concurrent clients, so
+the numbers measure the application, not the network.
+
+Usage (from the backend directory):
+    LOG_LEVEL=INFO python -m benchmarks.middleware_benchmark
+"""
+
+import asyncio
+import sys
+import time
+from typing import Any, Dict
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+
+CONCURRENCY = 10
+API_KEY = "heatguard-api-key-demo-12345"
+
+
+def build_app(legacy: bool) -> FastAPI:
+    """Build an app with the production routers and one of the two middlewares."""
+    from app.config.settings import settings
+    from app.api.health import health_bp
+    from app.api.prediction import prediction_bp
+    from app.middleware.auth import SecurityHeaders
+    from app.middleware.request_middleware import LoggingAndSecurityMiddleware
+    from app.utils.logger import get_logger
+
+    logger = get_logger("benchmarks.middleware")
+    app = FastAPI()
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.BACKEND_CORS_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "DELETE"],
+        allow_headers=["*"],
+    )
+
+    if legacy:
+        @app.middleware("http")
+        async def logging_and_security_middleware(request: Request, call_next):
+            start_time = time.time()
+            logger.debug(
+                f"Incoming request: {request.method} {request.url.path}",
+                method=request.method,
+                path=request.url.path,
+                client_ip=request.client.host if request.client else "unknown",
+                user_agent=request.headers.get("user-agent", "unknown")
+            )
+            response = await call_next(request)
+            process_time = time.time() - start_time
+            for header_name, header_value in SecurityHeaders.get_security_headers().items():
+                response.headers[header_name] = header_value
+            response.headers["X-Process-Time"] = str(round(process_time * 1000, 2))
+            response.headers["X-API-Version"] = settings.VERSION
+            logger.info(
+                f"Request completed: {request.method} {request.url.path}",
+                method=request.method,
+                path=request.url.path,
+                status_code=response.status_code,
+                response_time_ms=round(process_time * 1000, 2)
+            )
+            return response
+    else:
+        app.add_middleware(LoggingAndSecurityMiddleware)
+
+    app.include_router(prediction_bp)
+    app.include_router(health_bp)
+    return app
+
+
+async def measure(app: FastAPI, path: str, requests: int, payload: Dict[str, Any] = None) -> float:
+    """Return the best requests per second over three rounds."""
+    headers = {"X-API-Key": API_KEY}
+    best = 0.0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://localhost") as client:
+        async def worker(count: int) -> None:
+            for _ in range(count):
+                if payload is None:
+                    response = await client.get(path, headers=headers)
+                else:
+                    response = await client.post(path, json=payload, headers=headers)
+                assert response.status_code == 200, response.text
+
+        for _ in range(3):
+            start = time.perf_counter()
+            await asyncio.gather(*(worker(requests // CONCURRENCY) for _ in range(CONCURRENCY)))
+            best = max(best, requests / (time.perf_counter() - start))
+    return best
+
+
+async def main() -> None:
+    # The API modules start background tasks on import, so import them
+    # from inside a running event loop
+    from app.models.model_loader import model_loader
+    from app.utils.logger import flush_logging
+    sys.path.insert(0, "tests")
+    from fixtures.sample_data import get_sample_worker_data
+
+    model_loader.load_model("default")
+    payload = {"data": get_sample_worker_data()}
+    apps = {"before": build_app(legacy=True), "after": build_app(legacy=False)}
+
+    for path, requests, body in (("/api/v1/health/simple", 3000, None), ("/api/v1/predict", 1000, payload)):
+        print(f"{path}:")
+        for label, app in apps.items():
+            rps = await measure(app, path, requests, body)
+            flush_logging(timeout=10)
+            print(f"  {label:<8} {rps:>8.0f} req/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
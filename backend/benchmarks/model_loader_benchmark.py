@@ -0,0 +1,141 @@
+"""
+Model Loader Contention Benchmark
+=================================
+
+Compares the previous ``ModelLoader.load_model`` (every call, including
+cache hits, under one lock, which a cold load holds for the whole unpickle)
+with the lock-free snapshot read and single-flight load, from 100 threads:
+
+- warm: every thread fetches the cached default model, as each prediction
+  request and batch chunk does
+- cold: one thread loads a second model while the others keep fetching the
+  default model; reports how long those fetches stalled
+
+Usage (from the backend directory):
+    python -m benchmarks.model_loader_benchmark
+"""
+
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, ".")
+from app.models.model_loader import ModelLoader  # noqa: E402
+from app.models.heat_predictor import HeatExposurePredictor  # noqa: E402
+
+THREADS = 100
+FETCHES_PER_THREAD = 2000
+
+
+class LegacyModelLoader:
+    """The previous load_model: check, load and cache all under _load_lock."""
+
+    def __init__(self):
+        self._models: Dict[str, HeatExposurePredictor] = {}
+        self._load_times: Dict[str, datetime] = {}
+        self._access_times: Dict[str, datetime] = {}
+        self._load_lock = threading.Lock()
+
+    def load_model(self, model_name: str = "default") -> HeatExposurePredictor:
+        with self._load_lock:
+            if model_name in self._models and self._is_model_valid(model_name):
+                self._access_times[model_name] = datetime.now()
+                return self._models[model_name]
+            predictor = HeatExposurePredictor()
+            self._models[model_name] = predictor
+            self._load_times[model_name] = datetime.now()
+            self._access_times[model_name] = datetime.now()
+            return predictor
+
+    def _is_model_valid(self, model_name: str) -> bool:
+        if datetime.now() - self._load_times[model_name] > timedelta(hours=24):
+            return False
+        model = self._models.get(model_name)
+        return model is not None and model.is_loaded
+
+
+def new_loader() -> ModelLoader:
+    loader = object.__new__(ModelLoader)  # Bypass the singleton
+    loader._initialized = False
+    loader.__init__()
+    return loader
+
+
+def run_threads(target: Callable[[int], None]) -> float:
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def warm(loader: Any) -> Dict[str, float]:
+    """Fetches per second with every thread hitting the cache."""
+    loader.load_model("default")
+    elapsed = run_threads(lambda _: [loader.load_model("default") for _ in range(FETCHES_PER_THREAD)])
+    return {"per_second": THREADS * FETCHES_PER_THREAD / elapsed}
+
+
+def cold(loader: Any) -> Dict[str, float]:
+    """Worst cached fetch while another model loads, and how many times it loaded."""
+    loader.load_model("default")
+    stalls: List[float] = []
+    loading = threading.Event()
+    loads = []
+
+    def worker(index: int) -> None:
+        if index == 0:
+            loading.set()
+            loads.append(loader.load_model("second"))
+            return
+        loading.wait()
+        worst = 0.0
+        for _ in range(20):
+            start = time.perf_counter()
+            loader.load_model("default")
+            worst = max(worst, time.perf_counter() - start)
+            time.sleep(0.01)
+        stalls.append(worst)
+
+    elapsed = run_threads(worker)
+    return {"worst_stall_ms": max(stalls) * 1000, "elapsed_s": elapsed}
+
+
+def stampede(loader: Any) -> Dict[str, float]:
+    """Loads performed when all threads ask for an uncached model at once."""
+    calls = []
+    original = HeatExposurePredictor.__init__
+
+    def counting_init(self, *args, **kwargs):
+        calls.append(1)
+        original(self, *args, **kwargs)
+
+    HeatExposurePredictor.__init__ = counting_init
+    try:
+        elapsed = run_threads(lambda _: loader.load_model("stampede"))
+    finally:
+        HeatExposurePredictor.__init__ = original
+    return {"loads": len(calls), "elapsed_s": elapsed}
+
+
+def main() -> None:
+    sys.setswitchinterval(0.001)  # Closer to request threads preempting each other
+    loaders = {"before": LegacyModelLoader, "after": new_loader}
+
+    print(f"{THREADS} threads")
+    for name, scenario, fmt in (
+        ("warm cache hits", warm, "{per_second:>10,.0f} fetches/s"),
+        ("cached fetch during another model's load", cold, "worst stall {worst_stall_ms:>7.1f} ms"),
+        ("simultaneous cold load", stampede, "{loads} load(s) in {elapsed_s:.2f}s"),
+    ):
+        print(f"{name}:")
+        for label, factory in loaders.items():
+            print(f"  {label:<7} " + fmt.format(**scenario(factory())))
+
+
+if __name__ == "__main__":
+    main()
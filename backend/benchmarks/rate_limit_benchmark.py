@@ -0,0 +1,134 @@
+"""
+Redis Rate Limit Benchmark
+==========================
+
+Compares the previous Redis rate limit check (a ZREMRANGEBYSCORE / ZCARD /
+ZADD / EXPIRE pipeline, plus ZRANGE when over the limit) with the token
+bucket script (one EVALSHA) over the shared connection pool.
+
+Runs against the Redis protocol stand-in from the test fixtures, so the
+numbers compare round trips and server work per check rather than a real
+Redis server's speed.
+
+Usage (from the backend directory):
+    python -m benchmarks.rate_limit_benchmark
+"""
+
+import bisect
+import sys
+import threading
+import time
+from typing import Callable, Dict, List
+
+import redis
+
+sys.path.insert(0, ".")
+from tests.fixtures.redis_server import RedisStandIn, emulate_rate_limit_script  # noqa: E402
+
+THREADS = 8
+IDENTIFIERS = 200
+LIMIT = 1000
+CHECKS = 20000
+
+
+class SortedSetStandIn(RedisStandIn):
+    """Stand-in with the sorted-set commands the previous check used."""
+
+    def __init__(self):
+        super().__init__()
+        self.zsets: Dict[bytes, List[float]] = {}
+
+    def _cmd_zremrangebyscore(self, args):
+        scores = self.zsets.get(args[0], [])
+        cut = bisect.bisect_right(scores, float(args[2]))
+        del scores[:cut]
+        return cut
+
+    def _cmd_zcard(self, args):
+        return len(self.zsets.get(args[0], []))
+
+    def _cmd_zadd(self, args):
+        bisect.insort(self.zsets.setdefault(args[0], []), float(args[2]))
+        return 1
+
+    def _cmd_expire(self, args):
+        return 1
+
+    def _cmd_zrange(self, args):
+        scores = self.zsets.get(args[0], [])
+        return [item for score in scores[:1] for item in (repr(score).encode(), repr(score).encode())]
+
+
+def legacy_check(client: redis.Redis, identifier: str, limit: int) -> bool:
+    """The previous pipeline-based check (without MULTI/EXEC, which the stand-in lacks)."""
+    now = time.time()
+    key = f"rate_limit:{identifier}"
+    pipe = client.pipeline(transaction=False)
+    pipe.zremrangebyscore(key, 0, now - 60)
+    pipe.zcard(key)
+    pipe.zadd(key, {str(now): now})
+    pipe.expire(key, 3600)
+    current_count = pipe.execute()[1]
+    if current_count >= limit:
+        client.zrange(key, 0, 0, withscores=True)
+        return False
+    return True
+
+
+def run(check: Callable[[str], bool]) -> float:
+    """Run CHECKS checks from THREADS threads; return checks per second."""
+    identifiers = [f"key_{i:04d}" for i in range(IDENTIFIERS)]
+    per_thread = CHECKS // THREADS
+
+    def worker(offset: int) -> None:
+        for i in range(per_thread):
+            check(identifiers[(offset + i) % IDENTIFIERS])
+
+    threads = [threading.Thread(target=worker, args=(t * 7,)) for t in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return CHECKS / (time.perf_counter() - start)
+
+
+def main() -> None:
+    from app.middleware.auth import RATE_LIMIT_SCRIPT, RateLimiter, RateLimitError
+
+    server = SortedSetStandIn().start()
+    server.register_script(RATE_LIMIT_SCRIPT, emulate_rate_limit_script)
+    client = redis.from_url(server.url, max_connections=THREADS * 2, socket_timeout=5)
+
+    try:
+        before = run(lambda identifier: legacy_check(client, identifier, LIMIT))
+        before_commands = dict(server.commands)
+        stored_before = sum(len(scores) for scores in server.zsets.values())
+
+        limiter = RateLimiter(redis_client=client)
+
+        def after_check(identifier: str) -> bool:
+            try:
+                limiter.check_rate_limit(identifier, LIMIT)
+                return True
+            except RateLimitError:
+                return False
+
+        after = run(after_check)
+        after_commands = {name: count - before_commands.get(name, 0) for name, count in server.commands.items()}
+        stored_after = sum(len(fields) for fields in server.data.values())
+    finally:
+        server.stop()
+
+    legacy_commands = ('ZREMRANGEBYSCORE', 'ZCARD', 'ZADD', 'EXPIRE', 'ZRANGE')
+    print(f"{CHECKS:,} checks, {THREADS} threads, {IDENTIFIERS} identifiers, limit {LIMIT}/min")
+    print(f"  before {before:>9,.0f} checks/s  "
+          f"{sum(before_commands.get(name, 0) for name in legacy_commands) / CHECKS:.2f} commands/check  "
+          f"{stored_before:,} stored members")
+    print(f"  after  {after:>9,.0f} checks/s  "
+          f"{after_commands.get('EVALSHA', 0) / CHECKS:.2f} commands/check  "
+          f"{stored_after:,} stored fields")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Response Serialization Benchmark
+================================
+
+Compares the previous response path (Pydantic response_model validation,
+jsonable_encoder and the standard JSON encoder) with the direct
+FastJSONResponse path for 1-row and 1,000-row prediction responses.
+
+Usage (from the backend directory):
+    python -m benchmarks.serialization_benchmark
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+
+def make_prediction(index: int) -> Dict[str, Any]:
+    """Build a result dict shaped like PredictionService output."""
+    score = (index % 100) / 100
+    return {
+        'request_id': f'single_{index}',
+        'timestamp': datetime.now().isoformat(),
+        'worker_id': f'worker_{index:05d}',
+        'heat_exposure_risk_score': round(score, 4),
+        'risk_level': 'Warning',
+        'confidence': 0.912,
+        'temperature_celsius': np.float64(32.5),
+        'temperature_fahrenheit': 90.5,
+        'humidity_percent': np.float64(75.0),
+        'heat_index': 105.2,
+        'risk_score_standard': round(score, 4),
+        'risk_score_conservative': round(min(1.0, score + 0.15), 4),
+        'conservative_bias_applied': True,
+        'conservative_bias_value': 0.15,
+        'predicted_thermal_class': 'warm',
+        'class_probabilities': {'hot': 0.1, 'neutral': 0.2, 'slightly_warm': 0.3, 'warm': 0.4},
+        'osha_recommendations': [
+            "Implement work/rest cycles: 15 minutes work, 15 minutes rest",
+            "Mandatory water intake: 8 oz every 15 minutes",
+            "Move to air-conditioned area if possible",
+            "Remove unnecessary clothing layers",
+            "Assign heat stress buddy system",
+            "Postpone non-essential outdoor work",
+        ],
+        'requires_immediate_attention': False,
+        'heart_rate_avg': 95.0,
+        'hrv_rmssd': 25.5,
+        'processing_time_ms': 12.4,
+        'data_quality_score': 0.82,
+        'validation_warnings': ["Using default value for optional feature 'hrv_sdsd'"],
+        'model_version': '1.0.0',
+        'prediction_method': 'xgboost_heat_exposure',
+    }
+
+
+def make_batch(count: int) -> Dict[str, Any]:
+    """Build a result dict shaped like a batch prediction."""
+    return {
+        'request_id': 'batch_1',
+        'batch_size': count,
+        'successful_predictions': count,
+        'failed_predictions': 0,
+        'processing_time_ms': 512.3,
+        'validation_warnings': [],
+        'batch_statistics': {
+            'total_predictions': count,
+            'risk_level_distribution': {'Safe': 0, 'Caution': 0, 'Warning': count, 'Danger': 0},
+        },
+        'predictions': [make_prediction(i) for i in range(count)],
+        'service_version': '1.0.0',
+    }
+
+
+def measure(label: str, render: Callable[[], bytes], iterations: int) -> None:
+    """Run render repeatedly and report CPU per response and throughput."""
+    body = render()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    for _ in range(iterations):
+        render()
+    cpu_elapsed = time.process_time() - cpu_start
+    wall_elapsed = time.perf_counter() - wall_start
+
+    print(f"  {label:<8} {len(body):>10,} bytes  "
+          f"{cpu_elapsed / iterations * 1000:>9.3f} ms CPU/response  "
+          f"{len(body) * iterations / wall_elapsed / 1e6:>8.1f} MB/s")
+
+
+async def main() -> None:
+    # The API module starts background tasks on import, so import it
+    # from inside a running event loop
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+    from app.api.prediction import (
+        PredictionResponse, BatchPredictionResponse,
+        _single_prediction_response, _batch_prediction_response
+    )
+    from app.utils.serialization import encoder_name
+
+    single = make_prediction(1)
+    batch = make_batch(1000)
+
+    def before_single() -> bytes:
+        return JSONResponse(content=jsonable_encoder(PredictionResponse(**single))).body
+
+    def after_single() -> bytes:
+        return _single_prediction_response(single).body
+
+    def before_batch() -> bytes:
+        return JSONResponse(content=jsonable_encoder(BatchPredictionResponse(**batch))).body
+
+    def after_batch() -> bytes:
+        return _batch_prediction_response(batch).body
+
+    print(f"Encoder: {encoder_name()}")
+    print("1-row response:")
+    measure("before", before_single, 5000)
+    measure("after", after_single, 5000)
+    print("1,000-row response:")
+    measure("before", before_batch, 20)
+    measure("after", after_batch, 20)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,249 @@
+"""
+Redis Protocol Stand-In
+=======================
+
+A small in-process TCP server speaking the Redis protocol, for testing
+Redis code paths through a real redis-py client, connection pool and socket
+timeouts without a Redis server.
+
+Only the commands the application uses are implemented. Lua scripts cannot
+be executed, so each script the application loads is emulated by a Python
+handler registered under the script's text (see ``emulate_rate_limit_script``).
+"""
+
+import hashlib
+import math
+import socket
+import socketserver
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+# Handler(server, keys, args) -> reply, run under the server lock like a script
+ScriptHandler = Callable[["RedisStandIn", List[bytes], List[bytes]], Any]
+
+
+class RedisReplyError(Exception):
+    """Sent to the client as a RESP error reply."""
+
+
+class _RESPHandler(socketserver.StreamRequestHandler):
+    disable_nagle_algorithm = True  # Pipelined replies are written one by one
+
+    def handle(self):
+        stand_in: RedisStandIn = self.server.stand_in
+        while True:
+            try:
+                command = self._read_command()
+            except (ConnectionError, OSError):
+                return
+            if command is None:
+                return
+            if stand_in.delay:
+                time.sleep(stand_in.delay)
+            try:
+                reply = stand_in.execute(command)
+            except RedisReplyError as e:
+                self.wfile.write(b"-" + str(e).encode() + b"\r\n")
+            else:
+                self.wfile.write(_encode(reply))
+            self.wfile.flush()
+
+    def _read_command(self) -> Optional[List[bytes]]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            return line.split()
+        arguments = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            arguments.append(self.rfile.read(length + 2)[:-2])
+        return arguments
+
+
+def _encode(reply: Any) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    if isinstance(reply, bool):
+        return b":%d\r\n" % int(reply)
+    if isinstance(reply, int):
+        return b":%d\r\n" % reply
+    if isinstance(reply, str):
+        return b"+" + reply.encode() + b"\r\n"
+    if isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+    if isinstance(reply, (list, tuple)):
+        return b"*%d\r\n" % len(reply) + b"".join(_encode(item) for item in reply)
+    if isinstance(reply, dict):  # RESP3 map, only sent after HELLO 3
+        return b"%%%d\r\n" % len(reply) + b"".join(_encode(k) + _encode(v) for k, v in reply.items())
+    raise TypeError(f"Cannot encode {reply!r}")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class RedisStandIn:
+    """
+    In-process Redis protocol server.
+
+    Attributes:
+        delay: Seconds to sleep before each reply, to exercise client timeouts
+        clock: Server clock used by TIME and script emulations
+        commands: Count of commands received, by name
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.delay = 0.0
+        self.data: Dict[bytes, Dict[bytes, bytes]] = {}
+        self.expires: Dict[bytes, float] = {}
+        self.commands: Dict[str, int] = {}
+        self.scripts: Dict[str, bytes] = {}
+        self.script_handlers: Dict[bytes, ScriptHandler] = {}
+        self.lock = threading.Lock()
+        self._server: Optional[_Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"redis://{host}:{port}/0"
+
+    def start(self) -> "RedisStandIn":
+        self._server = _Server(("127.0.0.1", 0), _RESPHandler)
+        self._server.stand_in = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name="redis-stand-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop accepting connections and drop the open ones."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def register_script(self, script: str, handler: ScriptHandler) -> None:
+        """Emulate a Lua script with a Python handler."""
+        self.script_handlers[script.encode()] = handler
+
+    def execute(self, command: List[bytes]) -> Any:
+        name = command[0].upper().decode()
+        self.commands[name] = self.commands.get(name, 0) + 1
+        handler = getattr(self, f"_cmd_{name.lower()}", None)
+        if handler is None:
+            raise RedisReplyError(f"ERR unknown command '{name}'")
+        with self.lock:
+            return handler(command[1:])
+
+    # Key helpers, called under the lock
+
+    def hgetall(self, key: bytes) -> Dict[bytes, bytes]:
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at <= self.clock():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return self.data.get(key, {})
+
+    def hset(self, key: bytes, values: Dict[bytes, bytes]) -> None:
+        self.hgetall(key)
+        self.data.setdefault(key, {}).update(values)
+
+    def pexpire(self, key: bytes, milliseconds: int) -> None:
+        self.expires[key] = self.clock() + milliseconds / 1000
+
+    # Commands
+
+    def _cmd_ping(self, args):
+        return "PONG"
+
+    def _cmd_client(self, args):
+        return "OK"
+
+    def _cmd_hello(self, args):
+        # Replies below are valid in both RESP2 and RESP3
+        protocol = int(args[0]) if args else 2
+        info = {b"server": b"redis", b"version": b"7.2.0", b"proto": protocol, b"mode": b"standalone"}
+        if protocol == 3:
+            return info
+        return [item for pair in info.items() for item in pair]
+
+    def _cmd_flushall(self, args):
+        self.data.clear()
+        self.expires.clear()
+        return "OK"
+
+    def _cmd_time(self, args):
+        now = self.clock()
+        return [str(int(now)).encode(), str(int(now % 1 * 1_000_000)).encode()]
+
+    def _cmd_hgetall(self, args):
+        result = []
+        for field, value in self.hgetall(args[0]).items():
+            result.extend([field, value])
+        return result
+
+    def _cmd_pttl(self, args):
+        if not self.hgetall(args[0]):
+            return -2
+        expires_at = self.expires.get(args[0])
+        return -1 if expires_at is None else int((expires_at - self.clock()) * 1000)
+
+    def _cmd_script(self, args):
+        subcommand = args[0].upper()
+        if subcommand == b"LOAD":
+            sha = hashlib.sha1(args[1]).hexdigest()
+            self.scripts[sha] = args[1]
+            return sha.encode()
+        if subcommand == b"FLUSH":
+            self.scripts.clear()
+            return "OK"
+        if subcommand == b"EXISTS":
+            return [int(sha.decode() in self.scripts) for sha in args[1:]]
+        raise RedisReplyError("ERR unknown SCRIPT subcommand")
+
+    def _cmd_evalsha(self, args):
+        script = self.scripts.get(args[0].decode().lower())
+        if script is None:
+            raise RedisReplyError("NOSCRIPT No matching script. Please use EVAL.")
+        return self._run_script(script, args[1:])
+
+    def _cmd_eval(self, args):
+        self.scripts[hashlib.sha1(args[0]).hexdigest()] = args[0]
+        return self._run_script(args[0], args[1:])
+
+    def _run_script(self, script: bytes, args: List[bytes]) -> Any:
+        handler = self.script_handlers.get(script)
+        if handler is None:
+            raise RedisReplyError("ERR script not emulated by the stand-in")
+        key_count = int(args[0])
+        return handler(self, args[1:1 + key_count], args[1 + key_count:])
+
+
+def emulate_rate_limit_script(server: RedisStandIn, keys: List[bytes], args: List[bytes]) -> List[int]:
+    """Python port of app.middleware.auth.RATE_LIMIT_SCRIPT."""
+    limit = float(args[0])
+    rate = limit / float(args[1])
+    cost = float(args[2])
+    now = int(server.clock() * 1000)
+    state = server.hgetall(keys[0])
+    if b"tokens" not in state or b"ts" not in state:
+        tokens = limit
+    else:
+        tokens = min(limit, float(state[b"tokens"]) + max(0, now - int(state[b"ts"])) * rate)
+    if tokens < min(cost, limit):
+        return [0, math.floor(tokens * 1000), now]
+    tokens -= cost
+    server.hset(keys[0], {b"tokens": repr(tokens).encode(), b"ts": str(now).encode()})
+    server.pexpire(keys[0], math.ceil((limit - tokens) / rate) + 1000)
+    return [1, math.floor(tokens * 1000), now]
+
+
+def free_port() -> int:
+    """A local TCP port with nothing listening, for connection failure tests."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
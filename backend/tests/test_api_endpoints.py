@@ -16,7 +16,7 @@ Tests include success cases, error cases, validation, and edge cases.
 import pytest
 import json
 import time
-from unittest.mock import patch, Mock
+from unittest.mock import patch, Mock, AsyncMock
 from fastapi.testclient import TestClient
 from fastapi import status
 
@@ -70,6 +70,57 @@ class TestPredictionEndpoints:
             # Verify service was called
             mock_predict.assert_called_once()
 
+    def test_full_response_includes_recommendation_codes(self, authenticated_client, mock_auth_middleware,
+                                                         sample_worker_data):
+        """Default (full profile) responses carry the recommendation codes."""
+        codes = ['CAUTION_HYDRATE', 'CAUTION_REST']
+        with patch('app.api.prediction.prediction_service.predict_single_worker') as mock_predict:
+            mock_predict.return_value = {
+                'request_id': 'codes_123',
+                'worker_id': 'test_worker_001',
+                'timestamp': '2024-01-01T12:00:00',
+                'heat_exposure_risk_score': 0.35,
+                'risk_level': 'Caution',
+                'confidence': 0.87,
+                'temperature_celsius': 25.5,
+                'temperature_fahrenheit': 77.9,
+                'humidity_percent': 65.0,
+                'heat_index': 79.2,
+                'osha_recommendations': ['Increase hydration', 'Take rest breaks'],
+                'osha_recommendation_codes': codes,
+                'requires_immediate_attention': False,
+                'processing_time_ms': 145.6
+            }
+
+            response = authenticated_client.post("/api/v1/predict", json={"data": sample_worker_data})
+
+        assert response.status_code == 200
+        assert response.json()['osha_recommendation_codes'] == codes
+
+    def test_streamed_batch_includes_recommendation_codes(self, authenticated_client, mock_auth_middleware,
+                                                          batch_worker_data):
+        """NDJSON prediction records carry the recommendation codes and keep failed rows' errors."""
+        async def record_chunks():
+            yield [
+                {'record_type': 'prediction', 'batch_index': 0, 'worker_id': 'w0', 'risk_level': 'Caution',
+                 'osha_recommendation_key': 4, 'osha_recommendation_codes': ('CAUTION_HYDRATE',)},
+                {'record_type': 'prediction', 'batch_index': 1, 'worker_id': 'w1', 'error': 'bad row'}
+            ]
+            yield [{'record_type': 'batch_statistics', 'batch_size': 2}]
+
+        with patch('app.api.prediction.prediction_service.stream_multiple_workers',
+                   AsyncMock(return_value=record_chunks())):
+            response = authenticated_client.post(
+                "/api/v1/predict_batch", json={"data": batch_worker_data[:2]},
+                headers={"Accept": "application/x-ndjson"}
+            )
+
+        records = [json.loads(line) for line in response.text.splitlines()]
+        assert records[0]['osha_recommendation_codes'] == ['CAUTION_HYDRATE']
+        assert 'osha_recommendation_key' not in records[0]
+        assert records[1]['error'] == 'bad row'
+        assert records[2]['record_type'] == 'batch_statistics'
+
     def test_single_prediction_missing_auth(self, client, sample_worker_data):
         """Test single prediction without authentication."""
         request_data = {"data": sample_worker_data}
@@ -185,6 +236,28 @@ class TestPredictionEndpoints:
 
             mock_submit.assert_called_once()
 
+    def test_file_upload_written_in_batches(self, authenticated_client, mock_auth_middleware, tmp_path):
+        """Uploaded bodies reach disk intact when written in batches on the executor."""
+        from app.api import prediction
+
+        body = b"worker_id,Age\n" + b"".join(b"w%d,35\n" % i for i in range(300000))
+        received = {}
+
+        async def submit_file_job(file_path, **kwargs):
+            with open(file_path, 'rb') as f:
+                received['body'] = f.read()
+            return "job_upload_123"
+
+        with patch.object(prediction.settings, 'BATCH_RESULTS_DIR', str(tmp_path)), \
+             patch.object(prediction, 'UPLOAD_WRITE_BYTES', 64 * 1024), \
+             patch('app.api.prediction.batch_service.submit_file_job', side_effect=submit_file_job), \
+             patch('app.api.prediction.batch_service.get_job_status', return_value={'total_items': 300000}):
+            response = authenticated_client.post("/api/v1/predict_batch_upload?format=csv", content=body)
+
+        assert response.status_code == 200
+        assert response.json()['job_id'] == "job_upload_123"
+        assert received['body'] == body
+
     def test_batch_status_check(self, authenticated_client, mock_auth_middleware):
         """Test batch job status endpoint."""
         job_id = "test_job_123"
@@ -381,6 +454,19 @@ class TestHealthEndpoints:
 
             assert data['ready'] is False
 
+    def test_readiness_check_during_warmup(self, client):
+        """Test readiness is withheld while the model warms up."""
+        with patch('app.api.health.model_loader.is_model_loaded', return_value=True), \
+             patch('app.api.health.warmup_service.state', "running"):
+
+            response = client.get("/api/v1/readiness")
+
+            assert response.status_code == 503
+            data = response.json()
+
+            assert data['ready'] is False
+            assert data['reason'] == "Model warm-up in progress"
+
     def test_liveness_check(self, client):
         """Test Kubernetes liveness probe."""
         response = client.get("/api/v1/liveness")
@@ -579,6 +665,72 @@ class TestSystemEndpoints:
         assert 'api_version' in data
 
 
+class TestMetricsEndpoints:
+    """Test the Prometheus scrape endpoints."""
+
+    def test_metrics_endpoint(self, client):
+        """Operational metrics are served in the Prometheus text format."""
+        client.get("/api/v1/version")
+
+        response = client.get("/api/v1/metrics")
+
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert "# TYPE http_request_duration_seconds histogram" in body
+        assert "# TYPE heatguard_pipeline_stage_duration_seconds histogram" in body
+        assert 'http_requests_total{method="GET",handler="version",status="200"}' in body
+        assert "heatguard_batch_job_queue_depth" in body
+        assert 'heatguard_cache_hits_total{cache="model"}' in body
+
+    def test_business_metrics_endpoint(self, client):
+        """Prediction outcome counters are served separately."""
+        response = client.get("/api/v1/business-metrics")
+
+        assert response.status_code == 200
+        assert "# TYPE heatguard_predictions_total counter" in response.text
+        assert "heatguard_osha_compliance_logs_total" in response.text
+
+    def test_metrics_disabled(self, client):
+        """Scrapes return 404 when metrics are disabled."""
+        with patch('app.api.metrics.settings.METRICS_ENABLED', False):
+            response = client.get("/api/v1/metrics")
+
+        assert response.status_code == 404
+
+
+class TestRequestTracing:
+    """Test Server-Timing headers and the admin traces endpoint."""
+
+    def test_server_timing_header(self, client):
+        """Every response reports its stage timings."""
+        response = client.get("/api/v1/version")
+
+        assert response.status_code == 200
+        assert response.headers['server-timing'].startswith("total;dur=")
+        assert 'x-trace-id' not in response.headers
+
+    def test_sampled_request_is_kept(self, authenticated_client, mock_auth_middleware):
+        """Sampled requests are served by the admin traces endpoint under their request ID."""
+        with patch('app.utils.tracing.settings.TRACE_SAMPLE_RATE', 1.0):
+            response = authenticated_client.get("/api/v1/version", headers={"X-Request-ID": "trace-test-1"})
+        assert response.headers['x-trace-id'] == "trace-test-1"
+
+        response = authenticated_client.get("/api/v1/admin/traces", params={"path": "/api/v1/version"})
+
+        assert response.status_code == 200
+        traces = response.json()['traces']
+        assert traces[0]['trace_id'] == "trace-test-1"
+        assert traces[0]['status_code'] == 200
+        assert traces[0]['sampled'] is True
+
+    def test_traces_require_admin(self, client):
+        """The traces endpoint is not served without an API key."""
+        response = client.get("/api/v1/admin/traces")
+
+        assert response.status_code in (401, 403)
+
+
 class TestErrorHandling:
     """Test error handling across all endpoints."""
 
@@ -14,14 +14,18 @@ Comprehensive tests for HeatGuard authentication and security features:
 """
 
 import pytest
+import asyncio
+import json
 import time
 import hashlib
 import hmac
+import math
 from unittest.mock import Mock, patch, MagicMock
 from fastapi import HTTPException, status
 from fastapi.testclient import TestClient
 import redis
 
+from app.config.settings import settings
 from app.middleware.auth import (
     AuthMiddleware, RateLimiter, APIKeyError, RateLimitError,
     get_api_key, get_current_user, require_permission,
@@ -94,7 +98,8 @@ class TestAuthMiddleware:
 
         assert auth_middleware.valid_api_keys is not None
         assert auth_middleware.rate_limiter is not None
-        assert isinstance(auth_middleware.api_key_cache, dict)
+        assert len(auth_middleware.api_key_cache) == 0
+        assert len(auth_middleware.negative_key_cache) == 0
 
     def test_validate_api_key_success(self):
         """Test successful API key validation."""
@@ -135,6 +140,64 @@ class TestAuthMiddleware:
 
         assert result1 == result2
 
+    def test_validation_does_not_hash_loaded_keys(self):
+        """Expiry epochs and rate limit identifiers are computed once, when keys are loaded."""
+        auth_middleware = AuthMiddleware()
+        auth_middleware.set_api_keys({
+            "live-key": {"name": "Live", "active": True, "expires_at": "2099-01-01T00:00:00Z"},
+            "old-key": {"name": "Old", "active": True, "expires_at": "2020-01-01T00:00:00Z"},
+            "off-key": {"name": "Off", "active": False, "expires_at": None},
+        })
+
+        with patch('app.middleware.auth.hashlib.sha256', side_effect=AssertionError("hashed")), \
+                patch('app.middleware.auth.datetime', side_effect=AssertionError("parsed")):
+            for _ in range(3):
+                assert auth_middleware.validate_api_key("live-key")["name"] == "Live"
+            identifier = auth_middleware.get_key_identifier("live-key")
+            with pytest.raises(APIKeyError, match="expired"):
+                auth_middleware.validate_api_key("old-key")
+            with pytest.raises(APIKeyError, match="deactivated"):
+                auth_middleware.validate_api_key("off-key")
+
+        assert identifier == hash_api_key("live-key")
+        stats = auth_middleware.get_cache_stats()["valid_keys"]
+        assert (stats["hits"], stats["misses"]) == (2, 3)
+
+    def test_key_caches_are_bounded(self):
+        """Random invalid keys fill a bounded LRU cache instead of growing memory."""
+        with patch.object(settings, 'API_KEY_NEGATIVE_CACHE_SIZE', 100):
+            auth_middleware = AuthMiddleware()
+
+        for i in range(1000):
+            with pytest.raises(APIKeyError):
+                auth_middleware.validate_api_key(f"stuffed-key-{i}")
+
+        stats = auth_middleware.get_cache_stats()["invalid_keys"]
+        assert stats["size"] == 100
+        assert stats["evictions"] == 900
+        assert "stuffed-key-999" in auth_middleware.negative_key_cache
+        assert "stuffed-key-0" not in auth_middleware.negative_key_cache
+
+        # Repeated bad keys are rejected from the cache without a key store lookup
+        with patch.object(auth_middleware, '_lookup_api_key') as lookup:
+            with pytest.raises(APIKeyError):
+                auth_middleware.validate_api_key("stuffed-key-999")
+            lookup.assert_not_called()
+
+    def test_key_cache_entries_expire(self):
+        """Cached keys are looked up again after their TTL, so key store changes take effect."""
+        auth_middleware = AuthMiddleware()
+        api_key = "heatguard-api-key-demo-12345"
+
+        with patch('app.middleware.auth.time.time', return_value=1000.0):
+            auth_middleware.validate_api_key(api_key)
+        with patch('app.middleware.auth.time.time', return_value=1000.0 + settings.API_KEY_CACHE_TTL), \
+                patch.object(auth_middleware, '_lookup_api_key', return_value=None):
+            with pytest.raises(APIKeyError, match="Invalid"):
+                auth_middleware.validate_api_key(api_key)
+
+        assert auth_middleware.get_cache_stats()["valid_keys"]["expirations"] == 1
+
     def test_check_permissions(self):
         """Test permission checking."""
         auth_middleware = AuthMiddleware()
@@ -180,8 +243,8 @@ class TestRateLimiting:
         """Test RateLimiter initialization."""
         rate_limiter = RateLimiter()
 
-        assert rate_limiter.in_memory_store is not None
-        assert rate_limiter.lock is not None
+        assert len(rate_limiter._locks) == RateLimiter.LOCK_STRIPES
+        assert rate_limiter.get_tracked_identifiers() == 0
 
     def test_rate_limit_check_success(self):
         """Test successful rate limit check."""
@@ -221,49 +284,52 @@ class TestRateLimiting:
         with pytest.raises(RateLimitError):
             rate_limiter.check_rate_limit(identifier, limit=3, window_minutes=1)
 
-        # Clear the in-memory store to simulate window reset
-        rate_limiter.in_memory_store[identifier] = []
-
-        # Should allow requests again
-        result = rate_limiter.check_rate_limit(identifier, limit=3, window_minutes=1)
+        # A full window later the bucket has refilled
+        with patch('app.middleware.auth.time.time', return_value=time.time() + 60):
+            result = rate_limiter.check_rate_limit(identifier, limit=3, window_minutes=1)
         assert result["allowed"] is True
+        assert result["remaining"] == 2
 
-    @patch('redis.from_url')
-    def test_redis_rate_limiting(self, mock_redis_factory):
-        """Test Redis-based rate limiting."""
-        mock_redis = Mock()
-        mock_redis.ping.return_value = True
-        mock_redis.pipeline.return_value = mock_redis
-        mock_redis.zremrangebyscore.return_value = None
-        mock_redis.zcard.return_value = 2
-        mock_redis.zadd.return_value = 1
-        mock_redis.expire.return_value = True
-        mock_redis.execute.return_value = [None, 2, 1, True]
-
-        mock_redis_factory.return_value = mock_redis
-
-        rate_limiter = RateLimiter()
-
-        result = rate_limiter.check_rate_limit("redis_test", limit=10, window_minutes=1)
-
-        assert result["allowed"] is True
-        assert result["current_count"] == 3  # 2 existing + 1 new
-
-    @patch('redis.from_url')
-    def test_redis_rate_limit_exceeded(self, mock_redis_factory):
-        """Test Redis rate limit exceeded."""
-        mock_redis = Mock()
-        mock_redis.ping.return_value = True
-        mock_redis.pipeline.return_value = mock_redis
-        mock_redis.execute.return_value = [None, 10, 1, True]  # Already at limit
-        mock_redis.zrange.return_value = [(b'123456789', time.time())]
+    def test_token_bucket_refill_and_reset_headers(self):
+        """The in-memory bucket refills at limit per window and reports when a request is allowed again."""
+        with patch('redis.from_url', side_effect=Exception("Redis unavailable")):
+            rate_limiter = RateLimiter()
 
-        mock_redis_factory.return_value = mock_redis
+        with patch('app.middleware.auth.time.time', return_value=1000.0):
+            results = [rate_limiter.check_rate_limit("bucket_test", limit=60, window_minutes=1) for _ in range(60)]
+            with pytest.raises(RateLimitError) as exc_info:
+                rate_limiter.check_rate_limit("bucket_test", limit=60, window_minutes=1)
+
+        assert [result["remaining"] for result in results[:3]] == [59, 58, 57]
+        assert results[-1]["remaining"] == 0
+        assert results[-1]["reset_time"] == 1060  # Full again a window after the burst
+        assert exc_info.value.limit == 60
+        assert exc_info.value.retry_after == 1  # One token per second
+        assert exc_info.value.reset_time == 1001
+
+        # 1.5 seconds later one token is back, not the whole window
+        with patch('app.middleware.auth.time.time', return_value=1001.5):
+            assert rate_limiter.check_rate_limit("bucket_test", limit=60, window_minutes=1)["remaining"] == 0
+            with pytest.raises(RateLimitError):
+                rate_limiter.check_rate_limit("bucket_test", limit=60, window_minutes=1)
+
+    def test_idle_buckets_are_evicted(self):
+        """Buckets that have refilled are dropped by the periodic stripe sweep."""
+        with patch('redis.from_url', side_effect=Exception("Redis unavailable")):
+            rate_limiter = RateLimiter()
 
-        rate_limiter = RateLimiter()
+        with patch('app.middleware.auth.time.time', return_value=1000.0):
+            for i in range(200):
+                rate_limiter.check_rate_limit(f"idle_{i}", limit=100, window_minutes=1)
+        assert rate_limiter.get_tracked_identifiers() == 200
 
-        with pytest.raises(RateLimitError):
-            rate_limiter.check_rate_limit("redis_test", limit=10, window_minutes=1)
+        # Requests sweep the stripe they land in once per interval
+        with patch('app.middleware.auth.time.time', return_value=1000.0 + RateLimiter.SWEEP_INTERVAL + 1):
+            rate_limiter.check_rate_limit("active", limit=100, window_minutes=1)
+            stripe = hash("active") & (RateLimiter.LOCK_STRIPES - 1)
+            assert list(rate_limiter._buckets[stripe]) == ["active"]
+            assert rate_limiter.evict_idle() > 0
+        assert rate_limiter.get_tracked_identifiers() == 1
 
     def test_redis_fallback_to_memory(self):
         """Test fallback to memory-based rate limiting when Redis fails."""
@@ -275,6 +341,212 @@ class TestRateLimiting:
             assert result["allowed"] is True
 
 
+class TestRedisRateLimiting:
+    """Test the Redis rate limiting script through a Redis protocol stand-in."""
+
+    @pytest.fixture
+    def redis_stand_in(self):
+        from app.middleware.auth import RATE_LIMIT_SCRIPT
+        from tests.fixtures.redis_server import RedisStandIn, emulate_rate_limit_script
+
+        server = RedisStandIn(clock=Mock(return_value=1000.0)).start()
+        server.register_script(RATE_LIMIT_SCRIPT, emulate_rate_limit_script)
+        yield server
+        server.stop()
+
+    @staticmethod
+    def _rate_limiter(url):
+        return RateLimiter(redis_client=redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2))
+
+    def test_check_and_take_in_one_round_trip(self, redis_stand_in):
+        """Each check is a single EVALSHA against a compact per-identifier hash."""
+        rate_limiter = self._rate_limiter(redis_stand_in.url)
+
+        results = [rate_limiter.check_rate_limit("redis_test", limit=10, window_minutes=1) for _ in range(10)]
+        with pytest.raises(RateLimitError) as exc_info:
+            rate_limiter.check_rate_limit("redis_test", limit=10, window_minutes=1)
+
+        assert [result["remaining"] for result in results[:3]] == [9, 8, 7]
+        assert results[-1]["current_count"] == 10
+        assert results[-1]["reset_time"] == 1060  # Server clock, full again a window later
+        assert exc_info.value.reset_time == 1006  # One token every 6 seconds
+        assert exc_info.value.retry_after == 6
+
+        # The first EVALSHA misses and loads the script; every later check is one command
+        assert redis_stand_in.commands["SCRIPT"] == 1
+        assert redis_stand_in.commands["EVALSHA"] == 11 + 1
+        state = redis_stand_in.data[b"rate_limit:tb:redis_test"]
+        assert set(state) == {b"tokens", b"ts"}
+        assert 0 < redis_stand_in.expires[b"rate_limit:tb:redis_test"] - 1000.0 <= 61
+
+        # Instances sharing the server share the bucket
+        with pytest.raises(RateLimitError):
+            self._rate_limiter(redis_stand_in.url).check_rate_limit("redis_test", limit=10, window_minutes=1)
+
+        redis_stand_in.clock.return_value = 1012.0
+        assert rate_limiter.check_rate_limit("redis_test", limit=10, window_minutes=1)["remaining"] == 1
+
+    def test_falls_back_to_memory_on_timeout(self, redis_stand_in):
+        """A slow server trips the socket timeout; the local limiter takes over for the retry interval."""
+        rate_limiter = self._rate_limiter(redis_stand_in.url)
+        rate_limiter.check_rate_limit("slow", limit=5, window_minutes=1)
+        redis_stand_in.delay = 0.5
+
+        start = time.perf_counter()
+        result = rate_limiter.check_rate_limit("slow", limit=5, window_minutes=1)
+        assert result["allowed"] is True
+        assert rate_limiter.redis_fallbacks == 1
+
+        # Later checks skip Redis instead of waiting for the timeout again
+        for _ in range(4):
+            rate_limiter.check_rate_limit("slow", limit=5, window_minutes=1)
+        assert time.perf_counter() - start < 1.0
+        with pytest.raises(RateLimitError):
+            rate_limiter.check_rate_limit("slow", limit=5, window_minutes=1)
+        assert rate_limiter.redis_fallbacks == 1
+
+        # Redis is tried again after the interval
+        redis_stand_in.delay = 0
+        with patch('app.middleware.auth.time.time', return_value=time.time() + 3600):
+            rate_limiter.check_rate_limit("slow", limit=5, window_minutes=1)
+        assert redis_stand_in.commands["EVALSHA"] >= 3
+
+    def test_falls_back_to_memory_when_unreachable(self):
+        """Connection errors use the local limiter."""
+        from tests.fixtures.redis_server import free_port
+
+        rate_limiter = self._rate_limiter(f"redis://127.0.0.1:{free_port()}/0")
+        result = rate_limiter.check_rate_limit("unreachable", limit=5, window_minutes=1)
+
+        assert result["allowed"] is True
+        assert rate_limiter.redis_fallbacks == 1
+
+    def test_shared_client_pool(self):
+        """get_redis_client returns one pooled client per URL with the configured limits."""
+        from app.utils.redis_client import close_redis_clients, get_redis_client
+        from tests.fixtures.redis_server import free_port
+
+        url = f"redis://127.0.0.1:{free_port()}/0"
+        try:
+            client = get_redis_client(url)
+            assert get_redis_client(url) is client
+            assert client.connection_pool.max_connections == settings.REDIS_MAX_CONNECTIONS
+            assert client.connection_pool.connection_kwargs["socket_timeout"] == settings.REDIS_SOCKET_TIMEOUT
+        finally:
+            close_redis_clients()
+
+
+class TestComputeQuotas:
+    """Test cost-weighted quotas charged by rows scored."""
+
+    @staticmethod
+    def _quota_manager(redis_client=None, **key_info):
+        from app.middleware.quota import QuotaManager
+
+        with patch('redis.from_url', side_effect=Exception("Redis unavailable")):
+            auth = AuthMiddleware()
+        auth.set_api_keys({"quota-key": {"name": "Quota Key", "active": True, **key_info}})
+        rate_limiter = RateLimiter(redis_client=redis_client) if redis_client else auth.rate_limiter
+        return QuotaManager(auth=auth, rate_limiter=rate_limiter)
+
+    def test_batch_costs_rows_scored(self):
+        """A 1,000-row batch is charged 1,000 units where a single prediction is charged one."""
+        quota_manager = self._quota_manager(rows_per_second=10, burst_rows=2000)
+
+        with patch('app.middleware.auth.time.time', return_value=1000.0):
+            single = quota_manager.charge("quota-key", "predict", rows=1)
+            batch = quota_manager.charge("quota-key", "predict_batch", rows=1000)
+            background = quota_manager.charge("quota-key", "predict_batch_async", rows=1000)
+            upload = quota_manager.charge("quota-key", "predict_batch_upload", bytes_received=40_000)
+
+        assert single["cost"] == 1
+        assert batch["cost"] == 1000
+        assert background["cost"] == 1000 * settings.QUOTA_ASYNC_ROW_WEIGHT
+        assert upload["cost"] == 40_000 / settings.QUOTA_UPLOAD_BYTES_PER_ROW * settings.QUOTA_ASYNC_ROW_WEIGHT
+        assert batch["remaining"] == 999
+        assert quota_manager.get_metrics()["charged_units"]["predict_batch"] == 1000
+
+    def test_large_request_leaves_debt(self):
+        """A request larger than the burst is admitted from a full budget and repaid before the next one."""
+        quota_manager = self._quota_manager(rows_per_second=100, burst_rows=500)
+
+        with patch('app.middleware.auth.time.time', return_value=1000.0):
+            result = quota_manager.charge("quota-key", "predict_batch", rows=1000)
+            with pytest.raises(HTTPException) as exc_info:
+                quota_manager.charge("quota-key", "predict", rows=1)
+
+        assert result["remaining"] == -500
+        assert exc_info.value.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert exc_info.value.headers["Retry-After"] == "6"  # 501 units at 100 per second
+        assert exc_info.value.headers["X-Quota-Cost"] == "1"
+        assert exc_info.value.headers["X-Quota-Remaining"] == "0"
+        assert quota_manager.get_metrics()["rejected_requests"] == {"predict": 1}
+
+        with patch('app.middleware.auth.time.time', return_value=1005.1):
+            assert quota_manager.charge("quota-key", "predict", rows=1)["allowed"] is True
+
+    def test_quota_headers_and_budgets(self):
+        """Keys without a budget get the defaults; headers report what was charged and what is left."""
+        from app.middleware.quota import quota_headers
+
+        quota_manager = self._quota_manager()
+        identifier, rate, burst = quota_manager.get_budget("quota-key")
+        assert identifier == "quota:" + hashlib.sha256(b"quota-key").hexdigest()
+        assert (rate, burst) == (settings.QUOTA_ROWS_PER_SECOND, settings.QUOTA_BURST_ROWS)
+        assert quota_manager.get_budget(None)[0] == "quota:anonymous"
+
+        with patch('app.middleware.auth.time.time', return_value=1000.0):
+            headers = quota_headers(quota_manager.charge("quota-key", "predict_batch", rows=10))
+
+        assert headers["X-Quota-Cost"] == "10"
+        assert headers["X-Quota-Remaining"] == str(int(settings.QUOTA_BURST_ROWS) - 10)
+        assert headers["X-Quota-Limit"] == f"{settings.QUOTA_ROWS_PER_SECOND:g}"
+        assert headers["X-Quota-Reset"] == str(1000 + math.ceil(10 / settings.QUOTA_ROWS_PER_SECOND))
+        assert quota_headers(None) == {}
+
+        with patch.object(settings, 'QUOTA_ENABLED', False):
+            assert quota_manager.charge("quota-key", "predict_batch", rows=10 ** 6) is None
+
+    def test_unknown_keys_share_anonymous_budget(self):
+        """Rotating made-up keys are charged to one shared budget, not a fresh one each."""
+        quota_manager = self._quota_manager()
+
+        assert quota_manager.get_budget("made-up-key")[0] == "quota:anonymous"
+        with patch('app.middleware.auth.time.time', return_value=1000.0):
+            quota_manager.charge("bogus-key-0", "predict_batch", rows=20_000)
+            with pytest.raises(HTTPException) as exc_info:
+                for i in range(1, 200):
+                    quota_manager.charge(f"bogus-key-{i}", "predict_batch", rows=20_000)
+
+        assert exc_info.value.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert quota_manager.get_metrics()["rejected_requests"] == {"predict_batch": 1}
+
+    def test_redis_budget_shared_across_instances(self):
+        """Quota budgets live in Redis alongside the rate limits, one EVALSHA per charge."""
+        from app.middleware.auth import RATE_LIMIT_SCRIPT
+        from tests.fixtures.redis_server import RedisStandIn, emulate_rate_limit_script
+
+        server = RedisStandIn(clock=Mock(return_value=1000.0)).start()
+        server.register_script(RATE_LIMIT_SCRIPT, emulate_rate_limit_script)
+        try:
+            def client():
+                return redis.from_url(server.url, socket_timeout=0.2, socket_connect_timeout=0.2)
+
+            first = self._quota_manager(client(), rows_per_second=10, burst_rows=100)
+            second = self._quota_manager(client(), rows_per_second=10, burst_rows=100)
+
+            assert first.charge("quota-key", "predict_batch", rows=80)["remaining"] == 20
+            with pytest.raises(HTTPException) as exc_info:
+                second.charge("quota-key", "predict_batch", rows=30)
+            assert exc_info.value.headers["Retry-After"] == "1"
+
+            server.clock.return_value = 1001.0
+            assert second.charge("quota-key", "predict_batch", rows=30)["remaining"] == 0
+            assert first.rate_limiter.redis_fallbacks == 0
+        finally:
+            server.stop()
+
+
 class TestPermissionSystem:
     """Test permission-based access control."""
 
@@ -426,6 +698,75 @@ class TestSecurityHeaders:
         assert "X-Frame-Options" in response.headers
 
 
+class TestRequestMiddleware:
+    """Test the pure ASGI request logging and security headers middleware."""
+
+    @staticmethod
+    def _request(app, path="/"):
+        """Run one GET through the middleware and return the messages it sent."""
+        from app.middleware.request_middleware import LoggingAndSecurityMiddleware
+
+        scope = {"type": "http", "method": "GET", "path": path, "headers": [], "query_string": b""}
+        sent = []
+        requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await asyncio.Event().wait()  # No disconnect until the response ends
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(LoggingAndSecurityMiddleware(app)(scope, receive, send))
+        return sent
+
+    def test_headers_added_and_override_endpoint_values(self):
+        """Security headers and timing are added; endpoint values for the same names are replaced."""
+        from starlette.responses import JSONResponse
+
+        app = JSONResponse({"ok": True}, headers={"Cache-Control": "max-age=60", "X-Custom": "kept"})
+        start, body = self._request(app)
+        headers = [(name.decode(), value.decode()) for name, value in start["headers"]]
+
+        assert start["status"] == 200
+        assert body["body"] == b'{"ok":true}'
+        for name, value in SecurityHeaders.get_security_headers().items():
+            assert (name.lower(), value) in headers
+        assert [value for name, value in headers if name == "cache-control"] == ["no-cache, no-store, must-revalidate"]
+        assert ("x-custom", "kept") in headers
+        assert float(dict(headers)["x-process-time"]) >= 0
+
+    def test_streaming_response_not_buffered(self):
+        """Streamed chunks pass through one by one; completion is logged after the last chunk."""
+        from starlette.responses import StreamingResponse
+
+        async def chunks():
+            for i in range(3):
+                yield f"chunk{i}\n".encode()
+
+        with patch('app.middleware.request_middleware.logger') as mock_logger:
+            sent = self._request(StreamingResponse(chunks(), media_type="text/plain"))
+
+        assert [message.get("body") for message in sent[1:]] == [b"chunk0\n", b"chunk1\n", b"chunk2\n", b""]
+        assert b"x-process-time" in dict(sent[0]["headers"])
+        mock_logger.info.assert_called_once()
+        assert mock_logger.info.call_args.kwargs["status_code"] == 200
+
+    def test_unhandled_exception_returns_json_error(self):
+        """Exceptions before the response started become a JSON 500 with security headers."""
+        async def failing_app(scope, receive, send):
+            raise RuntimeError("boom")
+
+        with patch('app.middleware.request_middleware.logger') as mock_logger:
+            start, body = self._request(failing_app, "/api/v1/predict")
+
+        assert start["status"] == 500
+        assert json.loads(body["body"])["error"] == "Internal server error"
+        assert dict(start["headers"])[b"x-frame-options"] == b"DENY"
+        assert mock_logger.error.call_args.kwargs["error"] == "boom"
+
+
 class TestSecurityUtilities:
     """Test security utility functions."""
 
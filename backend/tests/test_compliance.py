@@ -24,6 +24,7 @@ from typing import Dict, List, Any
 import csv
 import io
 
+import app.services.compliance_service as compliance_module
 from app.services.compliance_service import ComplianceService
 from app.config.model_config import OSHA_STANDARDS
 
@@ -190,6 +191,215 @@ class TestOSHAComplianceService:
                 assert 'audit_worker_002' in content
 
 
+class TestComplianceRecommendationKeys:
+    """Test that compliance entries reference the shared recommendation tables."""
+
+    @pytest.fixture
+    def compliance_service(self):
+        return ComplianceService()
+
+    def test_compliance_entry_stores_recommendation_codes(self, compliance_service):
+        """Entries carry the recommendation key and codes instead of copied text."""
+        from app.models.heat_predictor import RECOMMENDATION_CODE_SETS
+
+        entry = compliance_service._create_compliance_entry({
+            'worker_id': 'comp_worker_002',
+            'heat_exposure_risk_score': 0.9,
+            'risk_level': 'Danger',
+            'heat_index': 135.0,
+            'osha_recommendation_key': 15
+        })
+
+        recommendations = entry['safety_recommendations']
+        assert recommendations['recommendation_key'] == 15
+        assert recommendations['recommendation_codes'] is RECOMMENDATION_CODE_SETS[15]
+        assert recommendations['recommendation_count'] == len(RECOMMENDATION_CODE_SETS[15])
+        assert 'recommendations' not in recommendations
+
+    def test_immediate_action_alert_includes_text(self, compliance_service):
+        """Immediate action alerts resolve the top recommendations to text."""
+        with patch.object(compliance_service.writer, 'submit_priority') as mock_submit:
+            compliance_service._log_immediate_action_required({
+                'worker_id': 'comp_worker_003',
+                'heat_exposure_risk_score': 0.9,
+                'heat_index': 135.0,
+                'osha_recommendation_key': 15
+            })
+
+        alert = mock_submit.call_args[0][0]
+        assert alert['immediate_recommendations'][0] == "STOP strenuous outdoor work immediately"
+        assert len(alert['immediate_recommendations']) == 3
+
+    def test_batch_alerts_sent_before_bulk_entries(self, compliance_service):
+        """Immediate action alerts in a batch go out before any routine entry is queued."""
+        calls = []
+        with patch.object(compliance_service.writer, 'submit', side_effect=lambda *a, **k: calls.append('bulk')), \
+                patch.object(compliance_service.writer, 'submit_priority',
+                             side_effect=lambda entry, **k: calls.append(entry['compliance_event'])):
+            compliance_service.log_batch_predictions([
+                {'worker_id': f'batch_worker_{i}', 'heat_exposure_risk_score': 0.9 if i == 99 else 0.2,
+                 'heat_index': 80.0}
+                for i in range(100)
+            ])
+
+        assert calls[:2] == ['IMMEDIATE_ACTION_REQUIRED', 'BATCH_HIGH_RISK_ALERT']
+        assert calls[2:] == ['bulk'] * 101
+
+
+class TestComplianceSegmentReports:
+    """Test compliance reports answered from the segment store."""
+
+    @pytest.fixture
+    def compliance_service(self):
+        from app.utils.compliance_store import ComplianceSegmentStore
+        from app.utils.compliance_writer import ComplianceWriter
+
+        temp_dir = tempfile.mkdtemp()
+        service = ComplianceService()
+        service.writer = ComplianceWriter(
+            store=ComplianceSegmentStore(root=os.path.join(temp_dir, 'segments')),
+            flush_interval_ms=5
+        )
+        with patch.object(compliance_module.settings, 'OSHA_LOG_FILE', os.path.join(temp_dir, 'legacy.log')):
+            yield service
+        service.writer.close(timeout=5)
+
+    def test_report_reads_only_requested_period(self, compliance_service):
+        """Reports count assessments inside the period across hourly segments."""
+        base = datetime(2024, 7, 1, 8, 0)
+        for i in range(12):
+            compliance_service.log_prediction({
+                'timestamp': (base + timedelta(minutes=30 * i)).isoformat(),
+                'worker_id': f'seg_worker_{i % 3}',
+                'heat_exposure_risk_score': 0.2,
+                'risk_level': 'Safe',
+                'heat_index': 80.0
+            })
+
+        report = compliance_service.generate_compliance_report(base + timedelta(hours=1), base + timedelta(hours=3))
+
+        assert report['summary_statistics']['total_assessments'] == 5
+        assert report['summary_statistics']['unique_workers'] == 3
+
+    def test_report_filters_workers(self, compliance_service):
+        """Worker filters are applied while reading segments."""
+        base = datetime(2024, 7, 1, 8, 0)
+        for i in range(6):
+            compliance_service.log_prediction({
+                'timestamp': (base + timedelta(minutes=i)).isoformat(),
+                'worker_id': f'seg_worker_{i % 2}',
+                'heat_exposure_risk_score': 0.2,
+                'heat_index': 80.0
+            })
+
+        report = compliance_service.generate_compliance_report(
+            base, base + timedelta(hours=1), worker_ids=['seg_worker_1']
+        )
+
+        assert report['summary_statistics']['total_assessments'] == 3
+        assert report['detailed_analysis']['worker_list'] == ['seg_worker_1']
+
+
+    def test_report_answered_from_rollups(self, compliance_service):
+        """Whole hours come from rollups; only partial edge hours read raw entries."""
+        base = datetime(2024, 7, 1, 8, 0)
+        predictions = [{
+            'timestamp': (base + timedelta(minutes=15 * i)).isoformat(),
+            'worker_id': f'seg_worker_{i % 4}',
+            'heat_exposure_risk_score': 0.9 if i % 4 == 0 else 0.3,
+            'risk_level': 'Danger' if i % 4 == 0 else 'Caution',
+            'heat_index': 110.0,
+            'requires_immediate_attention': i % 4 == 0
+        } for i in range(16)]
+        compliance_service.log_batch_predictions(predictions)
+
+        whole = compliance_service.generate_compliance_report(base, base + timedelta(hours=4) - timedelta(microseconds=1))
+        partial = compliance_service.generate_compliance_report(base + timedelta(minutes=30), base + timedelta(hours=4))
+
+        assert whole['report_metadata']['raw_entries_scanned'] == 0
+        assert whole['summary_statistics']['total_assessments'] == 16
+        assert whole['detailed_analysis']['high_risk_incidents'] == 4
+        assert whole['detailed_analysis']['risk_level_distribution'] == {'Danger': 4, 'Caution': 12}
+        assert whole['detailed_analysis']['maximum_heat_index'] == 110.0
+        assert partial['report_metadata']['hours_from_rollups'] == 3
+        assert partial['summary_statistics']['total_assessments'] == 14
+
+
+class TestComplianceExport:
+    """Test streaming exports of raw compliance entries."""
+
+    @pytest.fixture
+    def compliance_service(self):
+        from app.utils.compliance_store import ComplianceSegmentStore
+        from app.utils.compliance_writer import ComplianceWriter
+
+        temp_dir = tempfile.mkdtemp()
+        service = ComplianceService()
+        service.writer = ComplianceWriter(
+            store=ComplianceSegmentStore(root=os.path.join(temp_dir, 'segments')),
+            flush_interval_ms=5
+        )
+        base = datetime(2024, 7, 1, 8, 0)
+        service.log_batch_predictions([{
+            'timestamp': (base + timedelta(minutes=20 * i)).isoformat(),
+            'worker_id': f'export_worker_{i % 3}',
+            'heat_exposure_risk_score': 0.3,
+            'risk_level': 'Caution',
+            'heat_index': 92.0,
+            'osha_recommendation_key': 1
+        } for i in range(30)])
+        with patch.object(compliance_module.settings, 'OSHA_LOG_FILE', os.path.join(temp_dir, 'legacy.log')):
+            yield service
+        service.writer.close(timeout=5)
+
+    def test_ndjson_export_filters_while_streaming(self, compliance_service):
+        """NDJSON exports stream one entry per line for the requested workers and period."""
+        base = datetime(2024, 7, 1, 8, 0)
+        with patch.object(compliance_module.settings, 'COMPLIANCE_EXPORT_CHUNK_ROWS', 2):
+            export_id, chunks = compliance_service.export_compliance_entries(
+                base, base + timedelta(hours=4), worker_ids=['export_worker_1']
+            )
+            chunks = list(chunks)
+
+        entries = [json.loads(line) for line in b''.join(chunks).splitlines()]
+        assert len(chunks) > 1
+        assert len(entries) == 4
+        assert {entry['worker_identification']['worker_id'] for entry in entries} == {'export_worker_1'}
+
+        progress = compliance_service.get_export_progress(export_id)
+        assert progress['status'] == 'completed'
+        assert progress['entries_exported'] == 4
+        assert progress['segments_done'] == progress['segments_total'] == 5
+        assert progress['bytes_written'] == len(b''.join(chunks))
+
+    def test_csv_export_with_gzip(self, compliance_service):
+        """CSV exports have one column per field and can be gzipped."""
+        import gzip
+
+        base = datetime(2024, 7, 1, 8, 0)
+        _, chunks = compliance_service.export_compliance_entries(
+            base, base + timedelta(days=1), export_format='csv', compress=True,
+            fields=['worker_identification.worker_id', 'risk_assessment.risk_level',
+                    'safety_recommendations.recommendation_codes']
+        )
+        rows = list(csv.reader(io.StringIO(gzip.decompress(b''.join(chunks)).decode())))
+
+        assert rows[0] == ['worker_identification.worker_id', 'risk_assessment.risk_level',
+                           'safety_recommendations.recommendation_codes']
+        assert len(rows) == 31
+        assert rows[1][:2] == ['export_worker_0', 'Caution']
+        assert ';' in rows[1][2]
+
+    def test_invalid_export_requests(self, compliance_service):
+        """Unknown formats and inverted periods are rejected before streaming."""
+        base = datetime(2024, 7, 1, 8, 0)
+        with pytest.raises(ValueError):
+            compliance_service.export_compliance_entries(base, base + timedelta(hours=1), export_format='xml')
+        with pytest.raises(ValueError):
+            compliance_service.export_compliance_entries(base, base - timedelta(hours=1))
+        assert compliance_service.get_export_progress('missing') is None
+
+
 class TestOSHAReporting:
     """Test OSHA reporting and documentation functionality."""
 
@@ -19,11 +19,17 @@ import pandas as pd
 from unittest.mock import Mock, patch, MagicMock
 import tempfile
 import os
+import time
+import itertools
+from concurrent.futures import ThreadPoolExecutor
 import joblib
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 
-from app.models.heat_predictor import HeatExposurePredictor
+from app.models.heat_predictor import (
+    HeatExposurePredictor, COMPACT_PREDICTION_FIELDS, RECOMMENDATION_CODE_SETS, recommendation_text
+)
+from app.config.model_config import OSHA_RECOMMENDATIONS
 
 
 class TestModelInitialization:
@@ -134,7 +140,7 @@ class TestSinglePrediction:
         assert 'temperature_fahrenheit' in result
         assert 'humidity_percent' in result
         assert 'heat_index' in result
-        assert 'osha_recommendations' in result
+        assert 'osha_recommendation_key' in result
         assert 'requires_immediate_attention' in result
         assert 'worker_id' in result
         assert 'timestamp' in result
@@ -147,8 +153,8 @@ class TestSinglePrediction:
         assert result['risk_level'] in ['Safe', 'Caution', 'Warning', 'Danger']
 
         # Validate recommendations
-        assert isinstance(result['osha_recommendations'], list)
-        assert len(result['osha_recommendations']) > 0
+        assert isinstance(result['osha_recommendation_key'], int)
+        assert len(recommendation_text(result['osha_recommendation_key'])) > 0
 
     def test_single_prediction_with_missing_features(self, mock_heat_predictor, missing_features_data):
         """Test single prediction with missing features."""
@@ -183,7 +189,7 @@ class TestSinglePrediction:
         assert result['requires_immediate_attention'] is True
 
         # Should have relevant OSHA recommendations
-        recommendations = result['osha_recommendations']
+        recommendations = recommendation_text(result['osha_recommendation_key'])
         high_risk_keywords = ['STOP', 'immediate', 'medical', 'emergency', 'air-conditioned']
         assert any(keyword in ' '.join(recommendations) for keyword in high_risk_keywords)
 
@@ -370,6 +376,61 @@ class TestOSHARecommendations:
         assert any(keyword in rec_text for keyword in ['extreme', 'danger', 'cease'])
 
 
+class TestPredictionFieldSelection:
+    """Test field selection and recommendation codes."""
+
+    def test_compact_prediction_fields(self, mock_heat_predictor, sample_worker_data):
+        """Test that a compact prediction only computes the requested fields."""
+        result = mock_heat_predictor.predict_single(
+            sample_worker_data, fields=COMPACT_PREDICTION_FIELDS
+        )
+
+        for field in COMPACT_PREDICTION_FIELDS:
+            assert field in result
+
+        # Unrequested parts are never built
+        assert 'timestamp' not in result
+        assert 'class_probabilities' not in result
+        assert 'predicted_thermal_class' not in result
+
+    def test_compact_matches_full_prediction(self, mock_heat_predictor, sample_worker_data):
+        """Test that field selection does not change the shared values."""
+        full = mock_heat_predictor.predict_single(sample_worker_data.copy())
+        compact = mock_heat_predictor.predict_single(
+            sample_worker_data.copy(), fields=COMPACT_PREDICTION_FIELDS
+        )
+
+        for field in COMPACT_PREDICTION_FIELDS:
+            assert compact[field] == full[field]
+
+    def test_recommendation_codes_resolve_to_text(self, mock_heat_predictor, sample_worker_data):
+        """Test that recommendation codes resolve against the static table."""
+        result = mock_heat_predictor.predict_single(sample_worker_data)
+
+        codes = result['osha_recommendation_codes']
+        assert len(codes) > 0
+        assert tuple(OSHA_RECOMMENDATIONS[code] for code in codes) == \
+            recommendation_text(result['osha_recommendation_key'])
+
+    def test_recommendation_key_heat_index_advisory(self, mock_heat_predictor):
+        """Test that the heat index category selects the advisory."""
+        key = mock_heat_predictor._get_osha_recommendation_key
+        assert RECOMMENDATION_CODE_SETS[key('Safe', 75.0)] == (
+            'SAFE_CONTINUE', 'SAFE_HYDRATE', 'SAFE_MONITOR'
+        )
+        assert RECOMMENDATION_CODE_SETS[key('Warning', 90.0)][-1] == 'HI_EXTREME_CAUTION'
+        assert RECOMMENDATION_CODE_SETS[key('Danger', 110.0)][-1] == 'HI_DANGER'
+        assert RECOMMENDATION_CODE_SETS[key('Danger', 135.0)][-1] == 'HI_EXTREME_DANGER'
+
+    def test_recommendation_sets_are_shared(self, mock_heat_predictor, sample_worker_data):
+        """Test that predictions reuse the precomputed recommendation tuples."""
+        first = mock_heat_predictor.predict_single(sample_worker_data.copy())
+        second = mock_heat_predictor.predict_single(sample_worker_data.copy())
+
+        assert first['osha_recommendation_key'] == second['osha_recommendation_key']
+        assert first['osha_recommendation_codes'] is second['osha_recommendation_codes']
+
+
 class TestFeatureValidation:
     """Test feature validation and template functionality."""
 
@@ -531,6 +592,212 @@ class TestErrorHandling:
         assert len(results) == 100
 
 
+class TestModelLoader:
+    """Test the model loader's lock-free cache reads and single-flight loads."""
+
+    @staticmethod
+    def _fresh_loader():
+        from app.models.model_loader import ModelLoader
+
+        loader = object.__new__(ModelLoader)  # Bypass the singleton
+        loader._initialized = False
+        loader.__init__()
+        return loader
+
+    @staticmethod
+    def _slow_predictor(calls, delay=0.2, error=None):
+        def build(model_dir=None):
+            calls.append(model_dir)
+            time.sleep(delay)
+            if error is not None:
+                raise error
+            predictor = Mock(is_loaded=True, feature_columns=['Temperature'])
+            predictor.label_encoder.classes_ = ['Safe', 'Danger']
+            return predictor
+        return build
+
+    def test_concurrent_cold_loads_share_one_load(self):
+        """Callers arriving during a cold load wait for it instead of loading again."""
+        loader = self._fresh_loader()
+        calls = []
+
+        with patch('app.models.model_loader.HeatExposurePredictor', side_effect=self._slow_predictor(calls)):
+            with ThreadPoolExecutor(max_workers=20) as executor:
+                models = list(executor.map(lambda _: loader.load_model("default"), range(20)))
+
+        assert len(calls) == 1
+        assert all(model is models[0] for model in models)
+        assert loader._loads_in_flight == {}
+
+    def test_cache_hits_do_not_take_the_lock(self):
+        """A cached model is returned while a writer holds the lock."""
+        loader = self._fresh_loader()
+        calls = []
+        with patch('app.models.model_loader.HeatExposurePredictor', side_effect=self._slow_predictor(calls, 0)):
+            model = loader.load_model("default")
+
+        with loader._load_lock:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                assert executor.submit(loader.load_model, "default").result(timeout=1) is model
+                assert executor.submit(loader.get_model, "default").result(timeout=1) is model
+
+    def test_failed_load_raises_for_every_waiter(self):
+        """A failed load is reported to everyone who waited on it and retried by the next caller."""
+        loader = self._fresh_loader()
+        calls = []
+        failing = self._slow_predictor(calls, error=FileNotFoundError("xgboost_model.joblib"))
+
+        def load():
+            try:
+                loader.load_model("default")
+            except RuntimeError as e:
+                return e
+
+        with patch('app.models.model_loader.HeatExposurePredictor', side_effect=failing):
+            with ThreadPoolExecutor(max_workers=5) as executor:
+                errors = list(executor.map(lambda _: load(), range(5)))
+
+        assert len(calls) == 1
+        assert all(isinstance(error, RuntimeError) for error in errors)
+        assert not loader.is_model_loaded("default")
+
+        with patch('app.models.model_loader.HeatExposurePredictor', side_effect=self._slow_predictor(calls, 0)):
+            assert loader.load_model("default") is not None
+        assert len(calls) == 2
+
+    def test_lru_cleanup_publishes_new_snapshot(self):
+        """Loading past MODEL_CACHE_SIZE drops the least recently used model without mutating old snapshots."""
+        loader = self._fresh_loader()
+        calls = []
+
+        with patch('app.models.model_loader.HeatExposurePredictor', side_effect=self._slow_predictor(calls, 0)), \
+                patch('app.models.model_loader.settings.MODEL_CACHE_SIZE', 2), \
+                patch('app.models.model_loader.time.time', side_effect=itertools.count(1000.0)):
+            loader.load_model("a")
+            loader.load_model("b")
+            loader.load_model("a")  # Hit: "b" is now least recently used
+            snapshot = loader._entries
+            loader.load_model("c")
+
+        assert set(loader._entries) == {"a", "c"}
+        assert set(snapshot) == {"a", "b"}
+        assert len(calls) == 3
+
+    def test_memory_budget_evicts_least_recently_used(self):
+        """Models are evicted by footprint once MODEL_CACHE_MAX_BYTES is exceeded, and counted."""
+        loader = self._fresh_loader()
+        calls = []
+        with patch('app.models.model_loader.HeatExposurePredictor', side_effect=self._slow_predictor(calls, 0)), \
+                patch('app.models.model_loader.predictor_footprint', side_effect=[100, 300, 700]), \
+                patch('app.models.model_loader.settings.MODEL_CACHE_MAX_BYTES', 1000), \
+                patch('app.models.model_loader.time.time', side_effect=itertools.count(1000.0)):
+            for name in ("small", "medium", "small", "large"):
+                loader.load_model(name)
+
+        # "medium" was least recently used; dropping it brings 1100 bytes down to 800
+        assert set(loader._entries) == {"small", "large"}
+        info = loader.get_all_models_info()
+        assert info["small"]["memory_bytes"] == 100
+        assert (info["small"]["cache_hits"], info["small"]["cache_misses"]) == (1, 1)
+        assert loader._stats["medium"].evictions == 1
+        assert loader.health_check()["cache_memory_bytes"] == 800
+
+    def test_model_over_budget_is_still_cached(self):
+        """A model larger than the whole budget evicts the others but is kept itself."""
+        loader = self._fresh_loader()
+        calls = []
+
+        with patch('app.models.model_loader.HeatExposurePredictor', side_effect=self._slow_predictor(calls, 0)), \
+                patch('app.models.model_loader.predictor_footprint', return_value=600), \
+                patch('app.models.model_loader.settings.MODEL_CACHE_MAX_BYTES', 500):
+            loader.load_model("a")
+            loader.load_model("b")
+            loader.load_model("b")
+
+        assert set(loader._entries) == {"b"}
+        assert len(calls) == 2
+        assert loader.get_model_info("b")["cache_hits"] == 1
+
+    def test_predictor_footprint(self):
+        """Footprints count array buffers without copying them, and fall back to file sizes."""
+        from app.models.model_loader import predictor_footprint
+
+        weights = np.zeros(1_000_000, dtype=np.float64)
+        assert 8_000_000 <= predictor_footprint({'weights': weights}, ()) < 8_001_000
+        assert predictor_footprint(lambda: None, (("a.joblib", 10, 0), ("b.joblib", 5, 0))) == 15
+
+    @staticmethod
+    def _write_model_file(model_dir, content, mtime):
+        path = os.path.join(model_dir, "xgboost_model.joblib")
+        with open(path, "wb") as model_file:
+            model_file.write(content)
+        os.utime(path, ns=(mtime, mtime))
+
+    def test_refresher_swaps_in_changed_model(self, tmp_path):
+        """Changed files are loaded, warmed and swapped in once they settle; holders keep the old instance."""
+        from app.models.model_loader import ModelRefresher
+
+        loader = self._fresh_loader()
+        refresher = ModelRefresher(loader)
+        calls = []
+        self._write_model_file(tmp_path, b"v1", 1_000_000_000)
+
+        with patch('app.models.model_loader.HeatExposurePredictor', side_effect=self._slow_predictor(calls, 0)):
+            old_model = loader.load_model("default", model_dir=str(tmp_path))
+            assert refresher.run_once() == 0
+
+            self._write_model_file(tmp_path, b"v2", 2_000_000_000)
+            assert refresher.run_once() == 0  # Waits one pass for the files to settle
+            assert loader.load_model("default") is old_model
+            assert refresher.run_once() == 1
+
+        new_model = loader.load_model("default")
+        assert new_model is not old_model
+        new_model.predict_single.assert_called_once()  # Warmed before the swap
+        assert old_model.is_loaded  # Still usable by requests holding it
+        status = refresher.get_status()
+        assert status["swaps"] == 1
+        assert status["last_swap"]["previous_checksum"] != status["last_swap"]["checksum"]
+        assert loader.get_model_info("default")["checksum"] == status["last_swap"]["checksum"]
+
+    def test_refresher_ignores_touched_files_and_keeps_model_on_failure(self, tmp_path):
+        """A new mtime with the same content is not a reload; a failed reload keeps serving the old model."""
+        from app.models.model_loader import ModelRefresher
+
+        loader = self._fresh_loader()
+        refresher = ModelRefresher(loader)
+        calls = []
+        self._write_model_file(tmp_path, b"v1", 1_000_000_000)
+
+        with patch('app.models.model_loader.HeatExposurePredictor', side_effect=self._slow_predictor(calls, 0)):
+            model = loader.load_model("default", model_dir=str(tmp_path))
+            self._write_model_file(tmp_path, b"v1", 2_000_000_000)
+            refresher.run_once()
+            refresher.run_once()
+            assert refresher.run_once() == 0
+        assert len(calls) == 1
+
+        failing = self._slow_predictor(calls, 0, error=ValueError("truncated pickle"))
+        with patch('app.models.model_loader.HeatExposurePredictor', side_effect=failing):
+            self._write_model_file(tmp_path, b"v2", 3_000_000_000)
+            refresher.run_once()
+            assert refresher.run_once() == 0
+
+        assert loader.load_model("default") is model
+        assert refresher.get_status()["failures"] == 1
+        assert "truncated pickle" in refresher.get_status()["last_error"]
+
+    def test_models_do_not_expire_on_the_request_path(self):
+        """An old model is served as is; replacing it is the refresher's job."""
+        loader = self._fresh_loader()
+        calls = []
+        with patch('app.models.model_loader.HeatExposurePredictor', side_effect=self._slow_predictor(calls, 0)):
+            model = loader.load_model("default")
+            with patch('app.models.model_loader.time.time', return_value=time.time() + 7 * 86400):
+                assert loader.load_model("default") is model
+        assert len(calls) == 1
+
+
 @pytest.mark.parametrize("temperature,humidity,expected_risk_increase", [
     (20, 40, False),   # Cool and dry - should not increase risk
     (35, 80, True),    # Hot and humid - should increase risk
@@ -575,6 +842,7 @@ def test_demographic_factor_impact(mock_heat_predictor, sample_worker_data, age,
 
     # Age should be reflected in recommendations for older workers
     if age > 50:
-        rec_text = ' '.join(result['osha_recommendations']).lower()
+        recommendations = recommendation_text(result['osha_recommendation_key'])
+        rec_text = ' '.join(recommendations).lower()
         # Older workers might get more cautious recommendations
-        assert len(result['osha_recommendations']) >= 3
\ No newline at end of file
+        assert len(recommendations) >= 3
\ No newline at end of file
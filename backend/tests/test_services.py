@@ -15,6 +15,8 @@ Comprehensive tests for HeatGuard service layer components:
 
 import pytest
 import asyncio
+import os
+import json
 import time
 from unittest.mock import Mock, AsyncMock, patch, MagicMock
 from typing import Dict, List, Any
@@ -206,6 +208,236 @@ class TestPredictionService:
         assert result1['heat_exposure_risk_score'] >= result2['heat_exposure_risk_score']
 
 
+class TestPredictionServiceStreaming:
+    """Test chunked NDJSON streaming of batch predictions."""
+
+    @pytest.fixture
+    def prediction_service(self):
+        """Real prediction service backed by a stub model."""
+        from app.services.prediction_service import PredictionService
+
+        model = Mock()
+        model.predict_single.side_effect = lambda data, use_conservative, fields=None: {
+            'worker_id': data.get('worker_id'),
+            'heat_exposure_risk_score': 0.8,
+            'risk_level': 'Danger'
+        }
+
+        with patch('app.services.prediction_service.model_loader') as mock_loader:
+            mock_loader.load_model.return_value = model
+            yield PredictionService()
+
+    @pytest.fixture
+    def worker_batch(self):
+        return [
+            {'worker_id': f'stream_worker_{i}', 'Age': 35, 'Gender': 1, 'Temperature': 34.0,
+             'Humidity': 70.0, 'hrv_mean_hr': 110.0, 'hrv_mean_nni': 545.0}
+            for i in range(25)
+        ]
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_chunks_then_statistics(self, prediction_service, worker_batch):
+        """Each chunk is yielded as it finishes, followed by a statistics record."""
+        record_chunks = await prediction_service.stream_multiple_workers(
+            worker_batch, log_compliance=False, chunk_size=10
+        )
+        chunks = [chunk async for chunk in record_chunks]
+
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5, 1]
+        predictions = [record for chunk in chunks[:-1] for record in chunk]
+        assert all(record['record_type'] == 'prediction' for record in predictions)
+        assert sorted(record['batch_index'] for record in predictions) == list(range(25))
+
+        summary = chunks[-1][0]
+        assert summary['record_type'] == 'batch_statistics'
+        assert summary['batch_size'] == 25
+        assert summary['batch_statistics']['risk_level_distribution']['Danger'] == 25
+        assert summary['batch_statistics']['alerts']['requires_immediate_attention'] == 25
+
+    @pytest.mark.asyncio
+    async def test_stream_statistics_count_failed_rows(self, prediction_service, worker_batch):
+        """Rows the model fails on are reported as failed in the statistics record."""
+        from app.services import prediction_service as prediction_module
+
+        def predict_single(data, use_conservative, fields=None):
+            if data.get('worker_id') == 'stream_worker_3':
+                raise ValueError("feature out of range")
+            return {'worker_id': data.get('worker_id'), 'heat_exposure_risk_score': 0.8, 'risk_level': 'Danger'}
+
+        prediction_module.model_loader.load_model.return_value.predict_single.side_effect = predict_single
+
+        record_chunks = await prediction_service.stream_multiple_workers(
+            worker_batch, log_compliance=False, chunk_size=10
+        )
+        chunks = [chunk async for chunk in record_chunks]
+
+        summary = chunks[-1][0]
+        assert summary['successful_predictions'] == 24
+        assert summary['failed_predictions'] == 1
+        assert summary['batch_statistics']['failed_predictions'] == 1
+
+    @pytest.mark.asyncio
+    async def test_stream_logs_compliance_when_client_disconnects(self, prediction_service, worker_batch):
+        """A chunk is queued for compliance logging before it is sent, even if the stream is closed there."""
+        logged = []
+        prediction_service._log_batch_compliance_async = AsyncMock(side_effect=logged.append)
+
+        record_chunks = await prediction_service.stream_multiple_workers(worker_batch, chunk_size=10)
+        first_chunk = await record_chunks.__anext__()
+        await record_chunks.aclose()
+
+        assert logged == [first_chunk]
+
+    @pytest.mark.asyncio
+    async def test_stream_validation_fails_before_streaming(self, prediction_service):
+        """Invalid batches are rejected before the stream is returned."""
+        from app.utils.validators import ValidationError
+
+        with pytest.raises(ValidationError):
+            await prediction_service.stream_multiple_workers([{'Age': 'not-a-number'}])
+
+
+class TestPredictionServiceComplianceBackpressure:
+    """Test that a backed-up compliance writer does not slow predictions down."""
+
+    @pytest.fixture
+    def prediction_service(self, tmp_path):
+        """Real prediction service whose compliance writer has a full queue and no writer thread."""
+        from app.services.prediction_service import PredictionService
+        from app.utils.compliance_store import ComplianceSegmentStore
+        from app.utils.compliance_writer import ComplianceWriter
+
+        model = Mock()
+        model.predict_single.side_effect = lambda data, use_conservative, fields=None: {
+            'worker_id': data.get('worker_id'),
+            'heat_exposure_risk_score': 0.9,
+            'risk_level': 'Danger',
+            'requires_immediate_attention': True
+        }
+
+        writer = ComplianceWriter(store=ComplianceSegmentStore(root=str(tmp_path / 'segments')), queue_size=1)
+        with patch('app.services.prediction_service.model_loader') as mock_loader, \
+             patch.object(writer, '_ensure_started'):
+            mock_loader.load_model.return_value = model
+            service = PredictionService()
+            service.compliance_service.enable_logging = True
+            service.compliance_service.writer = writer
+            writer.submit({'worker_id': 'backlog'})
+            yield service
+
+    @pytest.mark.asyncio
+    async def test_prediction_returns_promptly_with_full_queue(self, prediction_service):
+        """Compliance entries that do not fit in the queue are buffered, not waited on."""
+        data = {'worker_id': 'busy_worker', 'Age': 35, 'Gender': 1, 'Temperature': 34.0,
+                'Humidity': 70.0, 'hrv_mean_hr': 110.0, 'hrv_mean_nni': 545.0}
+
+        start = time.perf_counter()
+        for _ in range(5):
+            result = await prediction_service.predict_single_worker(data)
+        elapsed = time.perf_counter() - start
+
+        assert result['worker_id'] == 'busy_worker'
+        assert elapsed < 0.5
+        assert prediction_service.compliance_service.writer.get_metrics()['entries_overflowed'] == 5
+
+
+class TestWarmupService:
+    """Test startup warm-up and latency self-calibration."""
+
+    @pytest.fixture
+    def prediction_service(self):
+        """Prediction service stub that records the batch sizes it scores."""
+        service = Mock()
+        service.sizes = []
+
+        async def predict_single_worker(data, log_compliance=True):
+            service.sizes.append(1)
+            return {}
+
+        async def predict_multiple_workers(data, log_compliance=True):
+            service.sizes.append(len(data))
+            return {}
+
+        service.predict_single_worker.side_effect = predict_single_worker
+        service.predict_multiple_workers.side_effect = predict_multiple_workers
+        return service
+
+    def test_warmup_scores_each_batch_size(self, prediction_service):
+        """Synthetic batches of each size run, split at the request batch limit."""
+        from app.services.warmup_service import WarmupService
+
+        warmup = WarmupService()
+        with patch('app.services.warmup_service.settings.WARMUP_BATCH_SIZES', [1, 32, 1024]):
+            assert warmup.start(prediction_service) is True
+            assert warmup.wait(timeout=30)
+
+        assert warmup.state == "completed"
+        assert prediction_service.sizes == [1, 32, 1000, 24]
+        assert all(call.kwargs['log_compliance'] is False
+                   for call in prediction_service.predict_multiple_workers.call_args_list)
+        status = warmup.get_status()
+        assert set(status['latency_profile']) == {'1', '32', '1024'}
+        assert status['per_row_ms'] is not None
+
+    def test_failed_warmup_does_not_block(self, prediction_service):
+        """A failing warm-up is reported and leaves the service uncalibrated."""
+        from app.services.warmup_service import WarmupService
+
+        prediction_service.predict_single_worker.side_effect = RuntimeError("model unavailable")
+        warmup = WarmupService()
+        warmup.start(prediction_service)
+        warmup.wait(timeout=30)
+
+        assert warmup.state == "failed"
+        assert not warmup.is_running
+        assert "model unavailable" in warmup.error
+        assert warmup.estimate_seconds(100) is None
+
+    def test_disabled_warmup(self, prediction_service):
+        """Warm-up can be switched off."""
+        from app.services.warmup_service import WarmupService
+
+        warmup = WarmupService()
+        with patch('app.services.warmup_service.settings.WARMUP_ENABLED', False):
+            assert warmup.start(prediction_service) is False
+
+        assert warmup.state == "disabled"
+        prediction_service.predict_single_worker.assert_not_called()
+
+    def test_calibration_seeds_eta_and_chunk_size(self):
+        """Row cost comes from the largest batch; the chunk size targets a duration."""
+        from app.services.warmup_service import WarmupService
+
+        warmup = WarmupService()
+        with patch('app.services.warmup_service.settings.BATCH_STREAM_CHUNK_TARGET_MS', 250.0):
+            warmup.calibrate({
+                1: {'total_ms': 9.0, 'per_row_ms': 9.0},
+                32: {'total_ms': 200.0, 'per_row_ms': 6.25},
+                1024: {'total_ms': 5120.0, 'per_row_ms': 5.0}
+            })
+
+        assert warmup.per_row_seconds == pytest.approx(0.005)
+        assert warmup.overhead_seconds == pytest.approx(0.004)
+        assert warmup.estimate_seconds(1000) == pytest.approx(5.004)
+        assert warmup.stream_chunk_size == 50
+
+    def test_chunk_size_is_clamped(self):
+        """Calibrated chunk sizes stay within sensible bounds, or off when disabled."""
+        from app.services.warmup_service import WarmupService, MIN_STREAM_CHUNK_SIZE
+        from app.config.settings import settings
+
+        slow, fast, fixed = WarmupService(), WarmupService(), WarmupService()
+        with patch('app.services.warmup_service.settings.BATCH_STREAM_CHUNK_TARGET_MS', 250.0):
+            slow.calibrate({32: {'total_ms': 32000.0, 'per_row_ms': 1000.0}})
+            fast.calibrate({32: {'total_ms': 0.32, 'per_row_ms': 0.01}})
+        with patch('app.services.warmup_service.settings.BATCH_STREAM_CHUNK_TARGET_MS', 0):
+            fixed.calibrate({32: {'total_ms': 200.0, 'per_row_ms': 6.25}})
+
+        assert slow.stream_chunk_size == MIN_STREAM_CHUNK_SIZE
+        assert fast.stream_chunk_size == settings.BATCH_SIZE_LIMIT
+        assert fixed.stream_chunk_size == settings.BATCH_STREAM_CHUNK_SIZE
+
+
 class TestBatchService:
     """Test batch processing service functionality."""
 
@@ -400,6 +632,135 @@ class TestBatchService:
         assert cancelled is False
 
 
+class TestBatchServiceFileJobs:
+    """Test chunked processing of uploaded CSV/Parquet files."""
+
+    @pytest.fixture
+    def upload_frame(self):
+        """Worker rows as they would appear in a daily export."""
+        return pd.DataFrame([
+            {
+                'worker_id': f'file_worker_{i}', 'Age': 30 + i % 20, 'Gender': i % 2,
+                'Temperature': 32.0, 'Humidity': 60.0, 'hrv_mean_hr': 90.0, 'hrv_mean_nni': 666.0
+            }
+            for i in range(250)
+        ])
+
+    @pytest.fixture
+    def mock_model(self):
+        """Model stub returning a fixed Warning-level assessment."""
+        model = Mock()
+        model.predict_single.side_effect = lambda data, use_conservative, fields=None: {
+            'worker_id': data.get('worker_id'),
+            'heat_exposure_risk_score': 0.6,
+            'risk_level': 'Warning'
+        }
+        return model
+
+    async def _run_file_job(self, tmp_path, upload_path, file_format, mock_model):
+        from app.config.settings import settings
+        from app.services.batch_service import BatchService
+
+        with patch.object(settings, 'BATCH_RESULTS_DIR', str(tmp_path / 'results')), \
+             patch('app.services.batch_service.model_loader') as mock_loader:
+            mock_loader.load_model.return_value = mock_model
+            service = BatchService()
+
+            job_id = await service.submit_file_job(
+                str(upload_path), file_format, log_compliance=False, chunk_size=100
+            )
+
+            for _ in range(100):
+                status = await service.get_job_status(job_id)
+                if status['status'] in ('completed', 'failed'):
+                    break
+                await asyncio.sleep(0.05)
+
+            return service, job_id, status
+
+    @pytest.mark.asyncio
+    async def test_csv_file_job_streams_results_to_disk(self, tmp_path, upload_frame, mock_model):
+        """CSV uploads are scored in chunks and written as NDJSON."""
+        upload_path = tmp_path / 'export.csv'
+        upload_frame.to_csv(upload_path, index=False)
+
+        service, job_id, status = await self._run_file_job(tmp_path, upload_path, 'csv', mock_model)
+
+        assert status['status'] == 'completed'
+        assert status['processed_items'] == 250
+        assert status['success_count'] == 250
+        assert len(status['errors']) <= 100
+
+        results = await service.get_job_results(job_id)
+        assert results['results'] is None
+        assert results['results_url'].endswith(f'/batch_results/{job_id}/download')
+        assert results['processing_summary']['risk_level_distribution']['Warning'] == 250
+
+        result_file = await service.get_job_result_file(job_id)
+        with open(result_file) as f:
+            rows = [json.loads(line) for line in f]
+        assert len(rows) == 250
+        assert sorted(r['batch_index'] for r in rows) == list(range(250))
+
+        # The uploaded source is removed once processed
+        assert not upload_path.exists()
+
+    @pytest.mark.asyncio
+    async def test_parquet_file_job_reads_row_groups(self, tmp_path, upload_frame, mock_model):
+        """Parquet uploads are read row group by row group."""
+        pytest.importorskip('pyarrow')
+        upload_path = tmp_path / 'export.parquet'
+        upload_frame.to_parquet(upload_path, row_group_size=70)
+
+        service, job_id, status = await self._run_file_job(tmp_path, upload_path, 'parquet', mock_model)
+
+        assert status['status'] == 'completed'
+        assert status['total_items'] == 250
+        assert status['success_count'] == 250
+
+    @pytest.mark.asyncio
+    async def test_failed_file_job_moves_to_completed(self, tmp_path, upload_frame, mock_model):
+        """A job that raises is finished like a successful one."""
+        from app.services.batch_service import BatchService
+
+        upload_path = tmp_path / 'export.csv'
+        upload_frame.to_csv(upload_path, index=False)
+
+        with patch.object(BatchService, '_write_results_chunk', side_effect=OSError("disk full")):
+            service, job_id, status = await self._run_file_job(tmp_path, upload_path, 'csv', mock_model)
+
+        assert status['status'] == 'failed'
+        assert job_id not in service.active_jobs
+        assert job_id in service.completed_jobs
+        assert not upload_path.exists()
+
+    @pytest.mark.asyncio
+    async def test_evicted_jobs_delete_result_files(self, tmp_path, upload_frame, mock_model):
+        """Evicting a completed job deletes its result file."""
+        upload_path = tmp_path / 'export.csv'
+        upload_frame.to_csv(upload_path, index=False)
+
+        service, job_id, status = await self._run_file_job(tmp_path, upload_path, 'csv', mock_model)
+        result_file = await service.get_job_result_file(job_id)
+        assert os.path.exists(result_file)
+
+        assert service._evict_completed_jobs(datetime.now()) == 0
+        assert service._evict_completed_jobs(datetime.now() + timedelta(days=2)) == 1
+
+        assert job_id not in service.completed_jobs
+        assert not os.path.exists(result_file)
+
+    @pytest.mark.asyncio
+    async def test_unsupported_file_format_rejected(self, tmp_path):
+        """Only CSV and Parquet uploads are accepted."""
+        from app.services.batch_service import BatchService
+        from app.utils.validators import ValidationError
+
+        service = BatchService()
+        with pytest.raises(ValidationError):
+            await service.submit_file_job(str(tmp_path / 'export.xlsx'), 'xlsx')
+
+
 class TestDataGenerationService:
     """Test synthetic data generation service."""
 
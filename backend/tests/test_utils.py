@@ -19,14 +19,17 @@ import pytest
 import os
 import tempfile
 import json
+import logging
+import threading
+import time
 from datetime import datetime, timedelta
-from unittest.mock import Mock, patch, mock_open
+from unittest.mock import MagicMock, Mock, patch, mock_open
 from typing import Dict, List, Any
 import pandas as pd
 import numpy as np
 
 from app.utils.validators import ValidationError
-from app.utils.logger import setup_logging, get_logger
+from app.utils.logger import setup_logging, get_logger, flush_logging
 from app.utils.data_preprocessor import DataPreprocessor
 
 
@@ -346,6 +349,7 @@ class TestLoggingUtilities:
         logger.info('Test log message')
 
         # Verify log file was created and contains message
+        flush_logging()
         assert os.path.exists(temp_log_file)
         with open(temp_log_file, 'r') as f:
             content = f.read()
@@ -363,6 +367,7 @@ class TestLoggingUtilities:
         logger.info('JSON test message', extra={'worker_id': 'test_001', 'risk_score': 0.45})
 
         # Verify JSON format in log file
+        flush_logging()
         with open(temp_log_file, 'r') as f:
             content = f.read()
             # Should contain JSON-like structure
@@ -397,6 +402,7 @@ class TestLoggingUtilities:
         )
 
         # Verify API request was logged
+        flush_logging()
         with open(temp_log_file, 'r') as f:
             content = f.read()
             assert '/api/v1/predict' in content
@@ -415,6 +421,7 @@ class TestLoggingUtilities:
             severity='warning'
         )
 
+        flush_logging()
         with open(temp_log_file, 'r') as f:
             content = f.read()
             assert 'authentication_failure' in content
@@ -433,12 +440,203 @@ class TestLoggingUtilities:
             cpu_usage_percent=25.3
         )
 
+        flush_logging()
         with open(temp_log_file, 'r') as f:
             content = f.read()
             assert 'single_prediction' in content
             assert '156.7' in content
 
 
+class TestLogPipeline:
+    """Test the queue-based logging pipeline."""
+
+    class _RecordingHandler(logging.Handler):
+        def __init__(self, gate=None):
+            super().__init__()
+            self.gate = gate
+            self.records = []
+            self.threads = set()
+
+        def emit(self, record):
+            if self.gate is not None:
+                self.gate.wait(5)
+            self.threads.add(threading.current_thread().name)
+            self.records.append(record)
+
+    def test_listener_writes_records_in_batches(self, tmp_path):
+        """Callers only enqueue; the listener formats and writes every record."""
+        from app.utils.logger import BatchRotatingFileHandler, JSONFormatter, LogPipeline
+
+        log_file = tmp_path / 'app.log'
+        file_handler = BatchRotatingFileHandler(str(log_file), maxBytes=4096, backupCount=50)
+        file_handler.setFormatter(JSONFormatter())
+        recording = self._RecordingHandler()
+        pipeline = LogPipeline([file_handler, recording], queue_size=1000, policy='block', enqueue_timeout=5)
+        pipeline.start()
+
+        record_logger = logging.getLogger('test_log_pipeline')
+        record_logger.propagate = False
+        record_logger.addHandler(pipeline.handler)
+        record_logger.setLevel(logging.INFO)
+        try:
+            for i in range(300):
+                record_logger.info('Prediction %d completed', i)
+            try:
+                raise ValueError('listener traceback')
+            except ValueError:
+                record_logger.exception('Prediction failed')
+            assert pipeline.flush(timeout=5)
+        finally:
+            record_logger.removeHandler(pipeline.handler)
+            pipeline.stop(timeout=5)
+
+        assert recording.threads == {'log-listener'}
+        assert [record.getMessage() for record in recording.records[:2]] == ['Prediction 0 completed',
+                                                                            'Prediction 1 completed']
+
+        # Rotated between batch lines, so every record is in one of the files, whole
+        lines = []
+        for path in sorted(tmp_path.glob('app.log*')):
+            lines.extend(json.loads(line) for line in path.read_text().splitlines())
+        assert len(list(tmp_path.glob('app.log*'))) > 1
+        assert len(lines) == 301
+        assert 'listener traceback' in [line for line in lines if line['message'] == 'Prediction failed'][0]['exception']
+
+        metrics = pipeline.get_metrics()
+        assert metrics['records_written'] == 301
+        assert metrics['records_dropped'] == 0
+        assert metrics['batches'] < 301
+
+    def test_full_queue_drops_and_reports(self):
+        """With the drop policy a full queue drops INFO records at once and counts them."""
+        from app.utils.logger import LogPipeline
+
+        gate = threading.Event()
+        recording = self._RecordingHandler(gate)
+        pipeline = LogPipeline([recording], queue_size=5, policy='drop', enqueue_timeout=0.05, batch_size=5)
+        pipeline.start()
+
+        record_logger = logging.getLogger('test_log_pipeline_drop')
+        record_logger.propagate = False
+        record_logger.addHandler(pipeline.handler)
+        record_logger.setLevel(logging.INFO)
+        try:
+            record_logger.info('first')
+            time.sleep(0.1)  # The listener takes it and blocks in the handler
+            for i in range(20):
+                record_logger.info('info %d', i)
+            start = time.perf_counter()
+            record_logger.error('error while full')
+            waited = time.perf_counter() - start
+
+            gate.set()
+            assert pipeline.flush(timeout=5)
+        finally:
+            record_logger.removeHandler(pipeline.handler)
+            pipeline.stop(timeout=5)
+
+        metrics = pipeline.get_metrics()
+        assert metrics['records_dropped_by_level'] == {'INFO': 15, 'ERROR': 1}
+        assert waited >= 0.04
+        assert metrics['max_queue_depth'] == 5
+        assert recording.records[-1].getMessage() == 'Log queue full: 16 records dropped'
+
+    def test_setup_logging_async_pipeline(self, tmp_path):
+        """setup_logging installs the queue handler by default, or plain handlers when disabled."""
+        from app.utils.logger import LogQueueHandler, get_logging_metrics
+
+        log_file = str(tmp_path / 'heatguard.log')
+        try:
+            setup_logging(log_level='INFO', log_file=log_file)
+            assert [type(handler) for handler in logging.getLogger().handlers] == [LogQueueHandler]
+            get_logger('pipeline_test').info('queued message', worker_id='w1')
+            assert flush_logging(timeout=5)
+            with open(log_file) as f:
+                assert 'queued message' in f.read()
+            assert get_logging_metrics()['running'] is True
+
+            setup_logging(log_level='INFO', log_file=log_file, async_logging=False)
+            assert LogQueueHandler not in [type(handler) for handler in logging.getLogger().handlers]
+            assert get_logging_metrics() == {'async': False}
+        finally:
+            setup_logging()
+
+
+class TestLazyLogging:
+    """Test deferred formatting and call-site sampling in HeatGuardLogger."""
+
+    class _RecordingHandler(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.records = []
+
+        def emit(self, record):
+            self.records.append(record)
+
+    @pytest.fixture
+    def recorded(self):
+        from app.utils.logger import HeatGuardLogger
+
+        heatguard_logger = HeatGuardLogger('test_lazy_logging')
+        handler = self._RecordingHandler()
+        heatguard_logger.logger.propagate = False
+        heatguard_logger.logger.addHandler(handler)
+        heatguard_logger.logger.setLevel(logging.INFO)
+        yield heatguard_logger, handler.records
+        heatguard_logger.logger.removeHandler(handler)
+
+    def test_disabled_level_skips_formatting(self, recorded):
+        """Below the level, neither callable messages nor arguments are formatted."""
+        heatguard_logger, records = recorded
+        message = Mock(return_value='expensive')
+        argument = MagicMock()
+
+        heatguard_logger.debug(message)
+        heatguard_logger.debug('Sample %s', argument)
+        heatguard_logger.info(message, worker_id='w1')
+
+        assert message.call_count == 1
+        argument.__str__.assert_not_called()
+        assert len(records) == 1
+        assert records[0].getMessage() == 'expensive'
+        assert records[0].extra_fields == {'worker_id': 'w1'}
+        assert records[0].funcName == 'test_disabled_level_skips_formatting'
+
+    def test_sampling_reports_suppressed_calls(self, recorded):
+        """sample_every=N emits 1 call in N per call site with the skipped count."""
+        heatguard_logger, records = recorded
+
+        for i in range(25):
+            heatguard_logger.info('Row %d', i, sample_every=10)
+        heatguard_logger.info('Other site', sample_every=10)
+
+        assert [record.getMessage() for record in records] == ['Row 0', 'Row 10', 'Row 20', 'Other site']
+        assert not hasattr(records[0], 'extra_fields')
+        assert records[1].extra_fields == {'suppressed': 9}
+
+    def test_rate_limit_per_call_site(self, recorded):
+        """max_per_second caps each call site within a one-second window."""
+        heatguard_logger, records = recorded
+
+        def log_rows(rows):
+            for i in rows:
+                heatguard_logger.info('Row %d', i, max_per_second=5)
+
+        with patch('app.utils.logger.time.monotonic', return_value=1000.0):
+            log_rows(range(20))
+        assert len(records) == 5
+
+        with patch('app.utils.logger.time.monotonic', return_value=1001.5):
+            log_rows(range(20, 22))
+        assert [record.getMessage() for record in records[5:]] == ['Row 20', 'Row 21']
+        assert records[5].extra_fields == {'suppressed': 15}
+
+    def test_get_logger_reuses_instances(self):
+        """Loggers are cached per name so call-site state is shared."""
+        assert get_logger('lazy_cache_test') is get_logger('lazy_cache_test')
+        assert get_logger('lazy_cache_test') is not get_logger('lazy_cache_other')
+
+
 class TestConfigurationUtilities:
     """Test configuration validation and utilities."""
 
@@ -850,6 +1048,7 @@ class TestErrorHandlingUtilities:
         except ValueError as e:
             log_exception(e, context={'operation': 'test', 'worker_id': 'test_001'})
 
+        flush_logging()
         with open(temp_log_file, 'r') as f:
             content = f.read()
             assert 'ValueError' in content
@@ -930,6 +1129,931 @@ class TestDataConversionUtilities:
         assert formatted['incident_rate'] < 1.0  # Should be incidents per 100 workers
 
 
+class TestResponseSerialization:
+    """Test fast JSON serialization of prediction responses."""
+
+    def test_dumps_handles_numpy_and_nested_values(self):
+        """Service results with numpy scalars serialize without conversion."""
+        from app.utils.serialization import dumps
+
+        content = {
+            'heat_exposure_risk_score': np.float64(0.4521),
+            'class_probabilities': {'warm': 0.4, 'hot': 0.1},
+            'osha_recommendations': ['Take rest breaks in shade/cool area every hour'],
+            'requires_immediate_attention': False
+        }
+
+        assert json.loads(dumps(content)) == {
+            'heat_exposure_risk_score': 0.4521,
+            'class_probabilities': {'warm': 0.4, 'hot': 0.1},
+            'osha_recommendations': ['Take rest breaks in shade/cool area every hour'],
+            'requires_immediate_attention': False
+        }
+
+    def test_dumps_lines_writes_one_record_per_line(self):
+        """NDJSON output has one JSON document per line."""
+        from app.utils.serialization import dumps_lines
+
+        body = dumps_lines([{'worker_id': 'a'}, {'worker_id': 'b'}])
+
+        assert body.endswith(b'\n')
+        assert [json.loads(line) for line in body.splitlines()] == [{'worker_id': 'a'}, {'worker_id': 'b'}]
+
+    def test_project_keeps_only_requested_fields(self):
+        """Projection drops internal fields and fills missing ones with None."""
+        from app.utils.serialization import project, project_many
+
+        result = {'worker_id': 'w1', 'risk_level': 'Safe', 'predicted_thermal_class': 'neutral'}
+
+        assert project(result, ('worker_id', 'risk_level', 'confidence')) == {
+            'worker_id': 'w1', 'risk_level': 'Safe', 'confidence': None
+        }
+        assert project_many([result], ('worker_id',)) == [{'worker_id': 'w1'}]
+
+    def test_fast_json_response_renders_bytes(self):
+        """FastJSONResponse renders the content directly."""
+        from app.utils.serialization import FastJSONResponse
+
+        response = FastJSONResponse({'status': 'ok'})
+
+        assert response.media_type == 'application/json'
+        assert json.loads(response.body) == {'status': 'ok'}
+
+
+class TestMetrics:
+    """Test the in-process Prometheus metrics registry."""
+
+    def test_counter_and_gauge_render(self):
+        """Labelled series render one sample line each, with escaped label values."""
+        from app.utils.metrics import MetricsRegistry
+
+        registry = MetricsRegistry()
+        requests = registry.counter("test_requests_total", "Requests", ("handler",))
+        in_flight = registry.gauge("test_in_flight", "In flight")
+        requests.labels("predict").inc()
+        requests.labels("predict").inc(2)
+        requests.labels('say "hi"').inc()
+        in_flight.inc(5)
+        in_flight.dec(2)
+
+        lines = registry.render().splitlines()
+
+        assert "# TYPE test_requests_total counter" in lines
+        assert 'test_requests_total{handler="predict"} 3' in lines
+        assert 'test_requests_total{handler="say \\"hi\\""} 1' in lines
+        assert "test_in_flight 3" in lines
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Histogram buckets count every observation at or below their bound."""
+        from app.utils.metrics import MetricsRegistry
+
+        registry = MetricsRegistry()
+        histogram = registry.histogram("test_seconds", "Latency", buckets=(0.01, 0.1))
+        for value in (0.005, 0.01, 0.05, 2.0):
+            histogram.observe(value)
+
+        lines = registry.render().splitlines()
+
+        assert 'test_seconds_bucket{le="0.01"} 2' in lines
+        assert 'test_seconds_bucket{le="0.1"} 3' in lines
+        assert 'test_seconds_bucket{le="+Inf"} 4' in lines
+        assert "test_seconds_count 4" in lines
+        assert "test_seconds_sum 2.065" in lines
+
+    def test_concurrent_updates_are_not_lost(self):
+        """Updates from many threads are all counted."""
+        from app.utils.metrics import MetricsRegistry
+
+        registry = MetricsRegistry()
+        counter = registry.counter("test_total", "Total")
+        histogram = registry.histogram("test_latency_seconds", "Latency")
+
+        def work():
+            for _ in range(5000):
+                counter.inc()
+                histogram.observe(0.001)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        lines = registry.render().splitlines()
+        assert "test_total 40000" in lines
+        assert "test_latency_seconds_count 40000" in lines
+
+    def test_collectors_and_failures(self):
+        """Collector families are rendered at scrape time; a failing collector is skipped."""
+        from app.utils.metrics import MetricsRegistry
+
+        registry = MetricsRegistry()
+        depth = {'value': 1}
+        registry.add_collector(lambda: [("test_queue_depth", "gauge", "Depth", [({}, depth['value'])])])
+        registry.add_collector(lambda: 1 / 0)
+
+        depth['value'] = 7
+        assert "test_queue_depth 7" in registry.render().splitlines()
+
+    def test_duplicate_and_mislabelled_metrics_are_rejected(self):
+        """Metric names are unique and label counts must match."""
+        from app.utils.metrics import MetricsRegistry
+
+        registry = MetricsRegistry()
+        counter = registry.counter("test_total", "Total", ("stage",))
+
+        with pytest.raises(ValueError):
+            registry.counter("test_total", "Again")
+        with pytest.raises(ValueError):
+            counter.labels("a", "b")
+
+    def test_pipeline_stage_timing(self):
+        """Stage timers and the serializers record into the stage histogram."""
+        from app.utils.metrics import PIPELINE_STAGE_DURATION, time_stage
+        from app.utils.serialization import dumps_lines
+
+        def count(stage):
+            return PIPELINE_STAGE_DURATION.labels(stage).snapshot()[0]
+
+        validation, serialization = sum(count('validation')), sum(count('serialization'))
+        with time_stage('validation'):
+            time.sleep(0.002)
+        dumps_lines([{'worker_id': 'a'}])
+
+        assert sum(count('validation')) == validation + 1
+        assert sum(count('serialization')) == serialization + 1
+
+    def test_business_predictions_counted_outside_warmup(self):
+        """Request predictions are counted by risk level; failed rows and paused (warm-up) scoring are not."""
+        from app.utils.metrics import PREDICTIONS, count_predictions, pause_business_metrics
+
+        def count(risk_level):
+            return PREDICTIONS.labels(risk_level).get()
+
+        danger, safe = count('Danger'), count('Safe')
+        count_predictions([{'risk_level': 'Danger'}, {'risk_level': 'Safe'}, {'error': 'bad row'}])
+        with pause_business_metrics():
+            count_predictions([{'risk_level': 'Danger'}] * 5)
+
+        assert count('Danger') == danger + 1
+        assert count('Safe') == safe + 1
+
+
+class TestTracing:
+    """Test request-scoped stage tracing."""
+
+    def test_stages_recorded_into_current_trace(self):
+        """Pipeline stages add to the current trace and nothing outside one."""
+        from app.utils import tracing
+        from app.utils.metrics import observe_stage
+
+        observe_stage('scaling', 0.001)
+        trace, token = tracing.start_trace("POST", "/api/v1/predict_batch", "trace-1")
+        try:
+            observe_stage('scaling', 0.002)
+            observe_stage('scaling', 0.003)
+            observe_stage('validation', 0.001)
+        finally:
+            tracing.reset_trace(token)
+        observe_stage('scaling', 0.004)
+
+        assert tracing.current_trace() is None
+        assert trace.stages['scaling'][1] == 2
+        assert trace.stages['scaling'][0] == pytest.approx(0.005)
+        header = trace.server_timing()
+        assert header.startswith("total;dur=")
+        assert 'scaling;dur=5.00;desc="x2"' in header
+        assert "validation;dur=1.00" in header
+
+    def test_spans_only_kept_when_sampled(self):
+        """Unsampled traces keep stage totals only; sampled ones keep each span and its thread."""
+        from app.utils import tracing
+
+        with patch('app.utils.tracing.settings.TRACE_SAMPLE_RATE', 0.0):
+            trace, token = tracing.start_trace("GET", "/a")
+        with tracing.span('preprocessing.imputation'):
+            pass
+        tracing.reset_trace(token)
+        assert not trace.sampled
+        assert trace.stages == {}
+
+        with patch('app.utils.tracing.settings.TRACE_SAMPLE_RATE', 1.0):
+            trace, token = tracing.start_trace("GET", "/a")
+        with tracing.span('preprocessing.imputation'):
+            pass
+        tracing.reset_trace(token)
+        spans = trace.to_dict()['spans']
+        assert [span['name'] for span in spans] == ['preprocessing.imputation']
+        assert spans[0]['thread'] == threading.current_thread().name
+
+    def test_executor_threads_record_into_trace(self):
+        """Tasks submitted to an executor run under the submitting request's trace."""
+        from concurrent.futures import ThreadPoolExecutor
+        from app.utils import tracing
+
+        trace, token = tracing.start_trace("POST", "/b")
+        try:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = [tracing.submit(executor, tracing.record_span, 'inference', 0.001) for _ in range(20)]
+                for future in futures:
+                    future.result()
+                executor.submit(tracing.propagate(tracing.record_span), 'scoring', 0.001).result()
+        finally:
+            tracing.reset_trace(token)
+
+        assert trace.stages['inference'][1] == 20
+        assert trace.stages['scoring'][1] == 1
+
+    def test_buffer_keeps_sampled_and_slow_traces(self):
+        """Sampled and slow traces are kept, most recent first, up to the buffer size."""
+        from app.utils import tracing
+
+        buffer = tracing.TraceBuffer(2)
+        with patch('app.utils.tracing.trace_buffer', buffer), \
+             patch('app.utils.tracing.settings.TRACE_SLOW_REQUEST_MS', 1000.0):
+            for trace_id, sampled in (('fast', False), ('s1', True), ('s2', True), ('s3', True)):
+                trace = tracing.RequestTrace(trace_id, "GET", "/c", sampled)
+                tracing.finish_trace(trace, 200)
+            slow = tracing.RequestTrace('slow', "GET", "/slow", False)
+            slow.start -= 2.0
+            tracing.finish_trace(slow, 200)
+
+        assert [trace['trace_id'] for trace in buffer.get_traces()] == ['slow', 's3']
+        assert [trace['trace_id'] for trace in buffer.get_traces(path="/c")] == ['s3']
+        assert [trace['trace_id'] for trace in buffer.get_traces(min_duration_ms=1000)] == ['slow']
+        assert buffer.get_stats()['kept_total'] == 4
+
+
+class TestComplianceWriter:
+    """Test the background group-commit compliance writer."""
+
+    @pytest.fixture
+    def store(self):
+        from app.utils.compliance_store import ComplianceSegmentStore
+
+        temp_dir = tempfile.mkdtemp()
+        yield ComplianceSegmentStore(root=os.path.join(temp_dir, 'osha_compliance'))
+
+    def _read_lines(self, store):
+        lines = []
+        for path in store.segments():
+            with open(path) as f:
+                lines.extend(f.read().splitlines())
+        return lines
+
+    def _read_entries(self, store):
+        return [json.loads(line.split(' | ', 2)[2]) for line in self._read_lines(store)]
+
+    def test_entries_written_in_log_line_format(self, store):
+        """Queued entries are written as 'timestamp | level | json' lines."""
+        from app.utils.compliance_writer import ComplianceWriter
+
+        writer = ComplianceWriter(store=store, flush_interval_ms=5)
+        writer.submit({'compliance_event': 'HEAT_EXPOSURE_ASSESSMENT', 'worker_id': 'w1'})
+        writer.submit({'compliance_event': 'IMMEDIATE_ACTION_REQUIRED'}, level='WARNING')
+        assert writer.flush(timeout=5)
+        writer.close()
+
+        lines = self._read_lines(store)
+        assert [line.split(' | ')[1] for line in lines] == ['INFO', 'WARNING']
+        assert self._read_entries(store)[0]['worker_id'] == 'w1'
+
+    def test_entries_are_group_committed(self, store):
+        """Entries arriving within one interval share a single write."""
+        from app.utils.compliance_writer import ComplianceWriter
+
+        writer = ComplianceWriter(store=store, flush_interval_ms=200)
+        for i in range(500):
+            writer.submit({'worker_id': f'worker_{i}', 'requires_immediate_attention': np.bool_(i % 2)})
+        writer.flush(timeout=5)
+        writer.close()
+
+        metrics = writer.get_metrics()
+        assert metrics['entries_written'] == 500
+        assert metrics['flush_count'] < 10
+        assert metrics['max_flush_ms'] > 0
+        assert len(self._read_entries(store)) == 500
+
+    def test_fsync_durability(self, store):
+        """fsync mode syncs every group commit to disk."""
+        from app.utils.compliance_writer import ComplianceWriter
+
+        writer = ComplianceWriter(store=store, flush_interval_ms=5, durability='fsync')
+        with patch('app.utils.compliance_store.os.fsync') as mock_fsync:
+            writer.submit({'worker_id': 'w1'})
+            writer.flush(timeout=5)
+            writer.close()
+
+        assert mock_fsync.called
+
+    def test_close_commits_pending_entries(self, store):
+        """Closing the writer commits everything still queued."""
+        from app.utils.compliance_writer import ComplianceWriter
+
+        writer = ComplianceWriter(store=store, flush_interval_ms=10000)
+        for i in range(10):
+            writer.submit({'worker_id': f'worker_{i}'})
+        writer.close(timeout=5)
+
+        assert writer.is_running() is False
+        assert len(self._read_entries(store)) == 10
+
+    def test_full_queue_buffers_entry_without_waiting(self, store):
+        """A full queue buffers the entry for the writer instead of blocking the caller or losing it."""
+        from app.utils.compliance_writer import ComplianceWriter
+
+        writer = ComplianceWriter(store=store, queue_size=1)
+        with patch.object(writer, '_ensure_started'):
+            start = time.perf_counter()
+            assert writer.submit({'worker_id': 'w1'}) is True
+            assert writer.submit({'worker_id': 'w2'}) is True
+            assert time.perf_counter() - start < 0.1
+
+        metrics = writer.get_metrics()
+        assert metrics['entries_dropped'] == 0
+        assert metrics['entries_overflowed'] == 1
+        assert metrics['overflow_depth'] == 1
+        assert self._read_entries(store) == []
+
+        writer._ensure_started()
+        writer.close(timeout=5)
+        assert sorted(entry['worker_id'] for entry in self._read_entries(store)) == ['w1', 'w2']
+        assert writer.get_metrics()['overflow_depth'] == 0
+
+    def test_full_queue_drops_entry_when_opted_in(self, store):
+        """The drop overflow policy gives up on entries that do not fit in the queue."""
+        import app.utils.compliance_writer as writer_module
+
+        writer = writer_module.ComplianceWriter(store=store, queue_size=1)
+        with patch.object(writer, '_ensure_started'), \
+             patch.object(writer_module.settings, 'COMPLIANCE_OVERFLOW_POLICY', 'drop'):
+            assert writer.submit({'worker_id': 'w1'}) is True
+            assert writer.submit({'worker_id': 'w2'}) is False
+
+        assert writer.get_metrics()['entries_dropped'] == 1
+        assert writer.get_metrics()['queue_depth'] == 1
+        assert self._read_entries(store) == []
+
+    def test_concurrent_submits_are_all_counted(self, store):
+        """Counters stay exact, and overflowed entries are written, with many threads submitting at once."""
+        from app.utils.compliance_writer import ComplianceWriter
+
+        writer = ComplianceWriter(store=store, queue_size=16, flush_interval_ms=5)
+
+        def submit_many(thread):
+            for i in range(500):
+                writer.submit({'worker_id': f'worker_{thread}_{i}'})
+
+        threads = [threading.Thread(target=submit_many, args=(t,)) for t in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert writer.flush(timeout=10)
+        writer.close()
+
+        metrics = writer.get_metrics()
+        assert metrics['entries_submitted'] == 4000
+        assert metrics['entries_written'] == 4000
+        assert len(self._read_entries(store)) == 4000
+
+    def test_invalid_durability_mode(self, store):
+        """Unknown durability modes are rejected."""
+        from app.utils.compliance_writer import ComplianceWriter
+
+        with pytest.raises(ValueError):
+            ComplianceWriter(store=store, durability='eventually')
+
+
+class TestCompliancePriorityChannel:
+    """Test the priority channel for immediate-action compliance alerts."""
+
+    @pytest.fixture
+    def store(self):
+        from app.utils.compliance_store import ComplianceSegmentStore
+
+        temp_dir = tempfile.mkdtemp()
+        yield ComplianceSegmentStore(root=os.path.join(temp_dir, 'osha_compliance'))
+
+    def test_priority_entries_bypass_bulk_queue(self, store):
+        """Alerts reach subscribers and the store while a bulk group is still collecting."""
+        import threading
+        from app.utils.compliance_writer import ComplianceWriter
+
+        writer = ComplianceWriter(store=store, flush_interval_ms=2000)
+        dispatched = threading.Event()
+        received = []
+
+        def on_alert(entry):
+            received.append((entry, writer.get_metrics()['entries_written']))
+            dispatched.set()
+
+        writer.subscribe(on_alert)
+        for i in range(1000):
+            writer.submit({'compliance_event': 'HEAT_EXPOSURE_ASSESSMENT', 'worker_id': f'w{i}'})
+        assert writer.submit_priority({'compliance_event': 'IMMEDIATE_ACTION_REQUIRED', 'worker_id': 'w7'})
+
+        assert dispatched.wait(timeout=1)
+        assert received == [({'compliance_event': 'IMMEDIATE_ACTION_REQUIRED', 'worker_id': 'w7'}, 0)]
+        assert writer.flush(timeout=5)
+        writer.close()
+
+        metrics = writer.get_metrics()['priority']
+        assert metrics['dispatched'] == metrics['written'] == 1
+        assert metrics['dispatch_latency_ms']['samples'] == 1
+        assert metrics['dispatch_latency_ms']['max'] < 1000
+        with open(store.segments()[0]) as f:
+            first = f.readline()
+        assert ' | WARNING | ' in first and 'IMMEDIATE_ACTION_REQUIRED' in first
+
+    def test_failing_subscriber_does_not_block_alerts(self, store):
+        """Subscriber errors are counted and the alert is still written."""
+        from app.utils.compliance_writer import ComplianceWriter
+
+        writer = ComplianceWriter(store=store, flush_interval_ms=5)
+        writer.subscribe(Mock(side_effect=RuntimeError("pager down")))
+        writer.submit_priority({'compliance_event': 'BATCH_HIGH_RISK_ALERT'})
+        writer.flush(timeout=5)
+        writer.close()
+
+        metrics = writer.get_metrics()['priority']
+        assert metrics['subscriber_errors'] == 1
+        assert metrics['written'] == 1
+
+
+class TestComplianceSegmentStore:
+    """Test the time-partitioned compliance segment store."""
+
+    @pytest.fixture
+    def store(self):
+        from app.utils.compliance_store import ComplianceSegmentStore
+
+        temp_dir = tempfile.mkdtemp()
+        yield ComplianceSegmentStore(root=os.path.join(temp_dir, 'osha_compliance'), index_interval=10)
+
+    def _assessment(self, worker_id, timestamp):
+        return {
+            'compliance_event': 'HEAT_EXPOSURE_ASSESSMENT',
+            'timestamp_utc': timestamp.isoformat(),
+            'worker_identification': {'worker_id': worker_id}
+        }
+
+    def _write(self, store, entries):
+        from app.utils.compliance_writer import ComplianceWriter
+
+        writer = ComplianceWriter(store=store, flush_interval_ms=5)
+        for entry in entries:
+            writer.submit(entry)
+        writer.close(timeout=5)
+
+    def test_entries_partitioned_by_hour(self, store):
+        """Entries land in the segment for the hour of their timestamp."""
+        base = datetime(2024, 7, 1, 9, 0)
+        self._write(store, [self._assessment(f'w{i}', base + timedelta(minutes=20 * i)) for i in range(6)])
+
+        assert [path.stem for path in store.segments()] == ['2024070109', '2024070110']
+        assert [path.stem for path in store.segments(base + timedelta(hours=1), base + timedelta(hours=3))] == ['2024070110']
+        assert store.read_workers(store.segments()[0]) == {'w0', 'w1', 'w2'}
+
+    def test_scan_returns_entries_in_range(self, store):
+        """Scans return only entries inside the requested range."""
+        base = datetime(2024, 7, 1, 9, 0)
+        self._write(store, [self._assessment(f'w{i}', base + timedelta(minutes=i)) for i in range(100)])
+
+        entries = list(store.scan(base + timedelta(minutes=30), base + timedelta(minutes=39)))
+
+        assert [e['worker_identification']['worker_id'] for e in entries] == [f'w{i}' for i in range(30, 40)]
+
+    def test_scan_reads_only_overlapping_blocks(self, store):
+        """The sparse index keeps blocks outside the range from being decoded."""
+        from app.utils import compliance_store
+
+        base = datetime(2024, 7, 1, 9, 0)
+        self._write(store, [self._assessment(f'w{i}', base + timedelta(seconds=i)) for i in range(200)])
+        assert len(store.read_index(store.segments()[0])) == 20
+
+        with patch.object(compliance_store, 'loads', wraps=compliance_store.loads) as mock_loads:
+            entries = list(store.scan(base + timedelta(seconds=50), base + timedelta(seconds=59)))
+
+        assert len(entries) == 10
+        assert mock_loads.call_count == 10
+
+    def test_worker_filter_pushed_down(self, store):
+        """Worker filters skip segments and lines before decoding."""
+        from app.utils import compliance_store
+
+        base = datetime(2024, 7, 1, 9, 0)
+        self._write(store, [self._assessment(f'w{i % 5}', base + timedelta(minutes=10 * i)) for i in range(30)])
+        self._write(store, [self._assessment('late', base + timedelta(hours=6))])
+
+        with patch.object(compliance_store, 'loads', wraps=compliance_store.loads) as mock_loads:
+            entries = list(store.scan(base, base + timedelta(hours=5), worker_ids=['w3']))
+            assert list(store.scan(base, base + timedelta(hours=7), worker_ids=['nobody'])) == []
+
+        assert len(entries) == 6
+        assert all(e['worker_identification']['worker_id'] == 'w3' for e in entries)
+        assert mock_loads.call_count == 6
+
+    def test_worker_filter_finds_pre_serialized_entries(self, store):
+        """Entries logged as JSON strings, and older lines with spaced separators, match worker filters."""
+        base = datetime(2024, 7, 1, 9, 0)
+        self._write(store, [json.dumps({
+            'event_type': 'HEAT_EXPOSURE_PREDICTION',
+            'worker_id': 'logged',
+            'timestamp_utc': base.isoformat()
+        })])
+        with open(store.segments()[0], 'ab') as f:
+            f.write(b'2024-07-01T09:00:01.000000 | INFO | ' + json.dumps({
+                'event_type': 'HEAT_EXPOSURE_PREDICTION', 'worker_id': 'older'
+            }).encode() + b'\n')
+
+        entries = list(store.scan(base, base + timedelta(minutes=1), worker_ids=['logged', 'older']))
+
+        assert [e['worker_id'] for e in entries] == ['logged', 'older']
+        assert store.read_workers(store.segments()[0]) == {'logged'}
+
+    def test_appends_resume_after_restart(self, store):
+        """A new store instance keeps indexing where the last one stopped."""
+        from app.utils.compliance_store import ComplianceSegmentStore
+
+        base = datetime(2024, 7, 1, 9, 0)
+        self._write(store, [self._assessment(f'w{i}', base + timedelta(seconds=i)) for i in range(15)])
+        reopened = ComplianceSegmentStore(root=str(store.root), index_interval=10)
+        self._write(reopened, [self._assessment(f'w{i}', base + timedelta(seconds=i)) for i in range(15, 40)])
+
+        blocks = reopened.read_index(reopened.segments()[0])
+        assert [end - start > 0 for start, end, _, _ in blocks] == [True] * len(blocks)
+        assert all(blocks[i][1] == blocks[i + 1][0] for i in range(len(blocks) - 1))
+        assert len(list(reopened.scan(base, base + timedelta(minutes=1)))) == 40
+
+    def test_partial_tail_line_ignored(self, store):
+        """A line still being written is not returned."""
+        base = datetime(2024, 7, 1, 9, 0)
+        self._write(store, [self._assessment('w1', base)])
+        with open(store.segments()[0], 'ab') as f:
+            f.write(b'2024-07-01T09:00:01.000000 | INFO | {"compliance_ev')
+
+        assert len(list(store.scan(base, base + timedelta(minutes=1)))) == 1
+
+    def test_timezone_aware_timestamps(self, store):
+        """Aware timestamps are stored and queried as local time."""
+        from datetime import timezone
+
+        moment = datetime(2024, 7, 1, 9, 0, tzinfo=timezone.utc)
+        self._write(store, [self._assessment('w1', moment)])
+
+        entries = list(store.scan(moment - timedelta(minutes=1), moment + timedelta(minutes=1)))
+        assert len(entries) == 1
+
+    def test_invalid_partition(self):
+        """Unknown partitions are rejected."""
+        from app.utils.compliance_store import ComplianceSegmentStore
+
+        with pytest.raises(ValueError):
+            ComplianceSegmentStore(root=tempfile.mkdtemp(), partition='minute')
+
+
+class TestComplianceRollups:
+    """Test hour × site × worker compliance rollups."""
+
+    @pytest.fixture
+    def store(self):
+        from app.utils.compliance_store import ComplianceSegmentStore
+
+        temp_dir = tempfile.mkdtemp()
+        yield ComplianceSegmentStore(root=os.path.join(temp_dir, 'osha_compliance'))
+
+    def _assessment(self, worker_id, timestamp, risk_score=0.5, heat_index=95.0, site_id=None):
+        return {
+            'compliance_event': 'HEAT_EXPOSURE_ASSESSMENT',
+            'timestamp_utc': timestamp.isoformat(),
+            'worker_identification': {'worker_id': worker_id, 'site_id': site_id},
+            'environmental_conditions': {'heat_index_fahrenheit': heat_index},
+            'risk_assessment': {
+                'heat_exposure_risk_score': risk_score,
+                'risk_level': 'Danger' if risk_score > 0.75 else 'Caution',
+                'requires_immediate_attention': risk_score > 0.75
+            }
+        }
+
+    def _write(self, store, entries):
+        from app.utils.compliance_writer import ComplianceWriter
+
+        writer = ComplianceWriter(store=store, flush_interval_ms=5)
+        for entry in entries:
+            writer.submit(entry)
+        writer.close(timeout=5)
+
+    def test_bucket_totals_and_merge(self):
+        """Buckets keep counts, sums and maxima, and merge losslessly."""
+        from app.utils.compliance_rollups import RollupBucket
+
+        first, second = RollupBucket(), RollupBucket()
+        first.add_assessment('Caution', 0.4, 85.0, False)
+        second.add_assessment('Danger', 0.9, 120.0, True)
+        second.add_event('BATCH_HIGH_RISK_ALERT')
+        first.merge(second)
+
+        assert first.assessments == 2
+        assert first.risk_levels == {'Caution': 1, 'Danger': 1}
+        assert first.risk_score_max == 0.9
+        assert first.heat_index_max == 120.0
+        assert first.average_risk_score() == pytest.approx(0.65)
+        assert first.high_risk == 1
+        assert first.immediate_attention == 1
+        assert first.events == {'BATCH_HIGH_RISK_ALERT': 1}
+        assert RollupBucket.from_dict(first.to_dict()).to_dict() == first.to_dict()
+
+    def test_rollups_persisted_per_hour_site_and_worker(self, store):
+        """Written entries are rolled up by hour, site and worker next to the segment."""
+        from app.utils.compliance_store import ROLLUP_SUFFIX
+        from app.utils.compliance_rollups import SegmentRollup
+
+        base = datetime(2024, 7, 1, 9, 0)
+        self._write(store, [
+            self._assessment('w1', base, risk_score=0.9, site_id='north'),
+            self._assessment('w1', base + timedelta(minutes=5), risk_score=0.3, site_id='north'),
+            self._assessment('w2', base + timedelta(minutes=10)),
+            {'compliance_event': 'BATCH_HIGH_RISK_ALERT', 'timestamp_utc': base.isoformat()}
+        ])
+
+        rollup = SegmentRollup.load(store.segment_path('2024070109').with_suffix(ROLLUP_SUFFIX))
+        hour = rollup.hours['2024070109']
+        assert hour.totals.assessments == 3
+        assert hour.totals.events == {'BATCH_HIGH_RISK_ALERT': 1}
+        assert hour.sites['north']['w1'].assessments == 2
+        assert hour.sites['north']['w1'].risk_score_max == 0.9
+        assert hour.sites['unassigned']['w2'].assessments == 1
+        assert hour.assessed_workers == {'w1', 'w2'}
+
+    def test_entries_after_saved_rollup_are_replayed(self, store):
+        """Entries written after the rollups were saved are folded in on load."""
+        from app.utils.compliance_store import ROLLUP_SUFFIX
+
+        base = datetime(2024, 7, 1, 9, 0)
+        self._write(store, [self._assessment(f'w{i}', base + timedelta(minutes=i)) for i in range(5)])
+        assert store.load_rollup('2024070109').hours['2024070109'].totals.assessments == 5
+
+        # Simulate a crash before the rollups were saved again
+        os.remove(store.segment_path('2024070109').with_suffix(ROLLUP_SUFFIX))
+        self._write(store, [self._assessment('w9', base + timedelta(minutes=30))])
+
+        hour = store.load_rollup('2024070109').hours['2024070109']
+        assert hour.totals.assessments == 6
+        assert 'w9' in hour.assessed_workers
+
+
+class TestComplianceArchive:
+    """Test compaction of closed compliance segments to Parquet."""
+
+    @pytest.fixture
+    def store(self):
+        pytest.importorskip('pyarrow')
+        from app.utils.compliance_store import ComplianceSegmentStore
+
+        temp_dir = tempfile.mkdtemp()
+        yield ComplianceSegmentStore(root=os.path.join(temp_dir, 'osha_compliance'))
+
+    def _assessment(self, worker_id, timestamp, risk_score=0.5):
+        from app.services.compliance_service import ComplianceService
+
+        service = ComplianceService.__new__(ComplianceService)
+        return service._create_compliance_entry({
+            'timestamp': timestamp.isoformat(),
+            'worker_id': worker_id,
+            'site_id': 'north',
+            'heat_index': 95.0,
+            'heat_exposure_risk_score': risk_score,
+            'risk_level': 'Danger' if risk_score > 0.75 else 'Caution',
+            'requires_immediate_attention': risk_score > 0.75,
+            'osha_recommendation_key': 2,
+            'request_id': f'req-{worker_id}-{timestamp.minute}'
+        })
+
+    def _write(self, store, entries):
+        from app.utils.compliance_writer import ComplianceWriter
+
+        writer = ComplianceWriter(store=store, flush_interval_ms=5)
+        for entry in entries:
+            writer.submit(entry)
+        writer.close(timeout=5)
+
+    def test_compaction_preserves_every_row(self, store):
+        """Archived segments return the same entries as the lines they replace."""
+        from app.utils.compliance_archive import ComplianceCompactor
+
+        base = datetime(2024, 7, 1, 9, 0)
+        entries = [self._assessment(f'w{i % 7}', base + timedelta(seconds=i), risk_score=(i % 10) / 10)
+                   for i in range(500)]
+        entries.append({'compliance_event': 'BATCH_HIGH_RISK_ALERT', 'timestamp_utc': base.isoformat(),
+                        'worker_id': 'w3', 'details': {'count': 2}})
+        self._write(store, entries)
+
+        expected = list(store.scan(base, base + timedelta(hours=1)))
+        segment_bytes = store.segment_path('2024070109').stat().st_size
+
+        compactor = ComplianceCompactor(store)
+        assert compactor.run_once(now=base + timedelta(hours=3)) == 1
+        assert not store.segment_path('2024070109').exists()
+        assert store.archive_path('2024070109').stat().st_size * 5 < segment_bytes
+
+        assert sorted(store.scan(base, base + timedelta(hours=1)), key=json.dumps) == sorted(expected, key=json.dumps)
+        assert store.load_rollup('2024070109').hours['2024070109'].totals.assessments == 500
+
+        worker_entries = list(store.scan(base, base + timedelta(hours=1), worker_ids=['w3']))
+        assert len(worker_entries) == len([i for i in range(500) if i % 7 == 3]) + 1  # The w3 alert too
+
+        projected = list(store.scan(base, base + timedelta(seconds=9), columns=['risk_assessment.risk_level']))
+        assert len(projected) == 11
+        assert projected[-1] == {'compliance_event': 'HEAT_EXPOSURE_ASSESSMENT',
+                                 'risk_assessment': {'risk_level': 'Danger'}}
+
+    def test_open_and_recent_segments_are_not_compacted(self, store):
+        """Segments within the grace period or still open in the writer stay as lines."""
+        from app.utils.compliance_archive import ComplianceCompactor
+        from app.utils.compliance_store import SegmentRecord, format_timestamp
+
+        base = datetime(2024, 7, 1, 9, 0)
+        self._write(store, [self._assessment('w1', base)])
+        compactor = ComplianceCompactor(store)
+        assert compactor.run_once(now=base + timedelta(minutes=90)) == 0
+
+        entry = self._assessment('w2', base + timedelta(minutes=1))
+        line = b"%s | INFO | %s\n" % (format_timestamp(base + timedelta(minutes=1)), json.dumps(entry).encode())
+        store.append([SegmentRecord(base + timedelta(minutes=1), 'w2', line, entry)])
+        assert compactor.run_once(now=base + timedelta(hours=3)) == 0
+        assert store.segment_path('2024070109').exists()
+
+        store.close()
+        assert compactor.run_once(now=base + timedelta(hours=3)) == 1
+
+    def test_late_entries_merge_into_archive(self, store):
+        """Entries written after compaction are read alongside the archive and merged later."""
+        from app.utils.compliance_archive import ComplianceCompactor
+
+        base = datetime(2024, 7, 1, 9, 0)
+        compactor = ComplianceCompactor(store)
+        self._write(store, [self._assessment(f'w{i}', base + timedelta(minutes=i)) for i in range(5)])
+        compactor.run_once(now=base + timedelta(hours=3))
+
+        self._write(store, [self._assessment('late', base + timedelta(minutes=30), risk_score=0.9)])
+        assert store.segment_path('2024070109').exists()
+        assert len(list(store.scan(base, base + timedelta(hours=1)))) == 6
+        hour = store.load_rollup('2024070109').hours['2024070109']
+        assert hour.totals.assessments == 6
+        assert hour.totals.high_risk == 1
+
+        assert compactor.run_once(now=base + timedelta(hours=3)) == 1
+        assert not store.segment_path('2024070109').exists()
+        assert len(list(store.scan(base, base + timedelta(hours=1)))) == 6
+        assert store.load_rollup('2024070109').hours['2024070109'].totals.assessments == 6
+        assert 'late' in store.read_workers(store.segment_path('2024070109'))
+
+
+class TestComplianceProcessSegments:
+    """Test per-process compliance segments and their merge."""
+
+    @pytest.fixture
+    def root(self):
+        temp_dir = tempfile.mkdtemp()
+        yield os.path.join(temp_dir, 'osha_compliance')
+
+    def _records(self, timestamps, worker_id):
+        from app.utils.compliance_store import SegmentRecord, format_timestamp
+        from app.utils.serialization import dumps
+
+        records = []
+        for sequence, timestamp in enumerate(timestamps):
+            entry = {'compliance_event': 'HEAT_EXPOSURE_ASSESSMENT', 'timestamp_utc': timestamp.isoformat(),
+                     'worker_identification': {'worker_id': worker_id, 'site_id': 'north'},
+                     'risk_assessment': {'risk_level': 'Caution', 'heat_exposure_risk_score': 0.4},
+                     'sequence': sequence}
+            line = format_timestamp(timestamp) + b' | INFO | ' + dumps(entry) + b'\n'
+            records.append(SegmentRecord(timestamp, worker_id, line, entry))
+        return records
+
+    def test_processes_write_own_segments_merged_in_time_order(self, root):
+        """Concurrent processes never share a file, and merging orders their entries by time."""
+        pytest.importorskip('fcntl')
+        import multiprocessing
+        from app.utils.compliance_merge import ComplianceSegmentMerger, SharedComplianceStore
+        from app.utils.compliance_writer import ComplianceWriter
+
+        base = datetime(2024, 7, 1, 9, 0)
+
+        def write(index):
+            writer = ComplianceWriter(store=SharedComplianceStore(root), flush_interval_ms=5)
+            for i in range(200):
+                writer.submit({'compliance_event': 'HEAT_EXPOSURE_ASSESSMENT',
+                               'timestamp_utc': (base + timedelta(seconds=i, milliseconds=index)).isoformat(),
+                               'worker_identification': {'worker_id': f'p{index}', 'site_id': 'north'},
+                               'risk_assessment': {'risk_level': 'Safe'}})
+            writer.close(timeout=10)
+
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=write, args=(index,)) for index in range(3)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+            assert process.exitcode == 0
+
+        store = SharedComplianceStore(root)
+        assert len(os.listdir(store.process_root)) == 3
+        assert len(list(store.scan(base, base + timedelta(hours=1)))) == 600
+        assert store.load_rollup('2024070109').hours['2024070109'].totals.assessments == 600
+
+        # The writers have exited, so their segments are merged whatever their age
+        merger = ComplianceSegmentMerger(store)
+        assert merger.run_once(now=base) == 3
+        assert merger.get_metrics()['processes_adopted'] == 3
+        assert os.listdir(store.process_root) == []
+
+        with open(store.consolidated.segment_path('2024070109'), 'rb') as f:
+            lines = f.read().splitlines()
+        assert len(lines) == 600
+        assert lines == sorted(lines, key=lambda line: line[:26])
+        assert len(list(store.scan(base, base + timedelta(hours=1), worker_ids=['p1']))) == 200
+        assert store.load_rollup('2024070109').hours['2024070109'].totals.assessments == 600
+        assert store.segment_workers('2024070109') == {'p0', 'p1', 'p2'}
+
+    def test_own_segments_merge_once_closed(self, root):
+        """This process's segments stay unmerged until their period is past the grace period."""
+        from app.utils.compliance_merge import ComplianceSegmentMerger, SharedComplianceStore
+
+        base = datetime(2024, 7, 1, 9, 0)
+        store = SharedComplianceStore(root)
+        store.append(self._records([base + timedelta(minutes=i) for i in range(10)], 'w1'))
+
+        merger = ComplianceSegmentMerger(store)
+        assert merger.run_once(now=base + timedelta(minutes=62)) == 0
+        assert store.local.segment_path('2024070109').exists()
+
+        assert merger.run_once(now=base + timedelta(hours=2)) == 1
+        assert not store.local.segment_path('2024070109').exists()
+        assert len(list(store.scan(base, base + timedelta(hours=1)))) == 10
+
+        # Late entries start a new process segment, merged into the consolidated one
+        store.append(self._records([base + timedelta(minutes=5, seconds=30)], 'late'))
+        assert len(list(store.scan(base, base + timedelta(hours=1)))) == 11
+        assert merger.run_once(now=base + timedelta(hours=3)) == 1
+
+        worker_ids = [entry['worker_identification']['worker_id'] for entry in
+                     store.scan(base + timedelta(minutes=5), base + timedelta(minutes=6))]
+        assert worker_ids == ['w1', 'late', 'w1']
+        assert store.load_rollup('2024070109', detail=True).hours['2024070109'].totals.assessments == 11
+        assert store.get_stats()['unmerged_segment_count'] == 0
+
+    def test_merge_leaves_segment_written_meanwhile(self, root):
+        """A process segment that grows while it is being merged is left for the next pass."""
+        from app.utils.compliance_merge import ComplianceSegmentMerger, SharedComplianceStore
+
+        base = datetime(2024, 7, 1, 9, 0)
+        store = SharedComplianceStore(root)
+        store.append(self._records([base], 'w1'))
+        store.close()
+
+        merger = ComplianceSegmentMerger(store)
+        stage_segment = store.consolidated.stage_segment
+
+        def stage_and_append(*args, **kwargs):
+            staged = stage_segment(*args, **kwargs)
+            store.append(self._records([base + timedelta(minutes=1)], 'w2'))
+            store.close()
+            return staged
+
+        with patch.object(store.consolidated, 'stage_segment', side_effect=stage_and_append):
+            assert merger.merge(store.local, '2024070109') is False
+
+        assert not store.consolidated.segment_path('2024070109').exists()
+        assert list(store.root.glob('*.staged')) == []
+        assert merger.merge(store.local, '2024070109') is True
+        assert len(list(store.scan(base, base + timedelta(hours=1)))) == 2
+
+    def test_paused_scan_does_not_block_merge(self, root):
+        """A consumer paused mid-scan holds no lock, so a merge can swap files meanwhile."""
+        pytest.importorskip('fcntl')
+        from app.utils.compliance_merge import ComplianceSegmentMerger, SharedComplianceStore
+
+        base = datetime(2024, 7, 1, 9, 0)
+        store = SharedComplianceStore(root)
+        store.append(self._records([base + timedelta(minutes=i) for i in range(10)], 'w1'))
+        store.close()
+
+        entries = store.scan(base, base + timedelta(hours=1))
+        first = next(entries)
+
+        merger = ComplianceSegmentMerger(store)
+        merge = threading.Thread(target=merger.run_once, kwargs={'now': base + timedelta(hours=2)}, daemon=True)
+        merge.start()
+        merge.join(5)
+
+        assert not merge.is_alive()
+        assert merger.get_metrics()['segments_merged'] == 1
+        assert len([first] + list(entries)) == 10
+        assert len(list(store.scan(base, base + timedelta(hours=1)))) == 10
+
+
 # Mark all utility tests as unit tests
 for name, obj in list(globals().items()):
     if isinstance(obj, type) and name.startswith('Test'):